@@ -640,11 +640,12 @@ def combinatorial_cv_endpoint():
         "strategy": "ma_crossover",
         "params": {"fast": 10, "slow": 30},
         "n_splits": 10,
+        "n_test_splits": 2,
         "embargo_pct": 0.01
     }
 
     Returns:
-        Per-fold IS/OOS Sharpe ratios
+        Per-combination IS/OOS Sharpe ratios and backtest path Sharpe ratios
     """
     try:
         data = request.json
@@ -654,6 +655,7 @@ def combinatorial_cv_endpoint():
         end_date = data.get('end_date')
         params = data['params']
         n_splits = data.get('n_splits', 10)
+        n_test_splits = data.get('n_test_splits', 2)
         embargo_pct = data.get('embargo_pct', 0.01)
 
         # Fetch data
@@ -665,7 +667,8 @@ def combinatorial_cv_endpoint():
             ma_crossover_strategy_wrapper,
             params,
             n_splits=n_splits,
-            embargo_pct=embargo_pct
+            embargo_pct=embargo_pct,
+            n_test_splits=n_test_splits
         )
 
         return jsonify(results)
@@ -1,20 +1,227 @@
 # combinatorial_cv.py - Combinatorial Purged Cross-Validation
 # Implements CPCV with purging and embargo for time series
 
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import KFold
-from typing import Callable, Dict
+from typing import Callable, Dict, Optional, Tuple, Union
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Combinations with fewer test observations are not evaluated
+MIN_TEST_SIZE = 10
+
+# Below this many (split × observation × variant) cells the pool costs more than it saves
+_MIN_PARALLEL_CELLS = 50_000_000
+
+# Strategy returns and split masks shared with pool workers (set once per worker)
+_worker_state: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+
+
+class CPCVSplits:
+    """
+    Train/test masks for every combination of k test groups out of N.
+
+    Observations are cut into N contiguous groups. Each of the C(N, k)
+    combinations tests on its k groups and trains on the rest, minus
+    `purge_size` observations before each test group (labels overlapping
+    the test period) and `embargo_size` observations after it. The
+    combinations assemble into C(N-1, k-1) full backtest paths, each group
+    being tested once per path.
+    """
+
+    def __init__(self, n_obs: int, n_groups: int = 10, n_test_groups: int = 2,
+                 embargo_size: int = 0, purge_size: int = 1):
+        if not 0 < n_test_groups < n_groups:
+            raise ValueError("n_test_groups must be between 1 and n_groups - 1")
+        if n_obs < n_groups:
+            raise ValueError(f"Need at least {n_groups} observations for {n_groups} groups")
+
+        self.n_obs = n_obs
+        self.n_groups = n_groups
+        self.n_test_groups = n_test_groups
+
+        sizes = np.full(n_groups, n_obs // n_groups)
+        sizes[:n_obs % n_groups] += 1
+        ends = np.cumsum(sizes)
+        starts = ends - sizes
+        self.group_of = np.repeat(np.arange(n_groups), sizes)
+
+        # (C × k) test groups of each combination, in lexicographic order
+        self.combinations = np.array(list(itertools.combinations(range(n_groups), n_test_groups)))
+        membership = np.zeros((len(self.combinations), n_groups), dtype=bool)
+        membership[np.arange(len(self.combinations))[:, None], self.combinations] = True
+
+        positions = np.arange(n_obs)
+        in_group = (positions >= starts[:, None]) & (positions < ends[:, None])
+        excluded = ((positions >= (starts - purge_size)[:, None])
+                    & (positions < (ends + embargo_size)[:, None]))
+
+        # Boolean matrix products: any of the combination's groups
+        self.test_masks = membership @ in_group
+        self.train_masks = ~(membership @ excluded)
+
+        # Path j tests group g with the j-th combination containing g
+        self.paths = np.column_stack([np.flatnonzero(membership[:, g]) for g in range(n_groups)])
+
+    @property
+    def n_splits(self) -> int:
+        return len(self.combinations)
+
+    @property
+    def n_paths(self) -> int:
+        return self.paths.shape[0]
+
+
+def masked_sharpes(masks: np.ndarray, values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    Annualized Sharpe ratio of every variant over every mask.
+
+    Args:
+        masks: (S × T) boolean observation masks
+        values: (T × N) strategy returns with missing values set to 0
+        valid: (T × N) 1.0 where the return is present
+
+    Returns:
+        (S × N) Sharpe ratios (0 where fewer than 2 returns or no volatility,
+        as `calculate_sharpe`)
+    """
+    weights = masks.astype(float)
+    return sharpe_from_moments(weights @ valid, weights @ values, weights @ (values * values))
+
+
+def sharpe_from_moments(count: np.ndarray, total: np.ndarray, squares: np.ndarray) -> np.ndarray:
+    """
+    Annualized Sharpe ratio from observation count, sum and sum of squares.
+
+    Zero where there are fewer than 2 observations or no volatility.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        variance = np.maximum(squares - count * mean * mean, 0.0) / (count - 1)
+        sharpe = mean / np.sqrt(variance) * np.sqrt(252)
+
+    # Variance within rounding noise of the mean square is a flat series
+    flat = variance <= 1e-14 * squares / np.maximum(count, 1)
+    sharpe[(count < 2) | flat | ~np.isfinite(sharpe)] = 0.0
+    return sharpe
+
+
+def as_returns_series(returns: Union[pd.DataFrame, pd.Series]) -> pd.Series:
+    """Returns series from a returns series, or a frame with 'close' prices or returns"""
+    if isinstance(returns, pd.DataFrame):
+        if 'close' in returns.columns:
+            return returns['close'].pct_change().dropna()
+        # Assume it's already returns
+        return returns.iloc[:, 0] if returns.shape[1] > 0 else returns.squeeze()
+    return returns
+
+
+def _init_worker(values, valid, train_masks, test_masks):
+    global _worker_state
+    _worker_state = (values, valid, train_masks, test_masks)
+
+
+def _evaluate_chunk(splits: slice) -> Tuple[np.ndarray, np.ndarray]:
+    """Pool task: IS/OOS Sharpe ratios of a range of combinations"""
+    values, valid, train_masks, test_masks = _worker_state
+    return (masked_sharpes(train_masks[splits], values, valid),
+            masked_sharpes(test_masks[splits], values, valid))
+
+
+def cpcv_evaluate(strategy_returns: Union[pd.DataFrame, pd.Series, np.ndarray],
+                  n_splits: int = 10,
+                  n_test_splits: int = 2,
+                  embargo_pct: float = 0.01,
+                  purge_size: int = 1,
+                  n_jobs: Optional[int] = None) -> Dict:
+    """
+    Combinatorial Purged Cross-Validation over a matrix of strategy returns.
+
+    Every variant (column) is scored in-sample and out-of-sample on every
+    train/test combination at once; in each combination the variant with
+    the best in-sample Sharpe is selected, and the selections are stitched
+    into out-of-sample backtest paths (one column each, for PBO and path
+    statistics).
+
+    Args:
+        strategy_returns: (T × N) per-period returns of N strategy variants
+        n_splits: Number of groups N
+        n_test_splits: Groups per test set k
+        embargo_pct: Embargo after each test group, as % of total data
+        purge_size: Observations purged from training before each test group
+        n_jobs: Worker processes (None = all CPUs)
+
+    Returns:
+        {
+            'splits': CPCVSplits,
+            'is_sharpes': (C × N) in-sample Sharpe ratios,
+            'oos_sharpes': (C × N) out-of-sample Sharpe ratios,
+            'selected': (C,) best in-sample variant per combination,
+            'path_returns': (T × paths) out-of-sample path returns,
+            'path_sharpes': (paths,) Sharpe ratio of each path
+        }
+    """
+    frame = pd.DataFrame(strategy_returns)
+    values = frame.to_numpy(dtype=float)
+    valid = (~np.isnan(values)).astype(float)
+    values = np.nan_to_num(values, nan=0.0)
+
+    n_obs, n_variants = values.shape
+    splits = CPCVSplits(n_obs, n_splits, n_test_splits,
+                        embargo_size=int(n_obs * embargo_pct), purge_size=purge_size)
+
+    logger.info(f"CPCV: n={n_obs}, variants={n_variants}, combinations={splits.n_splits}, "
+                f"paths={splits.n_paths}")
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    cells = splits.n_splits * n_obs * n_variants
+    n_workers = min(n_jobs, splits.n_splits, max(1, cells // _MIN_PARALLEL_CELLS))
+
+    if n_workers > 1:
+        chunk_size = -(-splits.n_splits // n_workers)
+        chunks = [slice(k, k + chunk_size) for k in range(0, splits.n_splits, chunk_size)]
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(values, valid, splits.train_masks, splits.test_masks)) as executor:
+            results = list(executor.map(_evaluate_chunk, chunks))
+        is_sharpes = np.vstack([r[0] for r in results])
+        oos_sharpes = np.vstack([r[1] for r in results])
+    else:
+        is_sharpes = masked_sharpes(splits.train_masks, values, valid)
+        oos_sharpes = masked_sharpes(splits.test_masks, values, valid)
+
+    selected = np.argmax(is_sharpes, axis=1)
+
+    # Variant traded at each observation of each path: (paths × T)
+    variant = selected[splits.paths][:, splits.group_of]
+    raw = np.where(valid > 0, values, np.nan)
+    path_returns = raw[np.arange(n_obs), variant].T
+
+    path_valid = ~np.isnan(path_returns)
+    path_sharpes = masked_sharpes(np.ones((1, n_obs), dtype=bool),
+                                  np.nan_to_num(path_returns, nan=0.0),
+                                  path_valid.astype(float))[0]
+
+    return {
+        'splits': splits,
+        'is_sharpes': is_sharpes,
+        'oos_sharpes': oos_sharpes,
+        'selected': selected,
+        'path_returns': pd.DataFrame(path_returns, index=frame.index),
+        'path_sharpes': path_sharpes
+    }
+
 
 def combinatorial_purged_cv(returns: pd.DataFrame,
                             strategy_func: Callable,
                             params: dict,
                             n_splits: int = 10,
-                            embargo_pct: float = 0.01) -> dict:
+                            embargo_pct: float = 0.01,
+                            n_test_splits: int = 2,
+                            n_jobs: Optional[int] = None) -> dict:
     """
     Combinatorial Purged Cross-Validation (CPCV).
 
@@ -23,104 +230,37 @@ def combinatorial_purged_cv(returns: pd.DataFrame,
     2. Autocorrelation in time series
 
     CPCV addresses this by:
-    1. Creating multiple train/test splits
+    1. Testing on every combination of n_test_splits out of n_splits groups
     2. Purging overlapping observations
     3. Adding embargo period between train/test
 
+    Signals are generated once over the full history, so every split sees
+    the same (warmed-up) strategy returns.
+
     Args:
         returns: Returns dataframe or series
         strategy_func: Strategy function
         params: Strategy parameters
-        n_splits: Number of folds
+        n_splits: Number of groups
         embargo_pct: Embargo period as % of total data
+        n_test_splits: Groups in each test set
+        n_jobs: Worker processes (None = all CPUs)
 
     Returns:
         {
-            'is_sharpes': In-sample Sharpe per split,
-            'oos_sharpes': Out-of-sample Sharpe per split,
+            'is_sharpes': In-sample Sharpe per combination,
+            'oos_sharpes': Out-of-sample Sharpe per combination,
             'mean_is_sharpe': Average IS Sharpe,
             'mean_oos_sharpe': Average OOS Sharpe,
-            'splits': Details of each split
+            'path_sharpes': Sharpe of each reconstructed backtest path,
+            'splits': Details of each combination
         }
     """
-    # Convert to Series if DataFrame
-    if isinstance(returns, pd.DataFrame):
-        if 'close' in returns.columns:
-            prices = returns['close']
-            returns_series = prices.pct_change().dropna()
-        else:
-            # Assume it's already returns
-            returns_series = returns.iloc[:, 0] if returns.shape[1] > 0 else returns.squeeze()
-    else:
-        returns_series = returns
+    returns_series = as_returns_series(returns)
 
     n = len(returns_series)
-    embargo_size = int(n * embargo_pct)
-
-    logger.info(f"CPCV: n={n}, n_splits={n_splits}, embargo_size={embargo_size}")
-
-    kfold = KFold(n_splits=n_splits, shuffle=False)
-
-    is_sharpes = []
-    oos_sharpes = []
-    split_details = []
-
-    for fold_idx, (train_idx, test_idx) in enumerate(kfold.split(returns_series)):
-        # Apply embargo: remove embargo_size observations after train
-        if len(train_idx) > embargo_size:
-            train_idx = train_idx[:-embargo_size]
-
-        # Purge: remove test observations that overlap with train
-        # (This is simplified; full implementation would check for label overlap)
-        if len(train_idx) > 0:
-            test_idx = test_idx[test_idx > train_idx[-1] + embargo_size]
-
-        if len(test_idx) < 10:  # Skip if test set too small
-            logger.warning(f"Fold {fold_idx}: test set too small ({len(test_idx)}), skipping")
-            continue
-
-        # Split data
-        train_returns = returns_series.iloc[train_idx]
-        test_returns = returns_series.iloc[test_idx]
-
-        try:
-            # Generate signals
-            train_signals = strategy_func(train_returns, **params)
-            test_signals = strategy_func(test_returns, **params)
-
-            # Ensure signals are pandas Series
-            if not isinstance(train_signals, pd.Series):
-                train_signals = pd.Series(train_signals, index=train_returns.index)
-            if not isinstance(test_signals, pd.Series):
-                test_signals = pd.Series(test_signals, index=test_returns.index)
-
-            # Calculate strategy returns
-            train_strategy_returns = train_returns * train_signals.shift(1)
-            test_strategy_returns = test_returns * test_signals.shift(1)
-
-            # Calculate Sharpe ratios
-            is_sharpe = calculate_sharpe(train_strategy_returns.dropna())
-            oos_sharpe = calculate_sharpe(test_strategy_returns.dropna())
-
-            is_sharpes.append(is_sharpe)
-            oos_sharpes.append(oos_sharpe)
-
-            split_details.append({
-                'fold': fold_idx,
-                'train_size': len(train_idx),
-                'test_size': len(test_idx),
-                'is_sharpe': float(is_sharpe),
-                'oos_sharpe': float(oos_sharpe)
-            })
-
-            logger.info(f"Fold {fold_idx}: IS Sharpe={is_sharpe:.3f}, OOS Sharpe={oos_sharpe:.3f}")
-
-        except Exception as e:
-            logger.error(f"Error in fold {fold_idx}: {str(e)}")
-            continue
-
-    if len(is_sharpes) == 0:
-        logger.warning("No valid splits completed")
+    if n < n_splits or (n // n_splits) * n_test_splits < MIN_TEST_SIZE:
+        logger.warning(f"Not enough data for {n_splits} groups ({n} observations)")
         return {
             'is_sharpes': [],
             'oos_sharpes': [],
@@ -131,13 +271,39 @@ def combinatorial_purged_cv(returns: pd.DataFrame,
             'splits': []
         }
 
+    signals = strategy_func(returns_series, **params)
+    if not isinstance(signals, pd.Series):
+        signals = pd.Series(np.asarray(signals), index=returns_series.index)
+    strategy_returns = returns_series * signals.shift(1)
+
+    result = cpcv_evaluate(strategy_returns, n_splits=n_splits, n_test_splits=n_test_splits,
+                           embargo_pct=embargo_pct, n_jobs=n_jobs)
+    splits = result['splits']
+    is_sharpes = result['is_sharpes'][:, 0]
+    oos_sharpes = result['oos_sharpes'][:, 0]
+
+    split_details = [
+        {
+            'fold': int(c),
+            'test_groups': splits.combinations[c].tolist(),
+            'train_size': int(splits.train_masks[c].sum()),
+            'test_size': int(splits.test_masks[c].sum()),
+            'is_sharpe': float(is_sharpes[c]),
+            'oos_sharpe': float(oos_sharpes[c])
+        }
+        for c in range(splits.n_splits)
+    ]
+
     return {
-        'is_sharpes': is_sharpes,
-        'oos_sharpes': oos_sharpes,
+        'is_sharpes': is_sharpes.tolist(),
+        'oos_sharpes': oos_sharpes.tolist(),
         'mean_is_sharpe': float(np.mean(is_sharpes)),
         'mean_oos_sharpe': float(np.mean(oos_sharpes)),
         'std_is_sharpe': float(np.std(is_sharpes)),
         'std_oos_sharpe': float(np.std(oos_sharpes)),
+        'n_combinations': splits.n_splits,
+        'n_paths': splits.n_paths,
+        'path_sharpes': result['path_sharpes'].tolist(),
         'splits': split_details
     }
 
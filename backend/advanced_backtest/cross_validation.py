@@ -3,7 +3,13 @@
 import numpy as np
 import pandas as pd
 from typing import List, Tuple
-import itertools
+import sys
+import os
+
+# Add parent directory to path to import shared module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from shared.grid_search import GridSearch, sharpe_scorer
 
 class CombinatorialPurgedCV:
     """
@@ -16,16 +22,18 @@ class CombinatorialPurgedCV:
     """
 
     def __init__(self, n_splits: int = 5, purge_pct: float = 0.05,
-                 embargo_pct: float = 0.01):
+                 embargo_pct: float = 0.01, n_jobs: int = None):
         """
         Args:
             n_splits: Number of CV splits
             purge_pct: Percentage of data to purge around test set
             embargo_pct: Percentage of data to embargo after test set
+            n_jobs: Worker processes for the parameter search (None = all CPUs)
         """
         self.n_splits = n_splits
         self.purge_pct = purge_pct
         self.embargo_pct = embargo_pct
+        self.n_jobs = n_jobs
 
     def split(self, data: pd.DataFrame) -> List[Tuple[np.ndarray, np.ndarray]]:
         """
@@ -78,25 +86,28 @@ class CombinatorialPurgedCV:
 
         results = []
 
-        for train_idx, test_idx in splits:
-            train_data = data.iloc[train_idx]
-            test_data = data.iloc[test_idx]
+        # Flat or empty training returns score 0, as on the test sets
+        scorer = sharpe_scorer(flat_score=0.0, empty_score=0.0)
+
+        with GridSearch(data, strategy_func, param_grid, scorer=scorer, n_jobs=self.n_jobs) as search:
+            for train_idx, test_idx in splits:
+                test_data = data.iloc[test_idx]
 
-            # Optimize on train
-            best_params = self._optimize_params(train_data, strategy_func, param_grid)
+                # Optimize on train
+                best_params, _ = search.best(train_idx)
 
-            # Evaluate on test
-            signals = strategy_func(test_data, best_params)
-            returns = test_data['returns'] * signals.shift(1)
-            returns = returns.dropna()
+                # Evaluate on test
+                signals = strategy_func(test_data, best_params)
+                returns = test_data['returns'] * signals.shift(1)
+                returns = returns.dropna()
 
-            sharpe = np.sqrt(252) * returns.mean() / returns.std() if returns.std() > 0 else 0
+                sharpe = np.sqrt(252) * returns.mean() / returns.std() if returns.std() > 0 else 0
 
-            results.append({
-                'sharpe': sharpe,
-                'return': (1 + returns).prod() - 1,
-                'params': best_params
-            })
+                results.append({
+                    'sharpe': sharpe,
+                    'return': (1 + returns).prod() - 1,
+                    'params': best_params
+                })
 
         return {
             'mean_sharpe': np.mean([r['sharpe'] for r in results]),
@@ -105,32 +116,6 @@ class CombinatorialPurgedCV:
             'probability_of_skill': self._calculate_pos(results)
         }
 
-    def _optimize_params(self, data, strategy_func, param_grid):
-        """Optimize parameters on training data."""
-        best_sharpe = -np.inf
-        best_params = None
-
-        for params in self._generate_combinations(param_grid):
-            signals = strategy_func(data, params)
-            returns = data['returns'] * signals.shift(1)
-            returns = returns.dropna()
-
-            sharpe = np.sqrt(252) * returns.mean() / returns.std() if returns.std() > 0 else 0
-
-            if sharpe > best_sharpe:
-                best_sharpe = sharpe
-                best_params = params
-
-        return best_params
-
-    def _generate_combinations(self, param_grid):
-        """Generate parameter combinations."""
-        keys = list(param_grid.keys())
-        values = list(param_grid.values())
-
-        for combination in itertools.product(*values):
-            yield dict(zip(keys, combination))
-
     def _calculate_pos(self, results):
         """
         Calculate Probability of Skill (POS).
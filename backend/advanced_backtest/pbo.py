@@ -1,14 +1,28 @@
 # pbo.py - Probability of Backtest Overfitting calculation
 # Implements PBO metric from Bailey et al. (2014)
 
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 from scipy.stats import rankdata, pearsonr
-from typing import List, Tuple, Dict, Callable
+from typing import List, Tuple, Dict, Callable, Optional, Union
 import logging
 
+from combinatorial_cv import as_returns_series, sharpe_from_moments
+
 logger = logging.getLogger(__name__)
 
+# Splits per chunk are capped so each chunk's (splits × strategies) matrices stay small
+DEFAULT_CHUNK_CELLS = 2_000_000
+
+# Below this many (split × strategy) cells the pool costs more than it saves
+_MIN_PARALLEL_CELLS = 20_000_000
+
+# Per-block moments shared with pool workers (set once per worker by the initializer)
+_worker_moments: Optional[Tuple[np.ndarray, ...]] = None
+
 
 def calculate_pbo(in_sample_sharpes: np.ndarray,
                   out_sample_sharpes: np.ndarray,
@@ -96,17 +110,7 @@ def calculate_pbo(in_sample_sharpes: np.ndarray,
         # Fraction of top IS strategies that underperform median OOS
         pbo = np.mean(top_quartile_oos < median_oos)
 
-    # Interpretation
-    if pbo < 0.3:
-        interpretation = "Excellent - Very low probability of overfitting"
-    elif pbo < 0.5:
-        interpretation = "Good - Strategy appears robust"
-    elif pbo < 0.6:
-        interpretation = "Marginal - Strategy performance uncertain"
-    elif pbo < 0.7:
-        interpretation = "Poor - High probability of overfitting"
-    else:
-        interpretation = "Very Poor - Strategy likely overfit to in-sample data"
+    interpretation = _interpret(pbo)
 
     logger.info(f"PBO = {pbo:.2%}, Rank correlation = {rank_corr:.3f}")
 
@@ -129,83 +133,238 @@ def calculate_pbo(in_sample_sharpes: np.ndarray,
     }
 
 
+def _interpret(pbo: float) -> str:
+    if pbo < 0.3:
+        return "Excellent - Very low probability of overfitting"
+    elif pbo < 0.5:
+        return "Good - Strategy appears robust"
+    elif pbo < 0.6:
+        return "Marginal - Strategy performance uncertain"
+    elif pbo < 0.7:
+        return "Poor - High probability of overfitting"
+    return "Very Poor - Strategy likely overfit to in-sample data"
+
+
+def _init_worker(moments: Tuple[np.ndarray, ...]):
+    global _worker_moments
+    _worker_moments = moments
+
+
+def _cscv_chunk_task(membership: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Pool task: evaluate a chunk of CSCV splits against the worker's shared moments"""
+    return _cscv_chunk(membership, _worker_moments)
+
+
+def _cscv_chunk(membership: np.ndarray, moments: Tuple[np.ndarray, ...]) -> Tuple[np.ndarray, ...]:
+    """
+    Evaluate the CSCV splits whose in-sample blocks are the rows of `membership`.
+
+    Returns:
+        logits, in-sample Sharpe of the IS-best strategy and its OOS Sharpe
+        (one per split), plus per-strategy IS and OOS Sharpe summed over the
+        chunk's splits
+    """
+    count, total, squares = moments
+    weights = membership.astype(float)
+
+    # In-sample moments are sums over the selected blocks; OOS is the rest
+    is_moments = [weights @ m for m in moments]
+    oos_moments = [m.sum(axis=0) - im for m, im in zip(moments, is_moments)]
+    is_sharpes = sharpe_from_moments(*is_moments)
+    oos_sharpes = sharpe_from_moments(*oos_moments)
+
+    rows = np.arange(len(membership))
+    best = np.argmax(is_sharpes, axis=1)
+    best_oos = oos_sharpes[rows, best]
+
+    # Average OOS rank (1..N) of the IS-best strategy, as rankdata
+    below = np.sum(oos_sharpes < best_oos[:, None], axis=1)
+    ties = np.sum(oos_sharpes == best_oos[:, None], axis=1)
+    omega = (below + (ties + 1) / 2) / (count.shape[1] + 1)
+    logits = np.log(omega / (1 - omega))
+
+    return logits, is_sharpes[rows, best], best_oos, is_sharpes.sum(axis=0), oos_sharpes.sum(axis=0)
+
+
+def _even_partitions(n_splits: int) -> int:
+    """CSCV partition count for a requested number of splits: odd values round down to even (minimum 2)"""
+    n_partitions = max(2, int(n_splits) - int(n_splits) % 2)
+    if n_partitions != n_splits:
+        logger.info(f"CSCV needs an even number of partitions: using {n_partitions} instead of {n_splits}")
+    return n_partitions
+
+
+def cscv_pbo(strategy_returns: Union[pd.DataFrame, np.ndarray],
+             n_partitions: int = 16,
+             n_jobs: Optional[int] = None,
+             chunk_cells: int = DEFAULT_CHUNK_CELLS) -> dict:
+    """
+    Probability of Backtest Overfitting by combinatorially symmetric cross-validation.
+
+    The T × N matrix of strategy returns is cut into S row blocks. Every
+    choice of S/2 blocks is one split: the strategy with the best in-sample
+    Sharpe is located in the out-of-sample ranking, giving the logit
+    λ = ln(ω / (1 - ω)) of its relative OOS rank ω. PBO is the fraction of
+    the C(S, S/2) splits with λ <= 0.
+
+    Per-block sums make each split's Sharpe ratios two matrix products;
+    splits are evaluated in chunks bounded by `chunk_cells` and spread
+    across worker processes for large N.
+
+    Args:
+        strategy_returns: (T × N) per-period returns of N strategies
+        n_partitions: Number of row blocks S (even)
+        n_jobs: Worker processes (None = all CPUs)
+        chunk_cells: Maximum splits × strategies evaluated per chunk
+
+    Returns:
+        PBO, logit distribution, performance degradation and per-strategy
+        average IS/OOS Sharpe ratios
+    """
+    frame = pd.DataFrame(strategy_returns)
+    values = frame.to_numpy(dtype=float)
+    n_obs, n_strategies = values.shape
+
+    if n_partitions % 2 or n_partitions < 2:
+        raise ValueError("n_partitions must be a positive even number")
+    if n_strategies < 2:
+        raise ValueError("Need at least 2 strategies for PBO estimation")
+    if n_obs < 2 * n_partitions:
+        raise ValueError(f"Need at least {2 * n_partitions} observations for {n_partitions} partitions")
+
+    # (S × N) count, sum and sum of squares of each block
+    valid = ~np.isnan(values)
+    values = np.where(valid, values, 0.0)
+    starts = np.linspace(0, n_obs, n_partitions + 1).astype(int)[:-1]
+    moments = tuple(np.add.reduceat(m, starts, axis=0)
+                    for m in (valid.astype(float), values, values * values))
+
+    combinations = np.array(list(itertools.combinations(range(n_partitions), n_partitions // 2)))
+    membership = np.zeros((len(combinations), n_partitions), dtype=bool)
+    membership[np.arange(len(combinations))[:, None], combinations] = True
+    n_splits = len(membership)
+
+    chunk_size = max(1, chunk_cells // n_strategies)
+    chunks = [membership[k:k + chunk_size] for k in range(0, n_splits, chunk_size)]
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_workers = min(n_jobs, len(chunks), max(1, n_splits * n_strategies // _MIN_PARALLEL_CELLS))
+
+    logger.info(f"CSCV PBO: {n_strategies} strategies, {n_obs} observations, "
+                f"{n_splits} splits in {len(chunks)} chunks, {n_workers} workers")
+
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(moments,)) as executor:
+            results = list(executor.map(_cscv_chunk_task, chunks))
+    else:
+        results = [_cscv_chunk(chunk, moments) for chunk in chunks]
+
+    logits = np.concatenate([r[0] for r in results])
+    best_is = np.concatenate([r[1] for r in results])
+    best_oos = np.concatenate([r[2] for r in results])
+    mean_is = sum(r[3] for r in results) / n_splits
+    mean_oos = sum(r[4] for r in results) / n_splits
+
+    pbo = float(np.mean(logits <= 0))
+
+    # Performance degradation: OOS Sharpe of the IS-best strategy against its IS Sharpe
+    if np.ptp(best_is) > 0:
+        slope, intercept = np.polyfit(best_is, best_oos, 1)
+    else:
+        slope, intercept = 0.0, float(np.mean(best_oos))
+
+    ranks_is = rankdata(mean_is)
+    ranks_oos = rankdata(mean_oos)
+    rank_corr = pearsonr(ranks_is, ranks_oos)[0] if np.ptp(ranks_is) > 0 and np.ptp(ranks_oos) > 0 else 0.0
+    best_is_idx = int(np.argmax(mean_is))
+
+    logger.info(f"PBO = {pbo:.2%} over {n_splits} splits, Rank correlation = {rank_corr:.3f}")
+
+    return {
+        'pbo': pbo,
+        'pbo_percentage': pbo * 100,
+        'is_overfit': bool(pbo > 0.5),
+        'rank_correlation': float(rank_corr),
+        'n_trials': int(n_strategies),
+        'n_splits': int(n_splits),
+        'n_partitions': int(n_partitions),
+        'logits': logits.tolist(),
+        'probability_of_loss': float(np.mean(best_oos < 0)),
+        'performance_degradation': {'slope': float(slope), 'intercept': float(intercept)},
+        'best_is_sharpe': float(mean_is[best_is_idx]),
+        'best_is_oos_sharpe': float(mean_oos[best_is_idx]),
+        'median_oos_sharpe': float(np.median(mean_oos)),
+        'mean_is_sharpes': mean_is,
+        'mean_oos_sharpes': mean_oos,
+        'interpretation': _interpret(pbo),
+        'rank_plot_data': {
+            'ranks_is': ranks_is.tolist(),
+            'ranks_oos': ranks_oos.tolist(),
+            'best_is_idx': best_is_idx
+        }
+    }
+
+
 def pbo_from_returns(returns: pd.DataFrame,
                      strategy_func: Callable,
                      param_grid: dict,
-                     n_splits: int = 10) -> dict:
+                     n_splits: int = 10,
+                     n_jobs: Optional[int] = None) -> dict:
     """
     Calculate PBO by running strategy with multiple parameter combinations.
 
     This is the practical implementation:
-    1. Split data into multiple train/test folds (CPCV)
-    2. For each parameter combination, calculate IS and OOS Sharpe
-    3. Calculate PBO from these results
+    1. Run every parameter combination once over the full history
+    2. Stack the strategy returns into a T × N matrix
+    3. Calculate PBO over all CSCV splits of that matrix
 
     Args:
         returns: Returns dataframe or series
         strategy_func: Function that takes (returns, **params) and returns signals
         param_grid: Dict of parameter ranges to test
             Example: {'lookback': [10, 20, 30], 'threshold': [1.5, 2.0, 2.5]}
-        n_splits: Number of train/test splits
+        n_splits: Number of CSCV partitions (odd values are rounded down to even)
+        n_jobs: Worker processes (None = all CPUs)
 
     Returns:
         PBO results + parameter combination details
     """
-    from itertools import product
-    from combinatorial_cv import combinatorial_purged_cv
-
     logger.info(f"Calculating PBO from returns with param_grid={param_grid}")
 
     # Generate all parameter combinations
     param_names = list(param_grid.keys())
-    param_values = list(param_grid.values())
-    param_combinations = list(product(*param_values))
-
-    n_params = len(param_combinations)
-    logger.info(f"Testing {n_params} parameter combinations")
-
-    # Storage for results
-    is_sharpes = np.zeros(n_params)
-    oos_sharpes = np.zeros(n_params)
-    param_details = []
-
-    # For each parameter combination
-    for i, param_tuple in enumerate(param_combinations):
-        params = dict(zip(param_names, param_tuple))
-
-        logger.info(f"Testing params {i+1}/{n_params}: {params}")
+    param_combinations = [dict(zip(param_names, values))
+                          for values in itertools.product(*param_grid.values())]
 
-        # Run CPCV
-        cv_results = combinatorial_purged_cv(
-            returns,
-            strategy_func,
-            params,
-            n_splits=n_splits
-        )
+    logger.info(f"Testing {len(param_combinations)} parameter combinations")
 
-        is_sharpes[i] = cv_results['mean_is_sharpe']
-        oos_sharpes[i] = cv_results['mean_oos_sharpe']
+    returns_series = as_returns_series(returns)
+    strategy_returns = _strategy_returns_matrix(
+        returns_series, [(strategy_func, params) for params in param_combinations]
+    )
 
-        param_details.append({
-            'params': params,
-            'is_sharpe': float(is_sharpes[i]),
-            'oos_sharpe': float(oos_sharpes[i])
-        })
-
-    # Calculate PBO
-    pbo_results = calculate_pbo(is_sharpes, oos_sharpes)
+    pbo_results = cscv_pbo(strategy_returns, n_partitions=_even_partitions(n_splits), n_jobs=n_jobs)
+    mean_is = pbo_results.pop('mean_is_sharpes')
+    mean_oos = pbo_results.pop('mean_oos_sharpes')
 
     # Add parameter details
+    param_details = [
+        {'params': params, 'is_sharpe': float(is_sharpe), 'oos_sharpe': float(oos_sharpe)}
+        for params, is_sharpe, oos_sharpe in zip(param_combinations, mean_is, mean_oos)
+    ]
+    best_idx = pbo_results['rank_plot_data']['best_is_idx']
     pbo_results['parameter_combinations'] = param_details
-    pbo_results['best_params'] = param_details[np.argmax(is_sharpes)]['params']
-    pbo_results['best_params_oos_sharpe'] = param_details[np.argmax(is_sharpes)]['oos_sharpe']
+    pbo_results['best_params'] = param_details[best_idx]['params']
+    pbo_results['best_params_oos_sharpe'] = param_details[best_idx]['oos_sharpe']
 
     return pbo_results
 
 
 def pbo_test(strategies: List[Callable],
              returns: pd.DataFrame,
-             n_splits: int = 10) -> dict:
+             n_splits: int = 10,
+             n_jobs: Optional[int] = None) -> dict:
     """
     Calculate PBO for a list of different strategies.
 
@@ -215,44 +374,45 @@ def pbo_test(strategies: List[Callable],
     Args:
         strategies: List of strategy functions
         returns: Returns data
-        n_splits: Number of CV splits
+        n_splits: Number of CSCV partitions (odd values are rounded down to even)
+        n_jobs: Worker processes (None = all CPUs)
 
     Returns:
         PBO results comparing different strategies
     """
-    from combinatorial_cv import combinatorial_purged_cv
-
     n_strategies = len(strategies)
     logger.info(f"Calculating PBO for {n_strategies} different strategies")
 
-    is_sharpes = np.zeros(n_strategies)
-    oos_sharpes = np.zeros(n_strategies)
-    strategy_details = []
-
-    for i, strategy_func in enumerate(strategies):
-        logger.info(f"Testing strategy {i+1}/{n_strategies}: {strategy_func.__name__}")
-
-        cv_results = combinatorial_purged_cv(
-            returns,
-            strategy_func,
-            {},  # No params
-            n_splits=n_splits
-        )
+    returns_series = as_returns_series(returns)
+    strategy_returns = _strategy_returns_matrix(
+        returns_series, [(strategy_func, {}) for strategy_func in strategies]
+    )
 
-        is_sharpes[i] = cv_results['mean_is_sharpe']
-        oos_sharpes[i] = cv_results['mean_oos_sharpe']
-
-        strategy_details.append({
-            'strategy_name': strategy_func.__name__,
-            'is_sharpe': float(is_sharpes[i]),
-            'oos_sharpe': float(oos_sharpes[i])
-        })
-
-    # Calculate PBO
-    pbo_results = calculate_pbo(is_sharpes, oos_sharpes)
+    pbo_results = cscv_pbo(strategy_returns, n_partitions=_even_partitions(n_splits), n_jobs=n_jobs)
+    mean_is = pbo_results.pop('mean_is_sharpes')
+    mean_oos = pbo_results.pop('mean_oos_sharpes')
 
     # Add strategy details
+    strategy_details = [
+        {'strategy_name': strategy_func.__name__, 'is_sharpe': float(is_sharpe), 'oos_sharpe': float(oos_sharpe)}
+        for strategy_func, is_sharpe, oos_sharpe in zip(strategies, mean_is, mean_oos)
+    ]
     pbo_results['strategies'] = strategy_details
-    pbo_results['best_strategy'] = strategy_details[np.argmax(is_sharpes)]['strategy_name']
+    pbo_results['best_strategy'] = strategy_details[pbo_results['rank_plot_data']['best_is_idx']]['strategy_name']
 
     return pbo_results
+
+
+def _strategy_returns_matrix(returns_series: pd.Series,
+                             runs: List[Tuple[Callable, dict]]) -> np.ndarray:
+    """(T × N) returns of each (strategy, params) run over the full history"""
+    matrix = np.full((len(returns_series), len(runs)), np.nan)
+    for i, (strategy_func, params) in enumerate(runs):
+        try:
+            signals = strategy_func(returns_series, **params)
+            if not isinstance(signals, pd.Series):
+                signals = pd.Series(np.asarray(signals), index=returns_series.index)
+            matrix[:, i] = (returns_series * signals.shift(1)).to_numpy(dtype=float)
+        except Exception as e:
+            logger.error(f"Error running {getattr(strategy_func, '__name__', strategy_func)} {params}: {str(e)}")
+    return matrix
@@ -4,6 +4,13 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import Callable, Dict, List, Tuple
+import sys
+import os
+
+# Add parent directory to path to import shared module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from shared.grid_search import GridSearch, sharpe_scorer
 
 class WalkForwardOptimizer:
     """
@@ -13,7 +20,7 @@ class WalkForwardOptimizer:
 
     def __init__(self, data: pd.DataFrame, strategy_func: Callable,
                  param_grid: Dict, train_period: int = 252,
-                 test_period: int = 63):
+                 test_period: int = 63, n_jobs: int = None):
         """
         Args:
             data: Price data DataFrame
@@ -21,50 +28,24 @@ class WalkForwardOptimizer:
             param_grid: Dict of parameter ranges to optimize
             train_period: Training window size (days)
             test_period: Testing window size (days)
+            n_jobs: Worker processes for the parameter search (None = all CPUs)
         """
         self.data = data
         self.strategy_func = strategy_func
         self.param_grid = param_grid
         self.train_period = train_period
         self.test_period = test_period
+        self.n_jobs = n_jobs
 
         self.results = []
         self.optimal_params_history = []
 
-    def _generate_param_combinations(self):
-        """Generate all parameter combinations from grid."""
-        import itertools
-
-        keys = list(self.param_grid.keys())
-        values = list(self.param_grid.values())
-
-        for combination in itertools.product(*values):
-            yield dict(zip(keys, combination))
-
     def _calculate_sharpe(self, returns: pd.Series):
         """Calculate annualized Sharpe ratio."""
         if len(returns) == 0 or returns.std() == 0:
             return 0
         return np.sqrt(252) * returns.mean() / returns.std()
 
-    def _optimize_window(self, train_data: pd.DataFrame):
-        """Optimize parameters on training data."""
-        best_sharpe = -np.inf
-        best_params = None
-
-        for params in self._generate_param_combinations():
-            signals = self.strategy_func(train_data, params)
-            returns = train_data['returns'] * signals.shift(1)
-            returns = returns.dropna()
-
-            sharpe = self._calculate_sharpe(returns)
-
-            if sharpe > best_sharpe:
-                best_sharpe = sharpe
-                best_params = params
-
-        return best_params, best_sharpe
-
     def run(self):
         """
         Run walk-forward optimization.
@@ -78,40 +59,43 @@ class WalkForwardOptimizer:
         total_length = len(self.data)
         current_start = 0
 
-        while current_start + self.train_period + self.test_period <= total_length:
-            # Define windows
-            train_end = current_start + self.train_period
-            test_end = train_end + self.test_period
-
-            train_data = self.data.iloc[current_start:train_end].copy()
-            test_data = self.data.iloc[train_end:test_end].copy()
-
-            # Optimize on training data
-            best_params, train_sharpe = self._optimize_window(train_data)
-            self.optimal_params_history.append(best_params)
-
-            # Test on out-of-sample data
-            signals = self.strategy_func(test_data, best_params)
-            test_returns = test_data['returns'] * signals.shift(1)
-            test_returns = test_returns.dropna()
-
-            test_sharpe = self._calculate_sharpe(test_returns)
-            test_total_return = (1 + test_returns).prod() - 1
-
-            self.results.append({
-                'train_start': self.data.index[current_start],
-                'train_end': self.data.index[train_end - 1],
-                'test_start': self.data.index[train_end],
-                'test_end': self.data.index[test_end - 1],
-                'optimal_params': best_params,
-                'train_sharpe': train_sharpe,
-                'test_sharpe': test_sharpe,
-                'test_return': test_total_return,
-                'test_returns': test_returns
-            })
-
-            # Slide window
-            current_start += self.test_period
+        # Same ranking as _calculate_sharpe: flat or empty returns score 0
+        scorer = sharpe_scorer(flat_score=0.0, empty_score=0.0)
+        with GridSearch(self.data, self.strategy_func, self.param_grid,
+                        scorer=scorer, n_jobs=self.n_jobs) as search:
+            while current_start + self.train_period + self.test_period <= total_length:
+                # Define windows
+                train_end = current_start + self.train_period
+                test_end = train_end + self.test_period
+
+                test_data = self.data.iloc[train_end:test_end].copy()
+
+                # Optimize on training data
+                best_params, train_sharpe = search.best(slice(current_start, train_end))
+                self.optimal_params_history.append(best_params)
+
+                # Test on out-of-sample data
+                signals = self.strategy_func(test_data, best_params)
+                test_returns = test_data['returns'] * signals.shift(1)
+                test_returns = test_returns.dropna()
+
+                test_sharpe = self._calculate_sharpe(test_returns)
+                test_total_return = (1 + test_returns).prod() - 1
+
+                self.results.append({
+                    'train_start': self.data.index[current_start],
+                    'train_end': self.data.index[train_end - 1],
+                    'test_start': self.data.index[train_end],
+                    'test_end': self.data.index[test_end - 1],
+                    'optimal_params': best_params,
+                    'train_sharpe': train_sharpe,
+                    'test_sharpe': test_sharpe,
+                    'test_return': test_total_return,
+                    'test_returns': test_returns
+                })
+
+                # Slide window
+                current_start += self.test_period
 
         return self.results
 
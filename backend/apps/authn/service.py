@@ -18,18 +18,19 @@ Production requires:
 
 import os
 import json
+import time
+import base64
 import secrets
 import hashlib
-from datetime import datetime, timedelta
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 from pathlib import Path
 
 import yaml
-from fastapi import FastAPI, HTTPException, Depends, Form, Header
+from fastapi import FastAPI, HTTPException, Depends, Form, Header, Response
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import jwt
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, ed25519
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.backends import default_backend
 import uvicorn
@@ -45,6 +46,17 @@ clients: Dict[str, Dict] = {}
 active_jwk: Optional[Dict] = None
 next_jwk: Optional[Dict] = None
 
+# Parsed private keys by kid (PEM parsing is done once, not per token)
+signing_keys: Dict[str, object] = {}
+
+# Precomputed JWKS response: (body, etag)
+jwks_body: bytes = b""
+jwks_etag: str = ""
+
+# Issued tokens still worth reusing: (subject, audience, scope) -> (token, exp)
+token_cache: Dict[Tuple[str, str, str], Tuple[str, int]] = {}
+token_cache_stats = {"hits": 0, "misses": 0}
+
 
 class TokenRequest(BaseModel):
     grant_type: str
@@ -95,8 +107,23 @@ def load_config():
     print(f"✓ Loaded config: {len(clients)} clients, issuer={config['issuer']}")
 
 
+def _base64url(value: bytes) -> str:
+    """Base64url without padding (RFC 7515)."""
+    return base64.urlsafe_b64encode(value).rstrip(b'=').decode('utf-8')
+
+
+def _int_to_base64url(value: int, length: Optional[int] = None) -> str:
+    length = length or (value.bit_length() + 7) // 8
+    return _base64url(value.to_bytes(length, 'big'))
+
+
 def generate_jwk_pair(kid: str, algorithm: str = "RS256") -> Dict:
-    """Generate RSA key pair and return as JWK."""
+    """
+    Generate a signing key pair and return it as a JWK.
+
+    RS256 uses RSA; ES256 (P-256) and EdDSA (Ed25519) sign considerably
+    faster and produce smaller keys and signatures.
+    """
     if algorithm == "RS256":
         key_size = config.get('keys', {}).get('key_size', 2048)
         private_key = rsa.generate_private_key(
@@ -104,51 +131,94 @@ def generate_jwk_pair(kid: str, algorithm: str = "RS256") -> Dict:
             key_size=key_size,
             backend=default_backend()
         )
+        public_numbers = private_key.public_key().public_numbers()
+        public_fields = {
+            'kty': 'RSA',
+            'n': _int_to_base64url(public_numbers.n),
+            'e': _int_to_base64url(public_numbers.e)
+        }
 
-        # Export private key
-        private_pem = private_key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.PKCS8,
-            encryption_algorithm=serialization.NoEncryption()
-        )
+    elif algorithm == "ES256":
+        private_key = ec.generate_private_key(ec.SECP256R1(), backend=default_backend())
+        public_numbers = private_key.public_key().public_numbers()
+        public_fields = {
+            'kty': 'EC',
+            'crv': 'P-256',
+            'x': _int_to_base64url(public_numbers.x, 32),
+            'y': _int_to_base64url(public_numbers.y, 32)
+        }
 
-        # Export public key
-        public_key = private_key.public_key()
-        public_pem = public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
+    elif algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+        raw_public = private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PublicFormat.Raw
         )
+        public_fields = {
+            'kty': 'OKP',
+            'crv': 'Ed25519',
+            'x': _base64url(raw_public)
+        }
 
-        # Get public numbers for JWK
-        public_numbers = public_key.public_numbers()
+    else:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
 
-        # Convert to base64url without padding
-        def int_to_base64url(value):
-            value_hex = format(value, 'x')
-            if len(value_hex) % 2:
-                value_hex = '0' + value_hex
-            value_bytes = bytes.fromhex(value_hex)
-            import base64
-            return base64.urlsafe_b64encode(value_bytes).rstrip(b'=').decode('utf-8')
+    # Export private key
+    private_pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
 
-        n = int_to_base64url(public_numbers.n)
-        e = int_to_base64url(public_numbers.e)
+    # Export public key
+    public_pem = private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
 
-        jwk = {
-            'kty': 'RSA',
-            'use': 'sig',
-            'kid': kid,
-            'alg': algorithm,
-            'n': n,
-            'e': e,
-            'private_pem': private_pem.decode('utf-8'),
-            'public_pem': public_pem.decode('utf-8')
-        }
+    jwk = {
+        **public_fields,
+        'use': 'sig',
+        'kid': kid,
+        'alg': algorithm,
+        'private_pem': private_pem.decode('utf-8'),
+        'public_pem': public_pem.decode('utf-8')
+    }
 
-        return jwk
+    return jwk
+
+
+def public_jwk(jwk: Dict) -> Dict:
+    """JWK without the private material."""
+    return {k: v for k, v in jwk.items() if k not in ('private_pem', 'public_pem')}
 
-    else:
-        raise ValueError(f"Unsupported algorithm: {algorithm}")
+
+def refresh_key_state():
+    """
+    Preload signing keys and rebuild the JWKS response after keys change.
+
+    Cached tokens are dropped so nothing signed by a retired active key is
+    handed out again.
+    """
+    global jwks_body, jwks_etag
+
+    for jwk in [active_jwk, next_jwk]:
+        if jwk and jwk['kid'] not in signing_keys:
+            signing_keys[jwk['kid']] = serialization.load_pem_private_key(
+                jwk['private_pem'].encode('utf-8'),
+                password=None,
+                backend=default_backend()
+            )
+
+    live_kids = {jwk['kid'] for jwk in [active_jwk, next_jwk] if jwk}
+    for kid in list(signing_keys):
+        if kid not in live_kids:
+            del signing_keys[kid]
+
+    jwks_body = json.dumps(get_jwks_public(), separators=(',', ':')).encode('utf-8')
+    jwks_etag = '"' + hashlib.sha256(jwks_body).hexdigest()[:32] + '"'
+
+    token_cache.clear()
 
 
 def load_or_generate_keys():
@@ -187,27 +257,14 @@ def load_or_generate_keys():
 
 def get_jwks_public() -> Dict:
     """Return JWKS with public keys only."""
-    keys = []
-
-    for jwk in [active_jwk, next_jwk]:
-        if jwk:
-            public_jwk = {
-                'kty': jwk['kty'],
-                'use': jwk['use'],
-                'kid': jwk['kid'],
-                'alg': jwk['alg'],
-                'n': jwk['n'],
-                'e': jwk['e']
-            }
-            keys.append(public_jwk)
-
-    return {'keys': keys}
+    return {'keys': [public_jwk(jwk) for jwk in [active_jwk, next_jwk] if jwk]}
 
 
-def create_jwt(client_id: str, client_data: Dict, audience: Optional[str], scope: Optional[str]) -> str:
-    """Create JWT using active key."""
-    now = datetime.utcnow()
-    exp = now + timedelta(seconds=config['token_ttl_seconds'])
+def create_jwt(client_id: str, client_data: Dict, audience: Optional[str], scope: Optional[str]) -> Tuple[str, int]:
+    """Create JWT using active key. Returns (token, exp)."""
+    # Epoch seconds: comparable with time.time() in issue_token on any host timezone
+    now = int(time.time())
+    exp = now + config['token_ttl_seconds']
 
     # Determine audience
     aud = audience if audience else config['audiences'][0]
@@ -219,24 +276,52 @@ def create_jwt(client_id: str, client_data: Dict, audience: Optional[str], scope
         'iss': config['issuer'],
         'sub': client_id,
         'aud': aud,
-        'iat': int(now.timestamp()),
-        'exp': int(exp.timestamp()),
-        'nbf': int(now.timestamp()),
+        'iat': now,
+        'exp': exp,
+        'nbf': now,
         'roles': client_data['roles'],
         'tenant': client_data['tenant'],
         'scope': token_scope,
         'jti': secrets.token_hex(16)  # JWT ID for tracking
     }
 
-    # Sign with active key
+    # Sign with active key (algorithm follows the key, not the config, so a
+    # key generated before an algorithm change keeps working until rotated)
     token = jwt.encode(
         payload,
-        active_jwk['private_pem'],
-        algorithm=config.get('algorithm', 'RS256'),
+        signing_keys[active_jwk['kid']],
+        algorithm=active_jwk['alg'],
         headers={'kid': active_jwk['kid']}
     )
 
-    return token
+    return token, payload['exp']
+
+
+def issue_token(client_id: str, client_data: Dict, audience: Optional[str], scope: Optional[str]) -> Tuple[str, int]:
+    """
+    Return a cached token for (client, audience, scope) or sign a new one.
+
+    A cached token is reissued once less than `token_cache.reissue_before_seconds`
+    of its lifetime remains. Returns (token, seconds until expiry).
+    """
+    cache_config = config.get('token_cache', {})
+    key = (client_id, audience or '', scope or '')
+    now = int(time.time())
+
+    if cache_config.get('enabled', True):
+        cached = token_cache.get(key)
+        reissue_before = cache_config.get('reissue_before_seconds', config['token_ttl_seconds'] // 5)
+        if cached and cached[1] - now > reissue_before:
+            token_cache_stats['hits'] += 1
+            return cached[0], cached[1] - now
+
+    token_cache_stats['misses'] += 1
+    token, exp = create_jwt(client_id, client_data, audience, scope)
+
+    if cache_config.get('enabled', True):
+        token_cache[key] = (token, exp)
+
+    return token, exp - now
 
 
 @app.on_event("startup")
@@ -255,6 +340,7 @@ async def startup():
 
     load_config()
     load_or_generate_keys()
+    refresh_key_state()
 
     print("")
     print("=" * 60)
@@ -276,14 +362,26 @@ async def health():
         "service": "authn",
         "issuer": config.get('issuer'),
         "active_kid": active_jwk['kid'] if active_jwk else None,
-        "next_kid": next_jwk['kid'] if next_jwk else None
+        "next_kid": next_jwk['kid'] if next_jwk else None,
+        "token_cache": {"size": len(token_cache), **token_cache_stats}
     }
 
 
 @app.get("/.well-known/jwks.json")
-async def jwks():
-    """JWKS endpoint - returns public keys for token verification."""
-    return get_jwks_public()
+async def jwks(if_none_match: Optional[str] = Header(None)):
+    """
+    JWKS endpoint - returns public keys for token verification.
+
+    The body is precomputed when keys change and served with an ETag so
+    verifiers can revalidate cheaply (304 Not Modified).
+    """
+    headers = {
+        'ETag': jwks_etag,
+        'Cache-Control': f"public, max-age={config.get('jwks_max_age_seconds', 300)}"
+    }
+    if if_none_match == jwks_etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=jwks_body, media_type='application/json', headers=headers)
 
 
 @app.post("/token", response_model=TokenResponse)
@@ -321,12 +419,12 @@ async def token(
         if not secrets.compare_digest(client_secret, client_data['secret']):
             raise HTTPException(status_code=401, detail="Invalid client_secret")
 
-        # Issue token
-        access_token = create_jwt(client_id, client_data, audience, scope)
+        # Issue token (reused while comfortably within its lifetime)
+        access_token, expires_in = issue_token(client_id, client_data, audience, scope)
 
         return TokenResponse(
             access_token=access_token,
-            expires_in=config['token_ttl_seconds'],
+            expires_in=expires_in,
             scope=' '.join(client_data['scopes'])
         )
 
@@ -347,12 +445,12 @@ async def token(
         if not secrets.compare_digest(password, client_data['secret']):
             raise HTTPException(status_code=401, detail="Invalid password")
 
-        # Issue token
-        access_token = create_jwt(user_id, client_data, audience, scope)
+        # Issue token (reused while comfortably within its lifetime)
+        access_token, expires_in = issue_token(user_id, client_data, audience, scope)
 
         return TokenResponse(
             access_token=access_token,
-            expires_in=config['token_ttl_seconds'],
+            expires_in=expires_in,
             scope=' '.join(client_data['scopes'])
         )
 
@@ -399,6 +497,8 @@ async def rotate_keys(authorization: Optional[str] = Header(None)):
     with open(next_path, 'w') as f:
         json.dump(next_jwk, f, indent=2)
 
+    refresh_key_state()
+
     print(f"✓ Key rotation: {old_kid} -> {active_jwk['kid']} (next: {new_kid})")
 
     return RotateResponse(
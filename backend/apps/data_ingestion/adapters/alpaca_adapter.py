@@ -4,7 +4,7 @@ Streams real-time Level 1 market data from Alpaca Markets (FREE)
 
 Component Isolation:
 - ONLY talks to Alpaca WebSocket API
-- ONLY writes to QuestDB (via ILP) and Valkey (cache)
+- ONLY writes to QuestDB (via the shared ILP writer) and Valkey (cache)
 - NO dependencies on other services
 - Self-contained error handling
 """
@@ -31,7 +31,8 @@ except ImportError as e:
     Trade = None
 
 import redis.asyncio as redis
-import httpx
+
+from .ilp_writer import ILPIngestionWriter, ILPWriterConfig
 
 
 @dataclass
@@ -70,7 +71,8 @@ class AlpacaAdapter:
         alpaca_config: AlpacaConfig,
         store_config: StoreConfig,
         symbols: List[str],
-        logger: Optional[logging.Logger] = None
+        logger: Optional[logging.Logger] = None,
+        ilp_writer: Optional[ILPIngestionWriter] = None
     ):
         self.alpaca_config = alpaca_config
         self.store_config = store_config
@@ -84,8 +86,8 @@ class AlpacaAdapter:
 
         # Data stores
         self.valkey_client: Optional[redis.Redis] = None
-        self.questdb_client: Optional[httpx.AsyncClient] = None
-        self.questdb_url: str = f"http://{store_config.questdb_http_host}:{store_config.questdb_http_port}/write"
+        self.ilp_writer: Optional[ILPIngestionWriter] = ilp_writer  # Shared QuestDB writer
+        self._owns_writer = ilp_writer is None
 
         # Statistics
         self.stats = {
@@ -102,7 +104,7 @@ class AlpacaAdapter:
 
         # Connect to data stores
         await self._connect_valkey()
-        self._connect_questdb()
+        await self._connect_questdb()
 
         # Connect to Alpaca
         await self._connect_alpaca()
@@ -128,15 +130,15 @@ class AlpacaAdapter:
             await self.valkey_client.close()
             self.logger.info("Valkey connection closed")
 
-        if self.questdb_client:
-            await self.questdb_client.aclose()
+        if self.ilp_writer and self._owns_writer:
+            await self.ilp_writer.stop()
             self.logger.info("QuestDB client closed")
 
         self.logger.info("Alpaca Adapter stopped")
 
     def is_healthy(self) -> bool:
         """Check if adapter is healthy"""
-        return self.connected and self.valkey_client is not None and self.questdb_client is not None
+        return self.connected and self.valkey_client is not None and self.ilp_writer is not None
 
     def get_status(self) -> Dict:
         """Get detailed adapter status"""
@@ -148,7 +150,7 @@ class AlpacaAdapter:
             "stats": self.stats,
             "data_stores": {
                 "valkey": "connected" if self.valkey_client else "disconnected",
-                "questdb": "connected" if self.questdb_client else "disconnected"
+                "questdb": "connected" if self.ilp_writer else "disconnected"
             }
         }
 
@@ -172,14 +174,25 @@ class AlpacaAdapter:
             self.valkey_client = None
             raise
 
-    def _connect_questdb(self):
-        """Connect to QuestDB HTTP endpoint"""
+    async def _connect_questdb(self):
+        """Connect to QuestDB (own batching writer unless a shared one was given)"""
+        if not self._owns_writer:
+            return
+
         try:
-            self.questdb_client = httpx.AsyncClient(timeout=5.0)
-            self.logger.info(f"QuestDB client initialized for {self.questdb_url}")
+            self.ilp_writer = ILPIngestionWriter(
+                ILPWriterConfig(
+                    host=self.store_config.questdb_http_host,
+                    http_port=self.store_config.questdb_http_port,
+                    timeout_seconds=5.0
+                ),
+                self.logger
+            )
+            await self.ilp_writer.start()
+            self.logger.info(f"QuestDB client initialized for {self.ilp_writer.http_url}")
         except Exception as e:
             self.logger.error(f"Failed to initialize QuestDB client: {e}")
-            self.questdb_client = None
+            self.ilp_writer = None
             raise
 
     async def _connect_alpaca(self):
@@ -254,8 +267,8 @@ class AlpacaAdapter:
             self.stats["quotes_received"] += 1
             self.stats["last_quote_time"] = datetime.now().isoformat()
 
-            # Write to QuestDB (persistent storage)
-            await self._write_quote_questdb(symbol, quote, timestamp)
+            # Queue for QuestDB (persistent storage, batched by the writer)
+            self._write_quote_questdb(symbol, quote, timestamp)
 
             # Write to Valkey (hot cache)
             await self._write_quote_valkey(symbol, quote, timestamp)
@@ -275,10 +288,10 @@ class AlpacaAdapter:
         except Exception as e:
             self.logger.error(f"Error processing trade update for {trade.symbol}: {e}")
 
-    async def _write_quote_questdb(self, symbol: str, quote: Quote, timestamp: int):
-        """Write quote data to QuestDB via HTTP (ILP format)"""
-        if not self.questdb_client:
-            self.logger.warning(f"QuestDB client not initialized, skipping write for {symbol}")
+    def _write_quote_questdb(self, symbol: str, quote: Quote, timestamp: int):
+        """Queue quote data for QuestDB (ILP format, batched by the ILP writer)"""
+        if not self.ilp_writer:
+            self.logger.warning(f"QuestDB writer not initialized, skipping write for {symbol}")
             return
 
         try:
@@ -299,24 +312,15 @@ class AlpacaAdapter:
                 f"{timestamp}"
             )
 
-            # Send via HTTP POST to /write endpoint
-            response = await self.questdb_client.post(
-                self.questdb_url,
-                params={"fmt": "ilp"},
-                content=line.encode('utf-8'),
-                headers={"Content-Type": "text/plain"}
-            )
-            response.raise_for_status()
-
-            self.stats["writes_succeeded"] += 1
-            self.logger.debug(f"Successfully wrote {symbol} to QuestDB")
+            # Delivery outcome per batch is tracked in the writer's stats
+            if self.ilp_writer.write(line, source="alpaca"):
+                self.stats["writes_succeeded"] += 1
+            else:
+                self.stats["writes_failed"] += 1
 
-        except httpx.HTTPStatusError as e:
-            self.stats["writes_failed"] += 1
-            self.logger.error(f"QuestDB HTTP error for {symbol}: status={e.response.status_code}, body={e.response.text}")
         except Exception as e:
             self.stats["writes_failed"] += 1
-            self.logger.error(f"Failed to write {symbol} to QuestDB: {type(e).__name__}: {e}")
+            self.logger.error(f"Failed to queue {symbol} for QuestDB: {type(e).__name__}: {e}")
 
     async def _write_quote_valkey(self, symbol: str, quote: Quote, timestamp: int):
         """Write quote data to Valkey (hot cache)"""
@@ -361,7 +365,8 @@ def create_alpaca_adapter(
     alpaca_config: Dict,
     store_config: Dict,
     symbols: List[str],
-    logger: logging.Logger
+    logger: logging.Logger,
+    ilp_writer: Optional[ILPIngestionWriter] = None
 ) -> AlpacaAdapter:
     """
     Factory function to create Alpaca adapter from config dictionaries
@@ -371,6 +376,7 @@ def create_alpaca_adapter(
         store_config: Dictionary with questdb_http_host, questdb_http_port, valkey_host, valkey_port, valkey_ttl_seconds
         symbols: List of stock symbols to subscribe to
         logger: Logger instance
+        ilp_writer: Shared QuestDB writer (adapter creates its own if None)
 
     Returns:
         AlpacaAdapter instance
@@ -403,5 +409,6 @@ def create_alpaca_adapter(
         alpaca_config=alpaca_cfg,
         store_config=store_cfg,
         symbols=symbols,
-        logger=logger
+        logger=logger,
+        ilp_writer=ilp_writer
     )
@@ -4,7 +4,7 @@ Fetches economic data from Federal Reserve Economic Data (FRED) API
 
 Component Isolation:
 - ONLY talks to FRED API
-- ONLY writes to QuestDB (via ILP) and Valkey (cache)
+- ONLY writes to QuestDB (via the shared ILP writer) and Valkey (cache)
 - NO dependencies on other services
 - Self-contained error handling
 """
@@ -20,6 +20,8 @@ from dataclasses import dataclass
 import httpx
 import redis.asyncio as redis
 
+from .ilp_writer import ILPIngestionWriter, ILPWriterConfig
+
 
 @dataclass
 class FREDConfig:
@@ -56,7 +58,8 @@ class FREDAdapter:
         self,
         fred_config: FREDConfig,
         store_config: StoreConfig,
-        logger: Optional[logging.Logger] = None
+        logger: Optional[logging.Logger] = None,
+        ilp_writer: Optional[ILPIngestionWriter] = None
     ):
         self.fred_config = fred_config
         self.store_config = store_config
@@ -67,8 +70,8 @@ class FREDAdapter:
 
         # Data stores
         self.valkey_client: Optional[redis.Redis] = None
-        self.questdb_client: Optional[httpx.AsyncClient] = None
-        self.questdb_url: str = f"http://{store_config.questdb_http_host}:{store_config.questdb_http_port}/write"
+        self.ilp_writer: Optional[ILPIngestionWriter] = ilp_writer  # Shared QuestDB writer
+        self._owns_writer = ilp_writer is None
 
         # Control
         self.running = False
@@ -83,7 +86,7 @@ class FREDAdapter:
 
         # Connect to data stores
         await self._connect_valkey()
-        self._connect_questdb()
+        await self._connect_questdb()
 
         # Create HTTP client for FRED API
         self.http_client = httpx.AsyncClient(timeout=30.0)
@@ -120,8 +123,8 @@ class FREDAdapter:
             await self.valkey_client.close()
             self.logger.info("Closed Valkey connection")
 
-        if self.questdb_client:
-            await self.questdb_client.aclose()
+        if self.ilp_writer and self._owns_writer:
+            await self.ilp_writer.stop()
             self.logger.info("Closed QuestDB connection")
 
         self.logger.info("FRED Adapter stopped")
@@ -142,11 +145,21 @@ class FREDAdapter:
             self.logger.error(f"Failed to connect to Valkey: {e}")
             raise
 
-    def _connect_questdb(self):
-        """Connect to QuestDB via HTTP"""
+    async def _connect_questdb(self):
+        """Connect to QuestDB (own batching writer unless a shared one was given)"""
+        if not self._owns_writer:
+            return
+
         try:
-            self.questdb_client = httpx.AsyncClient(timeout=10.0)
-            self.logger.info(f"Connected to QuestDB HTTP: {self.questdb_url}")
+            self.ilp_writer = ILPIngestionWriter(
+                ILPWriterConfig(
+                    host=self.store_config.questdb_http_host,
+                    http_port=self.store_config.questdb_http_port
+                ),
+                self.logger
+            )
+            await self.ilp_writer.start()
+            self.logger.info(f"Connected to QuestDB HTTP: {self.ilp_writer.http_url}")
         except Exception as e:
             self.logger.error(f"Failed to connect to QuestDB: {e}")
             raise
@@ -284,8 +297,8 @@ class FREDAdapter:
             title = metadata.get("title", series_id)
             units = metadata.get("units", "")
 
-            # Write to QuestDB
-            await self._write_questdb(series_id, title, value, units, date_str, timestamp)
+            # Queue for QuestDB (batched by the writer)
+            self._write_questdb(series_id, title, value, units, date_str, timestamp)
 
             # Write to Valkey
             await self._write_valkey(series_id, title, value, units, date_str, timestamp)
@@ -293,10 +306,10 @@ class FREDAdapter:
         except Exception as e:
             self.logger.error(f"Failed to write observation for {series_id}: {type(e).__name__}: {e}")
 
-    async def _write_questdb(self, series_id: str, title: str, value: float, units: str, date_str: str, timestamp: int):
-        """Write economic data to QuestDB via HTTP"""
-        if not self.questdb_client:
-            self.logger.warning(f"QuestDB client not initialized, skipping write for {series_id}")
+    def _write_questdb(self, series_id: str, title: str, value: float, units: str, date_str: str, timestamp: int):
+        """Queue economic data for QuestDB (non-blocking, batched by the ILP writer)"""
+        if not self.ilp_writer:
+            self.logger.warning(f"QuestDB writer not initialized, skipping write for {series_id}")
             return
 
         try:
@@ -315,21 +328,13 @@ class FREDAdapter:
                 f"{timestamp}"
             )
 
-            # Send via HTTP POST to /write endpoint
-            response = await self.questdb_client.post(
-                self.questdb_url,
-                params={"fmt": "ilp"},
-                content=line.encode('utf-8'),
-                headers={"Content-Type": "text/plain"}
-            )
-            response.raise_for_status()
-
-            self.logger.debug(f"Successfully wrote {series_id} to QuestDB: {value} ({date_str})")
+            if self.ilp_writer.write(line, source="fred"):
+                self.logger.debug(f"Queued {series_id} for QuestDB: {value} ({date_str})")
+            else:
+                self.logger.warning(f"QuestDB queue full, dropped {series_id} observation")
 
-        except httpx.HTTPStatusError as e:
-            self.logger.error(f"QuestDB HTTP error for {series_id}: status={e.response.status_code}, body={e.response.text}")
         except Exception as e:
-            self.logger.error(f"Failed to write {series_id} to QuestDB: {type(e).__name__}: {e}", exc_info=True)
+            self.logger.error(f"Failed to queue {series_id} for QuestDB: {type(e).__name__}: {e}", exc_info=True)
 
     async def _write_valkey(self, series_id: str, title: str, value: float, units: str, date_str: str, timestamp: int):
         """Write economic data to Valkey (hot cache)"""
@@ -369,7 +374,7 @@ class FREDAdapter:
             self.running and
             self.http_client is not None and
             self.valkey_client is not None and
-            self.questdb_client is not None
+            self.ilp_writer is not None
         )
 
     def get_status(self) -> dict:
@@ -379,7 +384,7 @@ class FREDAdapter:
             "series_count": len(self.fred_config.series),
             "metadata_cached": len(self.series_metadata),
             "valkey_connected": self.valkey_client is not None,
-            "questdb_connected": self.questdb_client is not None,
+            "questdb_connected": self.ilp_writer is not None,
             "update_interval_minutes": self.fred_config.update_interval_minutes
         }
 
@@ -389,7 +394,8 @@ class FREDAdapter:
 def create_fred_adapter(
     fred_config: Dict,
     store_config: Dict,
-    logger: Optional[logging.Logger] = None
+    logger: Optional[logging.Logger] = None,
+    ilp_writer: Optional[ILPIngestionWriter] = None
 ) -> FREDAdapter:
     """Factory function to create FRED adapter from config dictionaries"""
 
@@ -413,4 +419,4 @@ def create_fred_adapter(
         valkey_ttl_seconds=store_config.get("valkey_ttl_seconds", 3600)
     )
 
-    return FREDAdapter(fred_cfg, store_cfg, logger)
+    return FREDAdapter(fred_cfg, store_cfg, logger, ilp_writer)
@@ -4,7 +4,7 @@ Streams Level 1, Level 2, and Time & Sales data from Interactive Brokers
 
 Component Isolation:
 - ONLY talks to IBKR API
-- ONLY writes to QuestDB (via ILP) and Valkey (cache)
+- ONLY writes to QuestDB (via the shared ILP writer) and Valkey (cache)
 - NO dependencies on other services
 - Self-contained error handling
 """
@@ -25,7 +25,8 @@ except ImportError:
     Ticker = None
 
 import redis.asyncio as redis
-import httpx
+
+from .ilp_writer import ILPIngestionWriter, ILPWriterConfig, safe_float, safe_int
 
 
 @dataclass
@@ -65,7 +66,8 @@ class IBKRAdapter:
         ibkr_config: IBKRConfig,
         store_config: StoreConfig,
         symbols: List[str],
-        logger: Optional[logging.Logger] = None
+        logger: Optional[logging.Logger] = None,
+        ilp_writer: Optional[ILPIngestionWriter] = None
     ):
         self.ibkr_config = ibkr_config
         self.store_config = store_config
@@ -79,8 +81,8 @@ class IBKRAdapter:
 
         # Data stores
         self.valkey_client: Optional[redis.Redis] = None
-        self.questdb_client: Optional[httpx.AsyncClient] = None
-        self.questdb_url: str = f"http://{store_config.questdb_http_host}:{store_config.questdb_http_port}/write"
+        self.ilp_writer: Optional[ILPIngestionWriter] = ilp_writer  # Shared QuestDB writer
+        self._owns_writer = ilp_writer is None
 
         # Subscriptions tracking
         self.subscriptions: Dict[str, object] = {}
@@ -92,7 +94,7 @@ class IBKRAdapter:
 
         # Connect to data stores
         await self._connect_valkey()
-        self._connect_questdb()
+        await self._connect_questdb()
 
         # Connect to IBKR
         await self._connect_ibkr()
@@ -119,8 +121,8 @@ class IBKRAdapter:
             await self.valkey_client.close()
             self.logger.info("Closed Valkey connection")
 
-        if self.questdb_client:
-            await self.questdb_client.aclose()
+        if self.ilp_writer and self._owns_writer:
+            await self.ilp_writer.stop()
             self.logger.info("Closed QuestDB connection")
 
         self.logger.info("IBKR Adapter stopped")
@@ -185,20 +187,21 @@ class IBKRAdapter:
             self.logger.error(f"Failed to connect to Valkey: {e}")
             raise
 
-    def _connect_questdb(self):
-        """Connect to QuestDB via HTTP"""
+    async def _connect_questdb(self):
+        """Connect to QuestDB (own batching writer unless a shared one was given)"""
+        if not self._owns_writer:
+            return
+
         try:
-            # Configure connection pool for high-frequency concurrent writes
-            # 62 symbols * 2 (concurrent requests) = 124 connections needed
-            limits = httpx.Limits(
-                max_connections=200,
-                max_keepalive_connections=100
+            self.ilp_writer = ILPIngestionWriter(
+                ILPWriterConfig(
+                    host=self.store_config.questdb_http_host,
+                    http_port=self.store_config.questdb_http_port
+                ),
+                self.logger
             )
-            self.questdb_client = httpx.AsyncClient(
-                timeout=30.0,  # Increased timeout for high load
-                limits=limits
-            )
-            self.logger.info(f"Connected to QuestDB HTTP: {self.questdb_url}")
+            await self.ilp_writer.start()
+            self.logger.info(f"Connected to QuestDB HTTP: {self.ilp_writer.http_url}")
         except Exception as e:
             self.logger.error(f"Failed to connect to QuestDB: {e}")
             raise
@@ -296,8 +299,8 @@ class IBKRAdapter:
 
             timestamp = int(time.time() * 1_000_000_000)  # nanoseconds
 
-            # Write to QuestDB (persistent storage)
-            await self._write_level1_questdb(symbol, ticker, timestamp)
+            # Queue for QuestDB (persistent storage, batched by the writer)
+            self._write_level1_questdb(symbol, ticker, timestamp)
 
             # Write to Valkey (hot cache)
             await self._write_level1_valkey(symbol, ticker, timestamp)
@@ -306,27 +309,13 @@ class IBKRAdapter:
             self.logger.error(f"Error processing Level 1 update for {symbol}: {e}")
             # Don't crash - component isolation
 
-    async def _write_level1_questdb(self, symbol: str, ticker: 'Ticker', timestamp: int):
-        """Write Level 1 data to QuestDB via HTTP"""
-        if not self.questdb_client:
-            self.logger.warning(f"QuestDB client not initialized, skipping write for {symbol}")
+    def _write_level1_questdb(self, symbol: str, ticker: 'Ticker', timestamp: int):
+        """Queue Level 1 data for QuestDB (non-blocking, batched by the ILP writer)"""
+        if not self.ilp_writer:
+            self.logger.warning(f"QuestDB writer not initialized, skipping write for {symbol}")
             return
 
         try:
-            import math
-
-            # Helper to safely convert to int, handling NaN
-            def safe_int(value):
-                if value is None or (isinstance(value, float) and math.isnan(value)):
-                    return 0
-                return int(value)
-
-            # Helper to safely convert to float, handling NaN
-            def safe_float(value):
-                if value is None or (isinstance(value, float) and math.isnan(value)):
-                    return 0.0
-                return float(value)
-
             # Build ILP (InfluxDB Line Protocol) string
             # Format: table_name,tag1=value1,tag2=value2 field1=value1,field2=value2 timestamp_ns
             line = (
@@ -344,21 +333,11 @@ class IBKRAdapter:
                 f"{timestamp}"
             )
 
-            # Send via HTTP POST to /write endpoint
-            response = await self.questdb_client.post(
-                self.questdb_url,
-                params={"fmt": "ilp"},
-                content=line.encode('utf-8'),
-                headers={"Content-Type": "text/plain"}
-            )
-            response.raise_for_status()
-
-            self.logger.debug(f"Successfully wrote {symbol} to QuestDB")
+            if not self.ilp_writer.write(line, source="ibkr"):
+                self.logger.debug(f"QuestDB queue full, dropped update for {symbol}")
 
-        except httpx.HTTPStatusError as e:
-            self.logger.error(f"QuestDB HTTP error for {symbol}: status={e.response.status_code}, body={e.response.text}")
         except Exception as e:
-            self.logger.error(f"Failed to write {symbol} to QuestDB: {type(e).__name__}: {e}", exc_info=True)
+            self.logger.error(f"Failed to queue {symbol} for QuestDB: {type(e).__name__}: {e}", exc_info=True)
 
     async def _write_level1_valkey(self, symbol: str, ticker: 'Ticker', timestamp: int):
         """Write Level 1 data to Valkey (hot cache)"""
@@ -366,21 +345,8 @@ class IBKRAdapter:
             return
 
         try:
-            import math
             import json
 
-            # Helper to safely convert to int, handling NaN
-            def safe_int(value):
-                if value is None or (isinstance(value, float) and math.isnan(value)):
-                    return 0
-                return int(value)
-
-            # Helper to safely convert to float, handling NaN
-            def safe_float(value):
-                if value is None or (isinstance(value, float) and math.isnan(value)):
-                    return 0.0
-                return float(value)
-
             key = f"market:l1:{symbol}"
             value = {
                 "symbol": symbol,
@@ -421,7 +387,7 @@ class IBKRAdapter:
             self.ib is not None and
             self.ib.isConnected() and
             self.valkey_client is not None and
-            self.questdb_client is not None
+            self.ilp_writer is not None
         )
 
     def get_status(self) -> dict:
@@ -443,7 +409,7 @@ class IBKRAdapter:
             },
             "reconnect_attempts": self.reconnect_attempts,
             "valkey_connected": self.valkey_client is not None,
-            "questdb_connected": self.questdb_client is not None,
+            "questdb_connected": self.ilp_writer is not None,
             "note": "IBKR paper trading has ~100-123 symbol limit. See IBKR_SUBSCRIPTION_LIMIT_ANALYSIS.md"
         }
 
@@ -454,7 +420,8 @@ def create_ibkr_adapter(
     ibkr_config: Dict,
     store_config: Dict,
     symbols: List[str],
-    logger: Optional[logging.Logger] = None
+    logger: Optional[logging.Logger] = None,
+    ilp_writer: Optional[ILPIngestionWriter] = None
 ) -> IBKRAdapter:
     """Factory function to create IBKR adapter from config dictionaries"""
 
@@ -474,4 +441,4 @@ def create_ibkr_adapter(
         valkey_ttl_seconds=store_config.get("valkey_ttl_seconds", 300)
     )
 
-    return IBKRAdapter(ibkr_cfg, store_cfg, symbols, logger)
+    return IBKRAdapter(ibkr_cfg, store_cfg, symbols, logger, ilp_writer)
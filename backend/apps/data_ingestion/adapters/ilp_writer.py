@@ -0,0 +1,423 @@
+"""
+Shared QuestDB ILP Ingestion Writer
+
+One writer is shared by all data adapters (IBKR, Alpaca, Yahoo, FRED).
+Adapters enqueue ILP lines without awaiting any I/O; a single background
+task drains the queue in micro-batches and ships each batch over a
+persistent connection:
+- "http": one keep-alive POST to /write per batch (pooled httpx client)
+- "tcp":  raw ILP over a persistent socket to the ILP port (9009)
+
+Backpressure:
+- The queue is bounded (max_queue_lines)
+- drop_policy decides what happens when it is full:
+  "drop_newest" (reject the new line), "drop_oldest" (evict the oldest
+  queued line) or "block" (only for callers using write_async)
+
+Per-source metrics: lines enqueued/written/dropped, lines/sec and batch
+latency, exposed through get_stats() for the /status endpoint.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+
+# --- Value helpers (shared by all adapters) ---
+
+def safe_int(value) -> int:
+    """Convert to int, mapping None/NaN to 0"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 0
+    return int(value)
+
+
+def safe_float(value) -> float:
+    """Convert to float, mapping None/NaN to 0.0"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 0.0
+    return float(value)
+
+
+def escape_tag(value: str) -> str:
+    """Escape an ILP tag value (spaces, commas, equals signs)"""
+    return str(value).replace(" ", "\\ ").replace(",", "\\,").replace("=", "\\=")
+
+
+# --- Configuration ---
+
+DROP_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+
+@dataclass
+class ILPWriterConfig:
+    """Ingestion writer configuration"""
+    host: str
+    http_port: int = 9000
+    ilp_port: int = 9009
+    transport: str = "http"  # "http" or "tcp"
+    max_queue_lines: int = 100_000
+    batch_max_lines: int = 5_000
+    flush_interval_ms: int = 100
+    drop_policy: str = "drop_oldest"
+    timeout_seconds: float = 10.0
+    retry_delay_seconds: float = 1.0
+
+
+class _SourceStats:
+    """Counters for one data source (adapter)"""
+
+    __slots__ = (
+        "enqueued", "written", "dropped", "failed", "batches",
+        "batch_latency_ms_total", "batch_latency_ms_max", "last_batch_latency_ms",
+        "_rate_window_start", "_rate_window_lines", "lines_per_sec"
+    )
+
+    def __init__(self):
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.batch_latency_ms_total = 0.0
+        self.batch_latency_ms_max = 0.0
+        self.last_batch_latency_ms = 0.0
+        self._rate_window_start = time.monotonic()
+        self._rate_window_lines = 0
+        self.lines_per_sec = 0.0
+
+    def record_batch(self, lines: int, latency_ms: float, ok: bool):
+        self.batches += 1
+        self.last_batch_latency_ms = latency_ms
+        self.batch_latency_ms_total += latency_ms
+        self.batch_latency_ms_max = max(self.batch_latency_ms_max, latency_ms)
+
+        if not ok:
+            self.failed += lines
+            return
+
+        self.written += lines
+        self._rate_window_lines += lines
+
+        # Lines/sec over a rolling ~5 second window
+        now = time.monotonic()
+        elapsed = now - self._rate_window_start
+        if elapsed >= 5.0:
+            self.lines_per_sec = self._rate_window_lines / elapsed
+            self._rate_window_start = now
+            self._rate_window_lines = 0
+
+    def current_rate(self) -> float:
+        """Lines/sec: last full window, or the current window once it spans 1s"""
+        elapsed = time.monotonic() - self._rate_window_start
+        if self.lines_per_sec == 0.0 and elapsed >= 1.0:
+            return self._rate_window_lines / elapsed
+        return self.lines_per_sec
+
+    def to_dict(self) -> dict:
+        return {
+            "lines_enqueued": self.enqueued,
+            "lines_written": self.written,
+            "lines_dropped": self.dropped,
+            "lines_failed": self.failed,
+            "batches": self.batches,
+            "lines_per_sec": round(self.current_rate(), 1),
+            "batch_latency_ms_avg": round(self.batch_latency_ms_total / self.batches, 2) if self.batches else 0.0,
+            "batch_latency_ms_max": round(self.batch_latency_ms_max, 2),
+            "batch_latency_ms_last": round(self.last_batch_latency_ms, 2)
+        }
+
+
+class ILPIngestionWriter:
+    """
+    Bounded, batching ILP writer shared by all adapters
+
+    Usage:
+        writer = ILPIngestionWriter(ILPWriterConfig(host="questdb"))
+        await writer.start()
+        writer.write("market_data_l1,symbol=SPY last=450.5 1700000000000000000", source="ibkr")
+        ...
+        await writer.stop()  # flushes remaining lines
+    """
+
+    def __init__(self, config: ILPWriterConfig, logger: Optional[logging.Logger] = None):
+        if config.drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Invalid drop_policy: {config.drop_policy}. Must be one of {DROP_POLICIES}")
+        if config.transport not in ("http", "tcp"):
+            raise ValueError(f"Invalid transport: {config.transport}. Must be 'http' or 'tcp'")
+
+        self.config = config
+        self.logger = logger or logging.getLogger(__name__)
+
+        # Queue of (source, line); deque + event instead of asyncio.Queue so
+        # drop_oldest can evict in O(1)
+        self._queue: deque = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+        self._stats: Dict[str, _SourceStats] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self.running = False
+
+        # Transports (persistent)
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self.http_url = f"http://{config.host}:{config.http_port}/write"
+        self._tcp_writer: Optional[asyncio.StreamWriter] = None
+
+        self.connected = False
+        self.last_error: Optional[str] = None
+
+    # --- Lifecycle ---
+
+    async def start(self):
+        """Open the connection and start the flush task"""
+        if self.running:
+            return
+
+        if self.config.transport == "http":
+            # A single writer task sends batches sequentially, so a small
+            # keep-alive pool is enough
+            self.http_client = httpx.AsyncClient(
+                timeout=self.config.timeout_seconds,
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=4)
+            )
+            self.connected = True
+        else:
+            await self._connect_tcp()
+
+        self.running = True
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        self.logger.info(
+            f"ILP ingestion writer started ({self.config.transport}, "
+            f"batch={self.config.batch_max_lines} lines/{self.config.flush_interval_ms}ms, "
+            f"queue={self.config.max_queue_lines}, policy={self.config.drop_policy})"
+        )
+
+    async def stop(self):
+        """Flush queued lines and close the connection"""
+        if not self.running:
+            return
+
+        self.running = False
+        self._not_empty.set()  # Wake the flush loop so it can exit
+
+        if self._flush_task:
+            try:
+                await asyncio.wait_for(self._flush_task, timeout=self.config.timeout_seconds)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                self._flush_task.cancel()
+
+        if self.http_client:
+            await self.http_client.aclose()
+            self.http_client = None
+
+        await self._close_tcp()
+        self.connected = False
+        self.logger.info("ILP ingestion writer stopped")
+
+    # --- Enqueue API ---
+
+    def write(self, line: str, source: str = "default") -> bool:
+        """
+        Enqueue one ILP line without blocking
+
+        Returns:
+            True if queued, False if dropped (queue full under drop_newest/block)
+        """
+        stats = self._source_stats(source)
+
+        if len(self._queue) >= self.config.max_queue_lines:
+            if self.config.drop_policy == "drop_oldest":
+                old_source, _ = self._queue.popleft()
+                self._source_stats(old_source).dropped += 1
+            else:
+                stats.dropped += 1
+                return False
+
+        self._queue.append((source, line))
+        stats.enqueued += 1
+        self._not_empty.set()
+        if len(self._queue) >= self.config.max_queue_lines:
+            self._not_full.clear()
+        return True
+
+    def write_many(self, lines: List[str], source: str = "default") -> int:
+        """Enqueue several ILP lines; returns the number queued"""
+        return sum(1 for line in lines if self.write(line, source))
+
+    async def write_async(self, line: str, source: str = "default") -> bool:
+        """
+        Enqueue one ILP line, waiting for space under the "block" policy
+
+        Other policies behave exactly like write().
+        """
+        if self.config.drop_policy == "block":
+            while self.running and len(self._queue) >= self.config.max_queue_lines:
+                await self._not_full.wait()
+        return self.write(line, source)
+
+    # --- Flushing ---
+
+    async def _flush_loop(self):
+        """Drain the queue in size/time bounded micro-batches"""
+        interval = self.config.flush_interval_ms / 1000.0
+
+        while self.running or self._queue:
+            if not self._queue:
+                if not self.running:
+                    break
+                self._not_empty.clear()
+                await self._not_empty.wait()
+                continue
+
+            # Let a batch accumulate unless it is already full
+            if self.running and len(self._queue) < self.config.batch_max_lines:
+                await asyncio.sleep(interval)
+
+            batch = self._take_batch()
+            try:
+                await self._send_batch(batch)
+            except Exception as e:
+                self.logger.error(f"ILP flush loop error: {type(e).__name__}: {e}")
+                if self.running:
+                    await asyncio.sleep(self.config.retry_delay_seconds)
+
+    def _take_batch(self) -> List[Tuple[str, str]]:
+        n = min(len(self._queue), self.config.batch_max_lines)
+        batch = [self._queue.popleft() for _ in range(n)]
+        if len(self._queue) < self.config.max_queue_lines:
+            self._not_full.set()
+        return batch
+
+    async def _send_batch(self, batch: List[Tuple[str, str]]):
+        if not batch:
+            return
+
+        payload = ("\n".join(line for _, line in batch) + "\n").encode("utf-8")
+
+        started = time.perf_counter()
+        ok = True
+        try:
+            if self.config.transport == "http":
+                await self._send_http(payload)
+            else:
+                await self._send_tcp(payload)
+            self.last_error = None
+        except httpx.HTTPStatusError as e:
+            ok = False
+            self.last_error = f"HTTP {e.response.status_code}: {e.response.text[:200]}"
+            self.logger.error(f"QuestDB ILP batch rejected ({len(batch)} lines): {self.last_error}")
+        except Exception as e:
+            ok = False
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.logger.error(f"QuestDB ILP batch failed ({len(batch)} lines): {self.last_error}")
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        # Attribute the batch to each source it contained
+        per_source: Dict[str, int] = {}
+        for source, _ in batch:
+            per_source[source] = per_source.get(source, 0) + 1
+        for source, count in per_source.items():
+            self._source_stats(source).record_batch(count, latency_ms, ok)
+
+    async def _send_http(self, payload: bytes):
+        response = await self.http_client.post(
+            self.http_url,
+            content=payload,
+            headers={"Content-Type": "text/plain"}
+        )
+        response.raise_for_status()
+
+    async def _send_tcp(self, payload: bytes):
+        if self._tcp_writer is None or self._tcp_writer.is_closing():
+            await self._connect_tcp()
+        try:
+            self._tcp_writer.write(payload)
+            await self._tcp_writer.drain()
+        except (ConnectionError, OSError):
+            # Connection dropped; next batch reconnects
+            await self._close_tcp()
+            raise
+
+    async def _connect_tcp(self):
+        try:
+            _, self._tcp_writer = await asyncio.wait_for(
+                asyncio.open_connection(self.config.host, self.config.ilp_port),
+                timeout=self.config.timeout_seconds
+            )
+            self.connected = True
+            self.logger.info(f"Connected to QuestDB ILP TCP: {self.config.host}:{self.config.ilp_port}")
+        except Exception as e:
+            self.connected = False
+            self._tcp_writer = None
+            self.logger.error(f"Failed to connect to QuestDB ILP TCP: {e}")
+            raise
+
+    async def _close_tcp(self):
+        if self._tcp_writer is None:
+            return
+        try:
+            self._tcp_writer.close()
+            await self._tcp_writer.wait_closed()
+        except Exception:
+            pass
+        self._tcp_writer = None
+        self.connected = False
+
+    # --- Metrics ---
+
+    def _source_stats(self, source: str) -> _SourceStats:
+        stats = self._stats.get(source)
+        if stats is None:
+            stats = _SourceStats()
+            self._stats[source] = stats
+        return stats
+
+    def is_healthy(self) -> bool:
+        """Healthy when running and the last batch was accepted"""
+        return self.running and self.connected and self.last_error is None
+
+    def get_stats(self) -> dict:
+        """Queue depth and per-source ingestion metrics"""
+        return {
+            "running": self.running,
+            "transport": self.config.transport,
+            "connected": self.connected,
+            "queue_depth": len(self._queue),
+            "queue_capacity": self.config.max_queue_lines,
+            "drop_policy": self.config.drop_policy,
+            "last_error": self.last_error,
+            "sources": {source: stats.to_dict() for source, stats in self._stats.items()}
+        }
+
+
+# --- Factory Function ---
+
+def create_ilp_writer(
+    store_config: Dict,
+    ingestion_config: Optional[Dict] = None,
+    logger: Optional[logging.Logger] = None
+) -> ILPIngestionWriter:
+    """Factory function to create the shared writer from config dictionaries"""
+    ingestion_config = ingestion_config or {}
+
+    cfg = ILPWriterConfig(
+        host=store_config.get("questdb_http_host", store_config.get("questdb_ilp_host", "questdb")),
+        http_port=store_config.get("questdb_http_port", 9000),
+        ilp_port=store_config.get("questdb_ilp_port", 9009),
+        transport=ingestion_config.get("transport", "http"),
+        max_queue_lines=ingestion_config.get("max_queue_lines", 100_000),
+        batch_max_lines=ingestion_config.get("batch_max_lines", 5_000),
+        flush_interval_ms=ingestion_config.get("flush_interval_ms", 100),
+        drop_policy=ingestion_config.get("drop_policy", "drop_oldest"),
+        timeout_seconds=ingestion_config.get("timeout_seconds", 10.0)
+    )
+
+    return ILPIngestionWriter(cfg, logger)
@@ -4,34 +4,49 @@ Polls Yahoo Finance for symbols that exceeded IBKR paper trading limit (Error 10
 
 Component Isolation:
 - ONLY talks to Yahoo Finance API
-- ONLY writes to QuestDB (via HTTP) and Valkey (cache)
+- ONLY writes to QuestDB (via the shared ILP writer) and Valkey (cache)
 - NO dependencies on other services
 - Self-contained error handling
+
+Polling engine:
+- One bulk yf.download per cycle, run in a thread pool (never on the event loop)
+- Quotes are diffed against the last snapshot; only changed quotes are written
+- Bars carry no quote, so bid/ask are written as NULL (never as a 0 quote);
+  QuestDB rows carry the volume traded since the previous emitted quote,
+  which /api/bars sums where quote sizes are missing
+- Per-symbol adaptive interval: reset on change, doubled while unchanged
 """
 
 import asyncio
 import logging
 import time
 import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 from datetime import datetime
 from dataclasses import dataclass
 
+import pandas as pd
+
 try:
     import yfinance as yf
 except ImportError:
     yf = None
 
 import redis.asyncio as redis
-import httpx
+
+from .ilp_writer import ILPIngestionWriter, ILPWriterConfig, safe_float, safe_int
 
 
 @dataclass
 class YahooConfig:
     """Yahoo Finance configuration"""
     poll_interval_seconds: int = 5  # Poll every 5 seconds during market hours
+    max_poll_interval_seconds: int = 60  # Back-off ceiling for symbols that stop changing
     max_retries: int = 3
     timeout_seconds: int = 10
+    max_workers: int = 2  # Threads for blocking Yahoo downloads
 
 
 @dataclass
@@ -60,7 +75,8 @@ class YahooAdapter:
         yahoo_config: YahooConfig,
         store_config: StoreConfig,
         symbols: List[str],
-        logger: Optional[logging.Logger] = None
+        logger: Optional[logging.Logger] = None,
+        ilp_writer: Optional[ILPIngestionWriter] = None
     ):
         self.yahoo_config = yahoo_config
         self.store_config = store_config
@@ -73,13 +89,32 @@ class YahooAdapter:
 
         # Data stores
         self.valkey_client: Optional[redis.Redis] = None
-        self.questdb_client: Optional[httpx.AsyncClient] = None
-        self.questdb_url: str = f"http://{store_config.questdb_http_host}:{store_config.questdb_http_port}/write"
+        self.ilp_writer: Optional[ILPIngestionWriter] = ilp_writer  # Shared QuestDB writer
+        self._owns_writer = ilp_writer is None
 
         # Tracking
         self.poll_count = 0
         self.error_count = 0
         self.last_poll_time = None
+        self.poll_stats = {
+            "cycles": 0,
+            "last_cycle_ms": 0.0,
+            "max_cycle_ms": 0.0,
+            "total_cycle_ms": 0.0,
+            "last_fetch_ms": 0.0,
+            "last_symbols_polled": 0,
+            "quotes_changed": 0,
+            "quotes_unchanged": 0
+        }
+
+        # Polling engine state
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._snapshot: Dict[str, tuple] = {}  # symbol -> last emitted quote
+        self._intervals: Dict[str, float] = {}  # symbol -> adaptive poll interval (s)
+        self._next_due: Dict[str, float] = {}  # symbol -> monotonic due time
+        self._prev_close: Dict[str, float] = {}
+        self._prev_close_date = None
 
     async def start(self):
         """Start the adapter (connect to data stores and begin polling)"""
@@ -91,13 +126,17 @@ class YahooAdapter:
 
         # Connect to data stores
         await self._connect_valkey()
-        self._connect_questdb()
+        await self._connect_questdb()
 
         self.connected = True
         self.running = True
 
-        # Start polling loop
-        asyncio.create_task(self._poll_loop())
+        # Start polling loop (Yahoo calls run in the thread pool)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.yahoo_config.max_workers,
+            thread_name_prefix="yahoo-poll"
+        )
+        self._poll_task = asyncio.create_task(self._poll_loop())
 
         self.logger.info(f"Yahoo Finance Adapter started for {len(self.symbols)} symbols")
 
@@ -107,13 +146,23 @@ class YahooAdapter:
 
         self.running = False
 
+        if self._poll_task:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
         # Close data store connections
         if self.valkey_client:
             await self.valkey_client.close()
             self.logger.info("Closed Valkey connection")
 
-        if self.questdb_client:
-            await self.questdb_client.aclose()
+        if self.ilp_writer and self._owns_writer:
+            await self.ilp_writer.stop()
             self.logger.info("Closed QuestDB connection")
 
         self.logger.info("Yahoo Finance Adapter stopped")
@@ -134,18 +183,21 @@ class YahooAdapter:
             self.logger.error(f"Failed to connect to Valkey: {e}")
             raise
 
-    def _connect_questdb(self):
-        """Connect to QuestDB via HTTP"""
+    async def _connect_questdb(self):
+        """Connect to QuestDB (own batching writer unless a shared one was given)"""
+        if not self._owns_writer:
+            return
+
         try:
-            limits = httpx.Limits(
-                max_connections=100,
-                max_keepalive_connections=50
+            self.ilp_writer = ILPIngestionWriter(
+                ILPWriterConfig(
+                    host=self.store_config.questdb_http_host,
+                    http_port=self.store_config.questdb_http_port
+                ),
+                self.logger
             )
-            self.questdb_client = httpx.AsyncClient(
-                timeout=30.0,
-                limits=limits
-            )
-            self.logger.info(f"Connected to QuestDB HTTP: {self.questdb_url}")
+            await self.ilp_writer.start()
+            self.logger.info(f"Connected to QuestDB HTTP: {self.ilp_writer.http_url}")
         except Exception as e:
             self.logger.error(f"Failed to connect to QuestDB: {e}")
             raise
@@ -153,165 +205,232 @@ class YahooAdapter:
     # --- Polling Loop ---
 
     async def _poll_loop(self):
-        """Main polling loop"""
+        """
+        Main polling loop
+
+        Each cycle polls only the symbols that are due, with one bulk download
+        run in a worker thread so the event loop (shared with the IBKR adapter)
+        never blocks on Yahoo.
+        """
         self.logger.info(f"Starting polling loop (interval: {self.yahoo_config.poll_interval_seconds}s)")
 
         while self.running:
             try:
-                start_time = time.time()
-                await self._poll_all_symbols()
-                self.last_poll_time = datetime.now()
-                self.poll_count += 1
-
-                # Log every 100 polls
-                if self.poll_count % 100 == 0:
-                    self.logger.info(
-                        f"Poll #{self.poll_count}: {len(self.symbols)} symbols, "
-                        f"{self.error_count} total errors"
-                    )
-
-                # Sleep for remaining interval
-                elapsed = time.time() - start_time
-                sleep_time = max(0, self.yahoo_config.poll_interval_seconds - elapsed)
-                await asyncio.sleep(sleep_time)
+                now = time.monotonic()
+                due = [s for s in self.symbols if self._next_due.get(s, 0.0) <= now]
+
+                if due:
+                    await self._poll_symbols(due)
+                    self.last_poll_time = datetime.now()
+                    self.poll_count += 1
+
+                    # Log every 100 polls
+                    if self.poll_count % 100 == 0:
+                        self.logger.info(
+                            f"Poll #{self.poll_count}: {len(due)}/{len(self.symbols)} symbols due, "
+                            f"{self.error_count} total errors"
+                        )
+
+                # Sleep until the next symbol is due
+                next_due = min(self._next_due.values(), default=now + self.yahoo_config.poll_interval_seconds)
+                await asyncio.sleep(max(0.0, next_due - time.monotonic()))
 
             except Exception as e:
                 self.logger.error(f"Error in polling loop: {e}")
                 self.error_count += 1
                 await asyncio.sleep(5)  # Back off on error
 
-    async def _poll_all_symbols(self):
-        """Poll all symbols from Yahoo Finance"""
-        # Batch fetch for efficiency
-        try:
-            tickers = yf.Tickers(' '.join(self.symbols))
-
-            # Process each symbol
+    async def _poll_symbols(self, symbols: List[str]):
+        """Fetch quotes for due symbols, diff against the last snapshot, emit changes"""
+        cycle_start = time.perf_counter()
+
+        quotes = await self._fetch_quotes(symbols)
+        fetch_ms = (time.perf_counter() - cycle_start) * 1000
+
+        now = time.monotonic()
+        timestamp = int(time.time() * 1_000_000_000)  # nanoseconds
+        changed: Dict[str, tuple] = {}
+        traded: Dict[str, int] = {}
+
+        for symbol in symbols:
+            quote = quotes.get(symbol)
+            previous = self._snapshot.get(symbol)
+            is_changed = quote is not None and quote != previous
+            if is_changed:
+                self._snapshot[symbol] = quote
+                changed[symbol] = quote
+                traded[symbol] = self._traded_volume(previous, quote)
+            self._reschedule(symbol, is_changed, now)
+
+        # Emit changed quotes only
+        for symbol, (last, high, low, volume, close) in changed.items():
+            self._write_questdb(symbol, last, None, None, None, None, traded[symbol], high, low, close, timestamp)
+        await self._write_valkey_batch(changed, timestamp)
+
+        cycle_ms = (time.perf_counter() - cycle_start) * 1000
+        stats = self.poll_stats
+        stats["cycles"] += 1
+        stats["last_cycle_ms"] = round(cycle_ms, 1)
+        stats["max_cycle_ms"] = round(max(stats["max_cycle_ms"], cycle_ms), 1)
+        stats["total_cycle_ms"] += cycle_ms
+        stats["last_fetch_ms"] = round(fetch_ms, 1)
+        stats["last_symbols_polled"] = len(symbols)
+        stats["quotes_changed"] += len(changed)
+        stats["quotes_unchanged"] += len(symbols) - len(changed)
+
+    @staticmethod
+    def _traded_volume(previous: Optional[tuple], quote: tuple) -> int:
+        """Volume traded since the previous quote (0 on the first one, the new total after a day roll)"""
+        if previous is None:
+            return 0
+        volume, previous_volume = quote[3], previous[3]
+        return volume - previous_volume if volume >= previous_volume else volume
+
+    def _reschedule(self, symbol: str, changed: bool, now: float):
+        """Adapt a symbol's poll interval: reset on change, double while unchanged"""
+        base = self.yahoo_config.poll_interval_seconds
+        if changed:
+            interval = base
+        else:
+            interval = min(self._intervals.get(symbol, base) * 2, self.yahoo_config.max_poll_interval_seconds)
+        self._intervals[symbol] = interval
+        self._next_due[symbol] = now + interval
+
+    async def _fetch_quotes(self, symbols: List[str]) -> Dict[str, tuple]:
+        """Run the blocking bulk download in the thread pool, with retries"""
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(1, self.yahoo_config.max_retries + 1):
+            try:
+                return await loop.run_in_executor(self._executor, self._download_quotes, symbols)
+            except Exception as e:
+                self.error_count += 1
+                self.logger.warning(f"Yahoo bulk download failed (attempt {attempt}): {e}")
+                if attempt < self.yahoo_config.max_retries:
+                    await asyncio.sleep(2 ** attempt)
+
+        self.logger.error(f"Giving up on Yahoo download for {len(symbols)} symbols this cycle")
+        return {}
+
+    def _download_quotes(self, symbols: List[str]) -> Dict[str, tuple]:
+        """
+        Bulk quote download (runs in a worker thread)
+
+        One intraday request covers all symbols; previous closes come from a
+        daily request made once per day.
+
+        Returns:
+            symbol -> (last, day_high, day_low, day_volume, previous_close)
+        """
+        today = datetime.now().date()
+        if self._prev_close_date != today:
+            daily = yf.download(
+                self.symbols, period="5d", interval="1d", group_by="ticker",
+                progress=False, auto_adjust=False, threads=True,
+                timeout=self.yahoo_config.timeout_seconds
+            )
             for symbol in self.symbols:
-                try:
-                    ticker = tickers.tickers[symbol]
-                    await self._process_ticker(symbol, ticker)
-                except Exception as e:
-                    self.logger.debug(f"Error processing {symbol}: {e}")
-
-        except Exception as e:
-            self.logger.error(f"Error fetching batch from Yahoo: {e}")
-
-    async def _process_ticker(self, symbol: str, ticker):
-        """Process ticker data and write to stores"""
-        try:
-            # Get current quote
-            info = ticker.info
-
-            # Extract price data
-            last = info.get('currentPrice') or info.get('regularMarketPrice')
-            bid = info.get('bid')
-            ask = info.get('ask')
-            bid_size = info.get('bidSize', 0)
-            ask_size = info.get('askSize', 0)
-            volume = info.get('volume', 0)
-            high = info.get('dayHigh') or info.get('regularMarketDayHigh')
-            low = info.get('dayLow') or info.get('regularMarketDayLow')
-            close = info.get('previousClose') or info.get('regularMarketPreviousClose')
-
-            # Skip if no price data
-            if last is None:
-                return
-
-            timestamp = int(time.time() * 1_000_000_000)  # nanoseconds
-
-            # Write to QuestDB (persistent storage)
-            await self._write_questdb(symbol, last, bid, ask, bid_size, ask_size, volume, high, low, close, timestamp)
-
-            # Write to Valkey (hot cache)
-            await self._write_valkey(symbol, last, bid, ask, bid_size, ask_size, volume, timestamp)
-
-        except Exception as e:
-            self.logger.debug(f"Error processing ticker {symbol}: {e}")
+                frame = self._symbol_frame(daily, symbol)
+                if frame is not None and len(frame) >= 2:
+                    self._prev_close[symbol] = float(frame["Close"].iloc[-2])
+            self._prev_close_date = today
+
+        intraday = yf.download(
+            symbols, period="1d", interval="1m", group_by="ticker",
+            progress=False, auto_adjust=False, threads=True,
+            timeout=self.yahoo_config.timeout_seconds
+        )
 
-    async def _write_questdb(self, symbol: str, last, bid, ask, bid_size, ask_size, volume, high, low, close, timestamp: int):
-        """Write data to QuestDB via HTTP"""
-        if not self.questdb_client:
+        quotes = {}
+        for symbol in symbols:
+            frame = self._symbol_frame(intraday, symbol)
+            if frame is None:
+                continue
+            quotes[symbol] = (
+                float(frame["Close"].iloc[-1]),
+                float(frame["High"].max()),
+                float(frame["Low"].min()),
+                int(frame["Volume"].fillna(0).sum()),
+                self._prev_close.get(symbol)
+            )
+        return quotes
+
+    @staticmethod
+    def _symbol_frame(data: pd.DataFrame, symbol: str) -> Optional[pd.DataFrame]:
+        """Rows with a price for one symbol from a yf.download result"""
+        if data is None or data.empty:
+            return None
+        if isinstance(data.columns, pd.MultiIndex):
+            if symbol not in data.columns.get_level_values(0):
+                return None
+            frame = data[symbol]
+        else:
+            frame = data
+        frame = frame.dropna(subset=["Close"])
+        return frame if not frame.empty else None
+
+    def _write_questdb(self, symbol: str, last, bid, ask, bid_size, ask_size, volume, high, low, close, timestamp: int):
+        """
+        Queue data for QuestDB (non-blocking, batched by the ILP writer)
+
+        Quote fields passed as None are left out of the line (NULL in QuestDB)
+        rather than written as a zero quote.
+        """
+        if not self.ilp_writer:
             return
 
         try:
-            import math
-
-            def safe_float(value):
-                if value is None or (isinstance(value, float) and math.isnan(value)):
-                    return 0.0
-                return float(value)
-
-            def safe_int(value):
-                if value is None or (isinstance(value, float) and math.isnan(value)):
-                    return 0
-                return int(value)
+            fields = [f"last={safe_float(last)}"]
+            if bid is not None:
+                fields.append(f"bid={safe_float(bid)}")
+            if ask is not None:
+                fields.append(f"ask={safe_float(ask)}")
+            if bid_size is not None:
+                fields.append(f"bid_size={safe_int(bid_size)}i")
+            if ask_size is not None:
+                fields.append(f"ask_size={safe_int(ask_size)}i")
+            fields += [
+                f"volume={safe_int(volume)}i",
+                f"high={safe_float(high)}",
+                f"low={safe_float(low)}",
+                f"close={safe_float(close)}"
+            ]
 
             # Build ILP string
-            line = (
-                f"market_data_l1,"
-                f"symbol={symbol} "
-                f"last={safe_float(last)},"
-                f"bid={safe_float(bid)},"
-                f"ask={safe_float(ask)},"
-                f"bid_size={safe_int(bid_size)}i,"
-                f"ask_size={safe_int(ask_size)}i,"
-                f"volume={safe_int(volume)}i,"
-                f"high={safe_float(high)},"
-                f"low={safe_float(low)},"
-                f"close={safe_float(close)} "
-                f"{timestamp}"
-            )
+            line = f"market_data_l1,symbol={symbol} {','.join(fields)} {timestamp}"
 
-            response = await self.questdb_client.post(
-                self.questdb_url,
-                params={"fmt": "ilp"},
-                content=line.encode('utf-8'),
-                headers={"Content-Type": "text/plain"}
-            )
-            response.raise_for_status()
+            self.ilp_writer.write(line, source="yahoo")
 
         except Exception as e:
-            self.logger.debug(f"Failed to write {symbol} to QuestDB: {e}")
+            self.logger.debug(f"Failed to queue {symbol} for QuestDB: {e}")
 
-    async def _write_valkey(self, symbol: str, last, bid, ask, bid_size, ask_size, volume, timestamp: int):
-        """Write data to Valkey (hot cache)"""
-        if not self.valkey_client:
+    async def _write_valkey_batch(self, quotes: Dict[str, tuple], timestamp: int):
+        """
+        Write changed quotes to Valkey (hot cache) in one pipeline round trip
+
+        The bulk download carries no bid/ask, so those fields are null.
+        """
+        if not self.valkey_client or not quotes:
             return
 
         try:
-            import math
-
-            def safe_float(value):
-                if value is None or (isinstance(value, float) and math.isnan(value)):
-                    return 0.0
-                return float(value)
-
-            def safe_int(value):
-                if value is None or (isinstance(value, float) and math.isnan(value)):
-                    return 0
-                return int(value)
-
-            key = f"market:l1:{symbol}"
-            value = {
-                "symbol": symbol,
-                "last": safe_float(last),
-                "bid": safe_float(bid),
-                "ask": safe_float(ask),
-                "bid_size": safe_int(bid_size),
-                "ask_size": safe_int(ask_size),
-                "volume": safe_int(volume),
-                "timestamp": timestamp,
-                "source": "yahoo"
-            }
-
-            await self.valkey_client.setex(
-                key,
-                self.store_config.valkey_ttl_seconds,
-                json.dumps(value)
-            )
+            pipe = self.valkey_client.pipeline(transaction=False)
+            for symbol, (last, high, low, volume, close) in quotes.items():
+                value = {
+                    "symbol": symbol,
+                    "last": safe_float(last),
+                    "bid": None,
+                    "ask": None,
+                    "bid_size": None,
+                    "ask_size": None,
+                    "volume": safe_int(volume),
+                    "timestamp": timestamp,
+                    "source": "yahoo"
+                }
+                pipe.setex(f"market:l1:{symbol}", self.store_config.valkey_ttl_seconds, json.dumps(value))
+            await pipe.execute()
         except Exception as e:
-            self.logger.debug(f"Failed to write {symbol} to Valkey: {e}")
+            self.logger.debug(f"Failed to write {len(quotes)} quotes to Valkey: {e}")
 
     # --- Health Check ---
 
@@ -321,12 +440,14 @@ class YahooAdapter:
             self.connected and
             self.running and
             self.valkey_client is not None and
-            self.questdb_client is not None and
+            self.ilp_writer is not None and
             self.last_poll_time is not None
         )
 
     def get_status(self) -> dict:
         """Get adapter status"""
+        stats = self.poll_stats
+        intervals = Counter(f"{int(i)}s" for i in self._intervals.values())
         return {
             "connected": self.connected,
             "running": self.running,
@@ -335,8 +456,18 @@ class YahooAdapter:
             "error_count": self.error_count,
             "last_poll": self.last_poll_time.isoformat() if self.last_poll_time else None,
             "poll_interval": f"{self.yahoo_config.poll_interval_seconds}s",
+            "poll_cycle_ms": {
+                "last": stats["last_cycle_ms"],
+                "avg": round(stats["total_cycle_ms"] / stats["cycles"], 1) if stats["cycles"] else 0.0,
+                "max": stats["max_cycle_ms"],
+                "last_fetch": stats["last_fetch_ms"]
+            },
+            "last_symbols_polled": stats["last_symbols_polled"],
+            "quotes_changed": stats["quotes_changed"],
+            "quotes_unchanged": stats["quotes_unchanged"],
+            "symbols_by_interval": dict(sorted(intervals.items(), key=lambda kv: int(kv[0][:-1]))),
             "valkey_connected": self.valkey_client is not None,
-            "questdb_connected": self.questdb_client is not None
+            "questdb_connected": self.ilp_writer is not None
         }
 
 
@@ -346,14 +477,17 @@ def create_yahoo_adapter(
     yahoo_config: Dict,
     store_config: Dict,
     symbols: List[str],
-    logger: Optional[logging.Logger] = None
+    logger: Optional[logging.Logger] = None,
+    ilp_writer: Optional[ILPIngestionWriter] = None
 ) -> YahooAdapter:
     """Factory function to create Yahoo adapter from config dictionaries"""
 
     yahoo_cfg = YahooConfig(
         poll_interval_seconds=yahoo_config.get("poll_interval_seconds", 5),
+        max_poll_interval_seconds=yahoo_config.get("max_poll_interval_seconds", 60),
         max_retries=yahoo_config.get("max_retries", 3),
-        timeout_seconds=yahoo_config.get("timeout_seconds", 10)
+        timeout_seconds=yahoo_config.get("timeout_seconds", 10),
+        max_workers=yahoo_config.get("max_workers", 2)
     )
 
     store_cfg = StoreConfig(
@@ -364,4 +498,4 @@ def create_yahoo_adapter(
         valkey_ttl_seconds=store_config.get("valkey_ttl_seconds", 300)
     )
 
-    return YahooAdapter(yahoo_cfg, store_cfg, symbols, logger)
+    return YahooAdapter(yahoo_cfg, store_cfg, symbols, logger, ilp_writer)
@@ -0,0 +1,385 @@
+"""
+Bar Cache - materialized OHLCV bars behind /api/bars
+
+Keeps bars per (symbol, timeframe) in memory and maintains them
+incrementally instead of re-running SAMPLE BY over the raw tick table on
+every request:
+- First request for a series: one SAMPLE BY over the requested window
+- Older history requested later: only the missing range is backfilled
+- Every refresh_seconds: only the last (possibly still open) bar onwards is
+  re-aggregated and merged
+- Series are held as NumPy columns, capped at max_bars_per_series and
+  evicted LRU beyond max_series; only cold history (older than every window
+  requested in the last hot_seconds) is trimmed, so a window larger than the
+  cap is still served whole and repeat requests stay cache hits
+
+All QuestDB queries share one pooled httpx client.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+TIMEFRAMES = ("1m", "5m", "15m", "30m", "1h", "4h", "1d", "1w", "1M")
+
+LOOKBACKS = {
+    "1h": relativedelta(hours=1),
+    "6h": relativedelta(hours=6),
+    "1d": relativedelta(days=1),
+    "7d": relativedelta(days=7),
+    "30d": relativedelta(days=30),
+    "90d": relativedelta(days=90),
+    "1y": relativedelta(years=1),
+    "3y": relativedelta(years=3)
+}
+
+COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+# Symbols are interpolated into SQL, so only allow ticker characters
+_SYMBOL_RE = re.compile(r"^[A-Za-z0-9.\-^=_]{1,32}$")
+
+
+def valid_symbol(symbol: str) -> bool:
+    return bool(_SYMBOL_RE.match(symbol))
+
+
+def align_down(t: datetime, timeframe: str) -> datetime:
+    """Start of the calendar-aligned bar containing t (matches ALIGN TO CALENDAR)"""
+    n, unit = int(timeframe[:-1]), timeframe[-1]
+    day = t.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if unit == "m":
+        minutes = t.hour * 60 + t.minute
+        return day + timedelta(minutes=minutes - minutes % n)
+    if unit == "h":
+        return day + timedelta(hours=t.hour - t.hour % n)
+    if unit == "d":
+        return day
+    if unit == "w":
+        return day - timedelta(days=t.weekday())
+    if unit == "M":
+        return day.replace(day=1)
+    raise ValueError(f"Unsupported timeframe: {timeframe}")
+
+
+def _empty_columns() -> Dict[str, np.ndarray]:
+    cols = {name: np.empty(0) for name in COLUMNS}
+    cols["timestamp"] = np.empty(0, dtype="datetime64[us]")
+    return cols
+
+
+class BarSeries:
+    """Columnar bars for one (symbol, timeframe), sorted by timestamp"""
+
+    __slots__ = ("columns", "covered_from", "tail_from", "refreshed_at", "recent_starts", "lock")
+
+    def __init__(self):
+        self.columns = _empty_columns()
+        self.covered_from: Optional[np.datetime64] = None  # Earliest bar start queried
+        self.tail_from: Optional[np.datetime64] = None  # Where the next refresh starts
+        self.refreshed_at = 0.0
+        self.recent_starts: Dict[str, Tuple[np.datetime64, float]] = {}  # lookback -> (start, requested at)
+        self.lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self.columns["timestamp"])
+
+    def prepend(self, data: Dict[str, np.ndarray]):
+        self.columns = {k: np.concatenate([data[k], v]) for k, v in self.columns.items()}
+
+    def merge_tail(self, data: Dict[str, np.ndarray], tail_from: np.datetime64):
+        keep = self.columns["timestamp"] < tail_from
+        self.columns = {k: np.concatenate([v[keep], data[k]]) for k, v in self.columns.items()}
+
+    def hot_from(self, lookback: str, start: np.datetime64, hot_seconds: float) -> np.datetime64:
+        """Record a request and return the earliest start requested within hot_seconds"""
+        now = time.monotonic()
+        self.recent_starts[lookback] = (start, now)
+        self.recent_starts = {
+            k: (s, t) for k, (s, t) in self.recent_starts.items() if now - t <= hot_seconds
+        }
+        return min(s for s, _ in self.recent_starts.values())
+
+    def trim(self, max_bars: int, keep_from: np.datetime64):
+        """
+        Drop the oldest bars beyond max_bars, but never bars at or after keep_from
+
+        covered_from moves to the first kept bar, so a later backfill of
+        [start, covered_from) ends exactly where the kept bars begin.
+        """
+        excess = len(self) - max_bars
+        if excess <= 0:
+            return
+        excess = min(excess, int(np.searchsorted(self.columns["timestamp"], keep_from, side="left")))
+        if excess > 0:
+            self.columns = {k: v[excess:] for k, v in self.columns.items()}
+            self.covered_from = self.columns["timestamp"][0]
+
+    def slice_from(self, start: np.datetime64) -> Dict[str, np.ndarray]:
+        i = np.searchsorted(self.columns["timestamp"], start, side="left")
+        return {k: v[i:] for k, v in self.columns.items()}
+
+
+class BarCache:
+    """
+    Incrementally maintained bar store for /api/bars
+
+    Usage:
+        cache = BarCache("http://questdb:9000")
+        await cache.start()
+        bars = await cache.get_bars("SPY", "5m", "7d")  # column dict
+        await cache.stop()
+    """
+
+    def __init__(
+        self,
+        questdb_url: str,
+        max_series: int = 512,
+        max_bars_per_series: int = 200_000,
+        refresh_seconds: float = 2.0,
+        hot_seconds: float = 300.0,
+        timeout_seconds: float = 30.0,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.questdb_url = questdb_url
+        self.max_series = max_series
+        self.max_bars_per_series = max_bars_per_series
+        self.refresh_seconds = refresh_seconds
+        self.hot_seconds = hot_seconds
+        self.timeout_seconds = timeout_seconds
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.client: Optional[httpx.AsyncClient] = None
+        self._series: "OrderedDict[Tuple[str, str], BarSeries]" = OrderedDict()
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "backfills": 0,
+            "tail_refreshes": 0,
+            "evictions": 0,
+            "queries": 0,
+            "rows_fetched": 0,
+            "query_ms_total": 0.0
+        }
+
+    async def start(self):
+        """Create the shared QuestDB client"""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+
+    async def stop(self):
+        """Close the client and drop cached bars"""
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+        self._series.clear()
+
+    # --- Public API ---
+
+    async def get_bars(self, symbol: str, timeframe: str, lookback: str) -> Dict[str, np.ndarray]:
+        """
+        Bars for symbol over the lookback window, as NumPy columns
+
+        The window start is aligned down to a bar boundary so every returned
+        bar (except the live one) is complete.
+        """
+        now = datetime.utcnow()
+        start = align_down(now - LOOKBACKS[lookback], timeframe)
+        start64 = np.datetime64(start, "us")
+
+        series = self._get_series(symbol, timeframe)
+
+        async with series.lock:
+            if series.covered_from is None:
+                data = await self._query(symbol, timeframe, start, None)
+                series.columns = data
+                series.covered_from = start64
+                self._mark_refreshed(series, timeframe, now)
+                self.stats["misses"] += 1
+            else:
+                hit = True
+
+                if start64 < series.covered_from:
+                    # Only fetch history we don't have yet
+                    data = await self._query(symbol, timeframe, start, series.covered_from.astype(datetime))
+                    series.prepend(data)
+                    series.covered_from = start64
+                    self.stats["backfills"] += 1
+                    hit = False
+
+                if time.monotonic() - series.refreshed_at >= self.refresh_seconds:
+                    tail_from = series.tail_from
+                    data = await self._query(symbol, timeframe, tail_from.astype(datetime), None)
+                    series.merge_tail(data, tail_from)
+                    self._mark_refreshed(series, timeframe, now)
+                    self.stats["tail_refreshes"] += 1
+                    hit = False
+
+                if hit:
+                    self.stats["hits"] += 1
+
+            keep_from = series.hot_from(lookback, start64, self.hot_seconds)
+            series.trim(self.max_bars_per_series, keep_from)
+            return series.slice_from(start64)
+
+    async def get_many(self, symbols: List[str], timeframe: str, lookback: str) -> Dict[str, Dict[str, np.ndarray]]:
+        """Bars for several symbols, fetched concurrently"""
+        results = await asyncio.gather(*(self.get_bars(s, timeframe, lookback) for s in symbols))
+        return dict(zip(symbols, results))
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        queries = stats.pop("query_ms_total")
+        stats["avg_query_ms"] = round(queries / self.stats["queries"], 1) if self.stats["queries"] else 0.0
+        stats["series_cached"] = len(self._series)
+        stats["bars_cached"] = sum(len(s) for s in self._series.values())
+        return stats
+
+    # --- Internals ---
+
+    def _get_series(self, symbol: str, timeframe: str) -> BarSeries:
+        key = (symbol, timeframe)
+        series = self._series.get(key)
+        if series is None:
+            series = BarSeries()
+            self._series[key] = series
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+                self.stats["evictions"] += 1
+        else:
+            self._series.move_to_end(key)
+        return series
+
+    def _mark_refreshed(self, series: BarSeries, timeframe: str, now: datetime):
+        # Next refresh re-aggregates from the last (possibly open) bar onwards
+        if len(series):
+            series.tail_from = series.columns["timestamp"][-1]
+        else:
+            series.tail_from = np.datetime64(align_down(now, timeframe), "us")
+        series.refreshed_at = time.monotonic()
+
+    async def _query(self, symbol: str, timeframe: str, start: datetime, end: Optional[datetime]) -> Dict[str, np.ndarray]:
+        """SAMPLE BY over [start, end) for one symbol, returned as columns"""
+        end_clause = f" AND timestamp < '{end.isoformat()}Z'" if end else ""
+        # Volume: quote sizes where the feed has them; Yahoo rows have none
+        # and carry the volume traded since their previous row instead
+        query = f"""
+        SELECT
+            timestamp,
+            first(last) as open,
+            max(last) as high,
+            min(last) as low,
+            last(last) as close,
+            sum(coalesce(bid_size + ask_size, volume)) as volume
+        FROM market_data_l1
+        WHERE symbol = '{symbol}'
+            AND timestamp >= '{start.isoformat()}Z'{end_clause}
+        SAMPLE BY {timeframe} ALIGN TO CALENDAR
+        """
+
+        started = time.perf_counter()
+        response = await self.client.get(f"{self.questdb_url}/exec", params={"query": query})
+        response.raise_for_status()
+        result = response.json()
+        self.stats["queries"] += 1
+        self.stats["query_ms_total"] += (time.perf_counter() - started) * 1000
+
+        dataset = result.get("dataset") or []
+        if not dataset:
+            return _empty_columns()
+
+        self.stats["rows_fetched"] += len(dataset)
+        ts, opens, highs, lows, closes, volumes = zip(*dataset)
+        return {
+            "timestamp": np.array([t.rstrip("Z") for t in ts], dtype="datetime64[us]"),
+            "open": np.array(opens, dtype=float),
+            "high": np.array(highs, dtype=float),
+            "low": np.array(lows, dtype=float),
+            "close": np.array(closes, dtype=float),
+            "volume": np.nan_to_num(np.array(volumes, dtype=float))
+        }
+
+
+# --- Response Formats ---
+
+def _timestamps(bars: Dict[str, np.ndarray]) -> List[str]:
+    return [t + "Z" for t in np.datetime_as_string(bars["timestamp"], unit="us")]
+
+
+def _floats(values: np.ndarray) -> list:
+    return [None if v != v else v for v in values.tolist()]
+
+
+def bars_to_records(bars: Dict[str, np.ndarray]) -> List[dict]:
+    """Row format (original /api/bars JSON)"""
+    return [
+        {"timestamp": t, "open": o, "high": h, "low": l, "close": c, "volume": v}
+        for t, o, h, l, c, v in zip(
+            _timestamps(bars),
+            _floats(bars["open"]),
+            _floats(bars["high"]),
+            _floats(bars["low"]),
+            _floats(bars["close"]),
+            bars["volume"].astype(np.int64).tolist()
+        )
+    ]
+
+
+def bars_to_columns(bars: Dict[str, np.ndarray]) -> dict:
+    """Columnar JSON: one array per field"""
+    return {
+        "timestamp": _timestamps(bars),
+        "open": _floats(bars["open"]),
+        "high": _floats(bars["high"]),
+        "low": _floats(bars["low"]),
+        "close": _floats(bars["close"]),
+        "volume": bars["volume"].astype(np.int64).tolist()
+    }
+
+
+def bars_to_arrow(bars_by_symbol: Dict[str, Dict[str, np.ndarray]]) -> bytes:
+    """Arrow IPC stream with a symbol column (requires pyarrow)"""
+    if pa is None:
+        raise ImportError("pyarrow not installed")
+
+    symbols = np.concatenate([
+        np.full(len(bars["timestamp"]), symbol, dtype=object)
+        for symbol, bars in bars_by_symbol.items()
+    ]) if bars_by_symbol else np.empty(0, dtype=object)
+
+    def column(name):
+        parts = [bars[name] for bars in bars_by_symbol.values()]
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    table = pa.table({
+        "symbol": pa.array(symbols, type=pa.string()),
+        "timestamp": pa.array(column("timestamp").astype("datetime64[us]"), type=pa.timestamp("us", tz="UTC")),
+        "open": pa.array(column("open"), from_pandas=True),
+        "high": pa.array(column("high"), from_pandas=True),
+        "low": pa.array(column("low"), from_pandas=True),
+        "close": pa.array(column("close"), from_pandas=True),
+        "volume": pa.array(column("volume").astype(np.int64))
+    })
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -14,11 +14,12 @@ import asyncio
 import logging
 import signal
 import sys
+import time
 from typing import Dict, Optional, Union
 
 import yaml
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 
 # Import adapters
@@ -26,6 +27,11 @@ from adapters.ibkr_adapter import create_ibkr_adapter, IBKRAdapter
 from adapters.alpaca_adapter import create_alpaca_adapter, AlpacaAdapter
 from adapters.yahoo_adapter import create_yahoo_adapter, YahooAdapter
 from adapters.fred_adapter import create_fred_adapter, FREDAdapter
+from adapters.ilp_writer import create_ilp_writer, ILPIngestionWriter
+from bar_cache import (
+    BarCache, TIMEFRAMES, LOOKBACKS, valid_symbol,
+    bars_to_records, bars_to_columns, bars_to_arrow
+)
 
 
 # Configure logging
@@ -59,6 +65,16 @@ class DataIngestionService:
         self.alpaca_adapter: Optional[AlpacaAdapter] = None  # Legacy reference (deprecated)
         self.yahoo_adapter: Optional[YahooAdapter] = None  # Hybrid solution for IBKR limit
         self.fred_adapter: Optional[FREDAdapter] = None
+
+        # Shared QuestDB ILP writer (batched, used by all adapters)
+        self.ilp_writer: Optional[ILPIngestionWriter] = None
+
+        # Materialized OHLCV bars for /api/bars
+        self.bar_cache: Optional[BarCache] = None
+
+        # Event loop lag (how late a short sleep wakes up; blocking calls show here)
+        self.loop_lag = {"last_ms": 0.0, "max_ms": 0.0, "avg_ms": 0.0, "samples": 0}
+        self._loop_lag_task: Optional[asyncio.Task] = None
         # TODO: Add other adapters as they're implemented
         # self.crypto_adapter = None
         # self.etf_adapter = None
@@ -112,6 +128,9 @@ class DataIngestionService:
                 "version": "1.0.0",
                 "running": self.running,
                 "market_data_source": market_data_source,
+                "event_loop_lag_ms": self.loop_lag,
+                "ingestion": self.ilp_writer.get_stats() if self.ilp_writer else {"error": "not initialized"},
+                "bar_cache": self.bar_cache.get_stats() if self.bar_cache else {"error": "not initialized"},
                 "adapters": {
                     "market_data": market_data_status,
                     "yahoo": yahoo_status,
@@ -194,99 +213,77 @@ class DataIngestionService:
 
         @self.app.get("/api/bars")
         async def get_bars(
-            symbol: str,
+            symbol: Optional[str] = None,
+            symbols: Optional[str] = None,
             timeframe: str = "5m",
-            lookback: str = "7d"
+            lookback: str = "7d",
+            format: str = "json"
         ):
             """
-            Get OHLCV bars aggregated from tick data using QuestDB SAMPLE BY
+            Get OHLCV bars from the materialized bar cache (backed by QuestDB SAMPLE BY)
 
             Args:
                 symbol: Stock symbol (e.g., SPY, QQQ)
+                symbols: Comma-separated symbols for a multi-symbol request (e.g., SPY,QQQ,IWM)
                 timeframe: Bar timeframe - 1m, 5m, 15m, 30m, 1h, 4h, 1d, 1w, 1M (default: 5m)
                 lookback: How far back to query - 1h, 6h, 1d, 7d, 30d, 90d, 1y, 3y (default: 7d)
+                format: json (rows), columnar (array per field) or arrow (Arrow IPC stream)
 
             Returns:
-                List of OHLCV bars: [{"timestamp": ..., "open": ..., "high": ..., "low": ..., "close": ..., "volume": ...}]
+                symbol: List of OHLCV bars: [{"timestamp": ..., "open": ..., "high": ..., "low": ..., "close": ..., "volume": ...}]
+                symbols: {symbol: bars, ...}
 
             Example:
                 GET /api/bars?symbol=SPY&timeframe=5m&lookback=1d
+                GET /api/bars?symbols=SPY,QQQ&timeframe=1d&lookback=1y&format=columnar
             """
             import httpx
 
             # Validate timeframe
-            valid_timeframes = {"1m": "1m", "5m": "5m", "15m": "15m", "30m": "30m",
-                               "1h": "1h", "4h": "4h", "1d": "1d", "1w": "1w", "1M": "1M"}
-            if timeframe not in valid_timeframes:
+            if timeframe not in TIMEFRAMES:
                 raise HTTPException(
                     status_code=400,
-                    detail=f"Invalid timeframe. Must be one of: {', '.join(valid_timeframes.keys())}"
+                    detail=f"Invalid timeframe. Must be one of: {', '.join(TIMEFRAMES)}"
                 )
 
             # Validate lookback
-            valid_lookbacks = {"1h": "1h", "6h": "6h", "1d": "1d", "7d": "7d", "30d": "30d", "90d": "90d", "1y": "1y", "3y": "3y"}
-            if lookback not in valid_lookbacks:
+            if lookback not in LOOKBACKS:
                 raise HTTPException(
                     status_code=400,
-                    detail=f"Invalid lookback. Must be one of: {', '.join(valid_lookbacks.keys())}"
+                    detail=f"Invalid lookback. Must be one of: {', '.join(LOOKBACKS.keys())}"
                 )
 
-            try:
-                # Build QuestDB SAMPLE BY query
-                # Convert lookback to QuestDB dateadd format
-                lookback_map = {
-                    "1h": ("'h'", 1),
-                    "6h": ("'h'", 6),
-                    "1d": ("'d'", 1),
-                    "7d": ("'d'", 7),
-                    "30d": ("'d'", 30),
-                    "90d": ("'d'", 90),
-                    "1y": ("'y'", 1),
-                    "3y": ("'y'", 3)
-                }
-                period_type, period_count = lookback_map[lookback]
-
-                query = f"""
-                SELECT
-                    timestamp,
-                    first(last) as open,
-                    max(last) as high,
-                    min(last) as low,
-                    last(last) as close,
-                    sum(bid_size + ask_size) as volume
-                FROM market_data_l1
-                WHERE symbol = '{symbol}'
-                    AND timestamp > dateadd({period_type}, -{period_count}, now())
-                SAMPLE BY {timeframe} ALIGN TO CALENDAR
-                """
-
-                # Query QuestDB
-                questdb_url = self.config["stores"]["questdb"]["url"]
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.get(
-                        f"{questdb_url}/exec",
-                        params={"query": query}
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-
-                # Transform QuestDB response to OHLCV format
-                if "dataset" not in result or not result["dataset"]:
-                    return []
+            if format not in ("json", "columnar", "arrow"):
+                raise HTTPException(status_code=400, detail="Invalid format. Must be one of: json, columnar, arrow")
 
-                bars = []
-                for row in result["dataset"]:
-                    bars.append({
-                        "timestamp": row[0],
-                        "open": float(row[1]) if row[1] is not None else None,
-                        "high": float(row[2]) if row[2] is not None else None,
-                        "low": float(row[3]) if row[3] is not None else None,
-                        "close": float(row[4]) if row[4] is not None else None,
-                        "volume": int(row[5]) if row[5] is not None else 0
-                    })
+            # Validate symbols
+            requested = [s.strip() for s in symbols.split(",") if s.strip()] if symbols else ([symbol] if symbol else [])
+            if not requested:
+                raise HTTPException(status_code=400, detail="symbol or symbols is required")
+            invalid = [s for s in requested if not valid_symbol(s)]
+            if invalid:
+                raise HTTPException(status_code=400, detail=f"Invalid symbol(s): {', '.join(invalid)}")
 
-                return bars
+            if not self.bar_cache:
+                raise HTTPException(status_code=503, detail="Bar cache not ready")
 
+            try:
+                bars_by_symbol = await self.bar_cache.get_many(list(dict.fromkeys(requested)), timeframe, lookback)
+
+                if format == "arrow":
+                    try:
+                        content = bars_to_arrow(bars_by_symbol)
+                    except ImportError:
+                        raise HTTPException(status_code=400, detail="Arrow format requires pyarrow")
+                    return Response(content=content, media_type="application/vnd.apache.arrow.stream")
+
+                to_format = bars_to_columns if format == "columnar" else bars_to_records
+                if symbols:
+                    return {s: to_format(bars) for s, bars in bars_by_symbol.items()}
+                return to_format(bars_by_symbol[symbol])
+
+            except HTTPException:
+                raise
             except httpx.HTTPStatusError as e:
                 logger.error(f"QuestDB query failed: {e.response.text}")
                 raise HTTPException(status_code=500, detail=f"QuestDB error: {e.response.text}")
@@ -311,6 +308,19 @@ class DataIngestionService:
         # Load configuration
         self.load_config()
 
+        self._loop_lag_task = asyncio.create_task(self._monitor_loop_lag())
+
+        # Bar cache for /api/bars (shared QuestDB query client)
+        bar_cache_config = self.config.get("bar_cache", {})
+        self.bar_cache = BarCache(
+            self.config["stores"]["questdb"]["url"],
+            max_series=bar_cache_config.get("max_series", 512),
+            max_bars_per_series=bar_cache_config.get("max_bars_per_series", 200_000),
+            refresh_seconds=bar_cache_config.get("refresh_seconds", 2.0),
+            logger=logger
+        )
+        await self.bar_cache.start()
+
         # Get symbols from config (all tiers for sector rotation analysis)
         symbols_config = self.config.get("symbols", {})
         symbols = (
@@ -344,9 +354,14 @@ class DataIngestionService:
             "questdb_http_port": 9000,  # HTTP endpoint
             "valkey_host": self.config["stores"]["valkey"]["host"],
             "valkey_port": self.config["stores"]["valkey"]["port"],
-            "valkey_ttl_seconds": self.config["stores"]["valkey"].get("ttl_seconds", 300)
+            "valkey_ttl_seconds": self.config["stores"]["valkey"].get("ttl_seconds", 300),
+            "questdb_ilp_port": self.config["stores"]["questdb"].get("ilp_port", 9009)
         }
 
+        # Start the shared QuestDB writer before any adapter produces data
+        self.ilp_writer = create_ilp_writer(store_config, self.config.get("ingestion", {}), logger)
+        await self.ilp_writer.start()
+
         # Initialize Market Data Adapter (IBKR or Alpaca)
         try:
             if market_data_source == "alpaca":
@@ -357,7 +372,8 @@ class DataIngestionService:
                     alpaca_config,
                     store_config,
                     symbols,
-                    logger
+                    logger,
+                    self.ilp_writer
                 )
                 self.alpaca_adapter = self.market_data_adapter  # Legacy reference
 
@@ -378,7 +394,8 @@ class DataIngestionService:
                     ibkr_config,
                     store_config,
                     symbols,
-                    logger
+                    logger,
+                    self.ilp_writer
                 )
                 self.ibkr_adapter = self.market_data_adapter  # Legacy reference
 
@@ -391,7 +408,9 @@ class DataIngestionService:
                     yahoo_symbols = yahoo_config.get("symbols", [])
                     if yahoo_symbols:
                         logger.info(f"Starting Yahoo Finance Adapter for {len(yahoo_symbols)} symbols (IBKR overflow)...")
-                        self.yahoo_adapter = create_yahoo_adapter(yahoo_config, store_config, yahoo_symbols, logger)
+                        self.yahoo_adapter = create_yahoo_adapter(
+                            yahoo_config, store_config, yahoo_symbols, logger, self.ilp_writer
+                        )
                         await self.yahoo_adapter.start()
                         logger.info("Yahoo Finance Adapter started successfully")
                     else:
@@ -413,7 +432,8 @@ class DataIngestionService:
             self.fred_adapter = create_fred_adapter(
                 fred_config,
                 store_config,
-                logger
+                logger,
+                self.ilp_writer
             )
 
             await self.fred_adapter.start()
@@ -436,6 +456,9 @@ class DataIngestionService:
 
         self.running = False
 
+        if self._loop_lag_task:
+            self._loop_lag_task.cancel()
+
         # Stop Market Data Adapter (IBKR or Alpaca)
         if self.market_data_adapter:
             try:
@@ -463,8 +486,33 @@ class DataIngestionService:
         # TODO: Stop other adapters
         # await self.crypto_adapter.stop()
 
+        if self.bar_cache:
+            await self.bar_cache.stop()
+
+        # Stop the shared writer last so queued adapter writes are flushed
+        if self.ilp_writer:
+            try:
+                await self.ilp_writer.stop()
+                logger.info("QuestDB ILP writer stopped")
+            except Exception as e:
+                logger.error(f"Error stopping QuestDB ILP writer: {e}")
+
         logger.info("Data Ingestion Service stopped")
 
+    async def _monitor_loop_lag(self, interval: float = 0.5):
+        """Sample event loop lag for /status"""
+        lag = self.loop_lag
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag_ms = max(0.0, (time.perf_counter() - start - interval) * 1000)
+
+            lag["samples"] += 1
+            lag["last_ms"] = round(lag_ms, 2)
+            lag["max_ms"] = round(max(lag["max_ms"], lag_ms), 2)
+            # Exponential moving average (~20 samples)
+            lag["avg_ms"] = round(lag["avg_ms"] + (lag_ms - lag["avg_ms"]) * 0.1, 2)
+
     async def run_forever(self):
         """Keep service running"""
         try:
@@ -0,0 +1,69 @@
+"""
+Component Tests for BarCache
+Tests incremental bar maintenance with a MOCKED QuestDB query
+"""
+
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bar_cache import BarCache
+
+
+TICK_SECONDS = 10
+MINUTE = np.timedelta64(1, "m")
+
+
+def fake_query(cache: BarCache):
+    """SAMPLE BY 1m over synthetic ticks every TICK_SECONDS (price = seconds since epoch)"""
+    async def query(symbol, timeframe, start, end):
+        end = end or datetime.utcnow()
+        first = int(np.ceil(start.timestamp() / TICK_SECONDS)) * TICK_SECONDS
+        ticks = np.arange(first, end.timestamp(), TICK_SECONDS)
+        if end.microsecond == 0 and len(ticks) and ticks[-1] >= end.timestamp():
+            ticks = ticks[:-1]
+        bar_starts = ticks - ticks % 60
+        timestamps, index = np.unique(bar_starts, return_index=True)
+        bounds = list(index[1:]) + [len(ticks)]
+        cache.stats["queries"] += 1
+        return {
+            "timestamp": (timestamps * 1_000_000).astype("datetime64[us]"),
+            "open": ticks[index].astype(float),
+            "high": np.array([ticks[b - 1] for b in bounds], dtype=float),
+            "low": ticks[index].astype(float),
+            "close": np.array([ticks[b - 1] for b in bounds], dtype=float),
+            "volume": np.array([b - i for i, b in zip(index, bounds)], dtype=float)
+        }
+    return query
+
+
+@pytest.mark.asyncio
+async def test_backfill_after_trim_is_contiguous():
+    """Bars trimmed as cold history and backfilled later leave no gap or partial bar"""
+    cache = BarCache("http://questdb:9000", max_bars_per_series=100,
+                     refresh_seconds=3600, hot_seconds=0.0)
+    cache._query = fake_query(cache)
+
+    await cache.get_bars("SPY", "1m", "6h")
+    await asyncio.sleep(0.01)
+    await cache.get_bars("SPY", "1m", "1h")  # 6h window no longer hot: trimmed
+
+    series = cache._series[("SPY", "1m")]
+    assert len(series) <= 100
+    assert series.covered_from == series.columns["timestamp"][0]
+
+    await asyncio.sleep(0.01)
+    bars = await cache.get_bars("SPY", "1m", "6h")
+    assert cache.stats["backfills"] == 1
+
+    timestamps = bars["timestamp"]
+    assert np.all(np.diff(timestamps) == MINUTE)
+    # Every bar except the live one holds all of its ticks
+    assert np.all(bars["volume"][:-1] == 60 // TICK_SECONDS)
+    assert np.all(bars["close"][:-1] - bars["open"][:-1] == 60 - TICK_SECONDS)
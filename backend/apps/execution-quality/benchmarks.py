@@ -0,0 +1,241 @@
+"""
+Streaming benchmark engine for execution quality
+
+Keeps, per symbol, cumulative price x volume, volume, price x time and
+covered time in ring buffers of fixed-width buckets (several resolutions,
+e.g. 1s x 1h and 1m x 1d). Any interval VWAP/TWAP is then the difference of
+two cumulative values, and the arrival price is the price prevailing at the
+bucket boundary, so each query is O(1) regardless of tick count. Array
+versions of the queries serve batch TCA without per-execution loops.
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# (bucket seconds, number of buckets)
+DEFAULT_RINGS = [(1, 3600), (60, 1440)]
+
+# Cumulative columns stored per bucket boundary
+_PV, _V, _PT, _T, _PX = range(5)
+
+
+def normalize_symbol(symbol: str) -> str:
+    """BTC/USDT, BTC-USDT and btcusdt all map to BTCUSDT"""
+    return symbol.replace('/', '').replace('-', '').upper()
+
+
+class _Ring:
+    """Cumulative totals at the end of each of the last `size` buckets"""
+
+    __slots__ = ("resolution", "size", "values", "head")
+
+    def __init__(self, resolution: float, size: int):
+        self.resolution = resolution
+        self.size = size
+        self.values = np.zeros((5, size))
+        self.head: Optional[int] = None  # Index of the open (current) bucket
+
+
+class SymbolBenchmarks:
+    """Running totals and bucket rings for one symbol"""
+
+    def __init__(self, rings: Sequence[Tuple[float, int]]):
+        self.rings = [_Ring(resolution, size) for resolution, size in rings]
+
+        self.first_time: Optional[float] = None
+        self.last_time = 0.0
+        self.last_price = 0.0
+        self.total_pv = 0.0
+        self.total_v = 0.0
+        self.total_pt = 0.0  # Integral of prevailing price up to last_time
+        self.ticks = 0
+
+    def update(self, t: float, price: float, volume: float):
+        """Add a tick (t in epoch seconds). Late ticks are applied at last_time."""
+        if self.first_time is None:
+            self.first_time = t
+            self.last_time = t
+            self.last_price = price
+            for ring in self.rings:
+                ring.head = int(t // ring.resolution)
+        t = max(t, self.last_time)
+
+        for ring in self.rings:
+            bucket = int(t // ring.resolution)
+            if bucket > ring.head:
+                self._close_buckets(ring, bucket)
+
+        self.total_pt += self.last_price * (t - self.last_time)
+        self.total_pv += price * volume
+        self.total_v += volume
+        self.last_price = price
+        self.last_time = t
+        self.ticks += 1
+
+    def _close_buckets(self, ring: _Ring, bucket: int):
+        """Record totals at each boundary between the open bucket and `bucket`"""
+        # Only the last `size` boundaries can be kept
+        start = max(ring.head, bucket - ring.size)
+        boundaries = (np.arange(start, bucket) + 1) * ring.resolution
+        elapsed = boundaries - self.last_time
+        positions = np.arange(start, bucket) % ring.size
+
+        values = ring.values
+        values[_PV, positions] = self.total_pv
+        values[_V, positions] = self.total_v
+        values[_PT, positions] = self.total_pt + self.last_price * elapsed
+        values[_T, positions] = boundaries - self.first_time
+        values[_PX, positions] = self.last_price
+        ring.head = bucket
+
+    def cumulative_at(self, t: float) -> Optional[Tuple[float, float, float, float, float]]:
+        """Scalar version of `cumulative` (no array overhead)"""
+        if self.first_time is None:
+            return None
+        if t < self.first_time:
+            return (0.0, 0.0, 0.0, 0.0, math.nan)
+
+        finest = self.rings[0]
+        if t >= finest.head * finest.resolution:
+            t = max(t, self.last_time)
+            return (self.total_pv, self.total_v,
+                    self.total_pt + self.last_price * (t - self.last_time),
+                    t - self.first_time, self.last_price)
+
+        for ring in self.rings:
+            bucket = int(t // ring.resolution) - 1
+            if bucket >= ring.head - ring.size:
+                if bucket < int(self.first_time // ring.resolution):
+                    return (0.0, 0.0, 0.0, 0.0, math.nan)
+                column = ring.values[:, bucket % ring.size]
+                return tuple(column.tolist())
+        return None
+
+    def cumulative(self, times: np.ndarray) -> np.ndarray:
+        """
+        Cumulative (pv, v, pt, t, price) at each time, shape (5, n)
+
+        Times inside the open bucket use the live totals; earlier times use
+        the boundary at or before them. Times older than every ring are NaN.
+        """
+        times = np.asarray(times, dtype=float)
+        out = np.full((5, times.size), np.nan)
+        if self.first_time is None:
+            return out
+
+        # Before the first tick nothing has accumulated
+        before = times < self.first_time
+        out[:, before] = 0.0
+        out[_PX, before] = np.nan
+
+        finest = self.rings[0]
+        live = ~before & (times >= finest.head * finest.resolution)
+        if live.any():
+            t = np.maximum(times[live], self.last_time)
+            out[_PV, live] = self.total_pv
+            out[_V, live] = self.total_v
+            out[_PT, live] = self.total_pt + self.last_price * (t - self.last_time)
+            out[_T, live] = t - self.first_time
+            out[_PX, live] = self.last_price
+
+        pending = ~before & ~live
+        for ring in self.rings:
+            if not pending.any():
+                break
+            buckets = np.floor(times / ring.resolution).astype(np.int64) - 1
+            usable = pending & (buckets >= ring.head - ring.size)
+            # Buckets closed before the first tick hold nothing yet
+            first_bucket = int(self.first_time // ring.resolution)
+            empty = usable & (buckets < first_bucket)
+            out[:, empty] = 0.0
+            out[_PX, empty] = np.nan
+
+            filled = usable & ~empty
+            if filled.any():
+                out[:, filled] = ring.values[:, buckets[filled] % ring.size]
+            pending &= ~usable
+
+        return out
+
+
+class BenchmarkEngine:
+    """Per-symbol streaming VWAP/TWAP/arrival-price benchmarks"""
+
+    def __init__(self, rings: Optional[Sequence[Tuple[float, int]]] = None):
+        self.rings = [tuple(r) for r in (rings or DEFAULT_RINGS)]
+        self.symbols: Dict[str, SymbolBenchmarks] = {}
+
+    def on_tick(self, symbol: str, timestamp: float, price: float, volume: float = 0.0):
+        """Feed a tick (timestamp in epoch seconds)"""
+        if not price or not math.isfinite(price):
+            return
+        key = normalize_symbol(symbol)
+        state = self.symbols.get(key)
+        if state is None:
+            state = SymbolBenchmarks(self.rings)
+            self.symbols[key] = state
+        state.update(timestamp, price, volume or 0.0)
+
+    def _state(self, symbol: str) -> Optional[SymbolBenchmarks]:
+        return self.symbols.get(normalize_symbol(symbol))
+
+    # Scalar queries (one execution)
+
+    def arrival_price(self, symbol: str, t: float) -> Optional[float]:
+        """Price prevailing at time t"""
+        state = self._state(symbol)
+        at = state.cumulative_at(t) if state else None
+        return at[_PX] if at and math.isfinite(at[_PX]) else None
+
+    def vwap(self, symbol: str, start: float, end: float) -> Optional[float]:
+        """Volume-weighted average price over [start, end]"""
+        delta = self._scalar_delta(symbol, start, end)
+        return delta[_PV] / delta[_V] if delta and delta[_V] > 0 else None
+
+    def twap(self, symbol: str, start: float, end: float) -> Optional[float]:
+        """Time-weighted average of the prevailing price over [start, end]"""
+        delta = self._scalar_delta(symbol, start, end)
+        return delta[_PT] / delta[_T] if delta and delta[_T] > 0 else None
+
+    def _scalar_delta(self, symbol: str, start: float, end: float) -> Optional[List[float]]:
+        state = self._state(symbol)
+        if state is None:
+            return None
+        a, b = state.cumulative_at(start), state.cumulative_at(end)
+        if a is None or b is None:
+            return None
+        return [y - x for x, y in zip(a, b)]
+
+    # Vectorized queries (batch TCA)
+
+    def arrival_prices(self, symbol: str, times: Sequence[float]) -> np.ndarray:
+        state = self._state(symbol)
+        if state is None:
+            return np.full(len(times), np.nan)
+        return state.cumulative(np.asarray(times, dtype=float))[_PX]
+
+    def vwaps(self, symbol: str, starts: Sequence[float], ends: Sequence[float]) -> np.ndarray:
+        delta = self._delta(symbol, starts, ends)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(delta[_V] > 0, delta[_PV] / delta[_V], np.nan)
+
+    def twaps(self, symbol: str, starts: Sequence[float], ends: Sequence[float]) -> np.ndarray:
+        delta = self._delta(symbol, starts, ends)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(delta[_T] > 0, delta[_PT] / delta[_T], np.nan)
+
+    def _delta(self, symbol: str, starts: Sequence[float], ends: Sequence[float]) -> np.ndarray:
+        state = self._state(symbol)
+        if state is None:
+            return np.full((5, len(starts)), np.nan)
+        return (state.cumulative(np.asarray(ends, dtype=float))
+                - state.cumulative(np.asarray(starts, dtype=float)))
+
+    def get_stats(self) -> Dict[str, Dict]:
+        return {
+            symbol: {'ticks': state.ticks, 'last_price': state.last_price, 'last_time': state.last_time}
+            for symbol, state in self.symbols.items()
+        }
+
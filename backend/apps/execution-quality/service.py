@@ -9,7 +9,7 @@ import json
 import yaml
 import asyncio
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, List, Optional, Tuple
 import numpy as np
 import pandas as pd
@@ -22,6 +22,8 @@ from fastapi import FastAPI, HTTPException, status, Query
 from pydantic import BaseModel, Field
 from prometheus_client import Counter, Histogram, Gauge, generate_latest
 
+from benchmarks import BenchmarkEngine, normalize_symbol
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -36,6 +38,7 @@ slippage_histogram = Histogram('execution_slippage_bps', 'Execution slippage in
 fill_rate_gauge = Gauge('execution_fill_rate', 'Fill rate by venue', ['venue'])
 latency_histogram = Histogram('execution_latency_ms', 'Execution latency', ['venue'])
 price_improvement = Counter('execution_price_improvement_total', 'Price improvements', ['type'])
+ticks_ingested = Counter('execution_quality_ticks_total', 'Market ticks fed to the benchmark engine')
 
 # FastAPI app
 app = FastAPI(title="Execution Quality Service", version="1.0.0")
@@ -102,6 +105,8 @@ class ExecutionQualityService:
             'total_latency': 0,
             'price_improvements': 0
         })
+        self.benchmarks = BenchmarkEngine(config['benchmarks'].get('rings'))
+        self.cumulative_volume: Dict[Tuple[str, str], float] = {}  # (exchange, symbol) -> last 24h volume
         self.running = False
 
     async def start(self):
@@ -120,6 +125,9 @@ class ExecutionQualityService:
         await self.nc.subscribe("executions.completed", "exec_quality", self.handle_execution)
         await self.nc.subscribe("orders.filled", "exec_quality", self.handle_order_fill)
 
+        # Every instance needs the full tick stream for its benchmarks (no queue group)
+        await self.nc.subscribe(config['benchmarks'].get('tick_subject', 'market.tick.>'), cb=self.handle_tick)
+
         # Start background tasks
         self.running = True
         asyncio.create_task(self.analysis_loop())
@@ -153,6 +161,58 @@ class ExecutionQualityService:
         except Exception as e:
             logger.error(f"Error handling execution: {e}")
 
+    async def handle_tick(self, msg):
+        """Feed market ticks into the streaming benchmark engine"""
+        try:
+            tick = json.loads(msg.data)
+            price = tick.get('last') or 0.0
+            if not price and tick.get('bid') and tick.get('ask'):
+                price = (tick['bid'] + tick['ask']) / 2
+
+            self.benchmarks.on_tick(
+                tick['symbol'],
+                tick.get('timestamp', 0) / 1000.0,  # ms -> s
+                price,
+                self.tick_size(tick)
+            )
+            ticks_ingested.inc()
+
+        except Exception as e:
+            logger.error(f"Error handling tick: {e}")
+
+    def tick_size(self, tick: Dict) -> float:
+        """
+        Traded size carried by a tick, used as its VWAP weight
+
+        Trade ticks carry their own size in trade_size. REST ticker ticks
+        carry the rolling 24h volume, so their size is the increase since
+        the previous ticker of the same exchange and symbol (0 for the first
+        one, or when the rolling volume shrinks). Quote-only ticks weigh 0.
+        """
+        trade_size = tick.get('trade_size') or 0.0
+        if trade_size > 0:
+            return trade_size
+
+        volume = tick.get('volume') or 0.0
+        if volume <= 0:
+            return 0.0
+
+        key = (tick.get('exchange', ''), normalize_symbol(tick['symbol']))
+        previous = self.cumulative_volume.get(key)
+        self.cumulative_volume[key] = volume
+        if previous is None:
+            return 0.0
+        return max(volume - previous, 0.0)
+
+    async def cached_last_prices(self, symbols: List[str]) -> List[Optional[float]]:
+        """Last prices from the gateway's Valkey cache (hash last:{SYMBOL}, field price)"""
+        if not self.redis_client or not symbols:
+            return [None] * len(symbols)
+        pipe = self.redis_client.pipeline(transaction=False)
+        for symbol in symbols:
+            pipe.hget(f"last:{normalize_symbol(symbol)}", "price")
+        return [float(price) if price else None for price in await pipe.execute()]
+
     async def handle_order_fill(self, msg):
         """Handle order fill events"""
         try:
@@ -231,70 +291,168 @@ class ExecutionQualityService:
 
     async def calculate_execution_metrics(self, execution: Execution) -> ExecutionMetrics:
         """Calculate comprehensive execution metrics"""
+        row = (await self.analyze_batch([execution])).iloc[0]
+        return self.metrics_from_row(row)
 
-        # Get benchmark prices
-        benchmark = await self.get_benchmark_price(
-            execution.symbol,
-            execution.timestamp
+    @staticmethod
+    def metrics_from_row(row: pd.Series) -> ExecutionMetrics:
+        return ExecutionMetrics(
+            execution_id=row['execution_id'],
+            slippage_bps=row['slippage_bps'],
+            fill_rate=row['fill_rate'],
+            latency_ms=row['latency_ms'],
+            market_impact_bps=row['market_impact_bps'],
+            price_improvement_bps=row['price_improvement_bps'],
+            implementation_shortfall=row['implementation_shortfall']
         )
 
-        # Calculate slippage
-        slippage_bps = 0
-        if execution.arrival_price:
-            slippage_bps = ((execution.price - execution.arrival_price) /
-                          execution.arrival_price) * 10000
-
-        # Calculate market impact (simplified)
-        market_impact_bps = abs(slippage_bps) * 0.3  # Simplified assumption
+    @staticmethod
+    def to_epoch(timestamp: datetime) -> float:
+        """Epoch seconds; naive datetimes are UTC"""
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return timestamp.timestamp()
+
+    async def analyze_batch(self, executions: List[Execution]) -> pd.DataFrame:
+        """
+        Vectorized TCA for a batch of executions
+
+        Arrival price, trailing VWAP/TWAP and the configured benchmark come
+        from the streaming benchmark engine, one array query per symbol.
+        Slippage, market impact, price improvement and implementation
+        shortfall keep the per-execution definitions; arrival_cost_bps,
+        vwap_cost_bps and shortfall_cash are side-adjusted (positive = cost).
+        """
+        n = len(executions)
+        symbols = np.array([normalize_symbol(e.symbol) for e in executions], dtype=object)
+        times = np.array([self.to_epoch(e.timestamp) for e in executions], dtype=float)
+        prices = np.array([e.price for e in executions], dtype=float)
+        quantities = np.array([e.quantity for e in executions], dtype=float)
+        sign = np.array([1.0 if e.side.upper() == "BUY" else -1.0 for e in executions])
+        given_arrival = np.array([e.arrival_price or np.nan for e in executions], dtype=float)
+        given_benchmark = np.array([e.benchmark_price or np.nan for e in executions], dtype=float)
+
+        vwap_window = config['benchmarks']['vwap']['window_minutes'] * 60
+        twap_window = config['benchmarks']['twap']['window_minutes'] * 60
+
+        market = np.full(n, np.nan)
+        vwap = np.full(n, np.nan)
+        twap = np.full(n, np.nan)
+        for symbol in set(symbols):
+            idx = np.flatnonzero(symbols == symbol)
+            t = times[idx]
+            market[idx] = self.benchmarks.arrival_prices(symbol, t)
+            vwap[idx] = self.benchmarks.vwaps(symbol, t - vwap_window, t)
+            twap[idx] = self.benchmarks.twaps(symbol, t - twap_window, t)
+
+        arrival = np.where(np.isnan(given_arrival), market, given_arrival)
+
+        source = config['analysis'].get('benchmark_source', 'market')
+        streamed = {'vwap': vwap, 'twap': twap}.get(source, market)
+        benchmark = np.where(np.isnan(given_benchmark), streamed, given_benchmark)
+
+        # Symbols without ticks yet: last price cached in Valkey (one pipeline)
+        missing = np.flatnonzero(np.isnan(benchmark))
+        if missing.size:
+            cached = await self.cached_last_prices([symbols[i] for i in missing])
+            for i, price in zip(missing, cached):
+                if price:
+                    benchmark[i] = price
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            has_arrival = arrival > 0
+            has_benchmark = benchmark > 0
 
-        # Calculate price improvement
-        price_improvement_bps = 0
-        if benchmark:
-            if execution.side == "BUY":
-                price_improvement_bps = ((benchmark - execution.price) / benchmark) * 10000
-            else:
-                price_improvement_bps = ((execution.price - benchmark) / benchmark) * 10000
+            # Calculate slippage
+            slippage_bps = np.where(has_arrival, (prices - arrival) / arrival * 10000, 0.0)
 
-        # Implementation shortfall (simplified)
-        implementation_shortfall = abs(slippage_bps) + market_impact_bps
+            # Calculate market impact (simplified)
+            market_impact_bps = np.abs(slippage_bps) * 0.3
 
-        # Fill rate (assuming full fill for now)
-        fill_rate = 1.0
+            # Calculate price improvement
+            price_improvement_bps = np.where(
+                has_benchmark, sign * (benchmark - prices) / benchmark * 10000, 0.0
+            )
 
-        # Latency (placeholder - would come from order timestamps)
-        latency_ms = 50.0
+            # Side-adjusted costs
+            arrival_cost_bps = np.where(has_arrival, sign * (prices - arrival) / arrival * 10000, np.nan)
+            vwap_cost_bps = np.where(vwap > 0, sign * (prices - vwap) / vwap * 10000, np.nan)
+
+        return pd.DataFrame({
+            'execution_id': [e.execution_id for e in executions],
+            'symbol': symbols,
+            'venue': [e.venue for e in executions],
+            'side': [e.side for e in executions],
+            'quantity': quantities,
+            'price': prices,
+            'notional': prices * quantities,
+            'arrival_price': arrival,
+            'benchmark_price': benchmark,
+            'vwap': vwap,
+            'twap': twap,
+            'slippage_bps': slippage_bps,
+            'market_impact_bps': market_impact_bps,
+            'price_improvement_bps': price_improvement_bps,
+            # Implementation shortfall (simplified)
+            'implementation_shortfall': np.abs(slippage_bps) + market_impact_bps,
+            'arrival_cost_bps': arrival_cost_bps,
+            'vwap_cost_bps': vwap_cost_bps,
+            'shortfall_cash': np.where(has_arrival, sign * (prices - arrival) * quantities, np.nan),
+            # Fill rate (assuming full fill for now)
+            'fill_rate': 1.0,
+            # Latency (placeholder - would come from order timestamps)
+            'latency_ms': 50.0
+        })
 
-        return ExecutionMetrics(
-            execution_id=execution.execution_id,
-            slippage_bps=slippage_bps,
-            fill_rate=fill_rate,
-            latency_ms=latency_ms,
-            market_impact_bps=market_impact_bps,
-            price_improvement_bps=price_improvement_bps,
-            implementation_shortfall=implementation_shortfall
-        )
+    @staticmethod
+    def summarize_tca(tca: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Per-venue notional-weighted costs for an analyze_batch result"""
+        if tca.empty:
+            return []
+
+        def weighted(column: str) -> pd.Series:
+            valid = tca[column].notna()
+            weight = tca['notional'].where(valid, 0.0)
+            numerator = (tca[column].fillna(0.0) * weight).groupby(tca['venue']).sum()
+            return numerator / weight.groupby(tca['venue']).sum()
+
+        grouped = tca.groupby('venue')
+        summary = pd.DataFrame({
+            'executions': grouped.size(),
+            'notional': grouped['notional'].sum(),
+            'arrival_cost_bps': weighted('arrival_cost_bps'),
+            'vwap_cost_bps': weighted('vwap_cost_bps'),
+            'shortfall_cash': grouped['shortfall_cash'].sum(),
+            'price_improvement_rate': grouped['price_improvement_bps'].apply(lambda x: float((x > 0).mean()))
+        })
+        summary = summary.replace({np.nan: None})
+        return [{'venue': venue, **row} for venue, row in summary.to_dict('index').items()]
 
     async def get_benchmark_price(self, symbol: str, timestamp: datetime) -> Optional[float]:
         """Get benchmark price for comparison"""
-        # This would fetch VWAP/TWAP from market data
-        # For now, return a placeholder
-        market_key = f"market:{symbol}:last"
-        price = await self.redis_client.get(market_key)
-        if price:
-            return float(price)
-        return None
+        t = self.to_epoch(timestamp)
+        source = config['analysis'].get('benchmark_source', 'market')
+        if source == 'vwap':
+            price = self.benchmarks.vwap(symbol, t - config['benchmarks']['vwap']['window_minutes'] * 60, t)
+        elif source == 'twap':
+            price = self.benchmarks.twap(symbol, t - config['benchmarks']['twap']['window_minutes'] * 60, t)
+        else:
+            price = self.benchmarks.arrival_price(symbol, t)
+        if price is not None:
+            return price
+
+        # No ticks for this symbol yet
+        return (await self.cached_last_prices([symbol]))[0]
 
     async def calculate_vwap(self, symbol: str, start_time: datetime, end_time: datetime) -> float:
         """Calculate VWAP for a period"""
-        # Simplified VWAP calculation
-        # In production, this would query actual trade data
-        return 0.0
+        vwap = self.benchmarks.vwap(symbol, self.to_epoch(start_time), self.to_epoch(end_time))
+        return vwap if vwap is not None else 0.0
 
     async def calculate_twap(self, symbol: str, start_time: datetime, end_time: datetime) -> float:
         """Calculate TWAP for a period"""
-        # Simplified TWAP calculation
-        # In production, this would query actual price data
-        return 0.0
+        twap = self.benchmarks.twap(symbol, self.to_epoch(start_time), self.to_epoch(end_time))
+        return twap if twap is not None else 0.0
 
     async def update_venue_stats(self, venue: str, metrics: ExecutionMetrics):
         """Update venue statistics"""
@@ -318,18 +476,23 @@ class ExecutionQualityService:
             try:
                 await asyncio.sleep(config['analysis']['compute_interval'])
 
-                # Process buffered executions
-                while self.execution_buffer:
-                    execution = self.execution_buffer.pop(0)
+                # Process buffered executions as one vectorized batch
+                executions, self.execution_buffer = self.execution_buffer, []
+                if not executions:
+                    continue
+
+                tca = await self.analyze_batch(executions)
 
-                    # Calculate metrics
-                    metrics = await self.calculate_execution_metrics(execution)
+                pipe = self.redis_client.pipeline(transaction=False)
+                for execution, (_, row) in zip(executions, tca.iterrows()):
+                    metrics = self.metrics_from_row(row)
 
                     # Update venue stats
                     await self.update_venue_stats(execution.venue, metrics)
 
                     # Store metrics
-                    await self.store_metrics(metrics.dict())
+                    pipe.setex(f"metrics:{metrics.execution_id}", 86400, json.dumps(metrics.dict(), default=str))
+                await pipe.execute()
 
             except Exception as e:
                 logger.error(f"Error in analysis loop: {e}")
@@ -454,8 +617,20 @@ class ExecutionQualityService:
             try:
                 await asyncio.sleep(30)  # Run every 30 seconds
 
-                # This would calculate VWAP/TWAP for active symbols
-                # Simplified for now
+                # Publish current VWAP/TWAP for active symbols
+                now = datetime.utcnow()
+                vwap_start = now - timedelta(minutes=config['benchmarks']['vwap']['window_minutes'])
+                twap_start = now - timedelta(minutes=config['benchmarks']['twap']['window_minutes'])
+
+                pipe = self.redis_client.pipeline(transaction=False)
+                for symbol in list(self.benchmarks.symbols):
+                    pipe.hset(f"benchmark:{symbol}", mapping={
+                        'vwap': await self.calculate_vwap(symbol, vwap_start, now),
+                        'twap': await self.calculate_twap(symbol, twap_start, now),
+                        'last': self.benchmarks.symbols[symbol].last_price,
+                        'timestamp': now.isoformat()
+                    })
+                await pipe.execute()
 
             except Exception as e:
                 logger.error(f"Error in benchmark calculator: {e}")
@@ -589,6 +764,18 @@ async def get_benchmarks(symbol: str, window_minutes: int = Query(5)):
         "window_minutes": window_minutes,
         "vwap": vwap,
         "twap": twap,
+        "last": quality_service.benchmarks.arrival_price(symbol, quality_service.to_epoch(end_time)),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@app.post("/tca")
+async def batch_tca(executions: List[Execution]):
+    """Transaction cost analysis for a batch of executions (e.g. a day's fills)"""
+    tca = await quality_service.analyze_batch(executions)
+    return {
+        "executions": tca.replace({np.nan: None}).to_dict('records') if len(tca) else [],
+        "venues": quality_service.summarize_tca(tca),
         "timestamp": datetime.utcnow().isoformat()
     }
 
@@ -612,6 +799,7 @@ async def get_stats():
     return {
         "buffer_size": len(quality_service.execution_buffer),
         "venues_tracked": len(quality_service.venue_stats),
+        "benchmark_symbols": len(quality_service.benchmarks.symbols),
         "timestamp": datetime.utcnow().isoformat()
     }
 
@@ -8,15 +8,17 @@ import json
 import logging
 import signal
 import sys
+import threading
 import time
+from collections import deque
 from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, NamedTuple, Optional
 
+import aiohttp
 import ccxt.async_support as ccxt
 import nats
-import redis
-import requests
+import redis.asyncio as redis
 import yaml
 from cryptofeed import FeedHandler
 from cryptofeed.callback import BookCallback, TradeCallback
@@ -37,6 +39,8 @@ logger = logging.getLogger(__name__)
 # Global variables for connections
 nc: Optional[nats.NATS] = None
 redis_client: Optional[redis.Redis] = None
+http_session: Optional[aiohttp.ClientSession] = None
+pipeline: Optional["TickPipeline"] = None
 feed_handler: Optional[FeedHandler] = None
 exchange: Optional[ccxt.Exchange] = None
 config: Dict[str, Any] = {}
@@ -127,7 +131,7 @@ async def connect_nats() -> nats.NATS:
                 raise
 
 
-def connect_redis() -> redis.Redis:
+async def connect_redis() -> redis.Redis:
     """Connect to Redis/Valkey"""
     try:
         client = redis.Redis(
@@ -135,7 +139,7 @@ def connect_redis() -> redis.Redis:
             port=config.get("redis_port", 6379),
             decode_responses=True
         )
-        client.ping()
+        await client.ping()
         logger.info(f"Connected to Valkey at {config.get('redis_host')}:{config.get('redis_port')}")
         return client
     except Exception as e:
@@ -143,64 +147,260 @@ def connect_redis() -> redis.Redis:
         raise
 
 
-def insert_to_questdb(tick: MarketTick):
-    """Insert tick data into QuestDB using InfluxDB line protocol"""
-    try:
-        # Convert to InfluxDB line protocol format
-        # Format: table_name,tag1=value1,tag2=value2 field1=value1,field2=value2 timestamp
-        line = (
-            f"ticks,exchange={tick.exchange},symbol={tick.symbol.replace('/', '')} "
-            f"bid={tick.bid},ask={tick.ask},last={tick.last},volume={tick.volume} "
-            f"{tick.timestamp}000000"  # Convert ms to ns
-        )
-
-        # Send to QuestDB ILP endpoint
-        response = requests.post(
-            f"{config.get('questdb_url', 'http://localhost:9000')}/write",
-            params={"precision": "n"},
-            data=line,
-            timeout=1
-        )
+class CompactTick(NamedTuple):
+    """Tick as carried through the fan-out pipeline (no validation overhead)"""
+    exchange: str
+    symbol: str
+    timestamp: int  # ms
+    bid: float
+    ask: float
+    last: float
+    volume: float
+    trade_size: float = 0.0  # Size of the trade behind a trade tick (0 for quote/ticker ticks)
+
+
+class SinkWorker:
+    """
+    One pipeline stage: a bounded queue drained in batches by its own task
+
+    A full queue drops the oldest tick. With coalesce=True only the latest
+    tick per symbol is kept (enough for a last-value cache).
+    """
+
+    def __init__(self, name: str, flush, max_queue: int = 10000, batch_size: int = 500,
+                 flush_interval_ms: int = 50, coalesce: bool = False):
+        self.name = name
+        self.flush = flush  # async callable(List[CompactTick])
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.coalesce = coalesce
+
+        self.queue: deque = deque()  # (enqueue_time, tick)
+        self.latest: Dict[str, tuple] = {}  # symbol -> (enqueue_time, tick) when coalescing
+        self.wakeup = asyncio.Event()
+        self.stopping = False
+        self.task: Optional[asyncio.Task] = None
+
+        self.metrics = {
+            "enqueued": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "batches": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "last_lag_ms": 0.0,
+            "max_lag_ms": 0.0
+        }
 
-        if response.status_code != 204:
-            logger.error(f"QuestDB insert failed: {response.status_code} - {response.text}")
-    except Exception as e:
-        logger.error(f"Failed to insert to QuestDB: {e}")
+    def put(self, enqueued_at: float, tick: CompactTick):
+        self.metrics["enqueued"] += 1
+        if self.coalesce:
+            previous = self.latest.get(tick.symbol)
+            if previous is not None:
+                self.metrics["coalesced"] += 1
+                enqueued_at = previous[0]  # Lag counts from the oldest unflushed update
+            self.latest[tick.symbol] = (enqueued_at, tick)
+        else:
+            if len(self.queue) >= self.max_queue:
+                self.queue.popleft()
+                self.metrics["dropped"] += 1
+            self.queue.append((enqueued_at, tick))
+
+        if self.pending() >= self.batch_size:
+            self.wakeup.set()
+
+    def pending(self) -> int:
+        return len(self.latest) if self.coalesce else len(self.queue)
+
+    def take_batch(self) -> List[tuple]:
+        if self.coalesce:
+            batch = list(self.latest.values())
+            self.latest = {}
+            return batch
+        n = min(len(self.queue), self.batch_size)
+        return [self.queue.popleft() for _ in range(n)]
+
+    async def run(self):
+        """Flush on batch size or interval, whichever comes first"""
+        while not self.stopping:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+            while self.pending() and not self.stopping:
+                await self.flush_once()
+                if self.pending() < self.batch_size:
+                    break
+
+    async def flush_once(self):
         global error_count
-        error_count += 1
 
+        batch = self.take_batch()
+        if not batch:
+            return
 
-async def publish_tick(tick: MarketTick):
-    """Publish tick to NATS, QuestDB, and Valkey"""
-    global tick_count, nc, redis_client
+        started = time.monotonic()
+        lag_ms = (started - min(t for t, _ in batch)) * 1000
+        try:
+            await self.flush([tick for _, tick in batch])
+            self.metrics["flushed"] += len(batch)
+        except Exception as e:
+            self.metrics["errors"] += 1
+            error_count += 1
+            logger.error(f"{self.name} sink flush failed ({len(batch)} ticks): {e}")
+
+        flush_ms = (time.monotonic() - started) * 1000
+        m = self.metrics
+        m["batches"] += 1
+        m["last_flush_ms"] = round(flush_ms, 2)
+        m["max_flush_ms"] = round(max(m["max_flush_ms"], flush_ms), 2)
+        m["last_lag_ms"] = round(lag_ms, 2)
+        m["max_lag_ms"] = round(max(m["max_lag_ms"], lag_ms), 2)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"queue_depth": self.pending(), "max_queue": self.max_queue, **self.metrics}
+
+
+class TickPipeline:
+    """
+    Fan-out of ticks to independent sink workers
+
+    submit() only enqueues and returns. It is safe to call from the
+    cryptofeed thread: ticks are handed over through a thread-safe inbox
+    drained on the gateway's event loop.
+    """
+
+    def __init__(self, sinks: List[SinkWorker]):
+        self.sinks = sinks
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread: Optional[int] = None
+        self.inbox: deque = deque()
+        self.drain_scheduled = False
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        for sink in self.sinks:
+            sink.task = asyncio.create_task(sink.run())
+
+    async def stop(self):
+        """Stop the workers and flush what is still queued"""
+        self._drain_inbox()
+        for sink in self.sinks:
+            sink.stopping = True
+            sink.wakeup.set()
+            if sink.task:
+                await sink.task  # Let an in-flight batch complete
+            while sink.pending():
+                await sink.flush_once()
+
+    def submit(self, tick: CompactTick):
+        if self.loop is None:
+            return
+        if threading.get_ident() == self.loop_thread:
+            self._dispatch(tick)
+            return
+
+        # Foreign thread: one loop wakeup per burst, not per tick
+        self.inbox.append(tick)
+        if not self.drain_scheduled:
+            self.drain_scheduled = True
+            self.loop.call_soon_threadsafe(self._drain_inbox)
+
+    def _drain_inbox(self):
+        self.drain_scheduled = False
+        while self.inbox:
+            self._dispatch(self.inbox.popleft())
+
+    def _dispatch(self, tick: CompactTick):
+        now = time.monotonic()
+        for sink in self.sinks:
+            sink.put(now, tick)
+        last_tick_time[tick.symbol] = time.time()
 
-    try:
-        # Publish to NATS
-        if nc:
-            subject = f"market.tick.{tick.symbol.replace('/', '')}"
-            await nc.publish(subject, json.dumps(tick.dict()).encode())
-            tick_count += 1
+    def stats(self) -> Dict[str, Any]:
+        return {sink.name: sink.stats() for sink in self.sinks}
 
-        # Insert into QuestDB
-        insert_to_questdb(tick)
 
-        # Cache in Valkey
-        if redis_client:
-            key = f"last:{tick.symbol.replace('/', '')}"
-            redis_client.hset(key, mapping={
-                "price": tick.last,
-                "bid": tick.bid,
-                "ask": tick.ask,
-                "timestamp": tick.timestamp
-            })
-            redis_client.expire(key, 3600)  # Expire after 1 hour
-
-        # Update last tick time
-        last_tick_time[tick.symbol] = time.time()
+async def flush_nats(ticks: List[CompactTick]):
+    """Publish each tick to its NATS subject (client buffers, one flush per batch)"""
+    global tick_count
 
+    if not nc:
+        return
+
+    for tick in ticks:
+        subject = f"market.tick.{tick.symbol.replace('/', '')}"
+        await nc.publish(subject, json.dumps(tick._asdict()).encode())
+    tick_count += len(ticks)
+
+
+async def flush_questdb(ticks: List[CompactTick]):
+    """Insert ticks into QuestDB in one InfluxDB line protocol request"""
+    # Format: table_name,tag1=value1,tag2=value2 field1=value1,field2=value2 timestamp
+    lines = "\n".join(
+        f"ticks,exchange={tick.exchange},symbol={tick.symbol.replace('/', '')} "
+        f"bid={tick.bid},ask={tick.ask},last={tick.last},volume={tick.volume} "
+        f"{tick.timestamp}000000"  # Convert ms to ns
+        for tick in ticks
+    )
+
+    async with http_session.post(
+        f"{config.get('questdb_url', 'http://localhost:9000')}/write",
+        params={"precision": "n"},
+        data=lines.encode()
+    ) as response:
+        if response.status != 204:
+            raise RuntimeError(f"QuestDB insert failed: {response.status} - {await response.text()}")
+
+
+async def flush_valkey(ticks: List[CompactTick]):
+    """Write latest values per symbol to Valkey in one pipeline round trip"""
+    if not redis_client:
+        return
+
+    pipe = redis_client.pipeline(transaction=False)
+    for tick in ticks:
+        key = f"last:{tick.symbol.replace('/', '')}"
+        pipe.hset(key, mapping={
+            "price": tick.last,
+            "bid": tick.bid,
+            "ask": tick.ask,
+            "timestamp": tick.timestamp
+        })
+        pipe.expire(key, 3600)  # Expire after 1 hour
+    await pipe.execute()
+
+
+def create_pipeline() -> TickPipeline:
+    """Build the NATS/QuestDB/Valkey fan-out from config"""
+    pipeline_config = config.get("pipeline", {})
+
+    def sink(name, flush, defaults):
+        cfg = {**defaults, **pipeline_config.get(name, {})}
+        return SinkWorker(name, flush, **cfg)
+
+    return TickPipeline([
+        sink("nats", flush_nats, {"max_queue": 20000, "batch_size": 500, "flush_interval_ms": 10}),
+        sink("questdb", flush_questdb, {"max_queue": 100000, "batch_size": 5000, "flush_interval_ms": 250}),
+        sink("valkey", flush_valkey, {"max_queue": 10000, "batch_size": 1000, "flush_interval_ms": 250, "coalesce": True})
+    ])
+
+
+def publish_tick(tick: CompactTick):
+    """Hand a tick to the fan-out pipeline (NATS, QuestDB, Valkey); never blocks"""
+    global error_count
+
+    try:
+        if pipeline:
+            pipeline.submit(tick)
     except Exception as e:
         logger.error(f"Failed to publish tick: {e}")
-        global error_count
         error_count += 1
 
 
@@ -214,7 +414,7 @@ async def book_callback(data, receipt_timestamp):
         best_ask = float(data.book[ASK].iloc[0]) if len(data.book[ASK]) > 0 else 0.0
 
         # Create normalized tick
-        tick = MarketTick(
+        tick = CompactTick(
             exchange=data.exchange.lower(),
             symbol=symbol,
             timestamp=int(receipt_timestamp * 1000),
@@ -224,7 +424,7 @@ async def book_callback(data, receipt_timestamp):
             volume=0.0  # Order book doesn't have volume
         )
 
-        await publish_tick(tick)
+        publish_tick(tick)
 
     except Exception as e:
         logger.error(f"Error in book callback: {e}")
@@ -234,17 +434,18 @@ async def trade_callback(data, receipt_timestamp):
     """Handle trade updates from CryptoFeed"""
     try:
         # Create normalized tick from trade
-        tick = MarketTick(
+        tick = CompactTick(
             exchange=data.exchange.lower(),
             symbol=data.symbol,
             timestamp=int(receipt_timestamp * 1000),
             bid=float(data.price) - 0.01,  # Approximate bid
             ask=float(data.price) + 0.01,  # Approximate ask
             last=float(data.price),
-            volume=float(data.amount)
+            volume=float(data.amount),
+            trade_size=float(data.amount)
         )
 
-        await publish_tick(tick)
+        publish_tick(tick)
 
     except Exception as e:
         logger.error(f"Error in trade callback: {e}")
@@ -272,7 +473,7 @@ async def fetch_rest_data():
                         volume=ticker.get("baseVolume", 0.0)
                     )
 
-                    await publish_tick(tick)
+                    publish_tick(CompactTick(**tick.dict()))
 
                 except Exception as e:
                     logger.error(f"Failed to fetch {symbol}: {e}")
@@ -324,7 +525,7 @@ def setup_websocket_feeds():
 
 async def startup():
     """Initialize all connections and services"""
-    global nc, redis_client, exchange, config
+    global nc, redis_client, http_session, pipeline, exchange, config
 
     # Load configuration
     config = load_config()
@@ -332,7 +533,13 @@ async def startup():
 
     # Connect to services
     nc = await connect_nats()
-    redis_client = connect_redis()
+    redis_client = await connect_redis()
+    http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+
+    # Start fan-out pipeline before any feed produces ticks
+    pipeline = create_pipeline()
+    await pipeline.start()
+    logger.info("Tick pipeline started (NATS, QuestDB, Valkey sinks)")
 
     # Initialize CCXT exchange
     exchange_name = config.get("exchange", "binance")
@@ -361,7 +568,7 @@ async def startup():
 
 async def shutdown():
     """Cleanup connections on shutdown"""
-    global nc, redis_client, exchange, feed_handler
+    global nc, redis_client, http_session, exchange, feed_handler
 
     logger.info("Shutting down connections...")
 
@@ -371,11 +578,18 @@ async def shutdown():
     if exchange:
         await exchange.close()
 
+    # Flush queued ticks before closing the sinks' connections
+    if pipeline:
+        await pipeline.stop()
+
+    if http_session:
+        await http_session.close()
+
     if nc:
         await nc.close()
 
     if redis_client:
-        redis_client.close()
+        await redis_client.close()
 
     logger.info("All connections closed")
 
@@ -398,7 +612,7 @@ async def health_check():
     # Check Valkey
     try:
         if redis_client:
-            redis_client.ping()
+            await redis_client.ping()
             services["valkey"] = "healthy"
         else:
             services["valkey"] = "unhealthy"
@@ -407,11 +621,14 @@ async def health_check():
 
     # Check QuestDB
     try:
-        response = requests.get(f"{config.get('questdb_url', 'http://localhost:9000')}/", timeout=1)
-        if response.status_code == 200:
-            services["questdb"] = "healthy"
-        else:
-            services["questdb"] = "unhealthy"
+        async with http_session.get(
+            f"{config.get('questdb_url', 'http://localhost:9000')}/",
+            timeout=aiohttp.ClientTimeout(total=1)
+        ) as response:
+            if response.status == 200:
+                services["questdb"] = "healthy"
+            else:
+                services["questdb"] = "unhealthy"
     except:
         services["questdb"] = "unhealthy"
 
@@ -435,6 +652,7 @@ async def get_stats():
         "error_count": error_count,
         "uptime": time.time() - startup_time,
         "last_ticks": last_tick_time,
+        "pipeline": pipeline.stats() if pipeline else {},
         "config": {
             "exchange": config.get("exchange"),
             "symbols": config.get("symbols"),
@@ -7,7 +7,7 @@ import asyncio
 import json
 import logging
 import time
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import ccxt.async_support as ccxt
 from cryptofeed import FeedHandler
 from cryptofeed.callback import BookCallback, TradeCallback
@@ -19,6 +19,44 @@ from cryptofeed.exchanges import (
 
 logger = logging.getLogger(__name__)
 
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, bursts up to `capacity`
+
+    Installed as a ccxt exchange's REST throttler (`exchange.throttle`), so
+    every request - load_markets, fetch_tickers, fetch_ticker, ... - is
+    charged its endpoint cost in ccxt units (one unit = exchange.rateLimit ms).
+    A request costing more than the capacity waits for a full bucket and
+    leaves it in debt, so later requests pay for it.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+        self.loop = None  # Set by ccxt's Exchange.open()
+
+    def __call__(self, cost: Optional[float] = None):
+        """ccxt throttler interface: `await exchange.throttle(cost)`"""
+        return self.acquire(1.0 if cost is None else cost)
+
+    async def acquire(self, tokens: float = 1.0):
+        # The lock keeps waiters FIFO so a bulk request cannot be starved
+        needed = min(tokens, self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= needed:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((needed - self.tokens) / self.rate)
+
+
 class MultiExchangeGateway:
     """Gateway supporting multiple exchanges"""
 
@@ -71,6 +109,10 @@ class MultiExchangeGateway:
         self.feed_handler = FeedHandler()
         self.active_exchanges = []
 
+        # Polling state: exchange -> symbol -> {'received': ts, 'exchange_ts': ms}
+        self.last_update: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self.poll_stats: Dict[str, Dict[str, Any]] = {}
+
     async def initialize_exchanges(self):
         """Initialize all configured exchanges"""
 
@@ -87,10 +129,11 @@ class MultiExchangeGateway:
                 if exchange_name in self.CCXT_EXCHANGES:
                     exchange_class = self.CCXT_EXCHANGES[exchange_name]
 
-                    # Exchange-specific options
+                    # Exchange-specific options. ccxt's rate limiting stays on so
+                    # every request is charged its endpoint cost; the throttler
+                    # itself is replaced by our token bucket below.
                     options = {
                         'enableRateLimit': True,
-                        'rateLimit': exchange_config.get('rate_limit', 50),
                     }
 
                     # Add API credentials if provided
@@ -107,12 +150,22 @@ class MultiExchangeGateway:
                         options['tier'] = exchange_config.get('tier', 'Starter')
 
                     exchange = exchange_class(options)
+
+                    # rate_limit is in ccxt cost units per second; never exceed the
+                    # exchange's documented limit (1000 / rateLimit ms per unit)
+                    documented = 1000.0 / exchange.rateLimit
+                    rate_limit = min(exchange_config.get('rate_limit', documented), documented)
+                    bucket = TokenBucket(rate_limit, exchange_config.get('burst', rate_limit))
+                    exchange.throttle = bucket
+
                     await exchange.load_markets()
 
                     self.exchanges[exchange_name] = {
                         'ccxt': exchange,
                         'symbols': exchange_config.get('symbols', []),
-                        'config': exchange_config
+                        'config': exchange_config,
+                        'bucket': bucket,
+                        'bulk': bool(exchange.has.get('fetchTickers')) and exchange_config.get('bulk_tickers', True)
                     }
 
                     logger.info(f"Initialized {exchange_name} with {len(exchange_config.get('symbols', []))} symbols")
@@ -185,47 +238,127 @@ class MultiExchangeGateway:
         await asyncio.gather(*tasks)
 
     async def fetch_exchange_data(self, exchange_name: str, exchange_data: Dict):
-        """Fetch data from a single exchange"""
+        """
+        Poll a single exchange on a fixed schedule
+
+        Each sweep uses fetch_tickers bulk calls where the exchange supports
+        them, otherwise concurrent per-symbol fetch_ticker calls bounded by
+        max_concurrency. Every request is charged its endpoint cost by the
+        exchange's token bucket (ccxt throttler). The refresh interval is measured from the start of a sweep.
+        """
+
+        exchange_config = exchange_data['config']
+        interval = exchange_config.get('refresh_interval', 5)
+        semaphore = asyncio.Semaphore(exchange_config.get('max_concurrency', 8))
+        stats = self.poll_stats.setdefault(exchange_name, {
+            'sweeps': 0, 'errors': 0, 'last_sweep_ms': 0.0, 'mode': None
+        })
+        self.last_update.setdefault(exchange_name, {})
+
+        while True:
+            started = time.monotonic()
+            try:
+                if exchange_data['bulk']:
+                    await self._sweep_bulk(exchange_name, exchange_data)
+                    stats['mode'] = 'fetch_tickers'
+
+                # Bulk may have been switched off during this sweep
+                if not exchange_data['bulk']:
+                    await self._sweep_per_symbol(exchange_name, exchange_data, semaphore)
+                    stats['mode'] = 'fetch_ticker'
+
+            except Exception as e:
+                stats['errors'] += 1
+                logger.error(f"Error in {exchange_name} fetch loop: {e}")
+
+            elapsed = time.monotonic() - started
+            stats['sweeps'] += 1
+            stats['last_sweep_ms'] = round(elapsed * 1000, 1)
+            await asyncio.sleep(max(0.0, interval - elapsed))
+
+    async def _sweep_bulk(self, exchange_name: str, exchange_data: Dict):
+        """Fetch all symbols with fetch_tickers, chunked by tickers_batch_size"""
 
         exchange = exchange_data['ccxt']
         symbols = exchange_data['symbols']
+        batch_size = exchange_data['config'].get('tickers_batch_size', 100)
 
-        while True:
+        for i in range(0, len(symbols), batch_size):
+            chunk = symbols[i:i + batch_size]
             try:
-                for symbol in symbols:
-                    try:
-                        ticker = await exchange.fetch_ticker(symbol)
-
-                        # Publish with exchange prefix
-                        normalized_symbol = symbol.replace('/', '')
-                        topic = f"market.tick.{exchange_name}.{normalized_symbol}"
+                tickers = await exchange.fetch_tickers(chunk)
+            except (ccxt.NotSupported, ccxt.BadRequest, ccxt.ArgumentsRequired) as e:
+                # Exchange advertises fetchTickers but rejects symbol lists
+                logger.warning(f"{exchange_name} fetch_tickers unusable ({e}), falling back to fetch_ticker")
+                exchange_data['bulk'] = False
+                return
+
+            for symbol in chunk:
+                ticker = tickers.get(symbol)
+                if ticker:
+                    await self._handle_ticker(exchange_name, symbol, ticker)
+
+    async def _sweep_per_symbol(self, exchange_name: str, exchange_data: Dict,
+                                semaphore: asyncio.Semaphore):
+        """Fetch symbols concurrently, bounded by the semaphore and token bucket"""
 
-                        tick_data = {
-                            'exchange': exchange_name,
-                            'symbol': symbol,
-                            'timestamp': ticker.get('timestamp', int(time.time() * 1000)),
-                            'bid': ticker.get('bid', 0.0),
-                            'ask': ticker.get('ask', 0.0),
-                            'last': ticker.get('last', 0.0),
-                            'volume': ticker.get('baseVolume', 0.0)
-                        }
+        exchange = exchange_data['ccxt']
+        stats = self.poll_stats[exchange_name]
+
+        async def fetch_one(symbol: str):
+            async with semaphore:
+                try:
+                    ticker = await exchange.fetch_ticker(symbol)
+                except Exception as e:
+                    stats['errors'] += 1
+                    logger.error(f"Failed to fetch {symbol} from {exchange_name}: {e}")
+                    return
+            await self._handle_ticker(exchange_name, symbol, ticker)
+
+        await asyncio.gather(*(fetch_one(symbol) for symbol in exchange_data['symbols']))
+
+    async def _handle_ticker(self, exchange_name: str, symbol: str, ticker: Dict):
+        """Normalize a ccxt ticker, record freshness and publish it"""
+
+        # Publish with exchange prefix
+        normalized_symbol = symbol.replace('/', '')
+        topic = f"market.tick.{exchange_name}.{normalized_symbol}"
+
+        timestamp = ticker.get('timestamp') or int(time.time() * 1000)
+        tick_data = {
+            'exchange': exchange_name,
+            'symbol': symbol,
+            'timestamp': timestamp,
+            'bid': ticker.get('bid', 0.0),
+            'ask': ticker.get('ask', 0.0),
+            'last': ticker.get('last', 0.0),
+            'volume': ticker.get('baseVolume', 0.0)
+        }
 
-                        # Publish to NATS, insert to QuestDB, cache in Valkey
-                        await self.publish_tick(topic, tick_data)
+        self.last_update[exchange_name][symbol] = {
+            'received': time.time(),
+            'exchange_ts': timestamp
+        }
 
-                    except Exception as e:
-                        logger.error(f"Failed to fetch {symbol} from {exchange_name}: {e}")
+        # Publish to NATS, insert to QuestDB, cache in Valkey
+        await self.publish_tick(topic, tick_data)
 
-                    # Small delay between symbols
-                    await asyncio.sleep(0.5)
+    def get_staleness(self, exchange_name: str) -> Dict[str, Any]:
+        """Seconds since each symbol was last updated (None if never)"""
 
-                # Exchange-specific refresh interval
-                interval = exchange_data['config'].get('refresh_interval', 5)
-                await asyncio.sleep(interval)
+        now = time.time()
+        updates = self.last_update.get(exchange_name, {})
+        symbols = {}
+        for symbol in self.exchanges[exchange_name]['symbols']:
+            update = updates.get(symbol)
+            symbols[symbol] = round(now - update['received'], 2) if update else None
 
-            except Exception as e:
-                logger.error(f"Error in {exchange_name} fetch loop: {e}")
-                await asyncio.sleep(10)
+        ages = [age for age in symbols.values() if age is not None]
+        return {
+            'symbols': symbols,
+            'max_age_seconds': max(ages) if ages else None,
+            'never_updated': sum(1 for age in symbols.values() if age is None)
+        }
 
     async def publish_tick(self, topic: str, tick_data: Dict):
         """Publish tick to NATS, QuestDB, and Valkey"""
@@ -244,7 +377,9 @@ class MultiExchangeGateway:
         for exchange_name, exchange_data in self.exchanges.items():
             stats['exchange_details'][exchange_name] = {
                 'symbols': exchange_data['symbols'],
-                'connected': exchange_data['ccxt'].has['watchOrderBook'] if 'ccxt' in exchange_data else False
+                'connected': exchange_data['ccxt'].has['watchOrderBook'] if 'ccxt' in exchange_data else False,
+                'polling': self.poll_stats.get(exchange_name, {}),
+                'staleness': self.get_staleness(exchange_name)
             }
 
         return stats
@@ -257,21 +392,21 @@ MULTI_EXCHANGE_CONFIG = {
             'name': 'binance',
             'enabled': True,
             'symbols': ['BTC/USDT', 'ETH/USDT', 'SOL/USDT'],
-            'rate_limit': 50,  # requests per second
+            'rate_limit': 20,  # ccxt cost units/s: 1200 request weight/min
             'refresh_interval': 5,
         },
         {
             'name': 'coinbase',
             'enabled': True,
             'symbols': ['BTC/USD', 'ETH/USD', 'SOL/USD'],
-            'rate_limit': 10,
+            'rate_limit': 2.5,  # 10k requests/hour
             'refresh_interval': 3,
         },
         {
             'name': 'kraken',
             'enabled': True,
             'symbols': ['BTC/USD', 'ETH/USD', 'SOL/USD'],
-            'rate_limit': 15,
+            'rate_limit': 1,  # public endpoints: ~1 request/s
             'refresh_interval': 5,
             'tier': 'Intermediate',
         },
@@ -279,14 +414,14 @@ MULTI_EXCHANGE_CONFIG = {
             'name': 'bybit',
             'enabled': True,
             'symbols': ['BTC/USDT', 'ETH/USDT'],
-            'rate_limit': 50,
+            'rate_limit': 20,  # 8 market-data requests/s (2.5 units each)
             'refresh_interval': 2,
         },
         {
             'name': 'okx',
             'enabled': True,
             'symbols': ['BTC/USDT', 'ETH/USDT'],
-            'rate_limit': 20,
+            'rate_limit': 10,  # 20 requests/2s per market-data endpoint
             'refresh_interval': 3,
         },
         {
@@ -300,7 +435,7 @@ MULTI_EXCHANGE_CONFIG = {
             'name': 'kucoin',
             'enabled': True,
             'symbols': ['BTC/USDT', 'ETH/USDT'],
-            'rate_limit': 30,
+            'rate_limit': 20,
             'refresh_interval': 4,
         },
         {
@@ -314,7 +449,7 @@ MULTI_EXCHANGE_CONFIG = {
             'name': 'bitfinex',
             'enabled': True,
             'symbols': ['BTC/USD', 'ETH/USD'],
-            'rate_limit': 30,
+            'rate_limit': 1.5,  # 90 requests/min
             'refresh_interval': 3,
         },
         {
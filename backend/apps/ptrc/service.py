@@ -8,9 +8,11 @@ import os
 import json
 import yaml
 import asyncio
+import heapq
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
 from enum import Enum
 
 import uvicorn
@@ -39,6 +41,9 @@ reconciliation_mismatches = Counter('ptrc_reconciliation_mismatches_total', 'Tot
 
 compliance_latency = Histogram('ptrc_compliance_check_latency_seconds', 'Compliance check latency')
 processing_latency = Histogram('ptrc_post_trade_processing_latency_seconds', 'Post-trade processing latency')
+batch_size_histogram = Histogram('ptrc_batch_size', 'Trades per post-trade batch',
+                                 buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000))
+trade_queue_depth = Gauge('ptrc_trade_queue_depth', 'Trades waiting for post-trade processing')
 
 # FastAPI app
 app = FastAPI(title="PTRC Service", version="1.0.0")
@@ -96,6 +101,66 @@ class RegulatoryReport(BaseModel):
     generated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class SettlementScheduler:
+    """
+    Pending settlements ordered by settlement time
+
+    A min-heap of (due_timestamp, trade_id) gives O(log n) schedule and pop.
+    Cancelled or rescheduled trades are removed lazily: `pending` holds the
+    live due time per trade and stale heap entries are skipped on pop.
+    """
+
+    def __init__(self):
+        self.heap: List[Tuple[float, str]] = []
+        self.pending: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def __contains__(self, trade_id: str) -> bool:
+        return trade_id in self.pending
+
+    @staticmethod
+    def to_timestamp(when: datetime) -> float:
+        """Epoch seconds; naive datetimes are UTC (as produced by utcnow)"""
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return when.timestamp()
+
+    def schedule(self, trade_id: str, due: float):
+        self.pending[trade_id] = due
+        heapq.heappush(self.heap, (due, trade_id))
+
+    def cancel(self, trade_id: str) -> bool:
+        return self.pending.pop(trade_id, None) is not None
+
+    def next_due(self) -> Optional[float]:
+        """Due time of the earliest live entry"""
+        while self.heap:
+            due, trade_id = self.heap[0]
+            if self.pending.get(trade_id) == due:
+                return due
+            heapq.heappop(self.heap)
+        return None
+
+    def pop_due(self, now: float, limit: int) -> List[str]:
+        """Remove and return up to `limit` trades due at or before `now`"""
+        due_trades = []
+        while self.heap and len(due_trades) < limit:
+            due, trade_id = self.heap[0]
+            if due > now:
+                break
+            heapq.heappop(self.heap)
+            if self.pending.get(trade_id) == due:
+                del self.pending[trade_id]
+                due_trades.append(trade_id)
+        return due_trades
+
+
+# Redis sorted set persisting the settlement schedule (member=trade_id, score=due time)
+SETTLEMENT_SCHEDULE_KEY = "settlement:schedule"
+
+
 class PTRCService:
     """Post-Trade, Risk & Compliance Service"""
 
@@ -103,9 +168,16 @@ class PTRCService:
         self.redis_client = None
         self.nc = None
         self.compliance_cache = {}
-        self.settlement_queue = []
+        self.settlement_queue = SettlementScheduler()
         self.running = False
 
+        # Normalized sanctioned entities, swapped atomically on refresh
+        self.sanctions: FrozenSet[str] = frozenset()
+
+        # Executed trades waiting to be micro-batched
+        self.trade_queue: Optional[asyncio.Queue] = None
+        self.check_semaphore: Optional[asyncio.Semaphore] = None
+
     async def start(self):
         """Start the PTRC service"""
         logger.info("Starting PTRC service...")
@@ -115,6 +187,15 @@ class PTRCService:
             f"redis://{config['redis_host']}:{config['redis_port']}/{config['redis_db']}"
         )
 
+        # Sanctions are checked in memory, load them before the first trade
+        self.load_sanctions()
+
+        # Restore pending settlements persisted before a restart
+        await self.load_settlement_schedule()
+
+        self.trade_queue = asyncio.Queue(maxsize=config['post_trade'].get('queue_max_trades', 10000))
+        self.check_semaphore = asyncio.Semaphore(config['performance'].get('max_concurrent_checks', 50))
+
         # Connect to NATS
         self.nc = await nats.connect(config['nats_url'])
 
@@ -124,6 +205,8 @@ class PTRCService:
 
         # Start background tasks
         self.running = True
+        asyncio.create_task(self.batch_loop())
+        asyncio.create_task(self.sanctions_refresh_loop())
         asyncio.create_task(self.reconciliation_loop())
         asyncio.create_task(self.settlement_monitor())
         asyncio.create_task(self.regulatory_reporting())
@@ -144,6 +227,12 @@ class PTRCService:
             trade_data = json.loads(msg.data.decode())
             trade = Trade(**trade_data)
 
+            if config['performance'].get('batch_processing', True):
+                # Blocks (backpressure on the subscription) when the queue is full
+                await self.trade_queue.put(trade)
+                trade_queue_depth.set(self.trade_queue.qsize())
+                return
+
             # Start post-trade processing
             with processing_latency.time():
                 await self.process_trade(trade)
@@ -159,54 +248,160 @@ class PTRCService:
             trade_data = json.loads(msg.data.decode())
             trade_id = trade_data.get('trade_id')
 
-            # Update settlement status
-            await self.update_settlement_status(trade_id, SettlementStatus.CANCELLED)
+            # Update settlement status and drop it from the schedule
+            self.settlement_queue.cancel(trade_id)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.zrem(SETTLEMENT_SCHEDULE_KEY, trade_id)
+            await self.update_settlement_status(trade_id, SettlementStatus.CANCELLED, pipe)
+            await pipe.execute()
 
         except Exception as e:
             logger.error(f"Error handling cancelled trade: {e}")
 
-    async def process_trade(self, trade: Trade):
-        """Process trade through post-trade workflow"""
+    async def batch_loop(self):
+        """Drain the trade queue in micro-batches (batch_size or batch_window_ms)"""
+        loop = asyncio.get_running_loop()
+
+        while self.running:
+            try:
+                trade = await asyncio.wait_for(self.trade_queue.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
 
-        # 1. Compliance checks
-        compliance_result = await self.run_compliance_checks(trade)
+            batch = [trade]
+            batch_size = config['post_trade']['batch_size']
+            deadline = loop.time() + config['post_trade'].get('batch_window_ms', 20) / 1000.0
 
-        # 2. Risk monitoring
-        await self.monitor_risk(trade)
+            while len(batch) < batch_size:
+                try:
+                    batch.append(self.trade_queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
 
-        # 3. Settlement processing
-        await self.process_settlement(trade)
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.trade_queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
 
-        # 4. Audit logging
-        await self.audit_log(trade, compliance_result)
+            trade_queue_depth.set(self.trade_queue.qsize())
+            batch_size_histogram.observe(len(batch))
 
-        # 5. Send notifications
-        await self.send_notifications(trade, compliance_result)
+            started = time.perf_counter()
+            try:
+                processed = await self.process_batch(batch)
+                trades_processed.inc(processed)
+            except Exception as e:
+                logger.error(f"Error processing batch of {len(batch)} trades: {e}")
+
+            # Every trade in the batch waited for the whole batch
+            elapsed = time.perf_counter() - started
+            for _ in batch:
+                processing_latency.observe(elapsed)
 
-    async def run_compliance_checks(self, trade: Trade) -> ComplianceCheck:
+    async def process_trade(self, trade: Trade):
+        """Process trade through post-trade workflow"""
+        await self.process_batch([trade])
+
+    async def process_batch(self, trades: List[Trade]) -> int:
+        """
+        Post-trade workflow for a micro-batch of trades
+
+        Redis state for the batch is read in one pipelined round trip,
+        compliance and risk checks run concurrently per trade, and settlement
+        and audit writes go out in a single pipeline. Returns the number of
+        trades processed.
+        """
+
+        # 1. Prefetch KYC, position and limit keys
+        state = await self.fetch_batch_state(trades)
+
+        # 2. Compliance checks and risk monitoring (independent of each other)
+        async def evaluate(trade: Trade) -> ComplianceCheck:
+            async with self.check_semaphore:
+                compliance_result, _ = await asyncio.gather(
+                    self.run_compliance_checks(trade, state),
+                    self.monitor_risk(trade, state)
+                )
+                return compliance_result
+
+        results = await asyncio.gather(*(evaluate(trade) for trade in trades), return_exceptions=True)
+
+        processed = []
+        for trade, result in zip(trades, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error processing trade {trade.trade_id}: {result}")
+                continue
+            processed.append((trade, result))
+
+        # 3. Settlement processing and 4. audit logging
+        pipe = self.redis_client.pipeline(transaction=False)
+        for trade, compliance_result in processed:
+            await self.process_settlement(trade, pipe)
+            await self.audit_log(trade, compliance_result, pipe)
+        await pipe.execute()
+
+        # 5. Send notifications
+        await asyncio.gather(*(
+            self.send_notifications(trade, compliance_result)
+            for trade, compliance_result in processed
+        ))
+
+        return len(processed)
+
+    async def fetch_batch_state(self, trades: List[Trade]) -> Dict[str, Dict]:
+        """Fetch KYC status, positions and exposure limits for trades in one pipelined call"""
+        accounts = sorted({trade.account_id for trade in trades})
+        positions = sorted({(trade.account_id, trade.symbol) for trade in trades})
+
+        fetch_kyc = config['compliance']['check_kyc']
+        fetch_positions = config['risk_monitoring']['position_limit_check']
+        fetch_limits = config['risk_monitoring']['exposure_limit_check']
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        if fetch_kyc:
+            for account_id in accounts:
+                pipe.hget(f"kyc:{account_id}", "status")
+        if fetch_positions:
+            for account_id, symbol in positions:
+                pipe.get(f"position:{account_id}:{symbol}")
+        if fetch_limits:
+            for account_id in accounts:
+                pipe.hget(f"limits:{account_id}", "max_exposure")
+        values = iter(await pipe.execute())
+
+        return {
+            'kyc': {a: next(values) for a in accounts} if fetch_kyc else {},
+            'positions': {p: next(values) for p in positions} if fetch_positions else {},
+            'max_exposure': {a: next(values) for a in accounts} if fetch_limits else {}
+        }
+
+    async def run_compliance_checks(self, trade: Trade, state: Optional[Dict] = None) -> ComplianceCheck:
         """Run compliance checks on trade"""
+        if state is None:
+            state = await self.fetch_batch_state([trade])
+
         with compliance_latency.time():
 
-            # Check sanctions
+            # Checks are independent; run them together and report the first
+            # failure in sanctions -> AML -> KYC order
+            checks = []
             if config['compliance']['check_sanctions']:
-                sanctions_result = await self.check_sanctions(trade)
-                if sanctions_result.status == ComplianceStatus.FAILED:
-                    compliance_checks.labels(status='failed', type='sanctions').inc()
-                    return sanctions_result
-
-            # Check AML
+                checks.append(('sanctions', self.check_sanctions(trade)))
             if config['compliance']['check_aml']:
-                aml_result = await self.check_aml(trade)
-                if aml_result.status == ComplianceStatus.FAILED:
-                    compliance_checks.labels(status='failed', type='aml').inc()
-                    return aml_result
-
-            # Check KYC
+                checks.append(('aml', self.check_aml(trade)))
             if config['compliance']['check_kyc']:
-                kyc_result = await self.check_kyc(trade)
-                if kyc_result.status == ComplianceStatus.FAILED:
-                    compliance_checks.labels(status='failed', type='kyc').inc()
-                    return kyc_result
+                checks.append(('kyc', self.check_kyc(trade, state['kyc'].get(trade.account_id))))
+
+            results = await asyncio.gather(*(check for _, check in checks))
+
+            for (check_type, _), result in zip(checks, results):
+                if result.status == ComplianceStatus.FAILED:
+                    compliance_checks.labels(status='failed', type=check_type).inc()
+                    return result
 
             # All checks passed
             compliance_checks.labels(status='passed', type='all').inc()
@@ -219,11 +414,8 @@ class PTRCService:
 
     async def check_sanctions(self, trade: Trade) -> ComplianceCheck:
         """Check trade against sanctions lists"""
-        # Simulate sanctions check
-        await asyncio.sleep(0.001)  # 1ms check time
-
-        # Check counterparty against sanctions list
-        if trade.counterparty and trade.counterparty in self.get_sanctions_list():
+        # Check counterparty against the in-memory sanctions set
+        if trade.counterparty and self.normalize_entity(trade.counterparty) in self.sanctions:
             return ComplianceCheck(
                 trade_id=trade.trade_id,
                 check_type="SANCTIONS",
@@ -258,11 +450,9 @@ class PTRCService:
             status=ComplianceStatus.PASSED
         )
 
-    async def check_kyc(self, trade: Trade) -> ComplianceCheck:
-        """Know Your Customer check"""
+    async def check_kyc(self, trade: Trade, kyc_status: Optional[bytes]) -> ComplianceCheck:
+        """Know Your Customer check (status prefetched from kyc:{account_id})"""
         # Check if account has completed KYC
-        kyc_status = await self.redis_client.hget(f"kyc:{trade.account_id}", "status")
-
         if not kyc_status or kyc_status.decode() != "VERIFIED":
             return ComplianceCheck(
                 trade_id=trade.trade_id,
@@ -277,25 +467,24 @@ class PTRCService:
             status=ComplianceStatus.PASSED
         )
 
-    async def monitor_risk(self, trade: Trade):
+    async def monitor_risk(self, trade: Trade, state: Dict):
         """Monitor post-trade risk"""
         # Check position limits
         if config['risk_monitoring']['position_limit_check']:
-            await self.check_position_limits(trade)
+            await self.check_position_limits(trade, state)
 
         # Check exposure limits
         if config['risk_monitoring']['exposure_limit_check']:
-            await self.check_exposure_limits(trade)
+            await self.check_exposure_limits(trade, state)
 
         # Check concentration
         if config['risk_monitoring']['concentration_check']:
             await self.check_concentration(trade)
 
-    async def check_position_limits(self, trade: Trade):
+    async def check_position_limits(self, trade: Trade, state: Dict):
         """Check if trade violates position limits"""
         # Get current position
-        position_key = f"position:{trade.account_id}:{trade.symbol}"
-        current_position = await self.redis_client.get(position_key)
+        current_position = state['positions'].get((trade.account_id, trade.symbol))
 
         if current_position:
             position = float(current_position)
@@ -303,13 +492,13 @@ class PTRCService:
             if abs(position) > 100000:
                 logger.warning(f"Position limit warning for {trade.account_id} in {trade.symbol}")
 
-    async def check_exposure_limits(self, trade: Trade):
+    async def check_exposure_limits(self, trade: Trade, state: Dict):
         """Check exposure limits"""
         # Calculate exposure
         exposure = trade.quantity * trade.price
 
         # Check against account limits
-        max_exposure = await self.redis_client.hget(f"limits:{trade.account_id}", "max_exposure")
+        max_exposure = state['max_exposure'].get(trade.account_id)
         if max_exposure and exposure > float(max_exposure):
             logger.warning(f"Exposure limit exceeded for {trade.account_id}")
 
@@ -318,36 +507,38 @@ class PTRCService:
         # Simplified concentration check
         pass
 
-    async def process_settlement(self, trade: Trade):
+    async def process_settlement(self, trade: Trade, pipe=None):
         """Process trade settlement"""
         # Calculate settlement date (T+2 by default)
         settlement_days = config['post_trade']['t_plus_settlement_days']
         settlement_date = trade.execution_time + timedelta(days=settlement_days)
         trade.settlement_date = settlement_date
 
-        # Add to settlement queue
-        self.settlement_queue.append({
-            'trade_id': trade.trade_id,
-            'settlement_date': settlement_date,
-            'status': SettlementStatus.PENDING
-        })
+        # Add to settlement schedule (persisted so a restart keeps it)
+        due = self.settlement_queue.to_timestamp(settlement_date)
+        self.settlement_queue.schedule(trade.trade_id, due)
+        command = (pipe or self.redis_client).zadd(SETTLEMENT_SCHEDULE_KEY, {trade.trade_id: due})
+        if pipe is None:
+            await command
 
         # Update settlement status
-        await self.update_settlement_status(trade.trade_id, SettlementStatus.PENDING)
+        await self.update_settlement_status(trade.trade_id, SettlementStatus.PENDING, pipe)
         settlement_status.labels(status='pending').inc()
 
-    async def update_settlement_status(self, trade_id: str, status: SettlementStatus):
-        """Update settlement status in Redis"""
-        await self.redis_client.hset(
+    async def update_settlement_status(self, trade_id: str, status: SettlementStatus, pipe=None):
+        """Update settlement status in Redis (queued on `pipe` when given)"""
+        command = (pipe or self.redis_client).hset(
             f"settlement:{trade_id}",
             mapping={
                 'status': status.value,
                 'updated_at': datetime.utcnow().isoformat()
             }
         )
+        if pipe is None:
+            await command
 
-    async def audit_log(self, trade: Trade, compliance_result: ComplianceCheck):
-        """Create audit log entry"""
+    async def audit_log(self, trade: Trade, compliance_result: ComplianceCheck, pipe=None):
+        """Create audit log entry (queued on `pipe` when given)"""
         if config['audit']['enabled']:
             audit_entry = {
                 'trade_id': trade.trade_id,
@@ -363,11 +554,13 @@ class PTRCService:
 
             # Store in Redis with TTL
             ttl_seconds = config['audit']['retention_days'] * 86400
-            await self.redis_client.setex(
+            command = (pipe or self.redis_client).setex(
                 f"audit:{trade.trade_id}",
                 ttl_seconds,
                 json.dumps(audit_entry)
             )
+            if pipe is None:
+                await command
 
     async def send_notifications(self, trade: Trade, compliance_result: ComplianceCheck):
         """Send notifications for important events"""
@@ -418,35 +611,57 @@ class PTRCService:
         # Simulate matching logic
         return True
 
+    async def load_settlement_schedule(self):
+        """Rebuild the in-memory settlement schedule from Redis"""
+        entries = await self.redis_client.zrange(SETTLEMENT_SCHEDULE_KEY, 0, -1, withscores=True)
+        for trade_id, due in entries:
+            trade_id = trade_id.decode() if isinstance(trade_id, bytes) else trade_id
+            self.settlement_queue.schedule(trade_id, float(due))
+        logger.info(f"Restored {len(entries)} pending settlements")
+
     async def settlement_monitor(self):
         """Monitor settlement status"""
         while self.running:
             try:
+                # Wake at the check interval, or earlier if a settlement falls due
                 interval = config['post_trade']['settlement_check_interval']
+                next_due = self.settlement_queue.next_due()
+                if next_due is not None:
+                    interval = min(interval, max(1.0, next_due - time.time()))
                 await asyncio.sleep(interval)
 
-                # Check settlement queue
-                now = datetime.utcnow()
-                for item in self.settlement_queue:
-                    if item['status'] == SettlementStatus.PENDING:
-                        if item['settlement_date'] <= now:
-                            # Process settlement
-                            await self.settle_trade(item['trade_id'])
+                # Settle everything that is due, in bulk batches
+                batch_size = config['post_trade'].get('settlement_batch_size', 1000)
+                while True:
+                    due_trades = self.settlement_queue.pop_due(time.time(), batch_size)
+                    if not due_trades:
+                        break
+                    await self.settle_trades(due_trades)
 
             except Exception as e:
                 logger.error(f"Error in settlement monitor: {e}")
 
     async def settle_trade(self, trade_id: str):
         """Settle a trade"""
-        # Update status to settled
-        await self.update_settlement_status(trade_id, SettlementStatus.SETTLED)
-        settlement_status.labels(status='settled').inc()
+        self.settlement_queue.cancel(trade_id)
+        await self.settle_trades([trade_id])
+
+    async def settle_trades(self, trade_ids: List[str]):
+        """Settle trades with one pipelined status write and schedule removal"""
+        pipe = self.redis_client.pipeline(transaction=False)
+        for trade_id in trade_ids:
+            await self.update_settlement_status(trade_id, SettlementStatus.SETTLED, pipe)
+        pipe.zrem(SETTLEMENT_SCHEDULE_KEY, *trade_ids)
 
-        # Remove from queue
-        self.settlement_queue = [
-            item for item in self.settlement_queue
-            if item['trade_id'] != trade_id
-        ]
+        try:
+            await pipe.execute()
+        except Exception:
+            # Put them back so the next pass retries
+            for trade_id in trade_ids:
+                self.settlement_queue.schedule(trade_id, time.time())
+            raise
+
+        settlement_status.labels(status='settled').inc(len(trade_ids))
 
     async def regulatory_reporting(self):
         """Generate regulatory reports"""
@@ -500,6 +715,25 @@ class PTRCService:
         # In production, this would fetch from a sanctions database
         return ["BLOCKED_ENTITY_1", "BLOCKED_ENTITY_2"]
 
+    @staticmethod
+    def normalize_entity(name: str) -> str:
+        """Canonical form for sanctions matching"""
+        return " ".join(name.upper().split())
+
+    def load_sanctions(self):
+        """Load the sanctions list into an in-memory set (O(1) lookup per check)"""
+        self.sanctions = frozenset(self.normalize_entity(e) for e in self.get_sanctions_list())
+        logger.info(f"Loaded {len(self.sanctions)} sanctioned entities")
+
+    async def sanctions_refresh_loop(self):
+        """Periodically reload the sanctions list"""
+        while self.running:
+            try:
+                await asyncio.sleep(config['compliance'].get('sanctions_refresh_interval', 3600))
+                self.load_sanctions()
+            except Exception as e:
+                logger.error(f"Error refreshing sanctions list: {e}")
+
 
 # Service instance
 ptrc_service = PTRCService()
@@ -612,6 +846,8 @@ async def get_stats():
     return {
         "trades_processed": trades_processed._value.get(),
         "settlement_queue_size": len(ptrc_service.settlement_queue),
+        "trade_queue_size": ptrc_service.trade_queue.qsize() if ptrc_service.trade_queue else 0,
+        "sanctioned_entities": len(ptrc_service.sanctions),
         "compliance_cache_size": len(ptrc_service.compliance_cache),
         "timestamp": datetime.utcnow().isoformat()
     }
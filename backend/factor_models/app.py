@@ -5,6 +5,9 @@ from flask_cors import CORS
 import pandas as pd
 import sys
 import os
+import threading
+import time
+from collections import OrderedDict
 
 # Add parent directory to path to import shared module
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -17,8 +20,42 @@ from risk_attribution import RiskAttributor
 app = Flask(__name__)
 CORS(app)
 
-# Cache for models
-models = {}
+# Cache for fitted models: (tickers, start_date, end_date) -> (fitted_at, model)
+models = OrderedDict()
+models_lock = threading.Lock()
+MODEL_CACHE_SIZE = int(os.environ.get('FACTOR_MODEL_CACHE_SIZE', 16))
+MODEL_CACHE_TTL = int(os.environ.get('FACTOR_MODEL_CACHE_TTL', 3600))  # seconds
+
+
+def get_barra_model(tickers, start_date, end_date):
+    """
+    Fitted Barra model for a (universe, window), shared across requests.
+
+    Fitting downloads prices and fundamentals, so models are cached (LRU,
+    MODEL_CACHE_SIZE entries, refit after MODEL_CACHE_TTL seconds). Cached
+    models are only read by the endpoints.
+    """
+    key = (tuple(tickers), start_date, end_date)
+
+    with models_lock:
+        entry = models.get(key)
+        if entry and time.time() - entry[0] < MODEL_CACHE_TTL:
+            models.move_to_end(key)
+            return entry[1]
+
+    model = BarraFactorModel(tickers=list(tickers), start_date=start_date, end_date=end_date)
+    model.fetch_data()
+    model.calculate_factors()
+    model.estimate_factor_returns()  # Also computes residuals and specific risk
+    model.calculate_factor_covariance()
+
+    with models_lock:
+        models[key] = (time.time(), model)
+        models.move_to_end(key)
+        while len(models) > MODEL_CACHE_SIZE:
+            models.popitem(last=False)
+
+    return model
 
 
 @app.route('/api/health', methods=['GET'])
@@ -53,18 +90,8 @@ def analyze_barra():
         start_date = data.get('start_date', '2022-01-01')
         end_date = data.get('end_date', '2024-12-31')
 
-        # Create and fit model
-        model = BarraFactorModel(
-            tickers=tickers,
-            start_date=start_date,
-            end_date=end_date
-        )
-
-        model.fetch_data()
-        model.calculate_factors()
-        model.estimate_factor_returns()
-        model.calculate_factor_covariance()
-        model.calculate_specific_risk()
+        # Fitted model (cached per universe and window)
+        model = get_barra_model(tickers, start_date, end_date)
 
         # Analyze portfolio
         risk_decomp = model.decompose_portfolio_risk(weights)
@@ -227,13 +254,8 @@ def risk_attribution():
         start_date = data.get('start_date', '2022-01-01')
         end_date = data.get('end_date', '2024-12-31')
 
-        # Create Barra model
-        model = BarraFactorModel(tickers=tickers, start_date=start_date, end_date=end_date)
-        model.fetch_data()
-        model.calculate_factors()
-        model.estimate_factor_returns()
-        model.calculate_factor_covariance()
-        model.calculate_specific_risk()
+        # Barra model (cached per universe and window)
+        model = get_barra_model(tickers, start_date, end_date)
 
         # Create risk attributor
         attributor = RiskAttributor(model)
@@ -275,13 +297,8 @@ def stress_test():
         start_date = data.get('start_date', '2022-01-01')
         end_date = data.get('end_date', '2024-12-31')
 
-        # Create Barra model
-        model = BarraFactorModel(tickers=tickers, start_date=start_date, end_date=end_date)
-        model.fetch_data()
-        model.calculate_factors()
-        model.estimate_factor_returns()
-        model.calculate_factor_covariance()
-        model.calculate_specific_risk()
+        # Barra model (cached per universe and window)
+        model = get_barra_model(tickers, start_date, end_date)
 
         # Create risk attributor
         attributor = RiskAttributor(model)
@@ -315,13 +332,8 @@ def risk_budget():
         start_date = data.get('start_date', '2022-01-01')
         end_date = data.get('end_date', '2024-12-31')
 
-        # Create Barra model
-        model = BarraFactorModel(tickers=tickers, start_date=start_date, end_date=end_date)
-        model.fetch_data()
-        model.calculate_factors()
-        model.estimate_factor_returns()
-        model.calculate_factor_covariance()
-        model.calculate_specific_risk()
+        # Barra model (cached per universe and window)
+        model = get_barra_model(tickers, start_date, end_date)
 
         # Create risk attributor
         attributor = RiskAttributor(model)
@@ -353,13 +365,8 @@ def comprehensive_factor_analysis():
         start_date = data.get('start_date', '2022-01-01')
         end_date = data.get('end_date', '2024-12-31')
 
-        # Barra model
-        barra_model = BarraFactorModel(tickers=tickers, start_date=start_date, end_date=end_date)
-        barra_model.fetch_data()
-        barra_model.calculate_factors()
-        barra_model.estimate_factor_returns()
-        barra_model.calculate_factor_covariance()
-        barra_model.calculate_specific_risk()
+        # Barra model (cached per universe and window)
+        barra_model = get_barra_model(tickers, start_date, end_date)
 
         risk_decomp = barra_model.decompose_portfolio_risk(weights)
         tilts = barra_model.factor_tilts(weights)
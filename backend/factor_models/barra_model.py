@@ -2,7 +2,6 @@
 
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
 import yfinance as yf
 
@@ -19,15 +18,18 @@ class BarraFactorModel:
     - Growth (Revenue Growth)
     """
 
-    def __init__(self, tickers: list, start_date: str, end_date: str):
+    def __init__(self, tickers: list, start_date: str, end_date: str,
+                 regression_weights: str = 'equal'):
         self.tickers = tickers
         self.start_date = start_date
         self.end_date = end_date
+        self.regression_weights = regression_weights  # 'equal' or 'sqrt_cap'
 
         self.data = None
         self.factors = None
         self.factor_returns = None
         self.factor_covariance = None
+        self.residuals = None
         self.specific_risk = None
 
     def fetch_data(self):
@@ -116,27 +118,64 @@ class BarraFactorModel:
 
         return self.factors
 
-    def estimate_factor_returns(self):
-        """Estimate factor returns using cross-sectional regression."""
-        returns = self.data['returns']
-        factors = self.factors
-
-        # For each time period, regress stock returns on factor exposures
-        factor_returns = pd.DataFrame(index=returns.index, columns=factors.columns)
+    def _cross_section_weights(self) -> np.ndarray:
+        """Regression weight per stock: equal, or sqrt(market cap) as in Barra."""
+        if self.regression_weights == 'sqrt_cap':
+            market_cap = self.data['fundamentals']['marketCap'].reindex(self.tickers).values
+            weights = np.sqrt(market_cap.astype(float))
+            fallback = np.nanmedian(weights) if np.isfinite(weights).any() else 1.0
+            return np.where(np.isfinite(weights) & (weights > 0), weights, fallback)
+        return np.ones(len(self.tickers))
 
-        for date in returns.index:
-            y = returns.loc[date].values  # Stock returns
-            X = factors.values  # Factor exposures
+    def estimate_factor_returns(self):
+        """
+        Estimate factor returns using cross-sectional regression.
 
-            # Handle NaN values
-            valid_idx = ~np.isnan(y) & ~np.any(np.isnan(X), axis=1)
+        Exposures are the same on every date, so all dates are solved in one
+        batched weighted least-squares pass: dates sharing a missing-data
+        pattern share a design matrix and are solved together. Residuals and
+        specific risk are computed in the same pass.
+        """
+        returns = self.data['returns'].reindex(columns=self.tickers)
+        factors = self.factors.reindex(self.tickers)
+
+        Y = returns.values.astype(float)  # (dates, stocks)
+        X = factors.values  # (stocks, factors)
+        n_factors = X.shape[1]
+
+        # Handle NaN values: one validity mask per date
+        valid = ~np.isnan(Y) & ~np.any(np.isnan(X), axis=1)
+        patterns, inverse = np.unique(valid, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+
+        sqrt_w = np.sqrt(self._cross_section_weights())
+        coefs = np.full((len(Y), n_factors), np.nan)
+
+        for p, mask in enumerate(patterns):
+            if mask.sum() <= n_factors:
+                continue
+            dates = np.flatnonzero(inverse == p)
+            stocks = np.flatnonzero(mask)
+
+            # Weighted design with intercept, all dates of this pattern as columns
+            design = np.column_stack([np.ones(len(stocks)), X[stocks]]) * sqrt_w[stocks, None]
+            targets = Y[np.ix_(dates, stocks)].T * sqrt_w[stocks, None]
+            solution = np.linalg.lstsq(design, targets, rcond=None)[0]
+            coefs[dates] = solution[1:].T
+
+        factor_returns = pd.DataFrame(coefs, index=returns.index, columns=factors.columns)
+        self.factor_returns = factor_returns.dropna()
 
-            if valid_idx.sum() > len(factors.columns):
-                model = LinearRegression()
-                model.fit(X[valid_idx], y[valid_idx])
-                factor_returns.loc[date] = model.coef_
+        # Residual returns: stock return not explained by factor returns
+        fitted = ~np.isnan(coefs).any(axis=1)
+        self.residuals = pd.DataFrame(
+            Y[fitted] - coefs[fitted] @ X.T,
+            index=returns.index[fitted],
+            columns=self.tickers
+        )
 
-        self.factor_returns = factor_returns.dropna()
+        # Specific risk (volatility of residuals)
+        self.specific_risk = self.residuals.std() * np.sqrt(252)  # Annualized
 
         return self.factor_returns
 
@@ -152,32 +191,9 @@ class BarraFactorModel:
 
     def calculate_specific_risk(self):
         """Calculate stock-specific (idiosyncratic) risk."""
-        returns = self.data['returns']
-        factors = self.factors
-        factor_returns = self.factor_returns
-
-        # For each stock, calculate residual variance
-        specific_risk = {}
-
-        for ticker in self.tickers:
-            stock_returns = returns[ticker].dropna()
-
-            # Factor-explained returns
-            factor_exposure = factors.loc[ticker].values
-            explained_returns = factor_returns @ factor_exposure
-
-            # Align indices
-            common_idx = stock_returns.index.intersection(explained_returns.index)
-            stock_returns_aligned = stock_returns.loc[common_idx]
-            explained_returns_aligned = explained_returns.loc[common_idx]
-
-            # Residual returns
-            residual = stock_returns_aligned - explained_returns_aligned
-
-            # Specific risk (volatility of residuals)
-            specific_risk[ticker] = residual.std() * np.sqrt(252)  # Annualized
-
-        self.specific_risk = pd.Series(specific_risk)
+        # Computed alongside the factor returns
+        if self.residuals is None:
+            self.estimate_factor_returns()
 
         return self.specific_risk
 
@@ -26,6 +26,7 @@ from backtesting import (
     walk_forward_backtest,
     compare_thresholds
 )
+from model_store import WindowModelStore
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -41,6 +42,9 @@ logger = logging.getLogger(__name__)
 # Store trained models (in-memory for demo)
 trained_models = {}
 
+# Walk-forward window models, reused across requests
+walk_forward_store = WindowModelStore(Config.WALK_FORWARD_MODEL_DIR)
+
 
 @app.route('/health', methods=['GET'])
 def health():
@@ -286,7 +290,9 @@ def walk_forward_endpoint():
             "ticker": "SPY",
             "primary_strategy": "momentum",
             "train_window": 252,
-            "test_window": 63
+            "test_window": 63,
+            "model_type": "random_forest",
+            "warm_start": false
         }
 
     Returns:
@@ -303,6 +309,8 @@ def walk_forward_endpoint():
         strategy_params = data.get('strategy_params', {})
         train_window = int(data.get('train_window', 252))
         test_window = int(data.get('test_window', 63))
+        model_type = data.get('model_type', 'random_forest')
+        warm_start = bool(data.get('warm_start', False))
 
         if not ticker:
             return jsonify({'success': False, 'error': 'ticker is required'}), 400
@@ -317,15 +325,32 @@ def walk_forward_endpoint():
             prices,
             lambda price: get_strategy(primary_strategy_name, price, **strategy_params),
             train_window=train_window,
-            test_window=test_window
+            test_window=test_window,
+            model_type=model_type,
+            warm_start=warm_start,
+            store=walk_forward_store
         )
 
+        periods = [
+            {
+                'period': r['period'],
+                'test_start': r['test_start'],
+                'test_end': r['test_end'],
+                'cached': r['cached'],
+                'classification': r['classification'],
+                'sharpe_improvement': r['improvement']['sharpe_improvement']
+            }
+            for r in wf_result['all_periods']
+        ]
+
         response = {
             'success': True,
             'avg_without_meta': wf_result['avg_without_meta'],
             'avg_with_meta': wf_result['avg_with_meta'],
             'avg_improvement': wf_result['avg_improvement'],
             'n_periods': wf_result['n_periods'],
+            'n_cached': wf_result['n_cached'],
+            'periods': periods,
             'ticker': ticker,
             'strategy': primary_strategy_name
         }
@@ -1,15 +1,25 @@
 # backtesting.py - Backtest with and without meta-labeling
 
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 import logging
+from sklearn.metrics import accuracy_score, precision_score, recall_score
 from utils import calculate_strategy_returns, calculate_performance_metrics
-from meta_labeler import create_meta_labels, train_meta_model, apply_meta_sizing, predict_meta_probability
+from meta_labeler import create_meta_labels, create_meta_model, apply_meta_sizing, predict_meta_probability
 from feature_engineering import create_meta_features
+from model_store import WindowModelStore, window_key
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Dataset shared with walk-forward pool workers (set once per worker by the initializer)
+_worker_X = None
+_worker_y = None
+_worker_model_type = None
+
 
 def backtest_with_meta_labeling(prices: pd.DataFrame,
                                 primary_strategy: callable,
@@ -44,6 +54,19 @@ def backtest_with_meta_labeling(prices: pd.DataFrame,
     # Calculate returns
     market_returns = prices['close'].pct_change().dropna()
 
+    # WITH meta-labeling
+    meta_proba = predict_meta_probability(meta_model, meta_features)
+
+    result = _compare_meta(market_returns, primary_signals, meta_proba, threshold)
+    result['primary_signals'] = primary_signals
+    return result
+
+
+def _compare_meta(market_returns: pd.Series,
+                  primary_signals: pd.Series,
+                  meta_proba: pd.Series,
+                  threshold: float) -> dict:
+    """Performance of the primary signals with and without meta-sizing"""
     # WITHOUT meta-labeling
     returns_no_meta = calculate_strategy_returns(market_returns, primary_signals)
     metrics_no_meta = calculate_performance_metrics(returns_no_meta)
@@ -52,7 +75,6 @@ def backtest_with_meta_labeling(prices: pd.DataFrame,
                 f"Return: {metrics_no_meta['annual_return']:.2%}")
 
     # WITH meta-labeling
-    meta_proba = predict_meta_probability(meta_model, meta_features)
     sized_signals = apply_meta_sizing(primary_signals, meta_proba, threshold=threshold)
     returns_with_meta = calculate_strategy_returns(market_returns, sized_signals)
     metrics_with_meta = calculate_performance_metrics(returns_with_meta)
@@ -75,86 +97,303 @@ def backtest_with_meta_labeling(prices: pd.DataFrame,
         'improvement': improvement,
         'returns_no_meta': returns_no_meta,
         'returns_with_meta': returns_with_meta,
-        'primary_signals': primary_signals,
         'sized_signals': sized_signals
     }
 
 
+def walk_forward_windows(n_obs: int,
+                         train_window: int,
+                         test_window: int) -> list:
+    """
+    (train_start, train_end, test_end) row positions of each walk-forward window.
+
+    Windows roll forward by test_window; the test period is [train_end, test_end).
+    """
+    n_windows = max(0, (n_obs - train_window) // test_window)
+    return [
+        (i * test_window, i * test_window + train_window, i * test_window + train_window + test_window)
+        for i in range(n_windows)
+    ]
+
+
+def _meta_dataset(prices: pd.DataFrame,
+                  primary_strategy: callable,
+                  holding_period: int) -> tuple:
+    """
+    Primary signals, market returns, meta-features and meta-labels over the
+    full history, all aligned to the price index (NaN where unavailable).
+
+    Features only use data up to each bar, so slicing them by window gives
+    the same values as recomputing them per window, without losing each
+    window's warm-up rows.
+    """
+    close = prices['close']
+    market_returns = close.pct_change()
+    primary_signals = primary_strategy(close).reindex(prices.index)
+
+    labels = create_meta_labels(primary_signals.fillna(0), market_returns, holding_period)
+    features = create_meta_features(prices, primary_signals.fillna(0))
+
+    return (
+        primary_signals,
+        market_returns,
+        features.reindex(prices.index),
+        labels['meta_label'].reindex(prices.index)
+    )
+
+
+def _fit_window(X: pd.DataFrame,
+                y: pd.Series,
+                model_type: str,
+                previous=None,
+                n_jobs: int = -1):
+    """
+    Fit a window's meta-model, continuing from the previous window's model if given.
+
+    Warm starts: a random forest keeps its trees and grows WARM_START_TREES new
+    ones on this window (the oldest are dropped beyond RANDOM_FOREST_N_ESTIMATORS);
+    XGBoost adds WARM_START_ROUNDS boosting rounds; logistic regression starts
+    from the previous coefficients.
+    """
+    if previous is None or set(np.unique(y)) != set(previous.classes_):
+        model = create_meta_model(model_type, n_jobs=n_jobs)
+        model.fit(X, y)
+        return model
+
+    if model_type == 'xgboost':
+        model = create_meta_model(model_type, n_jobs=n_jobs)
+        model.set_params(n_estimators=Config.WARM_START_ROUNDS)
+        model.fit(X, y, xgb_model=previous.get_booster())
+        return model
+
+    model = copy.deepcopy(previous)
+    if model_type == 'random_forest':
+        model.set_params(warm_start=True, n_jobs=n_jobs,
+                         n_estimators=len(model.estimators_) + Config.WARM_START_TREES)
+        model.fit(X, y)
+        model.estimators_ = model.estimators_[-Config.RANDOM_FOREST_N_ESTIMATORS:]
+        model.set_params(n_estimators=len(model.estimators_))
+    else:
+        model.set_params(warm_start=True)
+        model.fit(X, y)
+    return model
+
+
+def _evaluate_window(model,
+                     X_test: pd.DataFrame,
+                     y_test: pd.Series) -> dict:
+    """Out-of-sample probabilities and classification metrics of a window model"""
+    probabilities = predict_meta_probability(model, X_test)
+    return {
+        'probabilities': probabilities,
+        'metrics': _window_metrics(probabilities, y_test)
+    }
+
+
+def _window_metrics(probabilities: pd.Series, y_test: pd.Series) -> dict:
+    """Classification metrics on the test rows labelled so far"""
+    labelled = y_test.notna()
+    y_true = y_test[labelled].astype(int)
+    y_pred = (probabilities[labelled] > 0.5).astype(int)
+
+    return {
+        'accuracy': float(accuracy_score(y_true, y_pred)) if len(y_true) else 0.0,
+        'precision': float(precision_score(y_true, y_pred, zero_division=0)),
+        'recall': float(recall_score(y_true, y_pred, zero_division=0)),
+        'n_test': int(len(y_true))
+    }
+
+
+def _init_worker(X: pd.DataFrame, y: pd.Series, model_type: str):
+    global _worker_X, _worker_y, _worker_model_type
+    _worker_X = X
+    _worker_y = y
+    _worker_model_type = model_type
+
+
+def _fit_window_task(train_rows: np.ndarray, test_rows: np.ndarray) -> dict:
+    """Pool task: fit and evaluate one window of the worker's shared dataset"""
+    model = _fit_window(_worker_X.iloc[train_rows], _worker_y.iloc[train_rows],
+                        _worker_model_type, n_jobs=1)
+    entry = _evaluate_window(model, _worker_X.iloc[test_rows], _worker_y.iloc[test_rows])
+    entry['model'] = model
+    return entry
+
+
 def walk_forward_backtest(prices: pd.DataFrame,
                          primary_strategy: callable,
                          train_window: int = 252,
                          test_window: int = 63,
-                         model_type: str = 'random_forest') -> dict:
+                         model_type: str = 'random_forest',
+                         holding_period: int = None,
+                         threshold: float = None,
+                         warm_start: bool = False,
+                         n_jobs: int = None,
+                         store: WindowModelStore = None) -> dict:
     """
     Walk-forward backtesting with meta-labeling.
 
+    Signals, meta-labels and meta-features are computed once over the full
+    history and sliced per window. Training rows whose label horizon reaches
+    into the test period are purged. Windows are fitted in parallel worker
+    processes, or sequentially when warm-starting each window's model from
+    the previous one. Fitted models and their out-of-sample results are kept
+    in `store` and reused when the same window is requested again.
+
     Args:
         prices: OHLCV price data
         primary_strategy: Function that returns primary signals
         train_window: Training window size (days)
         test_window: Test window size (days)
         model_type: Type of meta-model
+        holding_period: Meta-label holding period
+        threshold: Confidence threshold for meta-sizing
+        warm_start: Continue training from the previous window's model
+        n_jobs: Worker processes for independent windows (None = all CPUs)
+        store: Window model store (None = no reuse across calls)
 
     Returns:
         Aggregated results from all test periods
     """
-    logger.info(f"Walk-forward backtest: train={train_window}, test={test_window}")
-
-    all_results = []
-    n_windows = (len(prices) - train_window) // test_window
-
-    for i in range(n_windows):
-        start_idx = i * test_window
-        train_end_idx = start_idx + train_window
-        test_end_idx = train_end_idx + test_window
+    if holding_period is None:
+        holding_period = Config.DEFAULT_HOLDING_PERIOD
+    if threshold is None:
+        threshold = Config.DEFAULT_CONFIDENCE_THRESHOLD
 
-        if test_end_idx > len(prices):
-            break
+    logger.info(f"Walk-forward backtest: train={train_window}, test={test_window}, "
+                f"model={model_type}, warm_start={warm_start}")
+
+    primary_signals, market_returns, X, y = _meta_dataset(prices, primary_strategy, holding_period)
+    windows = walk_forward_windows(len(prices), train_window, test_window)
+    n_windows = len(windows)
+
+    # Model identity: training data plus everything that shapes the fit
+    settings = (model_type, warm_start, Config.RANDOM_STATE,
+                Config.RANDOM_FOREST_N_ESTIMATORS, Config.RANDOM_FOREST_MAX_DEPTH,
+                Config.RANDOM_FOREST_MIN_SAMPLES_SPLIT, Config.XGBOOST_N_ESTIMATORS,
+                Config.XGBOOST_MAX_DEPTH, Config.XGBOOST_LEARNING_RATE,
+                Config.WARM_START_TREES, Config.WARM_START_ROUNDS)
+
+    plans = []
+    for train_start, train_end, test_end in windows:
+        # Purge training rows whose forward label overlaps the test period
+        rows = np.arange(train_start, max(train_start, train_end - holding_period))
+        train_rows = rows[X.iloc[rows].notna().all(axis=1).values & y.iloc[rows].notna().values]
+        rows = np.arange(train_end, test_end)
+        test_rows = rows[X.iloc[rows].notna().all(axis=1).values]
+        plans.append((train_rows, test_rows))
+
+    entries = [None] * n_windows
+    cached = [False] * n_windows
+    errors = {}
+
+    def key_for(i, previous_key=None):
+        train_rows, test_rows = plans[i]
+        return window_key(settings, previous_key, X.iloc[train_rows], y.iloc[train_rows],
+                          X.iloc[test_rows])
+
+    def cached_entry(i):
+        # The key covers the model's inputs only: test labels whose horizon was
+        # still open when the entry was stored may have resolved since
+        entry = store.get(keys[i]) if store is not None else None
+        if entry is None:
+            return None
+        return {**entry, 'metrics': _window_metrics(entry['probabilities'], y.iloc[plans[i][1]])}
+
+    def run(i, previous=None, model_n_jobs=-1):
+        train_rows, test_rows = plans[i]
+        if len(train_rows) == 0 or len(test_rows) == 0:
+            raise ValueError("no complete training or test rows")
+        model = _fit_window(X.iloc[train_rows], y.iloc[train_rows], model_type, previous, model_n_jobs)
+        entry = _evaluate_window(model, X.iloc[test_rows], y.iloc[test_rows])
+        entry['model'] = model
+        return entry
+
+    keys = [None] * n_windows
+    if warm_start:
+        # Each window continues the previous one, so the chain is sequential
+        previous, previous_key = None, None
+        for i in range(n_windows):
+            keys[i] = key_for(i, previous_key)
+            entry = cached_entry(i)
+            cached[i] = entry is not None
+            if entry is None:
+                try:
+                    entry = run(i, previous)
+                except Exception as e:
+                    errors[i] = e
+                    continue
+                if store is not None:
+                    store.put(keys[i], entry)
+            entries[i] = entry
+            previous, previous_key = entry['model'], keys[i]
+    else:
+        pending = []
+        for i in range(n_windows):
+            keys[i] = key_for(i)
+            entry = cached_entry(i)
+            if entry is not None:
+                entries[i], cached[i] = entry, True
+            elif len(plans[i][0]) == 0 or len(plans[i][1]) == 0:
+                errors[i] = ValueError("no complete training or test rows")
+            else:
+                pending.append(i)
+
+        n_workers = min(n_jobs or Config.WALK_FORWARD_WORKERS or os.cpu_count() or 1, len(pending))
+        if n_workers > 1:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=(X, y, model_type)) as executor:
+                futures = {i: executor.submit(_fit_window_task, *plans[i]) for i in pending}
+                for i, future in futures.items():
+                    try:
+                        entries[i] = future.result()
+                    except Exception as e:
+                        errors[i] = e
+        else:
+            for i in pending:
+                try:
+                    entries[i] = run(i)
+                except Exception as e:
+                    errors[i] = e
+
+        if store is not None:
+            for i in pending:
+                if entries[i] is not None:
+                    store.put(keys[i], entries[i])
 
-        # Split data
-        train_prices = prices.iloc[start_idx:train_end_idx]
-        test_prices = prices.iloc[train_end_idx:test_end_idx]
+    all_results = []
+    for i, (train_start, train_end, test_end) in enumerate(windows):
+        if entries[i] is None:
+            logger.error(f"Error in period {i+1}: {str(errors.get(i))}")
+            continue
 
+        test_index = prices.index[train_end:test_end]
         try:
-            # Train on training period
-            train_signals = primary_strategy(train_prices['close'])
-            train_returns = train_prices['close'].pct_change()
-            train_meta_labels = create_meta_labels(train_signals, train_returns)
-            train_features = create_meta_features(train_prices, train_signals)
-
-            # Train meta-model
-            training_result = train_meta_model(
-                train_features,
-                train_meta_labels['meta_label'],
-                model_type=model_type
-            )
-
-            # Test on test period
-            test_signals = primary_strategy(test_prices['close'])
-            test_features = create_meta_features(test_prices, test_signals)
-
-            # Backtest
-            backtest_result = backtest_with_meta_labeling(
-                test_prices,
-                primary_strategy,
-                training_result['model'],
-                test_features
+            backtest_result = _compare_meta(
+                market_returns.loc[test_index].dropna(),
+                primary_signals.loc[test_index].dropna(),
+                entries[i]['probabilities'],
+                threshold
             )
-
-            all_results.append({
-                'period': i + 1,
-                'without_meta': backtest_result['without_meta'],
-                'with_meta': backtest_result['with_meta'],
-                'improvement': backtest_result['improvement']
-            })
-
-            logger.info(f"Period {i+1}/{n_windows}: Sharpe improvement = "
-                       f"{backtest_result['improvement']['sharpe_improvement']:.3f}")
-
         except Exception as e:
             logger.error(f"Error in period {i+1}: {str(e)}")
             continue
 
+        all_results.append({
+            'period': i + 1,
+            'train_start': str(prices.index[train_start]),
+            'test_start': str(test_index[0]),
+            'test_end': str(test_index[-1]),
+            'cached': cached[i],
+            'classification': entries[i]['metrics'],
+            'without_meta': backtest_result['without_meta'],
+            'with_meta': backtest_result['with_meta'],
+            'improvement': backtest_result['improvement']
+        })
+
+        logger.info(f"Period {i+1}/{n_windows}: Sharpe improvement = "
+                   f"{backtest_result['improvement']['sharpe_improvement']:.3f}")
+
     # Aggregate results
     if not all_results:
         raise ValueError("No successful walk-forward periods")
@@ -180,6 +419,7 @@ def walk_forward_backtest(prices: pd.DataFrame,
 
     return {
         'all_periods': all_results,
+        'n_cached': int(sum(r['cached'] for r in all_results)),
         'avg_without_meta': avg_without_meta,
         'avg_with_meta': avg_with_meta,
         'avg_improvement': avg_improvement,
@@ -33,6 +33,12 @@ class Config:
     XGBOOST_MAX_DEPTH = 6
     XGBOOST_LEARNING_RATE = 0.1
 
+    # Walk-forward
+    WALK_FORWARD_WORKERS = int(os.getenv('WALK_FORWARD_WORKERS', 0)) or None  # None = all CPUs
+    WALK_FORWARD_MODEL_DIR = os.getenv('WALK_FORWARD_MODEL_DIR') or None  # None = keep in memory only
+    WARM_START_TREES = 25  # Trees added per window to a warm-started random forest
+    WARM_START_ROUNDS = 25  # Boosting rounds added per window to a warm-started XGBoost model
+
     # Train/test split
     TEST_SIZE = 0.3
     RANDOM_STATE = 42
@@ -77,9 +77,7 @@ def create_meta_features(prices: pd.DataFrame,
 
     # === RECENT PERFORMANCE ===
     df['recent_return'] = close.pct_change(5)
-    df['win_rate_20'] = returns.rolling(20).apply(
-        lambda x: (x > 0).sum() / len(x) if len(x) > 0 else 0
-    )
+    df['win_rate_20'] = (returns > 0).astype(float).where(returns.notna()).rolling(20).mean()
 
     # === PRICE PATTERNS ===
     # Distance from highs/lows
@@ -70,6 +70,47 @@ def create_meta_labels(primary_signals: pd.Series,
     return df_clean
 
 
+def create_meta_model(model_type: str = 'random_forest',
+                      random_state: int = None,
+                      n_jobs: int = -1):
+    """
+    Unfitted meta-model with the configured hyperparameters.
+
+    Args:
+        model_type: 'random_forest' | 'xgboost' | 'logistic'
+        random_state: Random seed
+        n_jobs: Threads used by tree models (-1 = all CPUs)
+
+    Returns:
+        Classifier with fit/predict_proba
+    """
+    if random_state is None:
+        random_state = Config.RANDOM_STATE
+
+    if model_type == 'random_forest':
+        return RandomForestClassifier(
+            n_estimators=Config.RANDOM_FOREST_N_ESTIMATORS,
+            max_depth=Config.RANDOM_FOREST_MAX_DEPTH,
+            min_samples_split=Config.RANDOM_FOREST_MIN_SAMPLES_SPLIT,
+            random_state=random_state,
+            n_jobs=n_jobs
+        )
+    elif model_type == 'xgboost':
+        from xgboost import XGBClassifier
+        return XGBClassifier(
+            n_estimators=Config.XGBOOST_N_ESTIMATORS,
+            max_depth=Config.XGBOOST_MAX_DEPTH,
+            learning_rate=Config.XGBOOST_LEARNING_RATE,
+            random_state=random_state,
+            n_jobs=n_jobs
+        )
+    elif model_type == 'logistic':
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(max_iter=1000, random_state=random_state)
+    else:
+        raise ValueError(f"Unknown model_type: {model_type}")
+
+
 def train_meta_model(features: pd.DataFrame,
                     meta_labels: pd.Series,
                     model_type: str = 'random_forest',
@@ -117,29 +158,7 @@ def train_meta_model(features: pd.DataFrame,
     logger.info(f"Train size: {len(X_train)}, Test size: {len(X_test)}")
 
     # Train model
-    if model_type == 'random_forest':
-        from sklearn.ensemble import RandomForestClassifier
-        model = RandomForestClassifier(
-            n_estimators=Config.RANDOM_FOREST_N_ESTIMATORS,
-            max_depth=Config.RANDOM_FOREST_MAX_DEPTH,
-            min_samples_split=Config.RANDOM_FOREST_MIN_SAMPLES_SPLIT,
-            random_state=random_state,
-            n_jobs=-1
-        )
-    elif model_type == 'xgboost':
-        from xgboost import XGBClassifier
-        model = XGBClassifier(
-            n_estimators=Config.XGBOOST_N_ESTIMATORS,
-            max_depth=Config.XGBOOST_MAX_DEPTH,
-            learning_rate=Config.XGBOOST_LEARNING_RATE,
-            random_state=random_state,
-            n_jobs=-1
-        )
-    elif model_type == 'logistic':
-        from sklearn.linear_model import LogisticRegression
-        model = LogisticRegression(max_iter=1000, random_state=random_state)
-    else:
-        raise ValueError(f"Unknown model_type: {model_type}")
+    model = create_meta_model(model_type, random_state)
 
     # Fit model
     model.fit(X_train, y_train)
@@ -0,0 +1,105 @@
+# model_store.py - Persistence of walk-forward window models
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import joblib
+
+logger = logging.getLogger(__name__)
+
+
+def window_key(*parts) -> str:
+    """
+    Content hash identifying a window model.
+
+    Parts may be DataFrames/Series (hashed by index, columns and values),
+    arrays, or any picklable value (model type, hyperparameters, ...).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            digest.update(pd.util.hash_pandas_object(part, index=True).values.tobytes())
+            if isinstance(part, pd.DataFrame):
+                digest.update(repr(list(part.columns)).encode())
+        elif isinstance(part, np.ndarray):
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(pickle.dumps(part))
+        digest.update(b'|')
+    return digest.hexdigest()
+
+
+class WindowModelStore:
+    """
+    Fitted walk-forward models and their per-window results.
+
+    Entries are keyed by `window_key` of the training data and model
+    settings, so a window seen again (same ticker re-requested, or history
+    extended by new bars) is reused instead of refitted. Recent entries are
+    kept in memory; with a directory they are also written to disk (one
+    joblib file per window) and survive restarts.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_memory_entries: int = 512):
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+
+        path = self._path(key)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            entry = joblib.load(path)
+        except Exception as e:
+            logger.warning(f"Could not load window model {key}: {str(e)}")
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, entry: dict):
+        self._remember(key, entry)
+
+        path = self._path(key)
+        if path is None:
+            return
+        # Write then rename so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                joblib.dump(entry, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not persist window model {key}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def _remember(self, key: str, entry: dict):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Optional[str]:
+        return os.path.join(self.directory, f"{key}.joblib") if self.directory else None
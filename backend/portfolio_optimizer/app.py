@@ -196,17 +196,19 @@ def get_efficient_frontier():
     Body:
     {
         "tickers": ["AAPL", "MSFT", "GOOGL"],
-        "n_points": 50
+        "n_points": 50,
+        "estimator": "sample_cov"  // optional: ledoit_wolf, exp_cov, ...
     }
     """
     try:
         data = request.json
         tickers = data['tickers']
         n_points = data.get('n_points', 50)
+        estimator = data.get('estimator', 'sample_cov')
 
         prices = fetch_price_data(tickers)
         optimizer = PortfolioOptimizer(prices)
-        frontier = optimizer.efficient_frontier(n_points)
+        frontier = optimizer.efficient_frontier(n_points, estimator=estimator)
 
         return jsonify({'frontier': frontier})
 
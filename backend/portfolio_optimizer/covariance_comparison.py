@@ -7,7 +7,10 @@ import logging
 
 from covariance_cleaning import detone_covariance, detrend_covariance, detone_and_detrend
 from random_matrix_theory import rmt_denoise
+from covariance import CovarianceEstimator
+from rolling_backtest import rebalance_positions, covariance_snapshots, map_rebalances
 from pypfopt import EfficientFrontier, expected_returns
+from sklearn.covariance import LedoitWolf
 
 logger = logging.getLogger(__name__)
 
@@ -70,15 +73,20 @@ def optimize_with_covariance(returns: pd.DataFrame,
 def compare_covariance_methods(returns: pd.DataFrame,
                                methods: List[str] = ['raw', 'detoned', 'detrended', 'both', 'rmt'],
                                optimization_method: str = 'max_sharpe',
-                               risk_free_rate: float = 0.02) -> dict:
+                               risk_free_rate: float = 0.02,
+                               cov_estimates: Dict[str, np.ndarray] = None) -> dict:
     """
     Compare portfolio results using different covariance cleaning methods.
 
     Args:
         returns: Returns dataframe
-        methods: Which methods to compare
+        methods: Which methods to compare ('raw', 'detoned', 'detrended',
+                 'both', 'rmt', 'ledoit_wolf', 'ewma')
         optimization_method: Portfolio optimization method
         risk_free_rate: Risk-free rate
+        cov_estimates: Precomputed estimates keyed by 'sample', 'ledoit_wolf'
+                       or 'ewma' (e.g. from rolling_backtest.covariance_snapshots);
+                       missing ones are estimated from returns
 
     Returns:
         {
@@ -98,8 +106,12 @@ def compare_covariance_methods(returns: pd.DataFrame,
         'cleaning_diagnostics': {}
     }
 
+    cov_estimates = cov_estimates or {}
+
     # Raw covariance
-    raw_cov = returns.cov().values
+    raw_cov = cov_estimates.get('sample')
+    if raw_cov is None:
+        raw_cov = returns.cov().values
 
     # Process each method
     for method_name in methods:
@@ -140,6 +152,22 @@ def compare_covariance_methods(returns: pd.DataFrame,
                     'n_noise': result['n_noise_eigenvalues']
                 }
 
+            elif method_name == 'ledoit_wolf':
+                cov_matrix = cov_estimates.get('ledoit_wolf')
+                if cov_matrix is None:
+                    cov_matrix = LedoitWolf().fit(returns.values).covariance_
+                diagnostics = {
+                    'condition_number': float(np.linalg.cond(cov_matrix))
+                }
+
+            elif method_name == 'ewma':
+                cov_matrix = cov_estimates.get('ewma')
+                if cov_matrix is None:
+                    cov_matrix = CovarianceEstimator(returns).exponentially_weighted()['covariance']
+                diagnostics = {
+                    'condition_number': float(np.linalg.cond(cov_matrix))
+                }
+
             else:
                 logger.warning(f"Unknown method: {method_name}, skipping")
                 continue
@@ -224,15 +252,22 @@ def compare_eigenvalues(cov_matrices: Dict[str, np.ndarray]) -> pd.DataFrame:
 def backtest_comparison(prices: pd.DataFrame,
                        methods: List[str],
                        rebalance_freq: str = 'M',
-                       lookback_days: int = 252) -> dict:
+                       lookback_days: int = 252,
+                       max_workers: int = None) -> dict:
     """
     Backtest portfolios using different covariance methods.
 
+    Returns are computed once for the whole history. The lookback covariance is
+    slid forward incrementally between rebalance dates, and the per-date
+    cleaning and optimization run concurrently on a thread pool that shares
+    the returns matrix read-only.
+
     Args:
         prices: Historical prices
         methods: Covariance methods to compare
         rebalance_freq: Rebalancing frequency ('D', 'W', 'M', 'Q')
         lookback_days: Lookback window for covariance estimation
+        max_workers: Worker threads for rebalance evaluation
 
     Returns:
         {
@@ -246,54 +281,83 @@ def backtest_comparison(prices: pd.DataFrame,
     # Resample to rebalancing frequency
     rebalance_dates = prices.resample(rebalance_freq).last().index
 
-    # Initialize results
-    portfolio_values = {method: [1.0] for method in methods}
-    weights_history = {method: [] for method in methods}
-
-    for i, rebalance_date in enumerate(rebalance_dates[1:], 1):
-        # Get lookback window
-        lookback_start = prices.index[max(0, prices.index.get_loc(rebalance_date) - lookback_days)]
-        lookback_prices = prices.loc[lookback_start:rebalance_date]
-        lookback_returns = lookback_prices.pct_change().dropna()
+    returns = prices.pct_change()
+    returns_values = returns.values
+    positions = rebalance_positions(prices.index, rebalance_dates)
+
+    # Each rebalance holds its weights until the next rebalance date
+    periods = [
+        (rebalance_dates[i], positions[i], positions[i + 1])
+        for i in range(1, len(rebalance_dates) - 1)
+        if positions[i] >= 0
+    ]
+
+    estimators = ['sample']
+    if 'ledoit_wolf' in methods:
+        estimators.append('ledoit_wolf')
+    if 'ewma' in methods:
+        estimators.append('ewma')
+
+    snapshots = covariance_snapshots(
+        returns_values,
+        (pos + 1 for _, pos, _ in periods),
+        lookback=lookback_days,
+        estimators=estimators
+    )
 
-        if len(lookback_returns) < 20:
-            continue
+    def evaluate_rebalance(task):
+        (rebalance_date, pos, _), snapshot = task
+        if snapshot['n_obs'] < 20:
+            return None
 
-        # Compare methods
         try:
+            end = snapshot['end']
+            lookback_returns = returns.iloc[max(0, end - lookback_days):end].dropna()
             comparison = compare_covariance_methods(
                 lookback_returns,
-                methods=methods
+                methods=methods,
+                cov_estimates=snapshot
             )
+        except Exception as e:
+            logger.error(f"Error at rebalance date {rebalance_date}: {str(e)}")
+            return None
 
-            # Get next period return
-            next_date_idx = rebalance_dates.get_loc(rebalance_date) + 1
-            if next_date_idx >= len(rebalance_dates):
-                break
+        return {
+            method: np.array([weights[ticker] for ticker in prices.columns])
+            for method, weights in comparison['portfolio_weights'].items()
+        }
 
-            next_date = rebalance_dates[next_date_idx]
-            period_returns = prices.loc[rebalance_date:next_date].pct_change().iloc[1:]
+    rebalance_weights = map_rebalances(
+        evaluate_rebalance,
+        zip(periods, snapshots),
+        max_workers=max_workers
+    )
 
-            # Calculate portfolio returns for each method
-            for method in methods:
-                if method in comparison['portfolio_weights']:
-                    weights = comparison['portfolio_weights'][method]
-                    weights_array = np.array([weights[ticker] for ticker in prices.columns])
+    # Initialize results
+    portfolio_values = {method: [1.0] for method in methods}
+    weights_history = {method: [] for method in methods}
 
-                    # Calculate weighted returns
-                    period_port_returns = (period_returns * weights_array).sum(axis=1)
-                    period_cumret = (1 + period_port_returns).prod()
+    for (rebalance_date, pos, next_pos), weights_by_method in zip(periods, rebalance_weights):
+        if weights_by_method is None:
+            continue
 
-                    # Update portfolio value
-                    portfolio_values[method].append(
-                        portfolio_values[method][-1] * period_cumret
-                    )
+        period_returns = returns_values[pos + 1:next_pos + 1]
 
-                    weights_history[method].append(weights_array)
+        # Calculate portfolio returns for each method
+        for method in methods:
+            if method in weights_by_method:
+                weights_array = weights_by_method[method]
 
-        except Exception as e:
-            logger.error(f"Error at rebalance date {rebalance_date}: {str(e)}")
-            continue
+                # Calculate weighted returns
+                period_port_returns = np.nansum(period_returns * weights_array, axis=1)
+                period_cumret = np.prod(1 + period_port_returns)
+
+                # Update portfolio value
+                portfolio_values[method].append(
+                    portfolio_values[method][-1] * period_cumret
+                )
+
+                weights_history[method].append(weights_array)
 
     # Convert to DataFrames
     cumulative_returns_df = pd.DataFrame(portfolio_values)
@@ -0,0 +1,203 @@
+# frontier.py - Efficient frontier via the Critical Line Algorithm
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pypfopt import CLA, risk_models, expected_returns
+
+_FRONTIER_CACHE_SIZE = 64
+_frontier_cache = OrderedDict()
+_frontier_cache_lock = threading.Lock()
+
+
+def frontier_cache_key(prices: pd.DataFrame,
+                       estimator: str,
+                       n_points: int,
+                       risk_free_rate: float,
+                       weight_bounds: tuple) -> tuple:
+    """
+    Cache key for a frontier request: (tickers, window, estimator, ...).
+
+    The window is identified by its first/last date and length so that two
+    requests over the same history share a result.
+    """
+    return (
+        tuple(prices.columns),
+        str(prices.index[0]),
+        str(prices.index[-1]),
+        len(prices),
+        estimator,
+        int(n_points),
+        float(risk_free_rate),
+        tuple(weight_bounds),
+    )
+
+
+def clear_frontier_cache():
+    """Drop all cached frontiers."""
+    with _frontier_cache_lock:
+        _frontier_cache.clear()
+
+
+def corner_portfolios(mu: np.ndarray,
+                      cov_matrix: np.ndarray,
+                      weight_bounds: tuple = (0, 1)) -> np.ndarray:
+    """
+    Turning points of the efficient frontier.
+
+    The Critical Line Algorithm (Markowitz, 1956) solves the whole
+    box-constrained frontier in one pass. Between two adjacent corner
+    portfolios the efficient weights are a linear function of the target
+    return, so every frontier point follows from the corners without
+    another optimization.
+
+    Args:
+        mu: Expected returns (N,)
+        cov_matrix: Covariance matrix (N × N)
+        weight_bounds: (lower, upper) bound per asset
+
+    Returns:
+        Corner weights (K × N), ordered by increasing expected return
+    """
+    cla = CLA(np.asarray(mu), np.asarray(cov_matrix), weight_bounds=weight_bounds)
+    cla._solve()
+
+    corners = np.array([np.asarray(w).ravel() for w in cla.w])
+    corner_returns = corners @ np.asarray(mu)
+
+    # CLA walks from the highest-return corner down to minimum variance
+    order = np.argsort(corner_returns, kind='stable')
+    return corners[order]
+
+
+def _max_sharpe_on_segments(corners, mu, cov_matrix, risk_free_rate):
+    """
+    Exact max-Sharpe portfolio along the piecewise-linear frontier.
+
+    On the segment w(t) = w0 + t (w1 - w0) the excess return is a + b t and
+    the variance is c + 2 d t + e t², so the Sharpe ratio has a single
+    stationary point at t = (a d - b c) / (b d - a e).
+    """
+    if len(corners) == 1:
+        return corners[0]
+
+    w0 = corners[:-1]
+    dw = corners[1:] - corners[:-1]
+
+    a = w0 @ mu - risk_free_rate
+    b = dw @ mu
+    c = np.einsum('ij,jk,ik->i', w0, cov_matrix, w0)
+    d = np.einsum('ij,jk,ik->i', w0, cov_matrix, dw)
+    e = np.einsum('ij,jk,ik->i', dw, cov_matrix, dw)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_star = (a * d - b * c) / (b * d - a * e)
+    t_star = np.where(np.isfinite(t_star), np.clip(t_star, 0.0, 1.0), 0.0)
+
+    candidates = np.stack([np.zeros_like(t_star), t_star, np.ones_like(t_star)], axis=1)
+    excess = a[:, None] + b[:, None] * candidates
+    variance = c[:, None] + 2 * d[:, None] * candidates + e[:, None] * candidates ** 2
+    sharpe = excess / np.sqrt(np.maximum(variance, 1e-18))
+
+    seg, col = np.unravel_index(np.argmax(sharpe), sharpe.shape)
+    return w0[seg] + candidates[seg, col] * dw[seg]
+
+
+def frontier_from_corners(corners: np.ndarray,
+                          mu: np.ndarray,
+                          cov_matrix: np.ndarray,
+                          target_returns: np.ndarray) -> np.ndarray:
+    """
+    Efficient weights for each target return, interpolated between corners.
+
+    Args:
+        corners: Corner portfolios (K × N), ascending expected return
+        mu: Expected returns (N,)
+        cov_matrix: Covariance matrix (N × N)
+        target_returns: Target expected returns (P,)
+
+    Returns:
+        Weights (P × N)
+    """
+    corner_returns = corners @ mu
+    targets = np.clip(target_returns, corner_returns[0], corner_returns[-1])
+
+    if len(corners) == 1:
+        return np.repeat(corners, len(targets), axis=0)
+
+    upper = np.clip(np.searchsorted(corner_returns, targets, side='left'), 1, len(corners) - 1)
+    lower = upper - 1
+
+    span = corner_returns[upper] - corner_returns[lower]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(span > 0, (targets - corner_returns[lower]) / span, 0.0)
+
+    return corners[lower] + t[:, None] * (corners[upper] - corners[lower])
+
+
+def efficient_frontier_curve(prices: pd.DataFrame,
+                             n_points: int = 50,
+                             estimator: str = 'sample_cov',
+                             risk_free_rate: float = 0.02,
+                             weight_bounds: tuple = (0, 1),
+                             use_cache: bool = True) -> list:
+    """
+    Efficient frontier from the minimum-volatility to the max-Sharpe portfolio.
+
+    Covariance and expected returns are estimated once, the Critical Line
+    Algorithm finds the corner portfolios, and all frontier points are then
+    evaluated together in array form. Results are cached by
+    (tickers, window, estimator).
+
+    Args:
+        prices: Price dataframe (dates × tickers)
+        n_points: Number of frontier points
+        estimator: pypfopt risk model ('sample_cov', 'ledoit_wolf', 'exp_cov', ...)
+        risk_free_rate: Annual risk-free rate for the Sharpe ratio
+        weight_bounds: (lower, upper) bound per asset; (-1, 1) allows shorting
+        use_cache: Reuse a previously computed frontier for the same inputs
+
+    Returns:
+        List of {'return', 'volatility', 'sharpe'} dicts ordered by return
+    """
+    key = frontier_cache_key(prices, estimator, n_points, risk_free_rate, weight_bounds)
+    if use_cache:
+        with _frontier_cache_lock:
+            if key in _frontier_cache:
+                _frontier_cache.move_to_end(key)
+                return [dict(point) for point in _frontier_cache[key]]
+
+    mu = expected_returns.mean_historical_return(prices).values
+    S = risk_models.risk_matrix(prices, method=estimator)
+    S = np.asarray(S)
+
+    corners = corner_portfolios(mu, S, weight_bounds)
+
+    min_ret = float(corners[0] @ mu)
+    max_ret = float(_max_sharpe_on_segments(corners, mu, S, risk_free_rate) @ mu)
+    target_returns = np.linspace(min_ret, max(min_ret, max_ret), n_points)
+
+    weights = frontier_from_corners(corners, mu, S, target_returns)
+    returns = weights @ mu
+    vols = np.sqrt(np.maximum(np.einsum('ij,jk,ik->i', weights, S, weights), 0.0))
+    sharpes = (returns - risk_free_rate) / np.where(vols > 0, vols, np.nan)
+
+    frontier = [
+        {
+            'return': float(r),
+            'volatility': float(v),
+            'sharpe': float(s)
+        }
+        for r, v, s in zip(returns, vols, sharpes)
+    ]
+
+    if use_cache:
+        with _frontier_cache_lock:
+            _frontier_cache[key] = frontier
+            _frontier_cache.move_to_end(key)
+            while len(_frontier_cache) > _FRONTIER_CACHE_SIZE:
+                _frontier_cache.popitem(last=False)
+
+    return [dict(point) for point in frontier]
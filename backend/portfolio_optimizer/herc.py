@@ -15,7 +15,8 @@ logger = logging.getLogger(__name__)
 def herc_portfolio(returns: pd.DataFrame,
                    cov_matrix: np.ndarray = None,
                    linkage_method: str = 'single',
-                   risk_measure: str = 'volatility') -> dict:
+                   risk_measure: str = 'volatility',
+                   corr_matrix: np.ndarray = None) -> dict:
     """
     Hierarchical Equal Risk Contribution portfolio.
 
@@ -40,6 +41,7 @@ def herc_portfolio(returns: pd.DataFrame,
         cov_matrix: Covariance matrix (if None, computed from returns)
         linkage_method: 'single', 'complete', 'average', 'ward'
         risk_measure: 'volatility' or 'cvar' for tail risk
+        corr_matrix: Correlation matrix (if None, computed from returns)
 
     Returns:
         {
@@ -64,7 +66,8 @@ def herc_portfolio(returns: pd.DataFrame,
                 f"risk measure: {risk_measure}")
 
     # Step 1: Tree Clustering (same as HRP)
-    corr_matrix = returns.corr().values
+    if corr_matrix is None:
+        corr_matrix = returns.corr().values
     dist_matrix = np.sqrt(0.5 * (1 - corr_matrix))
 
     # Perform hierarchical clustering
@@ -158,7 +161,7 @@ def _recursive_bisection_erc(cov_matrix: np.ndarray,
 
     Args:
         cov_matrix: Covariance matrix (sorted)
-        returns: Returns dataframe (sorted)
+        returns: Returns dataframe (sorted); only needed for 'cvar'
         risk_measure: 'volatility' or 'cvar'
         weights: Current weights (initialized if None)
 
@@ -227,14 +230,14 @@ def _recursive_bisection_erc(cov_matrix: np.ndarray,
     if mid > 1:
         weights[:mid] = _recursive_bisection_erc(
             left_cov,
-            returns.iloc[:, :mid],
+            returns.iloc[:, :mid] if returns is not None else None,
             risk_measure,
             weights[:mid]
         )
     if n - mid > 1:
         weights[mid:] = _recursive_bisection_erc(
             right_cov,
-            returns.iloc[:, mid:],
+            returns.iloc[:, mid:] if returns is not None else None,
             risk_measure,
             weights[mid:]
         )
@@ -7,6 +7,8 @@ from typing import Dict
 import logging
 from herc import herc_portfolio
 from hrp import hrp_portfolio
+from rolling_backtest import covariance_snapshots, map_rebalances
+from resampling import resampled_weights, weight_distribution
 from risk_contribution import calculate_risk_contribution, calculate_cvar_contribution
 from tail_risk_metrics import portfolio_tail_risk_analysis
 
@@ -199,14 +201,20 @@ def compare_herc_hrp(returns: pd.DataFrame,
 
 def backtest_comparison(returns: pd.DataFrame,
                        train_size: float = 0.7,
-                       rebalance_frequency: int = 63) -> dict:
+                       rebalance_frequency: int = 63,
+                       max_workers: int = None) -> dict:
     """
     Backtest HERC vs HRP with periodic rebalancing.
 
+    The expanding training covariance and correlation are updated
+    incrementally between rebalances, and the clustering at each rebalance
+    runs concurrently against the shared returns matrix.
+
     Args:
         returns: Returns dataframe
         train_size: Fraction of data for initial training
         rebalance_frequency: Days between rebalancing (63 = quarterly)
+        max_workers: Worker threads for rebalance evaluation
 
     Returns:
         Out-of-sample performance comparison
@@ -217,36 +225,52 @@ def backtest_comparison(returns: pd.DataFrame,
     logger.info(f"Backtesting HERC vs HRP: {train_periods} train, "
                 f"{n_periods - train_periods} test periods")
 
+    returns_values = returns.values
+    starts = list(range(train_periods, n_periods, rebalance_frequency))
+
+    # Expanding training window ending at each rebalance
+    snapshots = covariance_snapshots(
+        returns_values,
+        starts,
+        lookback=None,
+        estimators=('sample', 'correlation')
+    )
+
+    def evaluate_rebalance(snapshot):
+        train_returns = returns.iloc[:snapshot['end']]
+        herc_weights = herc_portfolio(
+            train_returns,
+            snapshot['sample'],
+            corr_matrix=snapshot['correlation']
+        )['weights']
+        hrp_weights = hrp_portfolio(
+            train_returns,
+            snapshot['sample'],
+            corr_matrix=snapshot['correlation']
+        )['weights']
+        return herc_weights, hrp_weights
+
+    rebalance_weights = map_rebalances(evaluate_rebalance, snapshots, max_workers=max_workers)
+
     # Lists to store portfolio values
     herc_values = [1.0]
     hrp_values = [1.0]
-    dates = []
 
-    # Rolling window backtest
-    for start in range(train_periods, n_periods, rebalance_frequency):
-        # Training data
-        train_returns = returns.iloc[:start]
+    for start, weights in zip(starts, rebalance_weights):
+        if weights is None:
+            continue
+        herc_weights, hrp_weights = weights
 
         # Test period
         end = min(start + rebalance_frequency, n_periods)
-        test_returns = returns.iloc[start:end]
-
-        if len(test_returns) == 0:
-            break
-
-        # Optimize on training data
-        herc_weights = herc_portfolio(train_returns)['weights']
-        hrp_weights = hrp_portfolio(train_returns)['weights']
+        test_returns = returns_values[start:end]
 
-        # Apply to test data
-        herc_portfolio_returns = (test_returns @ herc_weights).values
-        hrp_portfolio_returns = (test_returns @ hrp_weights).values
+        # Apply to test data and update portfolio values
+        herc_values.extend(herc_values[-1] * np.cumprod(1 + test_returns @ herc_weights))
+        hrp_values.extend(hrp_values[-1] * np.cumprod(1 + test_returns @ hrp_weights))
 
-        # Update portfolio values
-        for i in range(len(test_returns)):
-            herc_values.append(herc_values[-1] * (1 + herc_portfolio_returns[i]))
-            hrp_values.append(hrp_values[-1] * (1 + hrp_portfolio_returns[i]))
-            dates.append(test_returns.index[i])
+    herc_values = np.asarray(herc_values)
+    hrp_values = np.asarray(hrp_values)
 
     # Calculate performance metrics
     herc_return = (herc_values[-1] - 1) * 100
@@ -273,43 +297,48 @@ def backtest_comparison(returns: pd.DataFrame,
 
 
 def weight_stability_analysis(returns: pd.DataFrame,
-                              n_simulations: int = 100) -> dict:
+                              n_simulations: int = 100,
+                              n_jobs: int = None,
+                              random_state: int = None) -> dict:
     """
     Analyze weight stability under bootstrap resampling.
 
-    More stable weights indicate robustness to estimation error.
+    More stable weights indicate robustness to estimation error. All resamples
+    are drawn up front, their moments computed in batches, and the clustering
+    runs on a process pool (see resampling.py).
 
     Args:
         returns: Returns dataframe
         n_simulations: Number of bootstrap samples
+        n_jobs: Worker processes (1 = in-process, default: CPU count)
+        random_state: Seed for reproducible resampling
 
     Returns:
-        Weight stability metrics
+        Weight stability metrics and per-asset weight distributions
     """
-    n_periods = len(returns)
-    n_assets = len(returns.columns)
-
-    herc_weights_all = np.zeros((n_simulations, n_assets))
-    hrp_weights_all = np.zeros((n_simulations, n_assets))
-
     logger.info(f"Running {n_simulations} bootstrap simulations")
 
-    for i in range(n_simulations):
-        # Bootstrap sample
-        sample_idx = np.random.choice(n_periods, n_periods, replace=True)
-        bootstrap_returns = returns.iloc[sample_idx]
-
-        # Run both methods
-        herc_weights_all[i] = herc_portfolio(bootstrap_returns)['weights']
-        hrp_weights_all[i] = hrp_portfolio(bootstrap_returns)['weights']
+    weights = resampled_weights(
+        returns,
+        n_samples=n_simulations,
+        n_jobs=n_jobs,
+        random_state=random_state
+    )
+    herc_weights_all = weights['herc']
+    hrp_weights_all = weights['hrp']
 
     # Calculate weight stability (lower std = more stable)
     herc_weight_std = np.mean(np.std(herc_weights_all, axis=0))
     hrp_weight_std = np.mean(np.std(hrp_weights_all, axis=0))
 
+    asset_names = returns.columns.tolist()
+
     return {
         'herc_weight_stability': float(herc_weight_std),
         'hrp_weight_stability': float(hrp_weight_std),
         'more_stable': 'HERC' if herc_weight_std < hrp_weight_std else 'HRP',
-        'stability_difference': float(abs(herc_weight_std - hrp_weight_std))
+        'stability_difference': float(abs(herc_weight_std - hrp_weight_std)),
+        'herc_weight_distribution': weight_distribution(herc_weights_all, asset_names),
+        'hrp_weight_distribution': weight_distribution(hrp_weights_all, asset_names),
+        'n_simulations': int(n_simulations)
     }
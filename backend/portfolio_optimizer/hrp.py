@@ -13,7 +13,8 @@ logger = logging.getLogger(__name__)
 
 def hrp_portfolio(returns: pd.DataFrame,
                   cov_matrix: np.ndarray = None,
-                  linkage_method: str = 'single') -> dict:
+                  linkage_method: str = 'single',
+                  corr_matrix: np.ndarray = None) -> dict:
     """
     Hierarchical Risk Parity portfolio optimization.
 
@@ -26,6 +27,7 @@ def hrp_portfolio(returns: pd.DataFrame,
         returns: Returns dataframe (T × N)
         cov_matrix: Covariance matrix (if None, computed from returns)
         linkage_method: 'single', 'complete', 'average', 'ward'
+        corr_matrix: Correlation matrix (if None, computed from returns)
 
     Returns:
         {
@@ -49,7 +51,8 @@ def hrp_portfolio(returns: pd.DataFrame,
 
     # Step 1: Tree Clustering
     # Convert correlation to distance matrix
-    corr_matrix = returns.corr().values
+    if corr_matrix is None:
+        corr_matrix = returns.corr().values
 
     # Distance = sqrt(0.5 * (1 - correlation))
     # This ensures: perfect correlation (1) = distance 0, no correlation (0) = distance 0.707
@@ -8,6 +8,8 @@ from pypfopt import HRPOpt, BlackLittermanModel
 from pypfopt.discrete_allocation import DiscreteAllocation
 import cvxpy as cp
 
+from frontier import efficient_frontier_curve
+
 class PortfolioOptimizer:
     """
     Advanced portfolio optimization using multiple methods.
@@ -238,40 +240,19 @@ class PortfolioOptimizer:
             'method': 'max_diversification'
         }
 
-    def efficient_frontier(self, n_points=50):
+    def efficient_frontier(self, n_points=50, estimator='sample_cov', risk_free_rate=0.02):
         """
         Generate the efficient frontier - optimal portfolios for different risk levels.
-        """
-        mu = expected_returns.mean_historical_return(self.prices)
-        S = risk_models.sample_cov(self.prices)
 
-        # Get min and max returns
-        ef_min = EfficientFrontier(mu, S)
-        ef_min.min_volatility()
-        min_ret = ef_min.portfolio_performance()[0]
-
-        ef_max = EfficientFrontier(mu, S)
-        ef_max.max_sharpe()
-        max_ret = ef_max.portfolio_performance()[0]
-
-        # Generate frontier
-        target_returns = np.linspace(min_ret, max_ret, n_points)
-        frontier = []
-
-        for target in target_returns:
-            try:
-                ef = EfficientFrontier(mu, S)
-                ef.efficient_return(target)
-                perf = ef.portfolio_performance()
-                frontier.append({
-                    'return': perf[0],
-                    'volatility': perf[1],
-                    'sharpe': perf[2]
-                })
-            except:
-                continue
-
-        return frontier
+        The curve runs from the minimum-volatility to the max-Sharpe portfolio and is
+        computed in one pass with the Critical Line Algorithm (see frontier.py).
+        """
+        return efficient_frontier_curve(
+            self.prices,
+            n_points=n_points,
+            estimator=estimator,
+            risk_free_rate=risk_free_rate
+        )
 
     def transaction_cost_optimization(self, current_weights, target_weights,
                                      cost_per_trade=0.001, min_trade_size=0.01):
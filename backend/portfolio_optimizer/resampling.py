@@ -0,0 +1,220 @@
+# resampling.py - Bootstrap resampling engine for HRP/HERC weight stability
+# Batched moment estimation with clustering fanned out to a process pool
+
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from scipy.cluster.hierarchy import linkage, leaves_list
+from scipy.spatial.distance import squareform
+import logging
+
+from hrp import _recursive_bisection_hrp
+from herc import _recursive_bisection_erc
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the gathered (batch × T × N) sample block per chunk
+_CHUNK_BYTES = 128 * 1024 * 1024
+
+
+def bootstrap_indices(n_periods: int,
+                      n_samples: int,
+                      random_state: int = None) -> np.ndarray:
+    """
+    Draw all bootstrap index sets up front.
+
+    Args:
+        n_periods: Number of observations to resample
+        n_samples: Number of bootstrap samples
+        random_state: Seed for reproducible draws
+
+    Returns:
+        Index array (n_samples × n_periods)
+    """
+    rng = np.random.default_rng(random_state)
+    return rng.integers(0, n_periods, size=(n_samples, n_periods))
+
+
+def batched_moments(returns: np.ndarray,
+                    indices: np.ndarray,
+                    chunk_size: int = None):
+    """
+    Covariance and correlation for every bootstrap sample, in chunks.
+
+    Each chunk gathers its samples into one (B × T × N) block and computes all
+    covariances with a single batched matrix product.
+
+    Args:
+        returns: Returns array (T × N)
+        indices: Bootstrap index sets (S × T)
+        chunk_size: Samples per chunk (default: sized to ~128MB)
+
+    Yields:
+        (covariances (B × N × N), correlations (B × N × N)) per chunk
+    """
+    n_samples, n_periods = indices.shape
+    n_assets = returns.shape[1]
+
+    if chunk_size is None:
+        chunk_size = max(1, _CHUNK_BYTES // (n_periods * n_assets * 8))
+
+    for start in range(0, n_samples, chunk_size):
+        samples = returns[indices[start:start + chunk_size]]
+        centred = samples - samples.mean(axis=1, keepdims=True)
+        cov = np.matmul(centred.transpose(0, 2, 1), centred) / (n_periods - 1)
+
+        vols = np.sqrt(np.diagonal(cov, axis1=1, axis2=2))
+        corr = cov / (vols[:, :, None] * vols[:, None, :])
+        corr = np.clip(corr, -1.0, 1.0)
+
+        yield cov, corr
+
+
+def cluster_weights(cov_matrix: np.ndarray,
+                    corr_matrix: np.ndarray,
+                    linkage_method: str = 'single') -> tuple:
+    """
+    HERC (volatility) and HRP weights from one covariance/correlation pair.
+
+    Both methods share the same tree, so clustering runs once per sample.
+
+    Args:
+        cov_matrix: Covariance matrix (N × N)
+        corr_matrix: Correlation matrix (N × N)
+        linkage_method: 'single', 'complete', 'average', 'ward'
+
+    Returns:
+        (herc_weights, hrp_weights)
+    """
+    dist_matrix = np.sqrt(np.clip(0.5 * (1 - corr_matrix), 0.0, None))
+    np.fill_diagonal(dist_matrix, 0.0)
+    link = linkage(squareform(dist_matrix, checks=False), method=linkage_method)
+
+    # Dendrogram leaf order is the same ordering hrp._quasi_diag produces
+    sort_ix = leaves_list(link)
+    unsort_ix = np.argsort(sort_ix)
+    sorted_cov = cov_matrix[np.ix_(sort_ix, sort_ix)]
+
+    herc_weights = _recursive_bisection_erc(sorted_cov, None, 'volatility')
+    hrp_weights = _recursive_bisection_hrp(sorted_cov)
+
+    return herc_weights[unsort_ix], hrp_weights[unsort_ix]
+
+
+def _cluster_chunk(args):
+    cov_batch, corr_batch, linkage_method = args
+    herc = np.empty(cov_batch.shape[:2])
+    hrp = np.empty(cov_batch.shape[:2])
+    for i in range(len(cov_batch)):
+        herc[i], hrp[i] = cluster_weights(cov_batch[i], corr_batch[i], linkage_method)
+    return herc, hrp
+
+
+def _run_bounded(tasks, n_jobs: int) -> list:
+    """
+    Cluster chunks on a process pool with at most n_jobs chunks in flight.
+
+    The next chunk's moments are only computed once a worker finishes, so
+    memory stays bounded by n_jobs chunks rather than all S × N × N matrices.
+    Results are returned in task order.
+    """
+    results = {}
+    pending = {}
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        for position, task in enumerate(tasks):
+            if len(pending) >= n_jobs:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[pending.pop(future)] = future.result()
+            pending[executor.submit(_cluster_chunk, task)] = position
+
+        for future in pending:
+            results[pending[future]] = future.result()
+
+    return [results[position] for position in range(len(results))]
+
+
+def resampled_weights(returns: pd.DataFrame,
+                      n_samples: int = 1000,
+                      linkage_method: str = 'single',
+                      n_jobs: int = None,
+                      random_state: int = None,
+                      chunk_size: int = None) -> dict:
+    """
+    HERC and HRP weights for each bootstrap resample of ``returns``.
+
+    Index sets are drawn once, moments are computed in batched array form,
+    and clustering plus recursive bisection run on a process pool.
+
+    Args:
+        returns: Returns dataframe (T × N)
+        n_samples: Number of bootstrap samples
+        linkage_method: Linkage method for both algorithms
+        n_jobs: Worker processes (1 = in-process, default: CPU count)
+        random_state: Seed for reproducible draws
+        chunk_size: Samples per batched moment computation
+
+    Returns:
+        {'herc': weights (S × N), 'hrp': weights (S × N)}
+    """
+    values = np.asarray(returns.values, dtype=float)
+    indices = bootstrap_indices(len(values), n_samples, random_state)
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    if chunk_size is None and n_jobs > 1:
+        # Enough chunks to keep every worker busy
+        chunk_size = max(1, min(
+            _CHUNK_BYTES // (values.shape[0] * values.shape[1] * 8),
+            -(-n_samples // (4 * n_jobs))
+        ))
+
+    tasks = (
+        (cov, corr, linkage_method)
+        for cov, corr in batched_moments(values, indices, chunk_size)
+    )
+
+    if n_jobs == 1:
+        results = [_cluster_chunk(task) for task in tasks]
+    else:
+        results = _run_bounded(tasks, n_jobs)
+
+    return {
+        'herc': np.vstack([herc for herc, _ in results]),
+        'hrp': np.vstack([hrp for _, hrp in results])
+    }
+
+
+def weight_distribution(weights: np.ndarray,
+                        asset_names: list,
+                        percentiles: tuple = (5, 25, 50, 75, 95)) -> dict:
+    """
+    Per-asset summary of a bootstrap weight distribution.
+
+    Args:
+        weights: Bootstrap weights (S × N)
+        asset_names: Asset labels (N)
+        percentiles: Percentiles to report
+
+    Returns:
+        {asset: {'mean', 'std', 'min', 'max', 'p5', ...}}
+    """
+    pct_values = np.percentile(weights, percentiles, axis=0)
+    means = weights.mean(axis=0)
+    stds = weights.std(axis=0)
+    mins = weights.min(axis=0)
+    maxs = weights.max(axis=0)
+
+    distribution = {}
+    for j, asset in enumerate(asset_names):
+        stats = {
+            'mean': float(means[j]),
+            'std': float(stds[j]),
+            'min': float(mins[j]),
+            'max': float(maxs[j])
+        }
+        for p, values in zip(percentiles, pct_values):
+            stats[f'p{p}'] = float(values[j])
+        distribution[asset] = stats
+
+    return distribution
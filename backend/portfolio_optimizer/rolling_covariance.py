@@ -0,0 +1,238 @@
+# rolling_covariance.py - Incremental covariance estimators for rolling backtests
+# Sample, Ledoit-Wolf and EWMA covariance updated in O(N²) per observation
+
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RollingCovariance:
+    """
+    Sliding-window covariance from running sufficient statistics.
+
+    Each observation entering or leaving the window is a rank-one update of
+    the running sums, so moving the window by one row costs O(N²) instead of
+    re-estimating from the full window. Rows containing NaN are skipped, which
+    matches calling ``.dropna()`` on the window before estimating.
+
+    The sums are rebuilt from the window every ``refresh`` updates to bound
+    floating point drift from repeated add/remove cycles.
+    """
+
+    def __init__(self, returns: np.ndarray, window: int = None, refresh: int = None):
+        """
+        Args:
+            returns: Returns array (T × N), shared read-only
+            window: Window length in rows (None = expanding window)
+            refresh: Updates between exact rebuilds (default: window length)
+        """
+        self.returns = np.asarray(returns, dtype=float)
+        self.valid = ~np.isnan(self.returns).any(axis=1)
+        self.window = window
+        self.refresh = refresh or window or 0
+
+        self.start = 0
+        self.end = 0
+        self._reset()
+
+    def _reset(self):
+        n_assets = self.returns.shape[1]
+        self.n_obs = 0
+        self.sum_x = np.zeros(n_assets)
+        self.sum_xx = np.zeros((n_assets, n_assets))
+        # Fourth-moment statistics needed for the Ledoit-Wolf intensity
+        self.sum_sq = 0.0
+        self.sum_sq2 = 0.0
+        self.sum_sq_x = np.zeros(n_assets)
+        self._updates = 0
+
+    def _apply(self, rows: np.ndarray, sign: float):
+        rows = rows[self.valid[rows]] if len(rows) else rows
+        if len(rows) == 0:
+            return
+        x = self.returns[rows]
+        sq = np.einsum('ij,ij->i', x, x)
+
+        self.n_obs += sign * len(rows)
+        self.sum_x += sign * x.sum(axis=0)
+        self.sum_xx += sign * (x.T @ x)
+        self.sum_sq += sign * sq.sum()
+        self.sum_sq2 += sign * (sq ** 2).sum()
+        self.sum_sq_x += sign * (sq @ x)
+        self._updates += len(rows)
+
+    def advance_to(self, end: int):
+        """
+        Move the window so that it covers rows [end - window, end).
+
+        Args:
+            end: Exclusive end row; must not move backwards
+        """
+        if end < self.end:
+            raise ValueError(f"Window cannot move backwards ({end} < {self.end})")
+
+        start = max(0, end - self.window) if self.window else 0
+
+        rebuild = start >= self.end or (self.refresh and self._updates >= self.refresh)
+        if rebuild:
+            self._reset()
+            self._apply(np.arange(start, end), 1.0)
+        else:
+            self._apply(np.arange(self.end, end), 1.0)
+            self._apply(np.arange(self.start, start), -1.0)
+
+        self.start = start
+        self.end = end
+
+    def mean(self) -> np.ndarray:
+        return self.sum_x / self.n_obs
+
+    def covariance(self, ddof: int = 1) -> np.ndarray:
+        """Sample covariance of the current window."""
+        mean = self.mean()
+        cov = (self.sum_xx - self.n_obs * np.outer(mean, mean)) / (self.n_obs - ddof)
+        return (cov + cov.T) / 2
+
+    def correlation(self) -> np.ndarray:
+        """Correlation matrix of the current window."""
+        cov = self.covariance()
+        vols = np.sqrt(np.clip(np.diag(cov), 1e-300, None))
+        corr = cov / np.outer(vols, vols)
+        np.fill_diagonal(corr, 1.0)
+        return np.clip(corr, -1.0, 1.0)
+
+    def ledoit_wolf(self) -> dict:
+        """
+        Ledoit-Wolf shrinkage towards a scaled identity.
+
+        Same estimator as ``sklearn.covariance.LedoitWolf``, with the shrinkage
+        intensity computed from the running moments instead of the raw window.
+
+        Returns:
+            {
+                'covariance': Shrunk covariance matrix,
+                'shrinkage': Shrinkage intensity in [0, 1]
+            }
+        """
+        n = self.n_obs
+        n_features = len(self.sum_x)
+        mean = self.mean()
+        emp_cov = self.covariance(ddof=0)
+
+        # Σ_t ||x_t - m||⁴ expanded in terms of the uncentred running sums
+        m_sq = mean @ mean
+        centred_sq2 = (self.sum_sq2
+                       + 4 * mean @ self.sum_xx @ mean
+                       + n * m_sq ** 2
+                       - 4 * mean @ self.sum_sq_x
+                       + 2 * m_sq * self.sum_sq
+                       - 4 * m_sq * (mean @ self.sum_x))
+
+        mu = np.trace(emp_cov) / n_features
+        delta_ = np.sum(emp_cov ** 2)
+        beta = (centred_sq2 / n - delta_) / (n_features * n)
+        delta = (delta_ - 2 * mu * np.trace(emp_cov) + n_features * mu ** 2) / n_features
+        beta = min(beta, delta)
+        shrinkage = 0.0 if beta <= 0 else beta / delta
+
+        shrunk_cov = (1 - shrinkage) * emp_cov
+        shrunk_cov.flat[::n_features + 1] += shrinkage * mu
+
+        return {
+            'covariance': shrunk_cov,
+            'shrinkage': float(shrinkage)
+        }
+
+
+class RollingEWMACovariance:
+    """
+    Sliding-window exponentially weighted covariance.
+
+    Matches ``returns.ewm(halflife=...).cov()`` evaluated on the window (bias
+    corrected, ``adjust=True``). Weights decay geometrically, so sliding the
+    window is a rescale plus one rank-one add and one rank-one remove.
+    """
+
+    def __init__(self, returns: np.ndarray, halflife: float = 60,
+                 window: int = None, refresh: int = None):
+        """
+        Args:
+            returns: Returns array (T × N), shared read-only
+            halflife: Half-life in rows for exponential weighting
+            window: Window length in rows (None = expanding window)
+            refresh: Updates between exact rebuilds (default: window length)
+        """
+        self.returns = np.asarray(returns, dtype=float)
+        self.valid = ~np.isnan(self.returns).any(axis=1)
+        self.halflife = halflife
+        self.decay = 0.5 ** (1.0 / halflife)
+        self.window = window
+        self.refresh = refresh or window or 0
+
+        # Valid-row counter so removed rows know how far they have decayed
+        self._rank = np.cumsum(self.valid)
+
+        self.start = 0
+        self.end = 0
+        self._reset()
+
+    def _reset(self):
+        n_assets = self.returns.shape[1]
+        self.sum_w = 0.0
+        self.sum_w2 = 0.0
+        self.sum_wx = np.zeros(n_assets)
+        self.sum_wxx = np.zeros((n_assets, n_assets))
+        self._updates = 0
+
+    def _add(self, rows: np.ndarray):
+        for row in rows[self.valid[rows]]:
+            x = self.returns[row]
+            self.sum_w = self.decay * self.sum_w + 1.0
+            self.sum_w2 = self.decay ** 2 * self.sum_w2 + 1.0
+            self.sum_wx = self.decay * self.sum_wx + x
+            self.sum_wxx *= self.decay
+            self.sum_wxx += np.outer(x, x)
+            self._updates += 1
+
+    def _remove(self, rows: np.ndarray, last_row: int):
+        for row in rows[self.valid[rows]]:
+            x = self.returns[row]
+            w = self.decay ** (self._rank[last_row] - self._rank[row])
+            self.sum_w -= w
+            self.sum_w2 -= w ** 2
+            self.sum_wx -= w * x
+            self.sum_wxx -= w * np.outer(x, x)
+            self._updates += 1
+
+    def advance_to(self, end: int):
+        """
+        Move the window so that it covers rows [end - window, end).
+
+        Args:
+            end: Exclusive end row; must not move backwards
+        """
+        if end < self.end:
+            raise ValueError(f"Window cannot move backwards ({end} < {self.end})")
+
+        start = max(0, end - self.window) if self.window else 0
+
+        rebuild = start >= self.end or (self.refresh and self._updates >= self.refresh)
+        if rebuild:
+            self._reset()
+            self._add(np.arange(start, end))
+        else:
+            self._add(np.arange(self.end, end))
+            if end > 0:
+                self._remove(np.arange(self.start, start), end - 1)
+
+        self.start = start
+        self.end = end
+
+    def covariance(self) -> np.ndarray:
+        """Bias-corrected EWMA covariance of the current window."""
+        mean = self.sum_wx / self.sum_w
+        biased = self.sum_wxx / self.sum_w - np.outer(mean, mean)
+        correction = self.sum_w ** 2 / (self.sum_w ** 2 - self.sum_w2)
+        cov = biased * correction
+        return (cov + cov.T) / 2
@@ -0,0 +1,311 @@
+"""
+Parallel, cached grid search for strategy parameter optimization
+
+Walk-forward and cross-validation loops run the same parameter grid over
+window after window. GridSearch is built once over the full dataset and
+scores the whole grid for any window (a slice or array of row positions):
+- Worker processes receive the dataset once (pool initializer); tasks only
+  carry window row positions and a chunk of the grid.
+- A strategy may declare a vectorized parameter axis (`@vectorized("fast")`):
+  it is then called once per combination of the other parameters with the
+  list of axis values, and returns one signal column per value.
+- Grid scores are cached per window, so a window seen again (anchored and
+  expanding walk-forward share every training window) costs nothing.
+- A strategy declared `@causal` (signals at t use data up to t only) is run
+  once per combination on the full history; every window, overlapping or
+  not, is then scored from a slice of the cached strategy-return matrix.
+
+Strategy returns follow the services' convention: returns * signals.shift(1),
+rows with a missing value dropped (NaN-aware statistics per column).
+
+Usage:
+    from shared.grid_search import GridSearch, sharpe_scorer
+
+    with GridSearch(data, strategy_func, param_grid, scorer=sharpe_scorer()) as search:
+        best_params, best_score = search.best(slice(0, 252))
+"""
+
+import hashlib
+import itertools
+import logging
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Below this many strategy calls per worker the pool start-up costs more than it saves
+_MIN_JOBS_PER_WORKER = 8
+
+# (combination indices, params, vectorized axis or None)
+Job = Tuple[List[int], Dict, Optional[str]]
+
+# Dataset and strategy shared with pool workers (set once per worker by the initializer)
+_worker_data: Optional[pd.DataFrame] = None
+_worker_strategy: Optional[Callable] = None
+
+
+def vectorized(axis: str) -> Callable:
+    """
+    Mark a strategy as evaluating a whole parameter axis per call.
+
+    During the search the strategy receives params[axis] as a list of values
+    and must return signals of shape (len(data), len(values)), one column per
+    value in the given order (ndarray or DataFrame). Called with a single
+    value (e.g. to trade the selected parameters) it returns a Series as usual.
+    """
+    def decorate(func: Callable) -> Callable:
+        func.vectorized_axis = axis
+        return func
+    return decorate
+
+
+def causal(func: Callable) -> Callable:
+    """Mark a strategy whose signal at t depends on data up to t only"""
+    func.causal = True
+    return func
+
+
+def parameter_combinations(param_grid: Dict) -> List[Dict]:
+    """All parameter combinations, in itertools.product order"""
+    keys = list(param_grid.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*param_grid.values())]
+
+
+def sharpe_scorer(risk_free_rate: float = 0.0, flat_score: Optional[float] = 0.0,
+                  empty_score: Optional[float] = None, periods: int = 252) -> Callable:
+    """
+    Annualized Sharpe ratio of each column of a strategy-return matrix.
+
+    Args:
+        risk_free_rate: Annual risk-free rate
+        flat_score: Score when returns have zero volatility (None = skip)
+        empty_score: Score when a column has no returns (None = skip)
+        periods: Periods per year
+
+    Returns:
+        Function (T × K returns, NaN = missing) -> K scores (NaN = skip)
+    """
+    def score(returns: np.ndarray) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            count = np.sum(~np.isnan(returns), axis=0)
+            total = np.nansum(returns, axis=0)
+            mean = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+            squares = np.nansum((returns - mean) ** 2, axis=0)
+            std = np.where(count > 1, np.sqrt(squares / np.maximum(count - 1, 1)), np.nan)
+            sharpe = np.sqrt(periods) * (mean - risk_free_rate / periods) / std
+
+        sharpe[std == 0] = np.nan if flat_score is None else flat_score
+        sharpe[count == 0] = np.nan if empty_score is None else empty_score
+        return sharpe
+    return score
+
+
+def _signals(data: pd.DataFrame, strategy_func: Callable, params: Dict,
+             axis: Optional[str], width: int) -> Tuple[np.ndarray, int]:
+    """Signals (T × width) for one job, and the number of combinations that failed (NaN columns)"""
+    try:
+        signals = np.asarray(strategy_func(data, params), dtype=float)
+        if signals.ndim == 1:
+            signals = signals.reshape(-1, 1)
+        if signals.shape != (len(data), width):
+            raise ValueError(f"expected signals of shape {(len(data), width)}, got {signals.shape}")
+        return signals, 0
+    except Exception as e:
+        if axis is None:
+            logger.warning(f"Error evaluating params {params}: {str(e)}")
+            return np.full((len(data), 1), np.nan), 1
+        logger.debug(f"Vectorized call failed for params {params}, evaluating '{axis}' per value: {str(e)}")
+
+    # Vectorized call failed: evaluate the axis one value at a time
+    columns = [
+        _signals(data, strategy_func, {**params, axis: value}, None, 1)
+        for value in params[axis]
+    ]
+    return np.column_stack([signals for signals, _ in columns]), sum(failed for _, failed in columns)
+
+
+def _run_jobs(data: pd.DataFrame, strategy_func: Callable,
+              jobs: Sequence[Job]) -> Tuple[List[int], np.ndarray, int]:
+    """Strategy returns (T × combinations) for the jobs, with their grid indices and failure count"""
+    returns = data['returns'].to_numpy(dtype=float)[:, None]
+    indices, blocks, failures = [], [], 0
+    for job_indices, params, axis in jobs:
+        signals, failed = _signals(data, strategy_func, params, axis, len(job_indices))
+        shifted = np.vstack([np.full((1, signals.shape[1]), np.nan), signals])[:len(signals)]
+        indices.extend(job_indices)
+        blocks.append(returns * shifted)
+        failures += failed
+    return indices, np.hstack(blocks), failures
+
+
+def _init_worker(data: pd.DataFrame, strategy_func: Callable):
+    global _worker_data, _worker_strategy
+    _worker_data = data
+    _worker_strategy = strategy_func
+
+
+def _run_job_chunk(rows: Optional[np.ndarray], jobs: Sequence[Job]) -> Tuple[List[int], np.ndarray, int]:
+    """Pool task: run a chunk of jobs on a window of the worker's shared dataset"""
+    data = _worker_data if rows is None else _worker_data.iloc[rows]
+    return _run_jobs(data, _worker_strategy, jobs)
+
+
+class GridSearch:
+    """
+    Score a parameter grid on windows of one dataset.
+
+    Results are cached per window for the lifetime of the instance; use it
+    as a context manager (or call `close`) to shut the worker pool down.
+    """
+
+    def __init__(self, data: pd.DataFrame, strategy_func: Callable, param_grid: Dict,
+                 scorer: Optional[Callable] = None, n_jobs: Optional[int] = None):
+        """
+        Args:
+            data: Full DataFrame with a 'returns' column
+            strategy_func: Function(data, params) -> signals (see `vectorized`, `causal`)
+            param_grid: Dictionary of parameter ranges
+            scorer: Function (T × K strategy returns) -> K scores, NaN = skip
+                (default: `sharpe_scorer()`)
+            n_jobs: Worker processes (None = all CPUs, 1 = in-process)
+        """
+        self.data = data
+        self.strategy_func = strategy_func
+        self.scorer = scorer or sharpe_scorer()
+        self.combinations = parameter_combinations(param_grid)
+        self.causal = bool(getattr(strategy_func, 'causal', False))
+        self.jobs = self._plan(param_grid, getattr(strategy_func, 'vectorized_axis', None))
+
+        n_jobs = n_jobs or os.cpu_count() or 1
+        self.n_workers = min(n_jobs, len(self.jobs) // _MIN_JOBS_PER_WORKER)
+        if self.n_workers > 1 and not self._picklable(strategy_func):
+            self.n_workers = 1
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._scores: Dict[str, np.ndarray] = {}
+        self._full_returns: Optional[np.ndarray] = None
+        # failures: strategy calls that raised (their combinations score NaN and are skipped)
+        self.stats = {'windows_evaluated': 0, 'cache_hits': 0, 'failures': 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def scores(self, rows: Union[slice, Sequence[int], np.ndarray]) -> np.ndarray:
+        """
+        Score of every combination on a window of the dataset.
+
+        Args:
+            rows: Window as a slice or array of row positions
+
+        Returns:
+            Array aligned with `combinations` (NaN where skipped)
+        """
+        rows = self._rows(rows)
+        key = hashlib.blake2b(rows.tobytes(), digest_size=16).hexdigest()
+        cached = self._scores.get(key)
+        if cached is not None:
+            self.stats['cache_hits'] += 1
+            return cached
+
+        if self.causal:
+            returns = self._strategy_returns(None)[rows]
+        else:
+            returns = self._strategy_returns(rows)
+
+        scores = np.asarray(self.scorer(returns), dtype=float)
+        self._scores[key] = scores
+        self.stats['windows_evaluated'] += 1
+        return scores
+
+    def best(self, rows: Union[slice, Sequence[int], np.ndarray]) -> Tuple[Dict, float]:
+        """
+        Best-scoring parameters on a window (first one on ties).
+
+        Falls back to the first combination with score 0 when every
+        combination was skipped.
+        """
+        scores = self.scores(rows)
+        if len(scores) == 0 or np.all(np.isnan(scores)):
+            return dict(self.combinations[0]) if self.combinations else {}, 0
+        best = int(np.nanargmax(scores))
+        return dict(self.combinations[best]), scores[best]
+
+    def _rows(self, rows) -> np.ndarray:
+        if isinstance(rows, slice):
+            return np.arange(*rows.indices(len(self.data)), dtype=np.int64)
+        return np.asarray(rows, dtype=np.int64)
+
+    def _plan(self, param_grid: Dict, axis: Optional[str]) -> List[Job]:
+        """One job per strategy call: a single combination or a vectorized axis"""
+        if axis is None or axis not in param_grid:
+            return [([i], params, None) for i, params in enumerate(self.combinations)]
+
+        # Combinations are in product order; group those differing only on the axis
+        keys = list(param_grid.keys())
+        position = keys.index(axis)
+        shape = [len(values) for values in param_grid.values()]
+        groups: Dict[Tuple, List[int]] = {}
+        for i, grid_index in enumerate(itertools.product(*(range(n) for n in shape))):
+            groups.setdefault(grid_index[:position] + grid_index[position + 1:], []).append(i)
+
+        jobs = []
+        for indices in groups.values():
+            params = dict(self.combinations[indices[0]])
+            params[axis] = [self.combinations[i][axis] for i in indices]
+            jobs.append((indices, params, axis))
+        return jobs
+
+    def _strategy_returns(self, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Strategy returns (T × combinations) on a window, or the full history if rows is None"""
+        if rows is None and self._full_returns is not None:
+            return self._full_returns
+
+        if self.n_workers > 1:
+            # A few chunks per worker keeps the pool balanced
+            chunk_size = max(1, -(-len(self.jobs) // (4 * self.n_workers)))
+            chunks = [self.jobs[k:k + chunk_size] for k in range(0, len(self.jobs), chunk_size)]
+            results = list(self._pool().map(_run_job_chunk, itertools.repeat(rows), chunks))
+        else:
+            data = self.data if rows is None else self.data.iloc[rows]
+            results = [_run_jobs(data, self.strategy_func, self.jobs)]
+
+        n_rows = len(self.data) if rows is None else len(rows)
+        returns = np.empty((n_rows, len(self.combinations)))
+        for indices, block, failures in results:
+            returns[:, indices] = block
+            self.stats['failures'] += failures
+
+        if rows is None:
+            self._full_returns = returns
+        return returns
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                initializer=_init_worker,
+                initargs=(self.data, self.strategy_func)
+            )
+        return self._executor
+
+    @staticmethod
+    def _picklable(strategy_func: Callable) -> bool:
+        try:
+            pickle.dumps(strategy_func)
+            return True
+        except Exception:
+            logger.info("Strategy function cannot be sent to worker processes; evaluating in-process")
+            return False
@@ -0,0 +1,194 @@
+"""
+In-process JWT verification against the authn JWKS
+
+Services verify tokens locally instead of calling authn per request:
+- Parsed public keys are cached by `kid`; the JWKS is refetched only when
+  an unknown kid shows up (rate limited) or the cache max-age expires,
+  and revalidated with If-None-Match so unchanged keys cost a 304. One
+  fetch runs at a time, outside the cache lock; while authn is unreachable
+  cached keys keep being served and refetches back off.
+- Claims of already-verified tokens are cached until the token expires,
+  so a client reusing its token pays for signature verification once.
+
+Usage:
+    from shared.jwt_verifier import JWTVerifier
+
+    verifier = JWTVerifier(
+        jwks_url="http://authn:8114/.well-known/jwks.json",
+        issuer="https://authn.trade2025.local",
+        audience="oms.trade2025.local"
+    )
+    claims = verifier.verify(token)  # raises jwt.InvalidTokenError
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import jwt
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Algorithms authn can issue; "none" and HMAC are never accepted
+SUPPORTED_ALGORITHMS = ["RS256", "ES256", "EdDSA"]
+
+
+class JWTVerifier:
+    """Thread-safe JWT verifier with kid-indexed key cache"""
+
+    def __init__(self, jwks_url: str, issuer: Optional[str] = None,
+                 audience: Optional[str] = None,
+                 algorithms: Optional[List[str]] = None,
+                 leeway_seconds: int = 30,
+                 default_max_age_seconds: int = 300,
+                 min_refresh_interval_seconds: float = 10.0,
+                 max_cached_tokens: int = 10000,
+                 timeout_seconds: float = 5.0):
+        self.jwks_url = jwks_url
+        self.issuer = issuer
+        self.audience = audience
+        self.algorithms = algorithms or SUPPORTED_ALGORITHMS
+        self.leeway = leeway_seconds
+        self.default_max_age = default_max_age_seconds
+        self.min_refresh_interval = min_refresh_interval_seconds
+        self.max_cached_tokens = max_cached_tokens
+        self.timeout = timeout_seconds
+
+        self._keys: Dict[str, Tuple[Any, str]] = {}  # kid -> (key object, alg)
+        self._etag: Optional[str] = None
+        self._expires_at = 0.0
+        self._last_fetch = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # At most one JWKS fetch in flight
+
+        # token -> (claims, exp)
+        self._verified: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+        self._session = requests.Session()
+        self.stats = {"verified": 0, "cache_hits": 0, "jwks_fetches": 0, "jwks_not_modified": 0}
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Return the token's claims, or raise jwt.InvalidTokenError"""
+        now = time.time()
+
+        with self._lock:
+            cached = self._verified.get(token)
+            if cached is not None:
+                claims, exp = cached
+                if now < exp + self.leeway:
+                    self._verified.move_to_end(token)
+                    self.stats["cache_hits"] += 1
+                    return claims
+                del self._verified[token]
+
+        header = jwt.get_unverified_header(token)
+        kid = header.get("kid")
+        if not kid:
+            raise jwt.InvalidTokenError("Token header has no kid")
+
+        key, alg = self._get_key(kid)
+        if header.get("alg") != alg or alg not in self.algorithms:
+            raise jwt.InvalidAlgorithmError(f"Unexpected algorithm {header.get('alg')} for kid {kid}")
+
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=[alg],
+            audience=self.audience,
+            issuer=self.issuer,
+            leeway=self.leeway,
+            options={"verify_aud": self.audience is not None}
+        )
+
+        with self._lock:
+            self.stats["verified"] += 1
+            self._verified[token] = (claims, float(claims.get("exp", now)))
+            if len(self._verified) > self.max_cached_tokens:
+                self._verified.popitem(last=False)
+
+        return claims
+
+    def _get_key(self, kid: str) -> Tuple[Any, str]:
+        with self._lock:
+            entry = self._keys.get(kid)
+            if entry is not None and time.monotonic() < self._expires_at:
+                return entry
+
+        if entry is not None:
+            # Stale cache: one caller refreshes, the others keep the known key
+            if not self._refresh_lock.acquire(blocking=False):
+                return entry
+        else:
+            # Unknown kid (e.g. just rotated): wait for an in-flight refresh
+            self._refresh_lock.acquire()
+
+        try:
+            with self._lock:
+                now = time.monotonic()
+                current = self._keys.get(kid)
+                if current is not None and (entry is None or now < self._expires_at):
+                    return current  # Loaded by the refresh we waited for
+                # Do not let a stream of bogus kids hammer authn
+                if entry is None and now - self._last_fetch < self.min_refresh_interval:
+                    raise jwt.InvalidTokenError(f"Unknown kid {kid}")
+                self._last_fetch = now
+
+            try:
+                self._refresh(now)
+            except requests.RequestException as e:
+                with self._lock:
+                    # Back off: keep serving cached keys instead of retrying every request
+                    self._expires_at = now + self.min_refresh_interval
+                if entry is not None:
+                    logger.warning(f"JWKS refresh failed, using cached key {kid}: {e}")
+                    return entry
+                raise jwt.InvalidTokenError(f"JWKS unavailable: {e}")
+        finally:
+            self._refresh_lock.release()
+
+        with self._lock:
+            entry = self._keys.get(kid)
+        if entry is None:
+            raise jwt.InvalidTokenError(f"Unknown kid {kid}")
+        return entry
+
+    def _refresh(self, now: float):
+        """Fetch the JWKS (conditional on ETag) outside the lock and rebuild the key cache"""
+        with self._lock:
+            headers = {"If-None-Match": self._etag} if self._etag else {}
+
+        response = self._session.get(self.jwks_url, headers=headers, timeout=self.timeout)
+        max_age = self._max_age(response.headers.get("Cache-Control"))
+
+        if response.status_code == 304:
+            with self._lock:
+                self.stats["jwks_fetches"] += 1
+                self.stats["jwks_not_modified"] += 1
+                self._expires_at = now + max_age
+            return
+
+        response.raise_for_status()
+        keys = {}
+        for jwk in response.json().get("keys", []):
+            try:
+                keys[jwk["kid"]] = (jwt.PyJWK(jwk).key, jwk.get("alg"))
+            except (KeyError, jwt.PyJWKError) as e:
+                logger.warning(f"Skipping unusable JWK {jwk.get('kid')}: {e}")
+
+        with self._lock:
+            self.stats["jwks_fetches"] += 1
+            self._keys = keys
+            self._etag = response.headers.get("ETag")
+            self._expires_at = now + max_age
+        logger.info(f"Loaded JWKS: {sorted(keys)}")
+
+    def _max_age(self, cache_control: Optional[str]) -> float:
+        if cache_control:
+            match = re.search(r"max-age=(\d+)", cache_control)
+            if match:
+                return float(match.group(1))
+        return float(self.default_max_age)
@@ -60,6 +60,9 @@ class Config:
     DEFAULT_CV_SPLITS = 5
     DEFAULT_EMBARGO_DAYS = 5
 
+    # Parameter grid search (worker processes; unset = all CPUs)
+    GRID_SEARCH_WORKERS = int(os.getenv('GRID_SEARCH_WORKERS', 0)) or None
+
     # Cache settings
     ENABLE_CACHE = True
     CACHE_TTL = 3600  # seconds
@@ -7,6 +7,7 @@ import sys
 sys.path.insert(0, '..')
 
 import walk_forward_variants
+from shared.grid_search import GridSearch, vectorized
 
 
 @pytest.fixture
@@ -36,6 +37,23 @@ def simple_strategy(data, params):
     return signals
 
 
+@vectorized('fast')
+def vectorized_strategy(data, params):
+    """Moving average crossover evaluating every 'fast' value in one call."""
+    if not isinstance(params['fast'], list):
+        return simple_strategy(data, params)
+
+    prices = data['Adj Close']
+    slow_ma = prices.rolling(params['slow']).mean().values[:, None]
+    fast_ma = np.column_stack([prices.rolling(f).mean().values for f in params['fast']])
+
+    signals = np.zeros(fast_ma.shape)
+    signals[fast_ma > slow_ma] = 1
+    signals[fast_ma <= slow_ma] = -1
+
+    return signals
+
+
 def test_anchored_walk_forward(sample_data):
     """Test anchored walk-forward optimization."""
     param_grid = {'fast': [10, 20], 'slow': [50, 100]}
@@ -88,5 +106,57 @@ def test_compare_walk_forward_methods(sample_data):
     assert 'method' in comparison_df.columns
 
 
+def test_grid_search_reuses_window_scores(sample_data):
+    """Test that a shared grid search scores each window once."""
+    param_grid = {'fast': [10, 20], 'slow': [50, 100]}
+
+    with GridSearch(sample_data, simple_strategy, param_grid, n_jobs=1) as search:
+        anchored = walk_forward_variants.anchored_walk_forward(
+            sample_data, simple_strategy, param_grid,
+            train_size=252, test_size=63, step=63, search=search
+        )
+        expanding = walk_forward_variants.expanding_walk_forward(
+            sample_data, simple_strategy, param_grid,
+            initial_train=252, test_size=63, step=63, search=search
+        )
+
+    assert search.stats['cache_hits'] == len(expanding['results'])
+    assert search.stats['windows_evaluated'] == len(anchored['results'])
+
+
+def test_vectorized_strategy_matches_scalar(sample_data):
+    """Test that a vectorized strategy selects the same parameters."""
+    param_grid = {'fast': [5, 10, 20], 'slow': [50, 100]}
+
+    scalar = walk_forward_variants.rolling_walk_forward(
+        sample_data, simple_strategy, param_grid, train_size=252, test_size=63, step=63
+    )
+    vector = walk_forward_variants.rolling_walk_forward(
+        sample_data, vectorized_strategy, param_grid, train_size=252, test_size=63, step=63
+    )
+
+    assert [r['optimal_params'] for r in scalar['results']] == \
+        [r['optimal_params'] for r in vector['results']]
+    assert np.allclose([r['train_score'] for r in scalar['results']],
+                       [r['train_score'] for r in vector['results']])
+
+
+def test_grid_search_counts_strategy_failures(sample_data):
+    """Test that failing parameter combinations are counted and skipped."""
+    def failing_strategy(data, params):
+        if params['fast'] == 20:
+            raise ValueError("unsupported window")
+        return simple_strategy(data, params)
+
+    param_grid = {'fast': [10, 20], 'slow': [50, 100]}
+
+    with GridSearch(sample_data, failing_strategy, param_grid, n_jobs=1) as search:
+        scores = search.scores(slice(0, 252))
+
+    assert search.stats['failures'] == 2
+    assert np.isnan(scores[2:]).all()
+    assert not np.isnan(scores[:2]).any()
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
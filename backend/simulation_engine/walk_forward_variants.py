@@ -2,13 +2,24 @@
 
 import numpy as np
 import pandas as pd
-from typing import Callable, Dict, List, Tuple
+from typing import Callable, Dict, List, Optional
 import logging
+from contextlib import contextmanager
+import sys
+import os
+
+# Add parent directory to path to import shared module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from shared.grid_search import GridSearch, sharpe_scorer
 from config import Config
-from utils import calculate_sharpe_ratio, calculate_sortino_ratio, calculate_calmar_ratio, calculate_metrics
+from utils import calculate_sortino_ratio, calculate_calmar_ratio, calculate_metrics
 
 logger = logging.getLogger(__name__)
 
+# Training windows are ranked by Sharpe ratio (as `calculate_sharpe_ratio`)
+_TRAIN_SCORER = sharpe_scorer(risk_free_rate=0.02, flat_score=0.0)
+
 
 def anchored_walk_forward(
     data: pd.DataFrame,
@@ -16,7 +27,8 @@ def anchored_walk_forward(
     param_grid: Dict,
     train_size: int = None,
     test_size: int = None,
-    step: int = None
+    step: int = None,
+    search: Optional[GridSearch] = None
 ) -> Dict:
     """
     Anchored walk-forward optimization.
@@ -31,6 +43,7 @@ def anchored_walk_forward(
         train_size: Initial training window size
         test_size: Test window size
         step: Step size for sliding test window
+        search: Shared GridSearch over `data` (reuses scores of windows seen before)
 
     Returns:
         Dictionary with results and summary statistics
@@ -48,38 +61,39 @@ def anchored_walk_forward(
 
     logger.info(f"Starting anchored walk-forward (train={train_size}, test={test_size}, step={step})")
 
-    while current_position + test_size <= total_length:
-        # Training data: from start to current position (growing window)
-        train_data = data.iloc[:current_position].copy()
+    with _grid_search(search, data, strategy_func, param_grid) as search:
+        while current_position + test_size <= total_length:
+            # Training data: from start to current position (growing window)
+            train_rows = slice(0, current_position)
 
-        # Test data: next test_size periods
-        test_data = data.iloc[current_position:current_position + test_size].copy()
+            # Test data: next test_size periods
+            test_data = data.iloc[current_position:current_position + test_size].copy()
 
-        # Optimize on training data
-        best_params, best_score = _optimize_params(train_data, strategy_func, param_grid)
+            # Optimize on training data
+            best_params, best_score = search.best(train_rows)
 
-        # Test on out-of-sample data
-        test_signals = strategy_func(test_data, best_params)
-        test_returns = test_data['returns'] * test_signals.shift(1)
-        test_returns = test_returns.dropna()
+            # Test on out-of-sample data
+            test_signals = strategy_func(test_data, best_params)
+            test_returns = test_data['returns'] * test_signals.shift(1)
+            test_returns = test_returns.dropna()
 
-        # Calculate metrics
-        test_metrics = calculate_metrics(test_returns)
+            # Calculate metrics
+            test_metrics = calculate_metrics(test_returns)
 
-        results.append({
-            'train_start': data.index[0],
-            'train_end': data.index[current_position - 1],
-            'test_start': data.index[current_position],
-            'test_end': data.index[min(current_position + test_size - 1, total_length - 1)],
-            'train_size': current_position,
-            'test_size': test_size,
-            'optimal_params': best_params,
-            'train_score': best_score,
-            **test_metrics
-        })
+            results.append({
+                'train_start': data.index[0],
+                'train_end': data.index[current_position - 1],
+                'test_start': data.index[current_position],
+                'test_end': data.index[min(current_position + test_size - 1, total_length - 1)],
+                'train_size': current_position,
+                'test_size': test_size,
+                'optimal_params': best_params,
+                'train_score': best_score,
+                **test_metrics
+            })
 
-        # Slide forward
-        current_position += step
+            # Slide forward
+            current_position += step
 
     # Aggregate results
     summary = _aggregate_results(results)
@@ -100,7 +114,8 @@ def rolling_walk_forward(
     param_grid: Dict,
     train_size: int = None,
     test_size: int = None,
-    step: int = None
+    step: int = None,
+    search: Optional[GridSearch] = None
 ) -> Dict:
     """
     Rolling walk-forward optimization.
@@ -114,6 +129,7 @@ def rolling_walk_forward(
         train_size: Training window size (fixed)
         test_size: Test window size
         step: Step size for sliding windows
+        search: Shared GridSearch over `data` (reuses scores of windows seen before)
 
     Returns:
         Dictionary with results and summary statistics
@@ -131,39 +147,40 @@ def rolling_walk_forward(
 
     logger.info(f"Starting rolling walk-forward (train={train_size}, test={test_size}, step={step})")
 
-    while current_position + train_size + test_size <= total_length:
-        # Training data: fixed window
-        train_data = data.iloc[current_position:current_position + train_size].copy()
+    with _grid_search(search, data, strategy_func, param_grid) as search:
+        while current_position + train_size + test_size <= total_length:
+            # Training data: fixed window
+            train_rows = slice(current_position, current_position + train_size)
 
-        # Test data: next test_size periods
-        test_start = current_position + train_size
-        test_data = data.iloc[test_start:test_start + test_size].copy()
+            # Test data: next test_size periods
+            test_start = current_position + train_size
+            test_data = data.iloc[test_start:test_start + test_size].copy()
 
-        # Optimize on training data
-        best_params, best_score = _optimize_params(train_data, strategy_func, param_grid)
+            # Optimize on training data
+            best_params, best_score = search.best(train_rows)
 
-        # Test on out-of-sample data
-        test_signals = strategy_func(test_data, best_params)
-        test_returns = test_data['returns'] * test_signals.shift(1)
-        test_returns = test_returns.dropna()
+            # Test on out-of-sample data
+            test_signals = strategy_func(test_data, best_params)
+            test_returns = test_data['returns'] * test_signals.shift(1)
+            test_returns = test_returns.dropna()
 
-        # Calculate metrics
-        test_metrics = calculate_metrics(test_returns)
+            # Calculate metrics
+            test_metrics = calculate_metrics(test_returns)
 
-        results.append({
-            'train_start': data.index[current_position],
-            'train_end': data.index[current_position + train_size - 1],
-            'test_start': data.index[test_start],
-            'test_end': data.index[min(test_start + test_size - 1, total_length - 1)],
-            'train_size': train_size,
-            'test_size': test_size,
-            'optimal_params': best_params,
-            'train_score': best_score,
-            **test_metrics
-        })
+            results.append({
+                'train_start': data.index[current_position],
+                'train_end': data.index[current_position + train_size - 1],
+                'test_start': data.index[test_start],
+                'test_end': data.index[min(test_start + test_size - 1, total_length - 1)],
+                'train_size': train_size,
+                'test_size': test_size,
+                'optimal_params': best_params,
+                'train_score': best_score,
+                **test_metrics
+            })
 
-        # Slide forward
-        current_position += step
+            # Slide forward
+            current_position += step
 
     # Aggregate results
     summary = _aggregate_results(results)
@@ -184,7 +201,8 @@ def expanding_walk_forward(
     param_grid: Dict,
     initial_train: int = None,
     test_size: int = None,
-    step: int = None
+    step: int = None,
+    search: Optional[GridSearch] = None
 ) -> Dict:
     """
     Expanding walk-forward optimization.
@@ -198,6 +216,7 @@ def expanding_walk_forward(
         initial_train: Initial training window size
         test_size: Test window size (expands)
         step: Step size for expansion
+        search: Shared GridSearch over `data` (reuses scores of windows seen before)
 
     Returns:
         Dictionary with results and summary statistics
@@ -215,40 +234,41 @@ def expanding_walk_forward(
 
     logger.info(f"Starting expanding walk-forward (initial_train={initial_train}, test={test_size}, step={step})")
 
-    while current_train_end + test_size <= total_length:
-        # Training data: from start to current_train_end (expanding)
-        train_data = data.iloc[:current_train_end].copy()
+    with _grid_search(search, data, strategy_func, param_grid) as search:
+        while current_train_end + test_size <= total_length:
+            # Training data: from start to current_train_end (expanding)
+            train_rows = slice(0, current_train_end)
 
-        # Test data: expanding window after training
-        test_end = min(current_train_end + test_size, total_length)
-        test_data = data.iloc[current_train_end:test_end].copy()
+            # Test data: expanding window after training
+            test_end = min(current_train_end + test_size, total_length)
+            test_data = data.iloc[current_train_end:test_end].copy()
 
-        # Optimize on training data
-        best_params, best_score = _optimize_params(train_data, strategy_func, param_grid)
+            # Optimize on training data
+            best_params, best_score = search.best(train_rows)
 
-        # Test on out-of-sample data
-        test_signals = strategy_func(test_data, best_params)
-        test_returns = test_data['returns'] * test_signals.shift(1)
-        test_returns = test_returns.dropna()
+            # Test on out-of-sample data
+            test_signals = strategy_func(test_data, best_params)
+            test_returns = test_data['returns'] * test_signals.shift(1)
+            test_returns = test_returns.dropna()
 
-        # Calculate metrics
-        test_metrics = calculate_metrics(test_returns)
+            # Calculate metrics
+            test_metrics = calculate_metrics(test_returns)
 
-        results.append({
-            'train_start': data.index[0],
-            'train_end': data.index[current_train_end - 1],
-            'test_start': data.index[current_train_end],
-            'test_end': data.index[test_end - 1],
-            'train_size': current_train_end,
-            'test_size': len(test_data),
-            'optimal_params': best_params,
-            'train_score': best_score,
-            **test_metrics
-        })
+            results.append({
+                'train_start': data.index[0],
+                'train_end': data.index[current_train_end - 1],
+                'test_start': data.index[current_train_end],
+                'test_end': data.index[test_end - 1],
+                'train_size': current_train_end,
+                'test_size': len(test_data),
+                'optimal_params': best_params,
+                'train_score': best_score,
+                **test_metrics
+            })
 
-        # Expand windows
-        current_train_end += step
-        test_size += step
+            # Expand windows
+            current_train_end += step
+            test_size += step
 
     # Aggregate results
     summary = _aggregate_results(results)
@@ -357,7 +377,8 @@ def walk_forward_with_reoptimization(
     param_grid: Dict,
     train_size: int = None,
     test_size: int = None,
-    reopt_frequency: int = 20
+    reopt_frequency: int = 20,
+    search: Optional[GridSearch] = None
 ) -> Dict:
     """
     Walk-forward with parameter drift tracking.
@@ -371,6 +392,7 @@ def walk_forward_with_reoptimization(
         train_size: Training window size
         test_size: Test window size
         reopt_frequency: Re-optimize every N periods
+        search: Shared GridSearch over `data` (reuses scores of windows seen before)
 
     Returns:
         Dictionary with parameter drift analysis
@@ -387,35 +409,36 @@ def walk_forward_with_reoptimization(
 
     logger.info(f"Starting walk-forward with reoptimization (freq={reopt_frequency})")
 
-    while current_position + train_size + test_size <= total_length:
-        # Training data
-        train_data = data.iloc[current_position:current_position + train_size].copy()
+    with _grid_search(search, data, strategy_func, param_grid) as search:
+        while current_position + train_size + test_size <= total_length:
+            # Training data
+            train_rows = slice(current_position, current_position + train_size)
 
-        # Optimize parameters
-        best_params, best_score = _optimize_params(train_data, strategy_func, param_grid)
-        param_history.append(best_params.copy())
+            # Optimize parameters
+            best_params, best_score = search.best(train_rows)
+            param_history.append(best_params.copy())
 
-        # Test for next reopt_frequency periods
-        for i in range(reopt_frequency):
-            test_start = current_position + train_size + i
-            test_end = test_start + 1
+            # Test for next reopt_frequency periods
+            for i in range(reopt_frequency):
+                test_start = current_position + train_size + i
+                test_end = test_start + 1
 
-            if test_end > total_length:
-                break
+                if test_end > total_length:
+                    break
 
-            test_data = data.iloc[test_start:test_end].copy()
+                test_data = data.iloc[test_start:test_end].copy()
 
-            # Use current best params
-            test_signals = strategy_func(test_data, best_params)
-            test_return = test_data['returns'].iloc[0] if len(test_data) > 0 else 0
+                # Use current best params
+                test_signals = strategy_func(test_data, best_params)
+                test_return = test_data['returns'].iloc[0] if len(test_data) > 0 else 0
 
-            results.append({
-                'date': data.index[test_start],
-                'return': test_return,
-                'params': best_params.copy()
-            })
+                results.append({
+                    'date': data.index[test_start],
+                    'return': test_return,
+                    'params': best_params.copy()
+                })
 
-        current_position += reopt_frequency
+            current_position += reopt_frequency
 
     # Analyze parameter drift
     param_stability = _analyze_parameter_drift(param_history)
@@ -454,65 +477,45 @@ def compare_walk_forward_methods(
 
     comparison_results = []
 
-    for method in methods:
-        try:
-            if method == 'anchored':
-                result = anchored_walk_forward(data, strategy_func, param_grid)
-            elif method == 'rolling':
-                result = rolling_walk_forward(data, strategy_func, param_grid)
-            elif method == 'expanding':
-                result = expanding_walk_forward(data, strategy_func, param_grid)
-            else:
-                logger.warning(f"Unknown method: {method}")
-                continue
-
-            summary = result['summary']
-            comparison_results.append({
-                'method': method,
-                **summary
-            })
-
-        except Exception as e:
-            logger.error(f"Error in {method} walk-forward: {str(e)}")
+    # One search for all methods: anchored and expanding share every training window
+    with _grid_search(None, data, strategy_func, param_grid) as search:
+        for method in methods:
+            try:
+                if method == 'anchored':
+                    result = anchored_walk_forward(data, strategy_func, param_grid, search=search)
+                elif method == 'rolling':
+                    result = rolling_walk_forward(data, strategy_func, param_grid, search=search)
+                elif method == 'expanding':
+                    result = expanding_walk_forward(data, strategy_func, param_grid, search=search)
+                else:
+                    logger.warning(f"Unknown method: {method}")
+                    continue
+
+                summary = result['summary']
+                comparison_results.append({
+                    'method': method,
+                    **summary
+                })
+
+            except Exception as e:
+                logger.error(f"Error in {method} walk-forward: {str(e)}")
 
     return pd.DataFrame(comparison_results)
 
 
 # Helper functions
 
-def _optimize_params(data: pd.DataFrame, strategy_func: Callable, param_grid: Dict) -> Tuple:
-    """Optimize parameters on training data."""
-    param_combinations = _generate_param_combinations(param_grid)
-
-    best_params = None
-    best_score = -np.inf
-
-    for params in param_combinations:
-        try:
-            signals = strategy_func(data, params)
-            returns = data['returns'] * signals.shift(1)
-            returns = returns.dropna()
-
-            if len(returns) == 0:
-                continue
-
-            # Optimize for Sharpe ratio
-            score = calculate_sharpe_ratio(returns)
-
-            if score > best_score:
-                best_score = score
-                best_params = params.copy()
-
-        except Exception as e:
-            logger.debug(f"Error evaluating params {params}: {str(e)}")
-            continue
-
-    if best_params is None:
-        # Fallback: use first parameter combination
-        best_params = param_combinations[0]
-        best_score = 0
-
-    return best_params, best_score
+@contextmanager
+def _grid_search(search: Optional[GridSearch], data: pd.DataFrame, strategy_func: Callable,
+                 param_grid: Dict):
+    """Use the caller's GridSearch, or one scoped to a single walk-forward run."""
+    if search is not None:
+        yield search
+        return
+
+    with GridSearch(data, strategy_func, param_grid, scorer=_TRAIN_SCORER,
+                    n_jobs=Config.GRID_SEARCH_WORKERS) as search:
+        yield search
 
 
 def _generate_param_combinations(param_grid: Dict) -> List[Dict]:
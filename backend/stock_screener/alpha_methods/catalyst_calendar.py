@@ -5,11 +5,9 @@ from typing import Dict, List
 import numpy as np
 from datetime import datetime
 import logging
-from event_calendar import EventCalendar
+from .event_calendar import EventCalendar
 import yfinance as yf
-import sys
-sys.path.append('.')
-from liquidity_vacuum import LiquidityVacuumDetector
+from .liquidity_vacuum import LiquidityVacuumDetector
 
 logger = logging.getLogger(__name__)
 
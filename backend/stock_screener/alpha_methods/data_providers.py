@@ -9,9 +9,10 @@ from datetime import datetime, timedelta
 import logging
 import requests
 from functools import lru_cache
-import time
 import os
 
+from .price_history import get_price_provider
+
 logger = logging.getLogger(__name__)
 
 
@@ -43,20 +44,17 @@ class DataProvider:
         self.alpha_vantage_key = os.getenv('ALPHA_VANTAGE_API_KEY', None)
         self.iex_cloud_key = os.getenv('IEX_CLOUD_API_KEY', None)
 
-        # Rate limiting
-        self._last_request_time = {}
-        self._min_request_interval = 0.2  # 200ms between requests
+        # Rate limiting (shared with the price history provider, never sleeps)
+        self._rate_limiter = get_price_provider().bucket
 
         logger.info(f"DataProvider initialized (mock_mode={mock_mode})")
 
-    def _rate_limit(self, source: str):
-        """Apply rate limiting for API calls."""
-        if source in self._last_request_time:
-            elapsed = time.time() - self._last_request_time[source]
-            if elapsed < self._min_request_interval:
-                time.sleep(self._min_request_interval - elapsed)
-
-        self._last_request_time[source] = time.time()
+    def _rate_limit(self, source: str) -> bool:
+        """Take a request token without blocking; False if the source is throttled."""
+        if self._rate_limiter.try_acquire():
+            return True
+        logger.warning(f"Rate limit reached for {source}, skipping request")
+        return False
 
     def get_bid_ask_spread(self, symbol: str) -> Optional[Dict]:
         """
@@ -77,7 +75,8 @@ class DataProvider:
             return self._mock_bid_ask_spread(symbol)
 
         try:
-            self._rate_limit('yfinance')
+            if not self._rate_limit('yfinance'):
+                return None
             ticker = yf.Ticker(symbol)
             info = ticker.info
 
@@ -184,7 +183,8 @@ class DataProvider:
             return self._mock_options_chain(symbol, expiration)
 
         try:
-            self._rate_limit('yfinance')
+            if not self._rate_limit('yfinance'):
+                return None
             ticker = yf.Ticker(symbol)
 
             # Get available expirations
@@ -335,7 +335,8 @@ class DataProvider:
 
         try:
             # Use yfinance for insider transactions
-            self._rate_limit('yfinance')
+            if not self._rate_limit('yfinance'):
+                return None
             ticker = yf.Ticker(symbol)
 
             insider_data = ticker.insider_transactions
@@ -4,10 +4,10 @@
 from typing import Dict, List, Optional
 import numpy as np
 import pandas as pd
-import yfinance as yf
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
-from data_providers import get_provider
+from .data_providers import get_provider
+from .price_history import get_history
 
 logger = logging.getLogger(__name__)
 
@@ -110,11 +110,7 @@ class LiquidityVacuumDetector:
     def _fetch_price_data(self, symbol: str, lookback_days: int) -> Optional[pd.DataFrame]:
         """Fetch price and volume data."""
         try:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=lookback_days + 10)
-
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(start=start_date, end=end_date)
+            hist = get_history(symbol, lookback_days=lookback_days + 10)
 
             if len(hist) < 20:
                 return None
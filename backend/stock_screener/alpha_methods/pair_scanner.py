@@ -0,0 +1,218 @@
+# pair_scanner.py - Panel-based pair scanning engine
+# One aligned price panel, one correlation matrix, pair tests fanned out to a process pool
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.stattools import coint
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Minimum overlapping observations for a pair test (matches StatisticalTests)
+MIN_OBSERVATIONS = 30
+
+# Below this many candidates the pool start-up costs more than it saves
+_MIN_PARALLEL_PAIRS = 64
+
+# Panel shared with pool workers (set once per worker by the initializer)
+_panel_values: Optional[np.ndarray] = None
+
+
+def build_panel(prices: Dict[str, pd.Series], min_history: int = 100) -> pd.DataFrame:
+    """
+    Align per-symbol closing prices into one date × symbol panel.
+
+    Args:
+        prices: {symbol: closing price series}
+        min_history: Minimum non-missing observations to keep a symbol
+
+    Returns:
+        DataFrame indexed by date, one column per symbol (NaN where missing)
+    """
+    series = {
+        symbol: s.astype(float)
+        for symbol, s in prices.items()
+        if s is not None and s.notna().sum() >= min_history
+    }
+    if not series:
+        return pd.DataFrame()
+
+    panel = pd.DataFrame(series)
+    # Providers stamp dates with differing timezones/times; align on the day
+    if isinstance(panel.index, pd.DatetimeIndex):
+        if panel.index.tz is not None:
+            panel.index = panel.index.tz_localize(None)
+        panel = panel.groupby(panel.index.normalize()).last()
+    return panel.sort_index()
+
+
+def candidate_pairs(corr: np.ndarray, min_correlation: float) -> np.ndarray:
+    """
+    Upper-triangle (i, j) index pairs whose correlation passes the filter.
+
+    Returns:
+        Array (K × 2) of column indices, i < j
+    """
+    i, j = np.triu_indices(corr.shape[0], k=1)
+    keep = corr[i, j] >= min_correlation  # NaN (too little overlap) never passes
+    return np.column_stack([i[keep], j[keep]])
+
+
+def pair_statistics(y: np.ndarray, x: np.ndarray) -> Optional[Dict]:
+    """
+    Engle-Granger test, hedge ratio, half-life and spread z-score for one pair.
+
+    Args:
+        y: Prices of the first symbol (NaN where missing)
+        x: Prices of the second symbol, same dates
+
+    Returns:
+        Dict of floats, or None if the pair has too little overlap
+    """
+    mask = ~(np.isnan(y) | np.isnan(x))
+    y, x = y[mask], x[mask]
+    if len(y) < MIN_OBSERVATIONS:
+        return None
+
+    score, p_value, crit_values = coint(y, x)
+
+    # Hedge ratio: OLS of y on x without intercept
+    xx = x @ x
+    hedge_ratio = (x @ y) / xx if xx > 0 else 0.0
+
+    spread = y - hedge_ratio * x
+
+    # Half-life from AR(1) on the spread: diff = lambda * lag
+    lag = spread[:-1]
+    diff = spread[1:] - lag
+    ll = lag @ lag
+    lambda_param = (lag @ diff) / ll if ll > 0 else 0.0
+    if lambda_param >= 0 or lambda_param <= -1:
+        half_life = None
+    else:
+        half_life = float(-np.log(2) / np.log1p(lambda_param))
+
+    spread_mean = spread.mean()
+    spread_std = spread.std(ddof=1)
+    current_zscore = (spread[-1] - spread_mean) / spread_std if spread_std > 0 else 0.0
+
+    return {
+        'p_value': float(p_value),
+        'test_statistic': float(score),
+        'critical_values': {
+            '1%': float(crit_values[0]),
+            '5%': float(crit_values[1]),
+            '10%': float(crit_values[2])
+        },
+        'hedge_ratio': float(hedge_ratio),
+        'lambda': float(lambda_param),
+        'half_life_days': half_life,
+        'current_zscore': float(current_zscore),
+        'spread_mean': float(spread_mean),
+        'spread_std': float(spread_std),
+        'current_spread': float(spread[-1]),
+        'observations': int(len(y))
+    }
+
+
+def _init_worker(values: np.ndarray):
+    global _panel_values
+    _panel_values = values
+
+
+def _test_pair_chunk(pairs: np.ndarray) -> List[Tuple[int, int, Optional[Dict]]]:
+    """Pool task: test a chunk of pairs against the worker's shared panel"""
+    return _test_pairs(_panel_values, pairs)
+
+
+def _test_pairs(values: np.ndarray, pairs: np.ndarray) -> List[Tuple[int, int, Optional[Dict]]]:
+    """Run `pair_statistics` for each (i, j) column pair of the panel values"""
+    results = []
+    for i, j in pairs:
+        try:
+            result = pair_statistics(values[:, i], values[:, j])
+        except Exception as e:
+            logger.debug(f"Pair test failed for columns {i}/{j}: {e}")
+            result = None
+        results.append((int(i), int(j), result))
+    return results
+
+
+class PairScanner:
+    """
+    Scan a price panel for cointegrated pairs.
+
+    Correlations for the whole universe come from one matrix computation;
+    only pairs passing the correlation filter are tested, in chunks spread
+    across worker processes that each receive the panel once.
+    """
+
+    def __init__(self, n_jobs: Optional[int] = None, chunk_size: Optional[int] = None,
+                 significance: float = 0.05):
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.significance = significance
+
+    def correlation_matrix(self, panel: pd.DataFrame) -> np.ndarray:
+        """Pairwise price correlations (NaN where overlap < MIN_OBSERVATIONS)"""
+        if not panel.isna().values.any():
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return np.corrcoef(panel.values, rowvar=False)
+        return panel.corr(min_periods=MIN_OBSERVATIONS).values
+
+    def scan(self, panel: pd.DataFrame, min_correlation: float = 0.7) -> List[Dict]:
+        """
+        Test every sufficiently correlated pair in the panel.
+
+        Args:
+            panel: Date × symbol price panel (see `build_panel`)
+            min_correlation: Minimum price correlation to run the tests
+
+        Returns:
+            One dict per cointegrated pair (unsorted), with the fields of
+            `pair_statistics` plus symbols and correlation
+        """
+        symbols = list(panel.columns)
+        if len(symbols) < 2:
+            return []
+
+        corr = self.correlation_matrix(panel)
+        pairs = candidate_pairs(corr, min_correlation)
+        n_total = len(symbols) * (len(symbols) - 1) // 2
+        logger.info(f"{len(pairs)} of {n_total} pairs pass correlation >= {min_correlation}")
+        if len(pairs) == 0:
+            return []
+
+        values = np.ascontiguousarray(panel.values, dtype=float)
+        results = self._run(values, pairs)
+
+        found = []
+        for i, j, result in results:
+            if result is None or not result['p_value'] < self.significance:
+                continue
+            result.update({
+                'symbol1': symbols[i],
+                'symbol2': symbols[j],
+                'correlation': float(corr[i, j])
+            })
+            found.append(result)
+        return found
+
+    def _run(self, values: np.ndarray, pairs: np.ndarray) -> List[Tuple[int, int, Optional[Dict]]]:
+        n_jobs = min(self.n_jobs, max(1, len(pairs) // _MIN_PARALLEL_PAIRS))
+        if n_jobs == 1:
+            return _test_pairs(values, pairs)
+
+        # A few chunks per worker keeps the pool balanced
+        chunk_size = self.chunk_size or max(1, -(-len(pairs) // (4 * n_jobs)))
+        chunks = [pairs[k:k + chunk_size] for k in range(0, len(pairs), chunk_size)]
+
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(values,)) as executor:
+            results = []
+            for chunk_results in executor.map(_test_pair_chunk, chunks):
+                results.extend(chunk_results)
+        return results
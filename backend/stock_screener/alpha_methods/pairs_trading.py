@@ -4,12 +4,13 @@
 from typing import Dict, List, Tuple, Optional
 import numpy as np
 import pandas as pd
-import yfinance as yf
-from datetime import datetime, timedelta
+from datetime import datetime
 from statsmodels.regression.linear_model import OLS
 import logging
 
 from .statistical_tests import StatisticalTests
+from .pair_scanner import PairScanner, build_panel
+from .price_history import get_history
 
 logger = logging.getLogger(__name__)
 
@@ -25,9 +26,10 @@ class PairsTrading:
     4. Risk metrics (correlation, beta stability)
     """
 
-    def __init__(self, mock_mode: bool = False):
+    def __init__(self, mock_mode: bool = False, n_jobs: Optional[int] = None):
         self.mock_mode = mock_mode
         self.stat_tests = StatisticalTests(mock_mode=mock_mode)
+        self.scanner = PairScanner(n_jobs=n_jobs)
 
     def scan_pairs(self, symbols: List[str], min_correlation: float = 0.7, max_pairs: int = 20) -> List[Dict]:
         """
@@ -47,60 +49,36 @@ class PairsTrading:
 
             logger.info(f"Scanning {len(symbols)} symbols for pairs")
 
-            pairs = []
-
-            # Fetch all prices upfront
+            # Fetch all prices once into an aligned panel
             prices_cache = {}
             for symbol in symbols:
                 prices = self._fetch_prices(symbol, 252)
                 if prices is not None and len(prices) >= 100:
                     prices_cache[symbol] = prices
 
-            valid_symbols = list(prices_cache.keys())
-            logger.info(f"Found valid price data for {len(valid_symbols)} symbols")
-
-            # Test all pairs
-            for i in range(len(valid_symbols)):
-                for j in range(i + 1, len(valid_symbols)):
-                    symbol1 = valid_symbols[i]
-                    symbol2 = valid_symbols[j]
-
-                    # Quick correlation filter
-                    corr = self._calculate_correlation(prices_cache[symbol1], prices_cache[symbol2])
-                    if corr < min_correlation:
-                        continue
-
-                    # Test cointegration
-                    coint_result = self.stat_tests.test_cointegration(symbol1, symbol2)
-
-                    if coint_result['is_cointegrated']:
-                        # Calculate current spread and z-score
-                        spread_data = self._calculate_spread(
-                            symbol1, symbol2, coint_result['hedge_ratio']
-                        )
-
-                        # Calculate half-life
-                        half_life_result = self.stat_tests.calculate_half_life(
-                            symbol1, symbol2, coint_result['hedge_ratio']
-                        )
-
-                        pair_info = {
-                            'symbol1': symbol1,
-                            'symbol2': symbol2,
-                            'correlation': corr,
-                            'hedge_ratio': coint_result['hedge_ratio'],
-                            'cointegration_pvalue': coint_result['p_value'],
-                            'cointegration_confidence': coint_result['confidence'],
-                            'current_zscore': spread_data['current_zscore'],
-                            'spread_mean': spread_data['spread_mean'],
-                            'spread_std': spread_data['spread_std'],
-                            'half_life_days': half_life_result.get('half_life_days'),
-                            'is_tradeable': half_life_result.get('is_tradeable', False),
-                            'signal': self._determine_signal(spread_data['current_zscore']),
-                            'analysis_date': datetime.now().isoformat()
-                        }
-
-                        pairs.append(pair_info)
+            panel = build_panel(prices_cache)
+            logger.info(f"Found valid price data for {panel.shape[1]} symbols")
+
+            # Correlation filter, Engle-Granger, hedge ratio and half-life all
+            # run on the panel arrays (no per-pair downloads)
+            pairs = []
+            for result in self.scanner.scan(panel, min_correlation):
+                half_life = result['half_life_days']
+                pairs.append({
+                    'symbol1': result['symbol1'],
+                    'symbol2': result['symbol2'],
+                    'correlation': result['correlation'],
+                    'hedge_ratio': result['hedge_ratio'],
+                    'cointegration_pvalue': result['p_value'],
+                    'cointegration_confidence': self._confidence_level(result['p_value']),
+                    'current_zscore': result['current_zscore'],
+                    'spread_mean': result['spread_mean'],
+                    'spread_std': result['spread_std'],
+                    'half_life_days': half_life,
+                    'is_tradeable': half_life is not None and 1 <= half_life <= 30,
+                    'signal': self._determine_signal(result['current_zscore']),
+                    'analysis_date': datetime.now().isoformat()
+                })
 
             # Sort by cointegration strength (lowest p-value first)
             pairs.sort(key=lambda x: x['cointegration_pvalue'])
@@ -240,10 +218,7 @@ class PairsTrading:
     def _fetch_prices(self, symbol: str, lookback_days: int) -> Optional[pd.Series]:
         """Fetch historical closing prices."""
         try:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=lookback_days + 20)
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(start=start_date, end=end_date)
+            hist = get_history(symbol, lookback_days=lookback_days + 20)
             return hist['Close'] if len(hist) >= 20 else None
         except:
             return None
@@ -258,44 +233,6 @@ class PairsTrading:
         except:
             return 0.0
 
-    def _calculate_spread(self, symbol1: str, symbol2: str, hedge_ratio: float) -> Dict:
-        """Calculate current spread and z-score."""
-        try:
-            prices1 = self._fetch_prices(symbol1, 252)
-            prices2 = self._fetch_prices(symbol2, 252)
-
-            if prices1 is None or prices2 is None:
-                return {
-                    'current_zscore': 0.0,
-                    'spread_mean': 0.0,
-                    'spread_std': 1.0
-                }
-
-            # Calculate spread
-            df = pd.concat([prices1, prices2], axis=1).dropna()
-            spread = df.iloc[:, 0] - hedge_ratio * df.iloc[:, 1]
-
-            # Calculate z-score
-            spread_mean = spread.mean()
-            spread_std = spread.std()
-            current_spread = spread.iloc[-1]
-            current_zscore = (current_spread - spread_mean) / spread_std if spread_std > 0 else 0.0
-
-            return {
-                'current_zscore': float(current_zscore),
-                'spread_mean': float(spread_mean),
-                'spread_std': float(spread_std),
-                'current_spread': float(current_spread)
-            }
-
-        except Exception as e:
-            logger.error(f"Error calculating spread: {e}")
-            return {
-                'current_zscore': 0.0,
-                'spread_mean': 0.0,
-                'spread_std': 1.0
-            }
-
     def _calculate_spread_history(self, symbol1: str, symbol2: str, hedge_ratio: float, lookback_days: int) -> Dict:
         """Calculate spread history with z-scores."""
         try:
@@ -345,6 +282,16 @@ class PairsTrading:
                 'history': []
             }
 
+    def _confidence_level(self, p_value: float) -> str:
+        """Significance bucket of a cointegration p-value."""
+        if p_value < 0.01:
+            return '1%'
+        elif p_value < 0.05:
+            return '5%'
+        elif p_value < 0.10:
+            return '10%'
+        return 'not_significant'
+
     def _determine_signal(self, zscore: float) -> str:
         """
         Determine trading signal based on z-score.
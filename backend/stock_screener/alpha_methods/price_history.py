@@ -0,0 +1,398 @@
+# price_history.py - Shared price history provider
+# Process-wide OHLCV cache: in-memory LRU + on-disk columnar store, incremental
+# refresh, per-key request coalescing and a token bucket (blocking only on a
+# cold cache)
+
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Calendar days per yfinance period unit
+_PERIOD_DAYS = {'d': 1, 'wk': 7, 'mo': 31, 'y': 366}
+
+_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class RateLimitExceeded(Exception):
+    """No download token available (in time)."""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    `try_acquire` never sleeps, so refreshes of cached data fall back to the
+    cache instead of parking a Flask request thread. `acquire` waits, for
+    downloads whose data is not cached at all.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Wait for tokens; False if they are not available within timeout seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+
+class _Entry:
+    """Cached history for one (symbol, interval)."""
+
+    __slots__ = ('frame', 'covered_start', 'refreshed_at')
+
+    def __init__(self, frame: pd.DataFrame, covered_start: pd.Timestamp, refreshed_at: float):
+        self.frame = frame
+        self.covered_start = covered_start  # Earliest date requested from the source
+        self.refreshed_at = refreshed_at    # Wall time of the last download of the tail
+
+
+class PriceHistoryProvider:
+    """
+    Shared OHLCV history for the whole screener process.
+
+    - Memory: LRU of (symbol, interval) frames
+    - Disk: one columnar .npz file per (symbol, interval), survives restarts
+    - Incremental: only the missing head or the stale tail is downloaded and
+      merged into the cached frame
+    - Coalescing: concurrent requests for the same key share one download
+    - Rate limiting: token bucket; when it is empty, stale cached data is
+      served rather than waiting, but a download with nothing cached waits
+      (up to max_wait_seconds, then raises RateLimitExceeded)
+    - Empty downloads are never cached or written to disk
+    """
+
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 max_entries: int = 512,
+                 max_age_seconds: float = 300.0,
+                 rate_per_second: float = 5.0,
+                 burst: float = 20.0,
+                 max_wait_seconds: float = 60.0):
+        """
+        Initialize provider.
+
+        Args:
+            cache_dir: Directory for the on-disk cache (None disables it)
+            max_entries: Frames kept in memory
+            max_age_seconds: Tail older than this is refreshed on access
+            rate_per_second: Sustained download rate
+            burst: Downloads allowed back to back
+            max_wait_seconds: Longest wait for a token when nothing is cached
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_age = max_age_seconds
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.max_wait = max_wait_seconds
+
+        self._entries: 'OrderedDict[Tuple[str, str], _Entry]' = OrderedDict()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+        self.stats = {'hits': 0, 'disk_loads': 0, 'downloads': 0, 'rate_limited': 0, 'errors': 0}
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get_history(self,
+                    symbol: str,
+                    lookback_days: Optional[int] = None,
+                    start: Optional[datetime] = None,
+                    end: Optional[datetime] = None,
+                    period: Optional[str] = None,
+                    interval: str = '1d') -> pd.DataFrame:
+        """
+        OHLCV history shaped like `yf.Ticker(symbol).history(...)`.
+
+        Args:
+            symbol: Ticker symbol
+            lookback_days: Calendar days back from now
+            start: Explicit start date (instead of lookback_days/period)
+            end: Explicit end date (default: now, i.e. include the latest bar)
+            period: yfinance-style period ('60d', '6mo', '1y')
+            interval: Bar interval ('1d', '1h', ...)
+
+        Returns:
+            DataFrame indexed by date (empty if unavailable)
+
+        Raises:
+            RateLimitExceeded: Nothing cached and no download token within
+                max_wait_seconds
+        """
+        if start is None:
+            days = lookback_days if lookback_days is not None else _period_days(period or '1y')
+            start = datetime.now() - timedelta(days=days)
+
+        key = (symbol.upper(), interval)
+        with self._key_lock(key):
+            entry = self._lookup(key)
+            try:
+                entry = self._ensure(key, entry, pd.Timestamp(start), end is None)
+            except RateLimitExceeded:
+                self.stats['rate_limited'] += 1
+                if entry is None:
+                    raise
+                logger.warning(f"Price download rate limit reached for {symbol}, serving cached data")
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Error fetching history for {symbol}: {e}")
+
+        if entry is None:
+            return pd.DataFrame(columns=_COLUMNS)
+        return _slice(entry.frame, start, end)
+
+    def get_close(self, symbol: str, **kwargs) -> Optional[pd.Series]:
+        """Closing prices, or None if no history is available."""
+        hist = self.get_history(symbol, **kwargs)
+        return hist['Close'] if len(hist) > 0 else None
+
+    def clear(self):
+        """Drop the in-memory cache (disk cache is kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    # Cache layers
+
+    def _key_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _lookup(self, key: Tuple[str, str]) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._load(key)
+        if entry is not None:
+            self.stats['disk_loads'] += 1
+            self._store(key, entry, persist=False)
+        return entry
+
+    def _store(self, key: Tuple[str, str], entry: _Entry, persist: bool = True):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if persist:
+            self._save(key, entry)
+
+    def _ensure(self, key: Tuple[str, str], entry: Optional[_Entry],
+                start: pd.Timestamp, need_latest: bool) -> Optional[_Entry]:
+        """Download whatever part of [start, now] the entry is missing."""
+        symbol, interval = key
+        start = start.normalize()
+
+        if entry is None:
+            frame = self._download(symbol, interval, start, None, wait=True)
+            if len(frame) == 0:
+                # Unknown symbol or transient failure: retry on the next request
+                return None
+            entry = _Entry(frame, start, time.time())
+            self._store(key, entry)
+            return entry
+
+        frame = entry.frame
+        covered_start = entry.covered_start
+        refreshed_at = entry.refreshed_at
+        changed = False
+
+        if start < covered_start:
+            # Requested window is not cached: wait for a token
+            head = self._download(symbol, interval, start, covered_start, wait=True)
+            frame = _merge(head, frame)
+            covered_start = start
+            changed = True
+
+        if need_latest and time.time() - refreshed_at > self.max_age:
+            # Re-download from the last cached bar: it may have been partial
+            tail_start = _naive(frame.index[-1]).normalize() if len(frame) else covered_start
+            tail = self._download(symbol, interval, tail_start, None)
+            if len(tail) > 0:
+                # An empty tail is a failed refresh: keep the entry stale
+                frame = _merge(frame, tail)
+                refreshed_at = time.time()
+                changed = True
+
+        if not changed:
+            self.stats['hits'] += 1
+            return entry
+
+        entry = _Entry(frame, covered_start, refreshed_at)
+        self._store(key, entry)
+        return entry
+
+    def _download(self, symbol: str, interval: str, start: pd.Timestamp,
+                  end: Optional[pd.Timestamp], wait: bool = False) -> pd.DataFrame:
+        acquired = self.bucket.acquire(timeout=self.max_wait) if wait else self.bucket.try_acquire()
+        if not acquired:
+            raise RateLimitExceeded(symbol)
+        self.stats['downloads'] += 1
+        end = end if end is not None else pd.Timestamp(datetime.now() + timedelta(days=1))
+        hist = yf.Ticker(symbol).history(start=start.to_pydatetime(), end=end.to_pydatetime(),
+                                         interval=interval)
+        return hist if hist is not None else pd.DataFrame(columns=_COLUMNS)
+
+    # Disk layer (columnar: one array per column plus the index)
+
+    def _path(self, key: Tuple[str, str]) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        symbol, interval = key
+        safe = re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+        return os.path.join(self.cache_dir, f"{safe}_{interval}.npz")
+
+    def _load(self, key: Tuple[str, str]) -> Optional[_Entry]:
+        path = self._path(key)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                columns = [str(c) for c in data['columns']]
+                index = pd.DatetimeIndex(data['index'].astype('datetime64[ns]'))
+                tz = str(data['tz'])
+                if tz:
+                    index = index.tz_localize('UTC').tz_convert(tz)
+                frame = pd.DataFrame(
+                    {c: data[f'col_{i}'] for i, c in enumerate(columns)}, index=index
+                )
+                frame.index.name = 'Date'
+                if len(frame) == 0:
+                    return None
+                return _Entry(frame, pd.Timestamp(int(data['covered_start'])),
+                              float(data['refreshed_at']))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable price cache {path}: {e}")
+            return None
+
+    def _save(self, key: Tuple[str, str], entry: _Entry):
+        path = self._path(key)
+        if path is None:
+            return
+        frame = entry.frame.select_dtypes(include=[np.number])
+        index = frame.index
+        tz = str(index.tz) if getattr(index, 'tz', None) is not None else ''
+        if tz:
+            index = index.tz_convert('UTC').tz_localize(None)
+
+        arrays = {f'col_{i}': frame[c].to_numpy() for i, c in enumerate(frame.columns)}
+        arrays.update({
+            'columns': np.array([str(c) for c in frame.columns]),
+            'index': index.to_numpy(dtype='datetime64[ns]').astype(np.int64),
+            'tz': np.array(tz),
+            'covered_start': np.array(entry.covered_start.value),
+            'refreshed_at': np.array(entry.refreshed_at)
+        })
+
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write price cache {path}: {e}")
+
+
+def _period_days(period: str) -> int:
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if match is None:
+        return 366 * 10 if period == 'max' else 366
+    return int(match.group(1)) * _PERIOD_DAYS[match.group(2)]
+
+
+def _naive(ts: pd.Timestamp) -> pd.Timestamp:
+    return ts.tz_localize(None) if ts.tzinfo is not None else ts
+
+
+def _merge(older: pd.DataFrame, newer: pd.DataFrame) -> pd.DataFrame:
+    """Concatenate two frames, newer rows winning on overlapping dates."""
+    if len(older) == 0:
+        return newer
+    if len(newer) == 0:
+        return older
+    if older.index.tz is not None and newer.index.tz is not None:
+        newer = newer.tz_convert(older.index.tz)
+    merged = pd.concat([older, newer])
+    return merged[~merged.index.duplicated(keep='last')].sort_index()
+
+
+def _slice(frame: pd.DataFrame, start: datetime, end: Optional[datetime]) -> pd.DataFrame:
+    if len(frame) == 0:
+        return frame
+    tz = frame.index.tz
+    lo = pd.Timestamp(start).normalize()
+    lo = lo.tz_localize(tz) if tz is not None and lo.tzinfo is None else lo
+    mask = frame.index >= lo
+    if end is not None:
+        hi = pd.Timestamp(end)
+        hi = hi.tz_localize(tz) if tz is not None and hi.tzinfo is None else hi
+        mask &= frame.index < hi
+    return frame.loc[mask]
+
+
+# Module-level instance shared by every screener module
+_provider = PriceHistoryProvider(
+    cache_dir=os.getenv('SCREENER_PRICE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'screener_price_cache')),
+    max_entries=int(os.getenv('SCREENER_PRICE_CACHE_ENTRIES', '512')),
+    max_age_seconds=float(os.getenv('SCREENER_PRICE_MAX_AGE', '300')),
+    rate_per_second=float(os.getenv('SCREENER_YF_RATE', '5')),
+    burst=float(os.getenv('SCREENER_YF_BURST', '20')),
+    max_wait_seconds=float(os.getenv('SCREENER_YF_MAX_WAIT', '60'))
+)
+
+
+def get_price_provider() -> PriceHistoryProvider:
+    """Get the shared price history provider."""
+    return _provider
+
+
+def get_history(symbol: str, **kwargs) -> pd.DataFrame:
+    """OHLCV history from the shared provider."""
+    return _provider.get_history(symbol, **kwargs)
+
+
+def get_close(symbol: str, **kwargs) -> Optional[pd.Series]:
+    """Closing prices from the shared provider."""
+    return _provider.get_close(symbol, **kwargs)
@@ -5,7 +5,7 @@ from typing import Dict, List, Optional
 import numpy as np
 from datetime import datetime, timedelta
 import logging
-from data_providers import get_provider
+from .data_providers import get_provider
 
 logger = logging.getLogger(__name__)
 
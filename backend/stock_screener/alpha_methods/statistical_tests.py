@@ -4,13 +4,14 @@
 from typing import Dict, List, Tuple, Optional
 import numpy as np
 import pandas as pd
-import yfinance as yf
-from datetime import datetime, timedelta
+from datetime import datetime
 from scipy import stats
 from statsmodels.tsa.stattools import adfuller, coint
 from statsmodels.regression.linear_model import OLS
 import logging
 
+from .price_history import get_history
+
 logger = logging.getLogger(__name__)
 
 
@@ -358,10 +359,7 @@ class StatisticalTests:
     def _fetch_prices(self, symbol: str, lookback_days: int) -> Optional[pd.Series]:
         """Fetch historical closing prices."""
         try:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=lookback_days + 20)
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(start=start_date, end=end_date)
+            hist = get_history(symbol, lookback_days=lookback_days + 20)
             return hist['Close'] if len(hist) >= 20 else None
         except:
             return None
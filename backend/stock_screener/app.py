@@ -17,6 +17,7 @@ from multi_horizon_predictor import MultiHorizonPredictor
 from heatmap_generator import HeatmapGenerator
 from confidence_scoring import calculate_prediction_confidence
 from regime_detection import detect_market_regime, get_regime_characteristics, RegimeDetector
+from batch_regime import BatchRegimeEngine
 
 # PROMPT 32 EXPANSION: Export and preset management imports
 import io
@@ -48,6 +49,7 @@ preset_mgr = PresetManager()
 
 # PROMPT 1: Initialize advanced regime detector
 regime_detector = RegimeDetector()
+batch_regime_engine = BatchRegimeEngine()
 
 # PROMPT 2: Initialize hierarchical regime manager
 from hierarchy_manager import HierarchyManager, analyze_full_hierarchy, analyze_stock_hierarchy
@@ -950,15 +952,8 @@ def regime_batch():
 
         logger.info(f"Batch regime detect: {len(symbols)} symbols, lookback={lookback_days}")
 
-        # Detect regime for each symbol
-        results = []
-        for symbol in symbols:
-            try:
-                result = regime_detector.detect_regime(symbol, lookback_days)
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Error detecting regime for {symbol}: {e}")
-                # Continue with other symbols
+        # All symbols scored in one vectorized pass
+        results = batch_regime_engine.detect(symbols, lookback_days)
 
         return jsonify({
             'results': results,
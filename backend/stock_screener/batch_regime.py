@@ -0,0 +1,445 @@
+# batch_regime.py - Vectorized multi-symbol regime detection
+# Computes the 15 RegimeDetector indicators for a whole panel of symbols as
+# 2-D array operations and scores all 8 regimes in one pass
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+from datetime import datetime
+import logging
+import threading
+
+from regime_detection import RegimeDetector
+from alpha_methods.price_history import get_history
+
+logger = logging.getLogger(__name__)
+
+# OHLCV fields kept per symbol (column order of the stored arrays)
+_FIELDS = ['High', 'Low', 'Close', 'Volume']
+_HIGH, _LOW, _CLOSE, _VOLUME = range(4)
+
+_SQRT_252 = np.sqrt(252)
+
+
+class BatchRegimeEngine:
+    """
+    Regime detection for many symbols at once.
+
+    Produces the same indicators, scores and result dicts as
+    RegimeDetector.detect_regime, but:
+    - Symbols with equal history length are stacked into one (T × n) block
+      and every indicator is a column-wise array operation
+    - Hurst (rescaled range) and half-life are closed-form regressions over
+      all columns instead of per-lag Python loops
+    - Histories stay in memory; `update` appends the day's bars (dropping
+      the oldest) so the morning run needs no re-download
+    """
+
+    REGIMES = RegimeDetector.REGIMES
+
+    def __init__(self, max_hurst_lag: int = 20):
+        self.max_hurst_lag = max_hurst_lag
+        self._detector = RegimeDetector()
+        self._history: Dict[str, np.ndarray] = {}  # symbol -> (T × 4) array
+        self._dates: Dict[str, pd.Timestamp] = {}  # symbol -> last bar date
+        self._lookback: Dict[str, int] = {}  # symbol -> lookback_days loaded
+        self._lock = threading.RLock()
+
+    # === DATA ===
+
+    def load(self, symbols: List[str], lookback_days: int = 60):
+        """
+        Bring histories up to date from the shared price cache.
+
+        The cache only downloads missing bars, so a daily rerun costs one
+        small tail refresh per symbol. Histories advanced by `update` past
+        the cached data are kept. Downloads run without the lock, which is
+        only taken to merge the results.
+        """
+        fetched = {}
+        for symbol in symbols:
+            try:
+                # Add buffer for indicator calculation
+                hist = get_history(symbol, lookback_days=lookback_days + 30)
+                if len(hist) >= 20:
+                    fetched[symbol] = hist
+            except Exception as e:
+                logger.error(f"Error fetching data for {symbol}: {e}")
+
+        with self._lock:
+            for symbol, hist in fetched.items():
+                last = self._dates.get(symbol)
+                if (self._lookback.get(symbol) == lookback_days and last is not None
+                        and last.date() > hist.index[-1].date()):
+                    continue
+                self.set_history(symbol, hist)
+                self._lookback[symbol] = lookback_days
+
+    def set_history(self, symbol: str, hist: pd.DataFrame):
+        """Replace a symbol's history with an OHLCV frame."""
+        with self._lock:
+            self._history[symbol] = hist[_FIELDS].to_numpy(dtype=float)
+            self._dates[symbol] = hist.index[-1]
+
+    def update(self, bars: Dict[str, Dict]) -> List[str]:
+        """
+        Append one new bar per symbol, keeping the window length fixed.
+
+        Args:
+            bars: {symbol: {'High', 'Low', 'Close', 'Volume', 'date' (optional)}}
+
+        Returns:
+            Symbols that were updated (bars for unknown symbols are ignored)
+        """
+        updated = []
+        with self._lock:
+            for symbol, bar in bars.items():
+                history = self._history.get(symbol)
+                if history is None:
+                    continue
+
+                date = bar.get('date')
+                if date is not None:
+                    date = pd.Timestamp(date)
+                    last = self._dates.get(symbol)
+                    if last is not None and date.date() == last.date():
+                        # Same session again: replace the (partial) last bar
+                        history[-1] = [bar[f] for f in _FIELDS]
+                        updated.append(symbol)
+                        continue
+                    self._dates[symbol] = date
+
+                row = np.array([[bar[f] for f in _FIELDS]], dtype=float)
+                self._history[symbol] = np.vstack([history[1:], row])
+                updated.append(symbol)
+        return updated
+
+    # === DETECTION ===
+
+    def detect(self, symbols: List[str], lookback_days: int = 60) -> List[Dict]:
+        """
+        Detect regimes for all symbols.
+
+        Returns:
+            One RegimeDetector-style result dict per symbol, in input order
+        """
+        self.load(symbols, lookback_days)
+        with self._lock:
+            table = self.indicator_table(symbols)
+
+        results = []
+        timestamp = datetime.now().isoformat()
+        scores = self._score_regimes(table) if len(table) else None
+
+        for symbol in symbols:
+            if symbol not in table.index:
+                logger.error(f"Insufficient data for {symbol}")
+                results.append(self._detector._default_regime(symbol))
+                continue
+
+            i = table.index.get_loc(symbol)
+            results.append(self._result(symbol, table.iloc[i], scores[i], timestamp))
+        return results
+
+    def regime_table(self, symbols: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Regime scores for every loaded symbol.
+
+        Returns:
+            DataFrame (symbol × regime scores) plus primary_regime,
+            secondary_regime and confidence columns
+        """
+        with self._lock:
+            table = self.indicator_table(symbols)
+        if len(table) == 0:
+            return pd.DataFrame(columns=self.REGIMES)
+
+        scores = self._score_regimes(table)
+        out = pd.DataFrame(scores, index=table.index, columns=self.REGIMES)
+
+        order = np.argsort(-scores, axis=1, kind='stable')
+        regimes = np.array(self.REGIMES)
+        out['primary_regime'] = regimes[order[:, 0]]
+        out['secondary_regime'] = regimes[order[:, 1]]
+        out['confidence'] = self._confidence(scores, table['realized_volatility'].to_numpy())
+        return out
+
+    def indicator_table(self, symbols: Optional[List[str]] = None) -> pd.DataFrame:
+        """All 15 indicators (+ autocorrelation) for the loaded symbols."""
+        symbols = [s for s in dict.fromkeys(symbols or self._history) if s in self._history]
+
+        # Equal-length histories form one dense block
+        groups: Dict[int, List[str]] = {}
+        for symbol in symbols:
+            groups.setdefault(len(self._history[symbol]), []).append(symbol)
+
+        frames = []
+        for length, members in groups.items():
+            if length < 20:
+                continue
+            block = np.stack([self._history[s] for s in members], axis=1)  # (T × n × 4)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                indicators = self._calculate_indicators(block)
+            frames.append(pd.DataFrame(indicators, index=members))
+
+        if not frames:
+            return pd.DataFrame()
+        table = pd.concat(frames)
+        return table.loc[[s for s in symbols if s in table.index]]
+
+    def _calculate_indicators(self, block: np.ndarray) -> Dict[str, np.ndarray]:
+        """Indicators for a (T × n × 4) block; every value is a length-n array."""
+        close = block[:, :, _CLOSE]
+        high = block[:, :, _HIGH]
+        low = block[:, :, _LOW]
+        volume = block[:, :, _VOLUME]
+        T = close.shape[0]
+
+        ind = {}
+
+        # === A. TREND ===
+        last20 = close[-20:]
+        sma20 = last20.mean(axis=0)
+        std20 = last20.std(axis=0, ddof=1)
+        ind['price_vs_sma20'] = close[-1] / sma20 - 1
+
+        if T >= 24:
+            sma20_prev = close[-24:-4].mean(axis=0)
+            ind['sma20_slope'] = (sma20 - sma20_prev) / sma20_prev
+        else:
+            ind['sma20_slope'] = np.zeros(close.shape[1])
+
+        ind['adx'] = _nan_to(self._adx(high, low, close), 0.0)
+
+        x = np.arange(20) - 9.5
+        slope = (x @ (last20 - sma20)) / (x @ x)
+        ind['linear_trend'] = slope / close[-1]
+
+        # === B. VOLATILITY ===
+        atr = _nan_to(self._atr(high, low, close), 0.0)
+        ind['atr_pct'] = np.where(close[-1] > 0, atr / close[-1] * 100, 0.0)
+
+        returns = close[1:] / close[:-1] - 1
+        n_returns = returns.shape[0]
+        if n_returns >= 20:
+            vol20 = returns[-20:].std(axis=0, ddof=1) * _SQRT_252
+            ind['realized_volatility'] = vol20
+            current_vol = returns[-5:].std(axis=0, ddof=1) * _SQRT_252
+            ind['vol_vs_avg'] = np.where(vol20 > 0, current_vol / vol20 - 1, 0.0)
+            ind['autocorr_lag1'] = _corr(returns[1:], returns[:-1])
+        else:
+            zeros = np.zeros(close.shape[1])
+            ind['realized_volatility'] = zeros
+            ind['vol_vs_avg'] = zeros
+            ind['autocorr_lag1'] = zeros
+
+        ind['bb_width'] = np.where(sma20 > 0, 4 * std20 / sma20, 0.0)
+
+        # === C. MEAN REVERSION ===
+        ind['hurst'] = self._hurst(close)
+        ind['half_life'] = self._half_life(close)
+        ind['zscore'] = np.where(std20 > 0, (close[-1] - sma20) / std20, 0.0)
+
+        # === D. MOMENTUM ===
+        ind['rsi'] = self._rsi(close)
+        macd = _ewm(close, 12) - _ewm(close, 26)
+        signal = _ewm(macd, 9)
+        ind['macd_histogram'] = macd[-1] - signal[-1]
+        ind['roc_20'] = close[-1] / close[-20] - 1
+
+        # === E. VOLUME ===
+        vol_5d = volume[-5:].mean(axis=0)
+        vol_20d = volume[-20:].mean(axis=0)
+        ind['volume_trend'] = np.where(vol_20d > 0, vol_5d / vol_20d - 1, 0.0)
+
+        return ind
+
+    # === INDICATOR HELPERS (all columns at once) ===
+
+    @staticmethod
+    def _true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+        prev_close = close[:-1]
+        tr = high - low
+        tr[1:] = np.maximum(tr[1:], np.maximum(np.abs(high[1:] - prev_close),
+                                               np.abs(low[1:] - prev_close)))
+        return tr
+
+    def _atr(self, high, low, close, period: int = 14) -> np.ndarray:
+        return self._true_range(high, low, close)[-period:].mean(axis=0)
+
+    def _adx(self, high, low, close, period: int = 14) -> np.ndarray:
+        tr = self._true_range(high, low, close)
+        plus_dm = np.vstack([np.full((1, high.shape[1]), np.nan), np.diff(high, axis=0)])
+        minus_dm = np.vstack([np.full((1, low.shape[1]), np.nan), -np.diff(low, axis=0)])
+        plus_dm[plus_dm < 0] = 0
+        minus_dm[minus_dm < 0] = 0
+
+        tr_smooth = _rolling_mean(tr, period)
+        plus_di = 100 * _rolling_mean(plus_dm, period) / tr_smooth
+        minus_di = 100 * _rolling_mean(minus_dm, period) / tr_smooth
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+        return dx[-period:].mean(axis=0)
+
+    @staticmethod
+    def _rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+        delta = np.diff(close[-(period + 1):], axis=0)
+        gain = np.where(delta > 0, delta, 0.0).mean(axis=0)
+        loss = np.where(delta < 0, -delta, 0.0).mean(axis=0)
+        rsi = 100 - 100 / (1 + gain / loss)
+        return _nan_to(rsi, 50.0)
+
+    def _hurst(self, close: np.ndarray) -> np.ndarray:
+        """Rescaled-range Hurst: range/std of non-overlapping chunks per lag."""
+        T, n = close.shape
+        if T < self.max_hurst_lag * 2:
+            return np.full(n, 0.5)
+
+        lags = np.arange(2, self.max_hurst_lag)
+        log_tau = np.empty((len(lags), n))
+        for k, lag in enumerate(lags):
+            n_chunks = len(range(0, T - lag, lag))
+            chunks = close[:n_chunks * lag].reshape(n_chunks, lag, n)
+            ranges = chunks.max(axis=1) - chunks.min(axis=1)
+            stds = chunks.std(axis=1)
+            log_tau[k] = np.log(ranges.mean(axis=0) / (stds.mean(axis=0) + 1e-10))
+
+        # Slope of log(R/S) on log(lag) for every column
+        log_lags = np.log(lags)
+        x = log_lags - log_lags.mean()
+        hurst = (x @ (log_tau - log_tau.mean(axis=0))) / (x @ x)
+        return np.clip(_nan_to(hurst, 0.5), 0.0, 1.0)
+
+    @staticmethod
+    def _half_life(close: np.ndarray) -> np.ndarray:
+        """AR(1) half-life: regress diff on lagged close (with intercept)."""
+        x = close[:-1]
+        y = np.diff(close, axis=0)
+        xc = x - x.mean(axis=0)
+        slope = (xc * (y - y.mean(axis=0))).sum(axis=0) / (xc * xc).sum(axis=0)
+
+        half_life = -np.log(2) / np.log(1 + slope)
+        valid = (slope < 0) & (half_life > 0)
+        return np.where(valid, half_life, 999.0)
+
+    # === SCORING ===
+
+    def _score_regimes(self, table: pd.DataFrame) -> np.ndarray:
+        """Regime scores (n × 8), same rules as RegimeDetector._score_regimes."""
+        ind = {c: table[c].to_numpy() for c in table.columns}
+        scores = np.zeros((len(table), len(self.REGIMES)))
+        col = {regime: j for j, regime in enumerate(self.REGIMES)}
+
+        def add(regime, condition, points):
+            scores[:, col[regime]] += np.where(condition, points, 0)
+
+        with np.errstate(invalid='ignore'):
+            add('BULL_TRENDING', ind['price_vs_sma20'] > 0.02, 2)
+            add('BULL_TRENDING', ind['sma20_slope'] > 0.01, 2)
+            add('BULL_TRENDING', ind['adx'] > 25, 1)
+            add('BULL_TRENDING', (ind['rsi'] > 50) & (ind['rsi'] < 70), 1)
+            add('BULL_TRENDING', ind['macd_histogram'] > 0, 1)
+
+            add('BEAR_TRENDING', ind['price_vs_sma20'] < -0.02, 2)
+            add('BEAR_TRENDING', ind['sma20_slope'] < -0.01, 2)
+            add('BEAR_TRENDING', ind['adx'] > 25, 1)
+            add('BEAR_TRENDING', (ind['rsi'] > 30) & (ind['rsi'] < 50), 1)
+            add('BEAR_TRENDING', ind['macd_histogram'] < 0, 1)
+
+            add('MOMENTUM', ind['hurst'] > 0.55, 3)
+            add('MOMENTUM', np.abs(ind['roc_20']) > 0.10, 2)
+            add('MOMENTUM', ind['autocorr_lag1'] > 0.3, 2)
+            add('MOMENTUM', ind['volume_trend'] > 0.2, 1)
+
+            add('MEAN_REVERTING', ind['hurst'] < 0.45, 3)
+            add('MEAN_REVERTING', np.abs(ind['zscore']) > 2, 2)
+            add('MEAN_REVERTING', ind['autocorr_lag1'] < 0, 2)
+            add('MEAN_REVERTING', ind['half_life'] < 10, 1)
+
+            add('HIGH_VOLATILITY', ind['realized_volatility'] > 0.30, 3)
+            add('HIGH_VOLATILITY', ind['atr_pct'] > 2.5, 2)
+            add('HIGH_VOLATILITY', ind['vol_vs_avg'] > 0.5, 2)
+
+            add('LOW_VOLATILITY', ind['realized_volatility'] < 0.15, 3)
+            add('LOW_VOLATILITY', ind['atr_pct'] < 1.0, 2)
+            add('LOW_VOLATILITY', ind['bb_width'] < 0.03, 1)
+
+            add('RANGE_BOUND', np.abs(ind['linear_trend']) < 0.001, 2)
+            add('RANGE_BOUND', ind['adx'] < 20, 2)
+            add('RANGE_BOUND', np.abs(ind['zscore']) < 0.5, 1)
+
+            add('CRISIS', ind['realized_volatility'] > 0.50, 3)
+            add('CRISIS', ind['roc_20'] < -0.10, 3)
+            add('CRISIS', ind['vol_vs_avg'] > 1.0, 2)
+
+        return scores
+
+    @staticmethod
+    def _confidence(scores: np.ndarray, realized_volatility: np.ndarray) -> np.ndarray:
+        top2 = -np.sort(-scores, axis=1)[:, :2]
+        confidence = np.minimum((top2[:, 0] - top2[:, 1]) / 10.0, 1.0)
+        confidence = np.where(realized_volatility > 0.40, confidence * 0.8, confidence)
+        return np.clip(confidence, 0.0, 1.0)
+
+    def _result(self, symbol: str, ind: pd.Series, scores: np.ndarray, timestamp: str) -> Dict:
+        order = np.argsort(-scores, kind='stable')
+        confidence = self._confidence(scores[None, :], np.array([ind['realized_volatility']]))[0]
+        primary = self.REGIMES[order[0]]
+
+        return {
+            'symbol': symbol,
+            'primary_regime': primary,
+            'secondary_regime': self.REGIMES[order[1]],
+            'confidence': round(float(confidence), 2),
+            'regime_strength': round(float(scores[order[0]]), 1),
+            'regime_scores': {r: round(float(s), 1) for r, s in zip(self.REGIMES, scores)},
+            'characteristics': {
+                'trend_strength': round(float(ind['adx']), 1),
+                'volatility': round(float(ind['realized_volatility']), 3),
+                'hurst_exponent': round(float(ind['hurst']), 2),
+                'price_vs_sma20': round(float(ind['price_vs_sma20']), 3),
+                'adx': round(float(ind['adx']), 1),
+                'rsi': round(float(ind['rsi']), 1)
+            },
+            'timestamp': timestamp
+        }
+
+
+def _nan_to(values: np.ndarray, default: float) -> np.ndarray:
+    return np.where(np.isfinite(values), values, default)
+
+
+def _rolling_mean(a: np.ndarray, window: int) -> np.ndarray:
+    """Trailing rolling mean along axis 0 (NaN until the window is full)."""
+    out = np.full(a.shape, np.nan)
+    if a.shape[0] >= window:
+        out[window - 1:] = np.lib.stride_tricks.sliding_window_view(a, window, axis=0).mean(axis=-1)
+    return out
+
+
+def _ewm(a: np.ndarray, span: int) -> np.ndarray:
+    """pandas ewm(span=span).mean() (adjust=True) along axis 0."""
+    decay = 1 - 2 / (span + 1)
+    out = np.empty_like(a)
+    num = np.zeros(a.shape[1])
+    den = 0.0
+    for t in range(a.shape[0]):
+        num = decay * num + a[t]
+        den = decay * den + 1
+        out[t] = num / den
+    return out
+
+
+def _corr(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Column-wise Pearson correlation."""
+    a = a - a.mean(axis=0)
+    b = b - b.mean(axis=0)
+    return (a * b).sum(axis=0) / np.sqrt((a * a).sum(axis=0) * (b * b).sum(axis=0))
+
+
+# Module-level instance
+_engine = BatchRegimeEngine()
+
+
+def detect_regimes(symbols: List[str], lookback_days: int = 60) -> List[Dict]:
+    """Batch regime detection (RegimeDetector result format)."""
+    return _engine.detect(symbols, lookback_days)
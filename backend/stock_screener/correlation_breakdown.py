@@ -4,11 +4,12 @@
 from typing import Dict, List, Optional, Tuple
 import numpy as np
 import pandas as pd
-import yfinance as yf
-from datetime import datetime, timedelta
+from datetime import datetime
 from scipy.stats import pearsonr
 import logging
 
+from alpha_methods.price_history import get_history
+
 logger = logging.getLogger(__name__)
 
 
@@ -126,16 +127,9 @@ class CorrelationBreakdownDetector:
                                 lookback_days: int) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
         """Fetch aligned price data for stock and sector."""
         try:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=lookback_days + 30)
-
-            # Fetch stock data
-            stock_ticker = yf.Ticker(symbol)
-            stock_hist = stock_ticker.history(start=start_date, end=end_date)
-
-            # Fetch sector data
-            sector_ticker = yf.Ticker(sector_etf)
-            sector_hist = sector_ticker.history(start=start_date, end=end_date)
+            # Fetch stock and sector data (shared cache)
+            stock_hist = get_history(symbol, lookback_days=lookback_days + 30)
+            sector_hist = get_history(sector_etf, lookback_days=lookback_days + 30)
 
             if len(stock_hist) < 20 or len(sector_hist) < 20:
                 return None, None
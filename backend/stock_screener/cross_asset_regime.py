@@ -4,10 +4,11 @@
 from datetime import datetime, timedelta
 from typing import Dict, List
 import logging
-import yfinance as yf
 import pandas as pd
 import numpy as np
 
+from alpha_methods.price_history import get_history
+
 logger = logging.getLogger(__name__)
 
 
@@ -91,14 +92,10 @@ class CrossAssetRegimeDetector:
         for symbols in self.ASSET_CLASSES.values():
             all_symbols.extend(symbols)
 
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=lookback_days + 10)
-
         data = {}
         for symbol in all_symbols:
             try:
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(start=start_date, end=end_date)
+                hist = get_history(symbol, lookback_days=lookback_days + 10)
                 if len(hist) > 0:
                     data[symbol] = hist['Close']
             except Exception as e:
@@ -1,9 +1,12 @@
 # hierarchy_manager.py - Hierarchical Regime Detection Manager
 # Orchestrates all 7 layers of regime detection
 
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
+import threading
+import time
 from regime_detection import RegimeDetector
 from temporal_regime import detect_temporal_context
 from macro_regime import detect_macro_regime
@@ -14,6 +17,17 @@ from industry_regime import detect_industry_regime
 
 logger = logging.getLogger(__name__)
 
+# Seconds each layer's output stays valid, matched to its data frequency
+LAYER_TTLS = {
+    'temporal': 3600,          # Calendar context
+    'macro': 12 * 3600,        # Macro proxies move on a monthly scale
+    'cross_asset': 3600,       # Daily cross-asset correlations
+    'market': 300,             # Intraday index regimes
+    'sector': 300,
+    'industry': 300,
+    'stock': 300
+}
+
 
 class HierarchyManager:
     """
@@ -32,11 +46,33 @@ class HierarchyManager:
     - Divergences between layers
     - Top-down vs bottom-up signals
     - Overall regime consensus
+
+    Layers run concurrently and each result is cached for its layer TTL,
+    so stock-level requests reuse the market-wide layers.
     """
 
-    def __init__(self):
+    def __init__(self, max_workers: int = 7, layer_ttls: Optional[Dict[str, float]] = None):
         self.regime_detector = RegimeDetector()
 
+        # Layer graph: every layer depends only on market data, so all of
+        # them run concurrently; alignment/divergence/risk are derived after
+        self._layers = {
+            'temporal': lambda: detect_temporal_context(),
+            'macro': lambda: detect_macro_regime(),
+            'cross_asset': lambda: detect_cross_asset_regime(lookback_days=30),
+            'market': detect_market_regime,
+            'sector': detect_sector_regime,
+            'industry': detect_industry_regime,
+            'stock': self.regime_detector.detect_regime
+        }
+        self.layer_ttls = {**LAYER_TTLS, **(layer_ttls or {})}
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='hierarchy')
+        self._cache: Dict[Tuple, Tuple[float, Dict]] = {}  # key -> (expires_at, result)
+        self._inflight: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+
     def analyze_full_hierarchy(self, symbol: str = None,
                               lookback_days: int = 60) -> Dict:
         """
@@ -51,30 +87,32 @@ class HierarchyManager:
         """
         logger.info(f"Analyzing full hierarchy for {symbol or 'market'}")
 
-        # Layer 0: Temporal
-        temporal = detect_temporal_context()
-
-        # Layer 1: Macro
-        macro = detect_macro_regime()
-
-        # Layer 2: Cross-Asset
-        cross_asset = detect_cross_asset_regime(lookback_days=30)
-
-        # Layer 3: Market
-        market = detect_market_regime(lookback_days)
-
-        # Layer 4: Sector
-        sector = detect_sector_regime(lookback_days)
+        # Start every layer at once (cached layers resolve immediately)
+        layers = {
+            'temporal': self._layer('temporal'),
+            'macro': self._layer('macro'),
+            'cross_asset': self._layer('cross_asset'),
+            'market': self._layer('market', lookback_days),
+            'sector': self._layer('sector', lookback_days),
+            'industry': self._layer('industry', lookback_days)
+        }
+        if symbol:
+            layers['stock'] = self._layer('stock', symbol, lookback_days)
 
-        # Layer 5: Industry (sample of key industries)
-        industry = detect_industry_regime(lookback_days)
+        # Layers 0-5: Temporal, Macro, Cross-Asset, Market, Sector, Industry
+        temporal = layers['temporal'].result()
+        macro = layers['macro'].result()
+        cross_asset = layers['cross_asset'].result()
+        market = layers['market'].result()
+        sector = layers['sector'].result()
+        industry = layers['industry'].result()
 
         # Layer 6: Stock (if provided)
         stock_regime = None
         stock_sector = None
         if symbol:
             try:
-                stock_regime = self.regime_detector.detect_regime(symbol, lookback_days)
+                stock_regime = layers['stock'].result()
                 # Try to determine sector (simplified - in production use fundamentals API)
                 stock_sector = self._infer_stock_sector(symbol)
             except Exception as e:
@@ -134,6 +172,48 @@ class HierarchyManager:
             )
         }
 
+    def invalidate(self, layer: Optional[str] = None):
+        """Drop cached results for one layer (or all layers)."""
+        with self._lock:
+            for key in [k for k in self._cache if layer is None or k[0] == layer]:
+                del self._cache[key]
+
+    def _layer(self, name: str, *args) -> Future:
+        """
+        Future for a layer result.
+
+        Fresh cached results come back as completed futures; concurrent
+        requests for the same layer share one computation.
+        """
+        key = (name,) + args
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                future = Future()
+                future.set_result(cached[1])
+                return future
+
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._executor.submit(self._compute, key)
+                self._inflight[key] = future
+            return future
+
+    def _compute(self, key: Tuple) -> Dict:
+        name, args = key[0], key[1:]
+        try:
+            result = self._layers[name](*args)
+            with self._lock:
+                now = time.monotonic()
+                # Keys are per (layer, symbol, lookback): drop expired ones so the cache stays bounded
+                for expired in [k for k, (expires_at, _) in self._cache.items() if expires_at <= now]:
+                    del self._cache[expired]
+                self._cache[key] = (now + self.layer_ttls[name], result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
     def analyze_stock_hierarchy(self, symbol: str, lookback_days: int = 60) -> Dict:
         """
         Analyze hierarchy specifically for a stock.
@@ -4,10 +4,11 @@
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 import logging
-import yfinance as yf
 import pandas as pd
 import numpy as np
 
+from alpha_methods.price_history import get_history
+
 logger = logging.getLogger(__name__)
 
 
@@ -125,8 +126,7 @@ class MacroRegimeDetector:
             data = {}
             for symbol, name in symbols.items():
                 try:
-                    ticker = yf.Ticker(symbol)
-                    hist = ticker.history(period='6mo')
+                    hist = get_history(symbol, period='6mo')
                     if len(hist) > 0:
                         latest = hist['Close'].iloc[-1]
                         prev_month = hist['Close'].iloc[-22] if len(hist) > 22 else hist['Close'].iloc[0]
@@ -6,10 +6,11 @@ import pandas as pd
 from typing import Dict, List, Tuple
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.linear_model import Ridge
-import yfinance as yf
 import logging
 from datetime import datetime, timedelta
 
+from alpha_methods.price_history import get_history
+
 logger = logging.getLogger(__name__)
 
 
@@ -271,8 +272,7 @@ class MultiHorizonPredictor:
     def _fetch_data(self, ticker: str, period: str = '1y') -> pd.DataFrame:
         """Fetch historical data."""
         try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period=period)
+            hist = get_history(ticker, period=period)
 
             # Cache current price
             if len(hist) > 0:
@@ -4,12 +4,13 @@
 
 import numpy as np
 import pandas as pd
-import yfinance as yf
 from typing import Dict, List, Tuple, Optional
 from scipy import stats
 from datetime import datetime
 import logging
 
+from alpha_methods.price_history import get_history
+
 logger = logging.getLogger(__name__)
 
 
@@ -100,10 +101,8 @@ class RegimeDetector:
     def _fetch_data(self, symbol: str, lookback_days: int) -> Optional[pd.DataFrame]:
         """Fetch OHLCV data."""
         try:
-            ticker = yf.Ticker(symbol)
             # Add buffer for indicator calculation
-            period = f"{lookback_days + 30}d"
-            hist = ticker.history(period=period)
+            hist = get_history(symbol, lookback_days=lookback_days + 30)
 
             if len(hist) < 20:
                 return None
@@ -5,10 +5,9 @@ from typing import Dict, List, Optional, Tuple
 import numpy as np
 from scipy.spatial.distance import euclidean
 from fastdtw import fastdtw
-import yfinance as yf
-from datetime import datetime, timedelta
 import logging
 from pattern_database import get_database, PricePattern
+from alpha_methods.price_history import get_history
 
 logger = logging.getLogger(__name__)
 
@@ -122,11 +121,7 @@ class TimeMachine:
     def _fetch_current_pattern(self, symbol: str, lookback_days: int) -> Optional[List[float]]:
         """Fetch and normalize current price pattern."""
         try:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=lookback_days + 10)
-
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(start=start_date, end=end_date)
+            hist = get_history(symbol, lookback_days=lookback_days + 10)
 
             if len(hist) < lookback_days:
                 return None
@@ -90,6 +90,7 @@ CREATE INDEX idx_entities_status ON entities(status) WHERE deleted_at IS NULL;
 CREATE INDEX idx_entities_category ON entities(category) WHERE deleted_at IS NULL;
 CREATE INDEX idx_entities_health ON entities(health_status) WHERE deleted_at IS NULL;
 CREATE INDEX idx_entities_created ON entities(created_at DESC);
+CREATE INDEX idx_entities_keyset ON entities(created_at DESC, entity_id DESC) WHERE deleted_at IS NULL;  -- Keyset pagination
 CREATE INDEX idx_entities_tags ON entities USING GIN(tags);  -- GIN index for array search
 CREATE INDEX idx_entities_name_search ON entities USING GIN(name gin_trgm_ops);  -- Full-text search
 CREATE INDEX idx_entities_config ON entities USING GIN(config);  -- JSONB search
@@ -391,6 +392,7 @@ CREATE INDEX idx_deps_entity ON dependencies(entity_id);
 CREATE INDEX idx_deps_depends_on ON dependencies(depends_on_entity_id);
 CREATE INDEX idx_deps_type ON dependencies(dependency_type);
 CREATE INDEX idx_deps_status ON dependencies(status);
+CREATE INDEX idx_deps_active_edges ON dependencies(entity_id, depends_on_entity_id) WHERE status = 'active';  -- Recursive graph traversal
 
 -- ==================================================
 -- TRIGGERS
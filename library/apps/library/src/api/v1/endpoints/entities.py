@@ -2,44 +2,108 @@
 Entity CRUD endpoints for Library Service.
 """
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, and_, func, select, tuple_
+from sqlalchemy.sql import Select
+from typing import List, Optional, Tuple
 from uuid import UUID
+from datetime import datetime
+import base64
 import logging
 
-from ....db.database import get_db
+from ....db.database import get_async_db
 from ....db.models import Entity as EntityModel
 from ....schemas.entity import (
     EntityCreate, EntityUpdate, EntityResponse, EntityList, EntityFilter
 )
 from ....messaging import publisher, EventType, Subjects
 from ....services.dependency_service import DependencyService
+from ....services.dependency_graph import dependency_graph
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/entities", tags=["Entities"])
 
 
+# ==================== KEYSET PAGINATION ====================
+
+def _encode_cursor(entity: EntityModel) -> str:
+    """Opaque cursor pointing just after an entity in (created_at, entity_id) order."""
+    raw = f"{entity.created_at.isoformat()}|{entity.entity_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        created_at, entity_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(entity_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+async def _keyset_page(
+    query: Select,
+    cursor: Optional[str],
+    page_size: int,
+    include_total: bool,
+    db: AsyncSession
+) -> EntityList:
+    """
+    One page of entities, newest first.
+
+    Seeks past the cursor on the (created_at, entity_id) index instead of
+    skipping rows with OFFSET; the total is only counted when requested.
+    """
+    total = None
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+
+    if cursor:
+        created_at, entity_id = _decode_cursor(cursor)
+        query = query.where(
+            tuple_(EntityModel.created_at, EntityModel.entity_id) < tuple_(created_at, entity_id)
+        )
+
+    # One extra row tells whether another page follows
+    entities = (await db.scalars(
+        query.order_by(EntityModel.created_at.desc(), EntityModel.entity_id.desc())
+             .limit(page_size + 1)
+    )).all()
+
+    next_cursor = _encode_cursor(entities[page_size - 1]) if len(entities) > page_size else None
+
+    return EntityList(
+        entities=[EntityResponse.model_validate(e) for e in entities[:page_size]],
+        page_size=page_size,
+        next_cursor=next_cursor,
+        total=total
+    )
+
+
 # ==================== LIST ENTITIES ====================
 
 @router.get("", response_model=EntityList)
 async def list_entities(
-    page: int = Query(1, ge=1, description="Page number"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     page_size: int = Query(20, ge=1, le=100, description="Items per page"),
+    include_total: bool = Query(False, description="Also count all matching entities"),
     type: Optional[str] = Query(None, description="Filter by entity type"),
     category: Optional[str] = Query(None, description="Filter by category"),
     status: Optional[str] = Query(None, description="Filter by status"),
     health_status: Optional[str] = Query(None, description="Filter by health status"),
     search: Optional[str] = Query(None, description="Search in name and description"),
     tags: Optional[List[str]] = Query(None, description="Filter by tags"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> EntityList:
     """
-    List entities with pagination and filtering.
+    List entities with keyset pagination and filtering.
 
-    - **page**: Page number (starts at 1)
+    - **cursor**: Cursor returned as next_cursor by the previous page (omit for the first page)
     - **page_size**: Number of items per page (max 100)
+    - **include_total**: Also return the total number of matches (extra COUNT query)
     - **type**: Filter by entity type (strategy, pipeline, model, etc.)
     - **category**: Filter by category
     - **status**: Filter by status (registered, deployed, active, etc.)
@@ -49,24 +113,24 @@ async def list_entities(
     """
     try:
         # Build query
-        query = db.query(EntityModel).filter(EntityModel.deleted_at.is_(None))
+        query = select(EntityModel).where(EntityModel.deleted_at.is_(None))
 
         # Apply filters
         if type:
-            query = query.filter(EntityModel.type == type)
+            query = query.where(EntityModel.type == type)
 
         if category:
-            query = query.filter(EntityModel.category == category)
+            query = query.where(EntityModel.category == category)
 
         if status:
-            query = query.filter(EntityModel.status == status)
+            query = query.where(EntityModel.status == status)
 
         if health_status:
-            query = query.filter(EntityModel.health_status == health_status)
+            query = query.where(EntityModel.health_status == health_status)
 
         if search:
             search_pattern = f"%{search}%"
-            query = query.filter(
+            query = query.where(
                 or_(
                     EntityModel.name.ilike(search_pattern),
                     EntityModel.description.ilike(search_pattern)
@@ -75,25 +139,12 @@ async def list_entities(
 
         if tags:
             # Filter entities that have ANY of the specified tags
-            query = query.filter(EntityModel.tags.overlap(tags))
-
-        # Get total count (before pagination)
-        total = query.count()
-
-        # Apply pagination
-        offset = (page - 1) * page_size
-        entities = query.order_by(EntityModel.created_at.desc()) \
-                       .offset(offset) \
-                       .limit(page_size) \
-                       .all()
-
-        return EntityList(
-            entities=[EntityResponse.model_validate(e) for e in entities],
-            total=total,
-            page=page,
-            page_size=page_size
-        )
+            query = query.where(EntityModel.tags.overlap(tags))
+
+        return await _keyset_page(query, cursor, page_size, include_total, db)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing entities: {e}")
         raise HTTPException(
@@ -107,7 +158,7 @@ async def list_entities(
 @router.get("/{entity_id}", response_model=EntityResponse)
 async def get_entity(
     entity_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> EntityResponse:
     """
     Get a single entity by ID.
@@ -115,10 +166,12 @@ async def get_entity(
     Returns 404 if entity not found or deleted.
     """
     try:
-        entity = db.query(EntityModel).filter(
-            EntityModel.entity_id == entity_id,
-            EntityModel.deleted_at.is_(None)
-        ).first()
+        entity = await db.scalar(
+            select(EntityModel).where(
+                EntityModel.entity_id == entity_id,
+                EntityModel.deleted_at.is_(None)
+            )
+        )
 
         if not entity:
             raise HTTPException(
@@ -143,7 +196,7 @@ async def get_entity(
 @router.post("", response_model=EntityResponse, status_code=status.HTTP_201_CREATED)
 async def create_entity(
     entity_data: EntityCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> EntityResponse:
     """
     Create a new entity.
@@ -154,10 +207,12 @@ async def create_entity(
     """
     try:
         # Check if entity with same name exists
-        existing = db.query(EntityModel).filter(
-            EntityModel.name == entity_data.name,
-            EntityModel.deleted_at.is_(None)
-        ).first()
+        existing = await db.scalar(
+            select(EntityModel).where(
+                EntityModel.name == entity_data.name,
+                EntityModel.deleted_at.is_(None)
+            )
+        )
 
         if existing:
             raise HTTPException(
@@ -168,16 +223,21 @@ async def create_entity(
         # Create entity
         entity = EntityModel(**entity_data.model_dump())
         db.add(entity)
-        db.commit()
-        db.refresh(entity)
+        await db.flush()
 
-        # Sync dependencies if requirements provided
+        # Sync dependencies if requirements provided (same transaction)
         if entity.requirements:
-            DependencyService.sync_dependencies(entity, db)
-            db.commit()
+            await DependencyService.sync_dependencies(entity, db)
+        dependencies = await DependencyService.active_dependencies(entity.entity_id, db)
+
+        await db.commit()
+        await db.refresh(entity)
 
         logger.info(f"Created entity: {entity.name} ({entity.entity_id})")
 
+        # Write through to the dependency graph index; other instances apply the event
+        graph = dependency_graph.record_entity(entity, dependencies)
+
         # Publish NATS event
         try:
             await publisher.publish_entity_registered(
@@ -189,7 +249,8 @@ async def create_entity(
                     "category": entity.category,
                     "author": entity.author,
                     "created_by": entity.created_by
-                }
+                },
+                data={"graph": graph}
             )
         except Exception as e:
             logger.error(f"Failed to publish entity.registered event: {e}")
@@ -201,7 +262,7 @@ async def create_entity(
         raise
     except Exception as e:
         logger.error(f"Error creating entity: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create entity: {str(e)}"
@@ -214,7 +275,7 @@ async def create_entity(
 async def update_entity(
     entity_id: UUID,
     entity_data: EntityUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> EntityResponse:
     """
     Update an existing entity.
@@ -225,10 +286,12 @@ async def update_entity(
     """
     try:
         # Get entity
-        entity = db.query(EntityModel).filter(
-            EntityModel.entity_id == entity_id,
-            EntityModel.deleted_at.is_(None)
-        ).first()
+        entity = await db.scalar(
+            select(EntityModel).where(
+                EntityModel.entity_id == entity_id,
+                EntityModel.deleted_at.is_(None)
+            )
+        )
 
         if not entity:
             raise HTTPException(
@@ -238,11 +301,13 @@ async def update_entity(
 
         # Check name uniqueness if name is being updated
         if entity_data.name and entity_data.name != entity.name:
-            existing = db.query(EntityModel).filter(
-                EntityModel.name == entity_data.name,
-                EntityModel.deleted_at.is_(None),
-                EntityModel.entity_id != entity_id
-            ).first()
+            existing = await db.scalar(
+                select(EntityModel).where(
+                    EntityModel.name == entity_data.name,
+                    EntityModel.deleted_at.is_(None),
+                    EntityModel.entity_id != entity_id
+                )
+            )
 
             if existing:
                 raise HTTPException(
@@ -255,16 +320,20 @@ async def update_entity(
         for field, value in update_data.items():
             setattr(entity, field, value)
 
-        db.commit()
-        db.refresh(entity)
-
-        # Sync dependencies if requirements were updated
+        # Sync dependencies if requirements were updated (same transaction)
+        dependencies = None
         if 'requirements' in update_data:
-            DependencyService.sync_dependencies(entity, db)
-            db.commit()
+            await db.flush()
+            await DependencyService.sync_dependencies(entity, db)
+            dependencies = await DependencyService.active_dependencies(entity.entity_id, db)
+
+        await db.commit()
+        await db.refresh(entity)
 
         logger.info(f"Updated entity: {entity.name} ({entity.entity_id})")
 
+        graph = dependency_graph.record_entity(entity, dependencies)
+
         # Publish NATS event
         try:
             await publisher.publish_generic_event(
@@ -273,7 +342,8 @@ async def update_entity(
                 data={
                     "entity_id": str(entity.entity_id),
                     "entity_name": entity.name,
-                    "updated_fields": list(update_data.keys())
+                    "updated_fields": list(update_data.keys()),
+                    "graph": graph
                 },
                 entity_id=str(entity.entity_id)
             )
@@ -286,7 +356,7 @@ async def update_entity(
         raise
     except Exception as e:
         logger.error(f"Error updating entity {entity_id}: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update entity: {str(e)}"
@@ -299,7 +369,7 @@ async def update_entity(
 async def delete_entity(
     entity_id: UUID,
     deleted_by: Optional[str] = Query(None, description="User performing deletion"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> None:
     """
     Soft delete an entity.
@@ -310,10 +380,12 @@ async def delete_entity(
     """
     try:
         # Get entity
-        entity = db.query(EntityModel).filter(
-            EntityModel.entity_id == entity_id,
-            EntityModel.deleted_at.is_(None)
-        ).first()
+        entity = await db.scalar(
+            select(EntityModel).where(
+                EntityModel.entity_id == entity_id,
+                EntityModel.deleted_at.is_(None)
+            )
+        )
 
         if not entity:
             raise HTTPException(
@@ -322,14 +394,15 @@ async def delete_entity(
             )
 
         # Soft delete
-        from datetime import datetime
         entity.deleted_at = datetime.utcnow()
         entity.deleted_by = deleted_by
 
-        db.commit()
+        await db.commit()
 
         logger.info(f"Deleted entity: {entity.name} ({entity.entity_id})")
 
+        graph = dependency_graph.record_entity(entity)
+
         # Publish NATS event
         try:
             await publisher.publish_generic_event(
@@ -338,7 +411,8 @@ async def delete_entity(
                 data={
                     "entity_id": str(entity.entity_id),
                     "entity_name": entity.name,
-                    "deleted_by": deleted_by
+                    "deleted_by": deleted_by,
+                    "graph": graph
                 },
                 entity_id=str(entity.entity_id)
             )
@@ -351,7 +425,7 @@ async def delete_entity(
         raise
     except Exception as e:
         logger.error(f"Error deleting entity {entity_id}: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete entity: {str(e)}"
@@ -363,9 +437,10 @@ async def delete_entity(
 @router.get("/search/", response_model=EntityList)
 async def search_entities(
     q: str = Query(..., min_length=1, description="Search query"),
-    page: int = Query(1, ge=1),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    include_total: bool = Query(False, description="Also count all matching entities"),
+    db: AsyncSession = Depends(get_async_db)
 ) -> EntityList:
     """
     Full-text search across entity names and descriptions.
@@ -375,7 +450,7 @@ async def search_entities(
     try:
         search_pattern = f"%{q}%"
 
-        query = db.query(EntityModel).filter(
+        query = select(EntityModel).where(
             EntityModel.deleted_at.is_(None),
             or_(
                 EntityModel.name.ilike(search_pattern),
@@ -384,21 +459,10 @@ async def search_entities(
             )
         )
 
-        total = query.count()
-
-        offset = (page - 1) * page_size
-        entities = query.order_by(EntityModel.created_at.desc()) \
-                       .offset(offset) \
-                       .limit(page_size) \
-                       .all()
-
-        return EntityList(
-            entities=[EntityResponse.model_validate(e) for e in entities],
-            total=total,
-            page=page,
-            page_size=page_size
-        )
+        return await _keyset_page(query, cursor, page_size, include_total, db)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error searching entities: {e}")
         raise HTTPException(
@@ -412,7 +476,7 @@ async def search_entities(
 @router.get("/{entity_id}/dependencies", response_model=List[dict])
 async def get_entity_dependencies(
     entity_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> List[dict]:
     """
     Get all dependencies for an entity.
@@ -420,13 +484,13 @@ async def get_entity_dependencies(
     Returns list of entities that this entity depends on.
     """
     try:
-        from ....db.models import Dependency
-
         # Check entity exists
-        entity = db.query(EntityModel).filter(
-            EntityModel.entity_id == entity_id,
-            EntityModel.deleted_at.is_(None)
-        ).first()
+        entity = await db.scalar(
+            select(EntityModel).where(
+                EntityModel.entity_id == entity_id,
+                EntityModel.deleted_at.is_(None)
+            )
+        )
 
         if not entity:
             raise HTTPException(
@@ -434,26 +498,20 @@ async def get_entity_dependencies(
                 detail=f"Entity {entity_id} not found"
             )
 
-        # Get dependencies
-        dependencies = db.query(Dependency).filter(
-            Dependency.entity_id == entity_id,
-            Dependency.status == 'active'
-        ).all()
-
-        result = []
-        for dep in dependencies:
-            dep_entity = db.query(EntityModel).filter(
-                EntityModel.entity_id == dep.depends_on_entity_id
-            ).first()
-
-            if dep_entity:
-                result.append({
-                    "dependency_id": str(dep.dependency_id),
-                    "entity": EntityResponse.model_validate(dep_entity).model_dump(),
-                    "dependency_type": dep.dependency_type,
-                    "min_version": dep.min_version,
-                    "max_version": dep.max_version
-                })
+        # Get dependencies with their entities in one query
+        dependencies = await DependencyService.get_dependencies(entity_id, db)
+
+        result = [
+            {
+                "dependency_id": str(dep.dependency_id),
+                "entity": EntityResponse.model_validate(dep.depends_on_entity).model_dump(),
+                "dependency_type": dep.dependency_type,
+                "min_version": dep.min_version,
+                "max_version": dep.max_version
+            }
+            for dep in dependencies
+            if dep.depends_on_entity is not None
+        ]
 
         return result
 
@@ -465,3 +523,37 @@ async def get_entity_dependencies(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get dependencies: {str(e)}"
         )
+
+
+# ==================== GET DEPENDENCY TREE ====================
+
+@router.get("/{entity_id}/dependencies/tree", response_model=dict)
+async def get_entity_dependency_tree(
+    entity_id: UUID,
+    max_depth: int = Query(10, ge=1, le=50, description="Maximum tree depth"),
+    db: AsyncSession = Depends(get_async_db)
+) -> dict:
+    """
+    Get the transitive dependency tree of an entity.
+
+    Resolved with a single recursive query regardless of tree size.
+    """
+    try:
+        tree = await DependencyService.get_dependency_tree(entity_id, db, max_depth=max_depth)
+
+        if tree.get('error') == 'Entity not found':
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Entity {entity_id} not found"
+            )
+
+        return tree
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting dependency tree for {entity_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get dependency tree: {str(e)}"
+        )
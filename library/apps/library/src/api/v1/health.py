@@ -7,6 +7,7 @@ import logging
 
 from ...schemas.health import HealthResponse, DetailedHealthResponse
 from ...db.database import check_db_connection
+from ...services.dependency_graph import dependency_graph
 from ...core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -58,6 +59,7 @@ async def detailed_health_check() -> DetailedHealthResponse:
 
     Checks:
     - Database connectivity
+    - Dependency graph index state
     - Service configuration
 
     Returns:
@@ -92,6 +94,10 @@ async def detailed_health_check() -> DetailedHealthResponse:
                 "status": _get_nats_status(),
                 "enabled": settings.NATS_ENABLED,
                 "url": settings.NATS_URL if settings.NATS_ENABLED else "N/A",
+            },
+            "dependency_graph": {
+                "status": "ready" if dependency_graph.ready else "not_built",
+                **dependency_graph.stats(),
             }
         }
     )
@@ -1,7 +1,10 @@
 """
 Database module.
 """
-from .database import Base, engine, SessionLocal, get_db, init_db, check_db_connection
+from .database import (
+    Base, engine, SessionLocal, get_db, async_engine, AsyncSessionLocal, get_async_db,
+    init_db, check_db_connection
+)
 from .models import Entity, Deployment, Swap, PerformanceMetric, Event, Dependency
 
 __all__ = [
@@ -9,6 +12,9 @@ __all__ = [
     "engine",
     "SessionLocal",
     "get_db",
+    "async_engine",
+    "AsyncSessionLocal",
+    "get_async_db",
     "init_db",
     "check_db_connection",
     "Entity",
@@ -3,11 +3,13 @@ Main FastAPI application for Library Service.
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
+import asyncio
 import logging
 
 from .core.config import settings
-from .db.database import init_db, check_db_connection
+from .db.database import init_db, check_db_connection, dispose_async_engine, SessionLocal
+from .services.dependency_graph import dependency_graph
 from .api.v1 import api_router
 
 # Configure logging
@@ -18,6 +20,13 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def refresh_dependency_graph(interval: float):
+    """Periodically rebuild the dependency graph index from the database."""
+    while True:
+        await asyncio.sleep(interval)
+        await dependency_graph.refresh()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -41,14 +50,42 @@ async def lifespan(app: FastAPI):
         logger.error("Database connection check failed")
         raise RuntimeError("Database connection failed")
 
+    # Build the in-process dependency graph index (rebuilt on first use if this fails)
+    try:
+        with SessionLocal() as db:
+            dependency_graph.rebuild(db)
+    except Exception as e:
+        logger.warning(f"Dependency graph index build failed: {e} - deferring to first use")
+
     # Connect to NATS (graceful degradation if unavailable)
+    graph_events = False
     try:
         from .messaging import nats_client
         await nats_client.connect()
         logger.info("NATS connected successfully")
+
+        # Keep the dependency graph index in sync with other instances
+        if nats_client.connected:
+            from .messaging import Subjects
+            await nats_client.subscribe(Subjects.ENTITY_ALL, dependency_graph.handle_event)
+            nats_client.reconnect_callbacks.append(dependency_graph.refresh)
+            graph_events = True
     except Exception as e:
         logger.warning(f"NATS connection failed: {e} - continuing without messaging")
 
+    # Periodic rebuild: the only source of other instances' writes without NATS
+    refresh_task = None
+    if settings.DEPENDENCY_GRAPH_REFRESH_SECONDS > 0:
+        refresh_task = asyncio.create_task(
+            refresh_dependency_graph(settings.DEPENDENCY_GRAPH_REFRESH_SECONDS)
+        )
+    if not graph_events:
+        logger.warning(
+            "Dependency graph index not subscribed to entity events - "
+            + (f"rebuilding every {settings.DEPENDENCY_GRAPH_REFRESH_SECONDS:g}s"
+               if refresh_task else "writes from other instances will not be seen")
+        )
+
     logger.info(f"{settings.SERVICE_NAME} startup complete")
 
     yield
@@ -56,6 +93,11 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info(f"Shutting down {settings.SERVICE_NAME}")
 
+    if refresh_task is not None:
+        refresh_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await refresh_task
+
     # Disconnect NATS
     try:
         from .messaging import nats_client
@@ -64,6 +106,9 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error disconnecting NATS: {e}")
 
+    # Close pooled database connections
+    await dispose_async_engine()
+
 
 # Create FastAPI application
 app = FastAPI(
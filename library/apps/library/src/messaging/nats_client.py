@@ -4,7 +4,7 @@ Handles connection, pub/sub, and request/reply patterns.
 """
 import asyncio
 import logging
-from typing import Optional, Callable, Any
+from typing import Optional, Callable, Any, List
 import json
 from datetime import datetime
 import nats
@@ -24,6 +24,7 @@ class LibraryNATSClient:
         self.connected = False
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = 10
+        self.reconnect_callbacks: List[Callable[[], Any]] = []
 
     async def connect(self) -> None:
         """Connect to NATS with retry logic."""
@@ -210,6 +211,13 @@ class LibraryNATSClient:
         self.connected = True
         logger.info("Reconnected to NATS")
 
+        # Let subscribers resynchronize state that may have missed events
+        for callback in self.reconnect_callbacks:
+            try:
+                await callback()
+            except Exception as e:
+                logger.error(f"Reconnect callback failed: {e}")
+
     async def _closed_callback(self):
         """Handle connection close."""
         self.connected = False
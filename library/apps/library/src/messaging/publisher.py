@@ -24,7 +24,8 @@ class EventPublisher:
         entity_name: str,
         entity_type: str,
         version: str,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None
     ) -> None:
         """Publish entity registered event."""
         event = EntityRegisteredEvent(
@@ -33,6 +34,7 @@ class EventPublisher:
             entity_name=entity_name,
             entity_type=entity_type,
             version=version,
+            data=data or {},
             metadata=metadata or {}
         )
 
@@ -106,11 +106,11 @@ class EntitySummary(BaseModel):
 
 # Alias for compatibility with Prompt 04 requirements
 class EntityList(BaseModel):
-    """Schema for paginated entity list (alias)."""
+    """Schema for keyset-paginated entity list (alias)."""
     entities: List[EntityResponse]
-    total: int
-    page: int
     page_size: int
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page (None on the last page)")
+    total: Optional[int] = Field(None, description="Total matches (only when include_total=true)")
 
 
 # Filter schema for query parameters
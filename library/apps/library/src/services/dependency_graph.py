@@ -0,0 +1,405 @@
+"""
+In-process index of the entity dependency graph.
+
+Holds the active dependency edges (forward and reverse adjacency) and the
+validation-relevant state of every entity, so swap and deployment
+validation answer dependency, reachability, cycle and impact-set queries
+from memory instead of querying the database per node.
+
+Kept consistent with the database by:
+- rebuild(): full load (two queries) at startup, after NATS reconnects and
+  periodically (settings.DEPENDENCY_GRAPH_REFRESH_SECONDS)
+- record_entity(): write-through after each committed write in this instance
+- handle_event(): entity snapshots published by other instances
+  (event data["graph"], see `snapshot`)
+"""
+import asyncio
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, FrozenSet, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..db.models import Entity as EntityModel, Dependency as DependencyModel
+
+logger = logging.getLogger(__name__)
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Comparable timestamps: DB values are timezone-aware, model defaults naive UTC."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+@dataclass
+class EntityNode:
+    """Entity state needed for dependency validation."""
+    name: str
+    status: Optional[str]
+    health_status: Optional[str]
+    deleted: bool
+    updated_at: Optional[datetime]
+
+
+def snapshot(entity: EntityModel, dependencies: Optional[Dict[UUID, str]] = None) -> Dict[str, Any]:
+    """
+    JSON-serializable graph state of an entity, as carried in event data["graph"].
+
+    Args:
+        entity: Entity after the write
+        dependencies: Active dependencies {depends_on_entity_id: dependency_type};
+            None leaves the entity's indexed edges unchanged
+    """
+    state = {
+        "entity_id": str(entity.entity_id),
+        "name": entity.name,
+        "status": entity.status,
+        "health_status": entity.health_status,
+        "deleted": entity.deleted_at is not None,
+        "updated_at": entity.updated_at.isoformat() if entity.updated_at else None,
+    }
+    if dependencies is not None:
+        state["dependencies"] = {str(dep_id): dep_type for dep_id, dep_type in dependencies.items()}
+    return state
+
+
+class DependencyGraphIndex:
+    """
+    Dependency graph of all entities, answered from memory.
+
+    Transitive closures (dependencies and dependents) are cached per entity
+    and invalidated whenever an edge changes, so repeated validations of the
+    same entities cost a dictionary lookup.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._nodes: Dict[UUID, EntityNode] = {}
+        self._forward: Dict[UUID, Dict[UUID, str]] = {}
+        self._reverse: Dict[UUID, Set[UUID]] = {}
+        self._closures: Dict[UUID, FrozenSet[UUID]] = {}
+        self._impacts: Dict[UUID, FrozenSet[UUID]] = {}
+        self.ready = False
+        self.built_at: Optional[datetime] = None
+        # Write sequence numbers, so a rebuild keeps writes applied while it was loading
+        self._writes = 0
+        self._node_writes: Dict[UUID, int] = {}
+        self._edge_writes: Dict[UUID, int] = {}
+
+    # ==================== MAINTENANCE ====================
+
+    def rebuild(self, db: Session) -> None:
+        """
+        Load the whole graph from the database, replacing the current index.
+
+        Entity state and edges written to the index while the load runs are
+        kept unless the loaded row is newer, so a rebuild cannot undo them.
+        """
+        with self._lock:
+            started = self._writes
+
+        nodes = {
+            row.entity_id: EntityNode(
+                name=row.name,
+                status=row.status,
+                health_status=row.health_status,
+                deleted=row.deleted_at is not None,
+                updated_at=_naive_utc(row.updated_at),
+            )
+            for row in db.execute(select(
+                EntityModel.entity_id, EntityModel.name, EntityModel.status,
+                EntityModel.health_status, EntityModel.deleted_at, EntityModel.updated_at
+            ))
+        }
+
+        forward: Dict[UUID, Dict[UUID, str]] = {}
+        for entity_id, depends_on_id, dep_type in db.execute(
+            select(
+                DependencyModel.entity_id,
+                DependencyModel.depends_on_entity_id,
+                DependencyModel.dependency_type
+            ).where(DependencyModel.status == 'active')
+        ):
+            forward.setdefault(entity_id, {})[depends_on_id] = dep_type
+
+        with self._lock:
+            for entity_id, write in self._node_writes.items():
+                current = self._nodes.get(entity_id)
+                if write <= started or current is None or self._is_newer(nodes.get(entity_id), current):
+                    continue
+                nodes[entity_id] = current
+                if self._edge_writes.get(entity_id, 0) > started:
+                    if self._forward.get(entity_id):
+                        forward[entity_id] = dict(self._forward[entity_id])
+                    else:
+                        forward.pop(entity_id, None)
+
+            reverse: Dict[UUID, Set[UUID]] = {}
+            for entity_id, dependencies in forward.items():
+                for depends_on_id in dependencies:
+                    reverse.setdefault(depends_on_id, set()).add(entity_id)
+
+            self._nodes = nodes
+            self._forward = forward
+            self._reverse = reverse
+            self._closures.clear()
+            self._impacts.clear()
+            self._node_writes.clear()
+            self._edge_writes.clear()
+            self.ready = True
+            self.built_at = datetime.utcnow()
+
+        n_edges = sum(len(deps) for deps in forward.values())
+        logger.info(f"Dependency graph index built: {len(nodes)} entities, {n_edges} dependencies")
+
+    @staticmethod
+    def _is_newer(loaded: Optional[EntityNode], current: EntityNode) -> bool:
+        """Whether a loaded row supersedes the indexed node."""
+        return (loaded is not None and loaded.updated_at is not None
+                and current.updated_at is not None and loaded.updated_at > current.updated_at)
+
+    def ensure_ready(self, db: Session) -> None:
+        """Build the index from `db` if the startup build did not happen."""
+        if not self.ready:
+            self.rebuild(db)
+
+    async def refresh(self) -> None:
+        """Rebuild from a fresh session without blocking the event loop (e.g. after missed events)."""
+        from ..db.database import SessionLocal
+
+        def run():
+            with SessionLocal() as db:
+                self.rebuild(db)
+
+        try:
+            await asyncio.to_thread(run)
+        except Exception as e:
+            logger.error(f"Dependency graph index refresh failed: {e}")
+
+    def record_entity(
+        self,
+        entity: EntityModel,
+        dependencies: Optional[Dict[UUID, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Apply a committed entity write to the index.
+
+        Returns:
+            The entity's snapshot, to publish as event data["graph"]
+        """
+        state = snapshot(entity, dependencies)
+        self.apply_snapshot(state)
+        return state
+
+    def apply_snapshot(self, state: Dict[str, Any]) -> bool:
+        """
+        Apply an entity snapshot (see `snapshot`).
+
+        Snapshots older than the indexed state of the entity are ignored, so
+        late or replayed events cannot undo newer writes.
+
+        Returns:
+            True if the index changed
+        """
+        entity_id = UUID(str(state["entity_id"]))
+        updated_at = state.get("updated_at")
+        if isinstance(updated_at, str):
+            updated_at = datetime.fromisoformat(updated_at)
+        updated_at = _naive_utc(updated_at)
+
+        with self._lock:
+            current = self._nodes.get(entity_id)
+            if (current is not None and current.updated_at is not None
+                    and updated_at is not None and updated_at < current.updated_at):
+                return False
+
+            self._nodes[entity_id] = EntityNode(
+                name=state.get("name") or (current.name if current else str(entity_id)),
+                status=state.get("status"),
+                health_status=state.get("health_status"),
+                deleted=bool(state.get("deleted")),
+                updated_at=updated_at,
+            )
+            if self._nodes[entity_id].deleted != (current is not None and current.deleted):
+                # Traversals skip deleted entities
+                self._closures.clear()
+                self._impacts.clear()
+
+            self._writes += 1
+            self._node_writes[entity_id] = self._writes
+
+            if "dependencies" in state:
+                self._set_dependencies(entity_id, {
+                    UUID(str(dep_id)): dep_type
+                    for dep_id, dep_type in (state["dependencies"] or {}).items()
+                })
+                self._edge_writes[entity_id] = self._writes
+        return True
+
+    async def handle_event(self, event: Dict[str, Any]) -> None:
+        """NATS callback: apply the graph snapshot(s) carried by a library event."""
+        graph = (event.get("data") or {}).get("graph")
+        if not graph:
+            return
+        for state in graph if isinstance(graph, list) else [graph]:
+            self.apply_snapshot(state)
+
+    def _set_dependencies(self, entity_id: UUID, dependencies: Dict[UUID, str]) -> None:
+        """Replace an entity's outgoing edges (caller holds the lock)."""
+        previous = self._forward.get(entity_id, {})
+        if previous == dependencies:
+            return
+
+        for dep_id in previous.keys() - dependencies.keys():
+            dependents = self._reverse.get(dep_id)
+            if dependents is not None:
+                dependents.discard(entity_id)
+                if not dependents:
+                    del self._reverse[dep_id]
+        for dep_id in dependencies.keys() - previous.keys():
+            self._reverse.setdefault(dep_id, set()).add(entity_id)
+
+        if dependencies:
+            self._forward[entity_id] = dict(dependencies)
+        else:
+            self._forward.pop(entity_id, None)
+
+        # Any closure may pass through the changed edges
+        self._closures.clear()
+        self._impacts.clear()
+
+    # ==================== QUERIES ====================
+
+    def dependency_closure(self, entity_id: UUID) -> FrozenSet[UUID]:
+        """Everything entity_id depends on, directly or transitively (not through deleted entities)."""
+        with self._lock:
+            closure = self._closures.get(entity_id)
+            if closure is None:
+                closure = self._reachable(entity_id, self._forward)
+                self._closures[entity_id] = closure
+            return closure
+
+    def impact_set(self, entity_id: UUID) -> FrozenSet[UUID]:
+        """Every non-deleted entity depending on entity_id, directly or transitively."""
+        with self._lock:
+            impact = self._impacts.get(entity_id)
+            if impact is None:
+                impact = self._reachable(entity_id, self._reverse)
+                self._impacts[entity_id] = impact
+            return impact
+
+    def reaches(self, source: UUID, target: UUID) -> bool:
+        """Whether source depends on target, directly or transitively."""
+        return target in self.dependency_closure(source)
+
+    def find_cycle(self, entity_id: UUID) -> Optional[List[UUID]]:
+        """
+        Shortest dependency cycle through entity_id.
+
+        Returns:
+            [entity_id, ..., entity_id], or None if entity_id is not on a cycle
+        """
+        with self._lock:
+            if not self.reaches(entity_id, entity_id):
+                return None
+
+            parents: Dict[UUID, UUID] = {}
+            queue = deque([entity_id])
+            while queue:
+                node = queue.popleft()
+                for dep_id in self._forward.get(node, ()):
+                    if dep_id != entity_id and self._deleted(dep_id):
+                        continue
+                    if dep_id == entity_id:
+                        path = [node]
+                        while path[-1] != entity_id:
+                            path.append(parents[path[-1]])
+                        return path[::-1] + [entity_id]
+                    if dep_id not in parents:
+                        parents[dep_id] = node
+                        queue.append(dep_id)
+            return None
+
+    def validate_dependencies(self, entity_id: UUID) -> dict:
+        """
+        Validate an entity's dependencies from the index.
+
+        Same result shape as `DependencyService.validate_dependencies`, plus
+        a circular dependency check.
+        """
+        errors = []
+        warnings = []
+
+        with self._lock:
+            dependencies = self._forward.get(entity_id, {})
+            for dep_id in dependencies:
+                dep = self._nodes.get(dep_id)
+
+                if dep is None:
+                    errors.append(f"Dependency entity {dep_id} not found")
+                    continue
+
+                if dep.deleted:
+                    errors.append(f"Dependency {dep.name} is deleted")
+                    continue
+
+                if dep.status == 'failed':
+                    warnings.append(f"Dependency {dep.name} is in failed state")
+
+                if dep.health_status == 'unhealthy':
+                    warnings.append(f"Dependency {dep.name} is unhealthy")
+
+            cycle = self.find_cycle(entity_id)
+            if cycle:
+                errors.append("Circular dependency: " + " -> ".join(self._name(n) for n in cycle))
+
+        return {
+            'valid': len(errors) == 0,
+            'dependency_count': len(dependencies),
+            'errors': errors,
+            'warnings': warnings
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'entities': len(self._nodes),
+                'dependencies': sum(len(deps) for deps in self._forward.values()),
+                'built_at': self.built_at.isoformat() if self.built_at else None,
+            }
+
+    def _name(self, entity_id: UUID) -> str:
+        node = self._nodes.get(entity_id)
+        return node.name if node else str(entity_id)
+
+    def _deleted(self, entity_id: UUID) -> bool:
+        node = self._nodes.get(entity_id)
+        return node is not None and node.deleted
+
+    def _reachable(self, start: UUID, adjacency: Dict[UUID, Any]) -> FrozenSet[UUID]:
+        """
+        Nodes reachable from start in one or more steps.
+
+        Soft-deleted entities keep their active edges, so they are skipped
+        (neither returned nor walked through).
+        """
+        seen: Set[UUID] = set()
+        stack = list(adjacency.get(start, ()))
+        while stack:
+            node = stack.pop()
+            if node in seen or (node != start and self._deleted(node)):
+                continue
+            seen.add(node)
+            stack.extend(adjacency.get(node, ()))
+        return frozenset(seen)
+
+
+# Global dependency graph index
+dependency_graph = DependencyGraphIndex()
@@ -2,24 +2,64 @@
 Dependency service for managing entity dependencies.
 
 Synchronizes between entity.requirements (simple array) and dependencies table (relational).
+
+Graph traversals (dependency tree, cycle check) run as a single recursive CTE
+instead of one query per node.
 """
-from sqlalchemy.orm import Session
+from collections import defaultdict
+from sqlalchemy import and_, delete, exists, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from uuid import UUID
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from ..db.models import Entity as EntityModel, Dependency as DependencyModel
 
 logger = logging.getLogger(__name__)
 
 
+def _reachable(start, max_depth: Optional[int] = None):
+    """
+    Recursive CTE of entities reachable from `start` over active dependencies.
+
+    Args:
+        start: Select of the starting entity IDs (one column)
+        max_depth: Stop expanding at this depth (adds a `depth` column);
+            None = full closure, which terminates on cycles since rows are distinct
+
+    Returns:
+        CTE with a `node` column (and `depth` if bounded)
+    """
+    if max_depth is None:
+        reach = start.cte("reach", recursive=True)
+        step = select(DependencyModel.depends_on_entity_id).join(
+            reach, DependencyModel.entity_id == reach.c.node
+        ).where(DependencyModel.status == 'active')
+        return reach.union(step)
+
+    reach = start.add_columns(literal_column("0").label("depth")).cte("reach", recursive=True)
+    step = select(DependencyModel.depends_on_entity_id, reach.c.depth + 1).join(
+        reach, DependencyModel.entity_id == reach.c.node
+    ).where(
+        DependencyModel.status == 'active',
+        reach.c.depth + 1 < max_depth
+    )
+    return reach.union(step)
+
+
 class DependencyService:
-    """Service for managing entity dependencies."""
+    """
+    Service for managing entity dependencies.
+
+    Used by the async entity endpoints (AsyncSession). Swap and deployment
+    validation read the in-process index (`dependency_graph.validate_dependencies`).
+    """
 
     @staticmethod
-    def sync_dependencies(
+    async def sync_dependencies(
         entity: EntityModel,
-        db: Session
+        db: AsyncSession
     ) -> None:
         """
         Synchronize entity.requirements with dependencies table.
@@ -33,123 +73,99 @@ class DependencyService:
         """
         if not entity.requirements:
             # No requirements - remove all dependencies
-            db.query(DependencyModel).filter(
-                DependencyModel.entity_id == entity.entity_id
-            ).delete()
+            await db.execute(
+                delete(DependencyModel).where(DependencyModel.entity_id == entity.entity_id)
+            )
             logger.debug(f"Cleared all dependencies for {entity.entity_id}")
             return
 
-        # Get existing dependencies
-        existing_deps = db.query(DependencyModel).filter(
-            DependencyModel.entity_id == entity.entity_id
-        ).all()
+        required_dep_ids = set()
+        for dep_id_str in entity.requirements:
+            try:
+                required_dep_ids.add(UUID(dep_id_str))
+            except (ValueError, AttributeError, TypeError) as e:
+                logger.error(f"Invalid dependency ID {dep_id_str}: {e}")
 
-        existing_dep_ids = {str(dep.depends_on_entity_id) for dep in existing_deps}
-        required_dep_ids = set(entity.requirements)
+        # Get existing dependencies
+        existing_dep_ids = set((await db.scalars(
+            select(DependencyModel.depends_on_entity_id).where(
+                DependencyModel.entity_id == entity.entity_id
+            )
+        )).all())
 
         # Remove dependencies no longer in requirements
         to_remove = existing_dep_ids - required_dep_ids
         if to_remove:
-            db.query(DependencyModel).filter(
-                DependencyModel.entity_id == entity.entity_id,
-                DependencyModel.depends_on_entity_id.in_([UUID(dep_id) for dep_id in to_remove])
-            ).delete(synchronize_session=False)
+            await db.execute(
+                delete(DependencyModel).where(
+                    DependencyModel.entity_id == entity.entity_id,
+                    DependencyModel.depends_on_entity_id.in_(to_remove)
+                )
+            )
             logger.debug(f"Removed {len(to_remove)} dependencies for {entity.entity_id}")
 
-        # Add new dependencies
+        # Add new dependencies (verifying the dependency entities exist in one query)
         to_add = required_dep_ids - existing_dep_ids
-        for dep_id_str in to_add:
-            try:
-                dep_id = UUID(dep_id_str)
-
-                # Verify the dependency entity exists
-                dep_entity = db.query(EntityModel).filter(
-                    EntityModel.entity_id == dep_id,
+        if to_add:
+            found = set((await db.scalars(
+                select(EntityModel.entity_id).where(
+                    EntityModel.entity_id.in_(to_add),
                     EntityModel.deleted_at.is_(None)
-                ).first()
+                )
+            )).all())
 
-                if not dep_entity:
+            for dep_id in to_add:
+                if dep_id not in found:
                     logger.warning(f"Dependency entity {dep_id} not found for {entity.entity_id}")
                     continue
 
-                # Create dependency record
-                dependency = DependencyModel(
+                db.add(DependencyModel(
                     entity_id=entity.entity_id,
                     depends_on_entity_id=dep_id,
                     dependency_type='required',  # Default type
                     status='active'
-                )
-                db.add(dependency)
+                ))
                 logger.debug(f"Added dependency {dep_id} for {entity.entity_id}")
 
-            except (ValueError, AttributeError) as e:
-                logger.error(f"Invalid dependency ID {dep_id_str}: {e}")
-                continue
-
-        db.flush()
+        await db.flush()
         logger.info(f"Synced {len(required_dep_ids)} dependencies for {entity.entity_id}")
 
     @staticmethod
-    def validate_dependencies(
+    async def active_dependencies(
         entity_id: UUID,
-        db: Session
-    ) -> dict:
-        """
-        Validate all dependencies for an entity.
-
-        Checks:
-        - All dependency entities exist
-        - No circular dependencies
-        - Dependencies are not deleted
-        - Dependencies are in valid state
+        db: AsyncSession
+    ) -> Dict[UUID, str]:
+        """Active direct dependencies as {depends_on_entity_id: dependency_type}."""
+        rows = await db.execute(
+            select(DependencyModel.depends_on_entity_id, DependencyModel.dependency_type).where(
+                DependencyModel.entity_id == entity_id,
+                DependencyModel.status == 'active'
+            )
+        )
+        return {depends_on_id: dep_type for depends_on_id, dep_type in rows}
 
-        Returns:
-            dict with validation results
-        """
-        errors = []
-        warnings = []
-
-        dependencies = db.query(DependencyModel).filter(
-            DependencyModel.entity_id == entity_id,
-            DependencyModel.status == 'active'
-        ).all()
-
-        for dep in dependencies:
-            # Check if dependency entity exists
-            dep_entity = db.query(EntityModel).filter(
-                EntityModel.entity_id == dep.depends_on_entity_id
-            ).first()
-
-            if not dep_entity:
-                errors.append(f"Dependency entity {dep.depends_on_entity_id} not found")
-                continue
-
-            # Check if deleted
-            if dep_entity.deleted_at:
-                errors.append(f"Dependency {dep_entity.name} is deleted")
-                continue
-
-            # Check status
-            if dep_entity.status == 'failed':
-                warnings.append(f"Dependency {dep_entity.name} is in failed state")
-
-            # Check health
-            if dep_entity.health_status == 'unhealthy':
-                warnings.append(f"Dependency {dep_entity.name} is unhealthy")
-
-        return {
-            'valid': len(errors) == 0,
-            'dependency_count': len(dependencies),
-            'errors': errors,
-            'warnings': warnings
-        }
+    @staticmethod
+    async def get_dependencies(
+        entity_id: UUID,
+        db: AsyncSession
+    ) -> List[DependencyModel]:
+        """Active direct dependencies of an entity, with depends_on_entity eager-loaded."""
+        result = await db.scalars(
+            select(DependencyModel)
+            .options(joinedload(DependencyModel.depends_on_entity))
+            .where(
+                DependencyModel.entity_id == entity_id,
+                DependencyModel.status == 'active'
+            )
+            .order_by(DependencyModel.created_at)
+        )
+        return list(result.all())
 
     @staticmethod
-    def check_circular_dependency(
+    async def check_circular_dependency(
         entity_id: UUID,
         depends_on_id: UUID,
-        db: Session,
-        visited: Optional[set] = None
+        db: AsyncSession
     ) -> bool:
         """
         Check if adding a dependency would create a circular dependency.
@@ -158,89 +174,101 @@ class DependencyService:
             entity_id: The entity that would depend on depends_on_id
             depends_on_id: The entity being depended upon
             db: Database session
-            visited: Set of visited entity IDs (for recursion)
 
         Returns:
             True if circular dependency detected, False otherwise
         """
-        if visited is None:
-            visited = set()
-
         # If depends_on_id depends on entity_id (directly or indirectly), circular
         if depends_on_id == entity_id:
             return True
 
-        if depends_on_id in visited:
-            return False
-
-        visited.add(depends_on_id)
-
-        # Get all dependencies of depends_on_id
-        deps = db.query(DependencyModel).filter(
-            DependencyModel.entity_id == depends_on_id,
-            DependencyModel.status == 'active'
-        ).all()
-
-        for dep in deps:
-            if DependencyService.check_circular_dependency(
-                entity_id, dep.depends_on_entity_id, db, visited
-            ):
-                return True
-
-        return False
+        reach = _reachable(
+            select(DependencyModel.depends_on_entity_id.label("node")).where(
+                DependencyModel.entity_id == depends_on_id,
+                DependencyModel.status == 'active'
+            )
+        )
+        return bool(await db.scalar(
+            select(exists().where(reach.c.node == entity_id))
+        ))
 
     @staticmethod
-    def get_dependency_tree(
+    async def get_dependency_tree(
         entity_id: UUID,
-        db: Session,
-        depth: int = 0,
+        db: AsyncSession,
         max_depth: int = 10
     ) -> dict:
         """
         Get the full dependency tree for an entity.
 
+        One recursive query fetches every entity within max_depth and its
+        active dependencies; the tree is then assembled in memory.
+
         Args:
             entity_id: Root entity ID
             db: Database session
-            depth: Current recursion depth
-            max_depth: Maximum recursion depth
+            max_depth: Maximum tree depth
 
         Returns:
             dict representing dependency tree
         """
-        if depth >= max_depth:
-            return {'error': 'Max depth reached'}
-
-        entity = db.query(EntityModel).filter(
-            EntityModel.entity_id == entity_id,
-            EntityModel.deleted_at.is_(None)
-        ).first()
-
-        if not entity:
-            return {'error': 'Entity not found'}
-
-        dependencies = db.query(DependencyModel).filter(
-            DependencyModel.entity_id == entity_id,
-            DependencyModel.status == 'active'
-        ).all()
-
-        tree = {
-            'entity_id': str(entity_id),
-            'name': entity.name,
-            'type': entity.type,
-            'status': entity.status,
-            'dependencies': []
-        }
-
-        for dep in dependencies:
-            subtree = DependencyService.get_dependency_tree(
-                dep.depends_on_entity_id, db, depth + 1, max_depth
+        reach = _reachable(
+            select(EntityModel.entity_id.label("node")).where(EntityModel.entity_id == entity_id),
+            max_depth=max_depth
+        )
+        nodes = select(reach.c.node).distinct().subquery()
+
+        rows = (await db.execute(
+            select(
+                nodes.c.node,
+                EntityModel.name,
+                EntityModel.type,
+                EntityModel.status,
+                EntityModel.deleted_at,
+                DependencyModel.depends_on_entity_id,
+                DependencyModel.dependency_type,
+                DependencyModel.min_version,
+                DependencyModel.max_version
             )
-            tree['dependencies'].append({
-                'dependency_type': dep.dependency_type,
-                'min_version': dep.min_version,
-                'max_version': dep.max_version,
-                'entity': subtree
-            })
-
-        return tree
+            .select_from(nodes)
+            .outerjoin(EntityModel, EntityModel.entity_id == nodes.c.node)
+            .outerjoin(DependencyModel, and_(
+                DependencyModel.entity_id == nodes.c.node,
+                DependencyModel.status == 'active'
+            ))
+            .order_by(nodes.c.node, DependencyModel.created_at)
+        )).all()
+
+        entities = {}
+        edges = defaultdict(list)
+        for row in rows:
+            if row.name is not None and row.deleted_at is None:
+                entities[row.node] = row
+            if row.depends_on_entity_id is not None:
+                edges[row.node].append(row)
+
+        def build(node: UUID, depth: int) -> dict:
+            if depth >= max_depth:
+                return {'error': 'Max depth reached'}
+
+            entity = entities.get(node)
+            if entity is None:
+                return {'error': 'Entity not found'}
+
+            return {
+                'entity_id': str(node),
+                'name': entity.name,
+                'type': entity.type,
+                'status': entity.status,
+                'dependencies': [
+                    {
+                        'dependency_type': edge.dependency_type,
+                        'min_version': edge.min_version,
+                        'max_version': edge.max_version,
+                        'entity': build(edge.depends_on_entity_id, depth + 1)
+                    }
+                    for edge in edges[node]
+                ]
+            }
+
+        return build(entity_id, 0)
@@ -9,6 +9,7 @@ from typing import Optional
 
 from ..db.models import Entity as EntityModel, Deployment as DeploymentModel
 from ..schemas.deployment import DeploymentValidation
+from .dependency_graph import dependency_graph
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +30,7 @@ class DeploymentService:
         - Entity exists and not deleted
         - Entity is in validated or registered status
         - No active deployment in target environment
-        - Dependencies are met
+        - Dependencies are met and not circular
         """
         errors = []
         warnings = []
@@ -61,6 +62,16 @@ class DeploymentService:
             errors.append("Entity version is required")
         checks['has_version'] = entity.version is not None
 
+        # Check 5: Dependencies met and acyclic (in-process graph index)
+        dependency_graph.ensure_ready(db)
+        dep_validation = dependency_graph.validate_dependencies(entity.entity_id)
+        for error in dep_validation['errors']:
+            errors.append(f"Dependency error: {error}")
+        for warning in dep_validation['warnings']:
+            warnings.append(f"Dependency warning: {warning}")
+        checks['dependencies_valid'] = dep_validation['valid']
+        checks['dependency_count'] = dep_validation['dependency_count']
+
         passed = len(errors) == 0
 
         return DeploymentValidation(
@@ -10,6 +10,7 @@ import time
 
 from ..db.models import Entity as EntityModel, Deployment as DeploymentModel, Swap as SwapModel
 from ..schemas.swap import SwapValidation, SwapStatus
+from .dependency_graph import dependency_graph
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +33,7 @@ class SwapService:
         - Both entities are same type (strategy->strategy, pipeline->pipeline)
         - From entity has active deployment in target environment
         - To entity is ready for deployment
-        - No circular dependencies would be created
+        - To entity does not depend on the from entity (directly or transitively)
         - Configuration compatibility
         """
         errors = []
@@ -150,18 +151,32 @@ class SwapService:
         else:
             checks['categories_match'] = True
 
-        # Check 10: Dependencies validation
-        if to_entity.requirements:
-            from ..services.dependency_service import DependencyService
-            dep_validation = DependencyService.validate_dependencies(to_entity_id, db)
-            if not dep_validation['valid']:
-                for error in dep_validation['errors']:
-                    errors.append(f"Dependency error: {error}")
-            for warning in dep_validation['warnings']:
-                warnings.append(f"Dependency warning: {warning}")
-            checks['dependencies_valid'] = dep_validation['valid']
+        # Check 10: Dependencies validation (in-process graph index, no per-node queries)
+        dependency_graph.ensure_ready(db)
+        dep_validation = dependency_graph.validate_dependencies(to_entity_id)
+        for error in dep_validation['errors']:
+            errors.append(f"Dependency error: {error}")
+        for warning in dep_validation['warnings']:
+            warnings.append(f"Dependency warning: {warning}")
+        checks['dependencies_valid'] = dep_validation['valid']
+
+        # Check 11: To entity must not rely on the entity the swap deactivates
+        if dependency_graph.reaches(to_entity_id, from_entity_id):
+            errors.append(
+                f"To entity {to_entity.name} depends on {from_entity.name} "
+                f"(directly or transitively), which the swap deactivates"
+            )
+            checks['to_independent_of_from'] = False
         else:
-            checks['dependencies_valid'] = True
+            checks['to_independent_of_from'] = True
+
+        # Check 12: Entities affected by replacing the from entity (warning only)
+        impacted = dependency_graph.impact_set(from_entity_id)
+        checks['impacted_entities'] = len(impacted)
+        if impacted:
+            warnings.append(
+                f"{len(impacted)} entities depend on {from_entity.name} (directly or transitively)"
+            )
 
         # Determine if swap can proceed
         passed = len(errors) == 0
@@ -7,7 +7,8 @@ import asyncio
 from typing import Dict, List
 from datetime import datetime
 
-from ..core.models import Order, OrderSide, OrderType
+from ..core.models import OrderSide, OrderType
+from ..core.records import SimOrder
 from ..config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -22,7 +23,7 @@ class Agent:
         self.positions: Dict[str, float] = {}  # symbol -> quantity
         self.cash = 1000000.0  # Starting capital
 
-    async def generate_orders(self, symbol: str, engine) -> List[Order]:
+    async def generate_orders(self, symbol: str, engine) -> List[SimOrder]:
         """Generate orders for this agent. Override in subclasses."""
         return []
 
@@ -37,7 +38,7 @@ class MarketMaker(Agent):
         self.spread = 0.001  # 0.1% spread
         self.quote_size = 100.0
 
-    async def generate_orders(self, symbol: str, engine) -> List[Order]:
+    async def generate_orders(self, symbol: str, engine) -> List[SimOrder]:
         """Generate bid/ask quotes around current price."""
         orders = []
 
@@ -58,7 +59,7 @@ class MarketMaker(Agent):
         ask_price = current_price + half_spread
 
         # Create bid order (buy)
-        bid = Order(
+        bid = SimOrder(
             symbol=symbol,
             side=OrderSide.BUY,
             order_type=OrderType.LIMIT,
@@ -69,7 +70,7 @@ class MarketMaker(Agent):
         orders.append(bid)
 
         # Create ask order (sell)
-        ask = Order(
+        ask = SimOrder(
             symbol=symbol,
             side=OrderSide.SELL,
             order_type=OrderType.LIMIT,
@@ -92,7 +93,7 @@ class NoiseTrader(Agent):
         self.order_probability = 0.05  # 5% chance per tick
         self.max_order_size = 50.0
 
-    async def generate_orders(self, symbol: str, engine) -> List[Order]:
+    async def generate_orders(self, symbol: str, engine) -> List[SimOrder]:
         """Generate random orders."""
         orders = []
 
@@ -114,7 +115,7 @@ class NoiseTrader(Agent):
         # Random order type (70% market, 30% limit)
         if random.random() < 0.7:
             # Market order
-            order = Order(
+            order = SimOrder(
                 symbol=symbol,
                 side=side,
                 order_type=OrderType.MARKET,
@@ -126,7 +127,7 @@ class NoiseTrader(Agent):
             offset_pct = random.uniform(-0.01, 0.01)  # +/- 1%
             price = current_price * (1 + offset_pct)
 
-            order = Order(
+            order = SimOrder(
                 symbol=symbol,
                 side=side,
                 order_type=OrderType.LIMIT,
@@ -150,7 +151,7 @@ class InformedTrader(Agent):
         self.order_size = 75.0
         self.order_probability = 0.1  # 10% chance per tick
 
-    async def generate_orders(self, symbol: str, engine) -> List[Order]:
+    async def generate_orders(self, symbol: str, engine) -> List[SimOrder]:
         """Generate orders based on momentum signals."""
         orders = []
 
@@ -172,7 +173,7 @@ class InformedTrader(Agent):
         side = OrderSide.BUY if momentum > 0 else OrderSide.SELL
 
         # Use market orders for informed trading
-        order = Order(
+        order = SimOrder(
             symbol=symbol,
             side=side,
             order_type=OrderType.MARKET,
@@ -195,7 +196,7 @@ class MomentumTrader(Agent):
         self.order_size = 60.0
         self.order_probability = 0.08  # 8% chance per tick
 
-    async def generate_orders(self, symbol: str, engine) -> List[Order]:
+    async def generate_orders(self, symbol: str, engine) -> List[SimOrder]:
         """Generate orders following momentum."""
         orders = []
 
@@ -220,7 +221,7 @@ class MomentumTrader(Agent):
         price_offset = 0.0005 if side == OrderSide.BUY else -0.0005
         price = current_price * (1 + price_offset)
 
-        order = Order(
+        order = SimOrder(
             symbol=symbol,
             side=side,
             order_type=OrderType.LIMIT,
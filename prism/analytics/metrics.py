@@ -3,10 +3,12 @@ Analytics & Metrics - market microstructure analytics.
 """
 import logging
 import math
-from typing import Dict, List, Optional
+from typing import Dict, Optional
 from collections import defaultdict, deque
 
-from ..core.models import Fill, OrderBook
+import numpy as np
+
+from ..core.models import OrderBook
 from ..config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -44,17 +46,18 @@ class Analytics:
 
         # Order book metrics
         if symbol in self.engine.order_books:
-            order_book = self.engine.order_books[symbol]
+            order_book = self.engine.get_order_book(symbol)
             metrics['bid_ask_spread'] = self.calculate_bid_ask_spread(order_book)
             metrics['mid_price'] = self.calculate_mid_price(order_book)
             metrics['order_book_imbalance'] = self.calculate_order_book_imbalance(order_book)
             metrics['depth_5'] = self.calculate_book_depth(order_book, levels=5)
 
-        # Fill-based metrics
-        symbol_fills = [f for f in self.engine.fills if f.symbol == symbol]
-        if symbol_fills:
-            metrics['effective_spread'] = self.calculate_effective_spread(symbol_fills)
-            metrics['price_impact'] = self.calculate_price_impact(symbol_fills)
+        # Fill-based metrics (read as columns from the fill buffer)
+        fill_indices = self.engine.fills.symbol_indices(symbol)
+        if len(fill_indices):
+            prices = self.engine.fills.column('price', fill_indices[-100:])
+            metrics['effective_spread'] = self.calculate_effective_spread(symbol, prices)
+            metrics['price_impact'] = self.calculate_price_impact(prices)
             metrics['realized_volatility'] = self.calculate_realized_volatility(symbol)
 
         # Market state metrics
@@ -119,57 +122,40 @@ class Analytics:
             'total_depth': bid_depth + ask_depth
         }
 
-    def calculate_effective_spread(self, fills: List[Fill]) -> Optional[float]:
+    def calculate_effective_spread(self, symbol: str, prices: np.ndarray) -> Optional[float]:
         """
-        Calculate effective spread.
+        Calculate effective spread over recent fill prices.
         Effective spread = 2 * |trade_price - mid_price|
         """
-        if not fills or len(fills) < 10:
+        if len(prices) < 10 or symbol not in self.engine.order_books:
             return None
 
-        # Use recent fills
-        recent_fills = fills[-100:]
-
-        spreads = []
-        for fill in recent_fills:
-            symbol = fill.symbol
-            if symbol not in self.engine.order_books:
-                continue
+        order_book = self.engine.get_order_book(symbol)
+        mid_price = self.calculate_mid_price(order_book)
 
-            order_book = self.engine.order_books[symbol]
-            mid_price = self.calculate_mid_price(order_book)
-
-            if mid_price:
-                effective_spread = 2 * abs(fill.price - mid_price)
-                spreads.append(effective_spread)
+        if not mid_price:
+            return None
 
-        if spreads:
-            return sum(spreads) / len(spreads)
-        return None
+        return float(np.mean(2 * np.abs(prices[-100:] - mid_price)))
 
-    def calculate_price_impact(self, fills: List[Fill]) -> Optional[float]:
+    def calculate_price_impact(self, prices: np.ndarray) -> Optional[float]:
         """
-        Calculate average price impact.
+        Calculate average price impact over recent fill prices.
         Impact = (execution_price - pre_trade_price) / pre_trade_price
         """
-        if not fills or len(fills) < 10:
+        if len(prices) < 10:
             return None
 
-        # Simplified: use recent fills
-        recent_fills = fills[-100:]
+        # Simplified: consecutive recent fills
+        recent = prices[-100:]
+        prev_prices = recent[:-1]
+        valid = prev_prices > 0
 
-        impacts = []
-        for i in range(1, len(recent_fills)):
-            prev_price = recent_fills[i-1].price
-            curr_price = recent_fills[i].price
-
-            if prev_price > 0:
-                impact = abs(curr_price - prev_price) / prev_price
-                impacts.append(impact)
+        if not valid.any():
+            return None
 
-        if impacts:
-            return sum(impacts) / len(impacts)
-        return None
+        impacts = np.abs(recent[1:][valid] - prev_prices[valid]) / prev_prices[valid]
+        return float(impacts.mean())
 
     def calculate_realized_volatility(self, symbol: str) -> Optional[float]:
         """
@@ -206,21 +192,19 @@ class Analytics:
 
         return volatility
 
-    def calculate_vwap(self, fills: List[Fill]) -> Optional[float]:
+    def calculate_vwap(self, prices: np.ndarray, quantities: np.ndarray) -> Optional[float]:
         """
         Calculate volume-weighted average price.
         VWAP = sum(price * quantity) / sum(quantity)
         """
-        if not fills:
+        if len(prices) == 0:
             return None
 
-        total_value = sum(f.price * f.quantity for f in fills)
-        total_volume = sum(f.quantity for f in fills)
-
+        total_volume = quantities.sum()
         if total_volume == 0:
             return None
 
-        return total_value / total_volume
+        return float(np.dot(prices, quantities) / total_volume)
 
     def get_metrics(self, symbol: str) -> dict:
         """Get cached metrics for symbol."""
@@ -3,11 +3,12 @@ PRISM Core Engine - orchestrates all components.
 """
 import asyncio
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Optional, Union
 from datetime import datetime
 from uuid import UUID
 
 from .models import Order, Fill, OrderBook, MarketState
+from .records import SimOrder, FillBuffer
 from ..config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -22,8 +23,8 @@ class PRISMEngine:
     def __init__(self):
         self.symbols: Dict[str, MarketState] = {}
         self.order_books: Dict[str, OrderBook] = {}
-        self.active_orders: Dict[UUID, Order] = {}
-        self.fills: List[Fill] = []
+        self.active_orders: Dict[int, SimOrder] = {}
+        self.fills = FillBuffer()
         self.running = False
 
         # Components (will be initialized when implemented)
@@ -157,20 +158,34 @@ class PRISMEngine:
 
         logger.info(f"Added symbol {symbol} at ${initial_price}")
 
-    async def submit_order(self, order: Order) -> UUID:
-        """Submit an order to PRISM."""
-        self.active_orders[order.order_id] = order
+    async def submit_order(self, order: Union[Order, SimOrder]) -> Union[UUID, int]:
+        """
+        Submit an order to PRISM.
+
+        API orders are converted to a SimOrder for matching and their execution
+        state is copied back afterwards; the UUID is returned. Internal SimOrders
+        are processed as-is and their integer id is returned.
+        """
+        api_order = order if isinstance(order, Order) else None
+        sim = SimOrder.from_model(order) if api_order is not None else order
+        self.active_orders[sim.order_id] = sim
 
         # Route to execution engine
         if self.execution_engine:
-            await self.execution_engine.process_order(order)
+            await self.execution_engine.process_order(sim)
         else:
-            logger.warning(f"Execution engine not available for order {order.order_id}")
+            logger.warning(f"Execution engine not available for order {sim.external_id}")
 
-        return order.order_id
+        if api_order is not None:
+            sim.update_model(api_order)
+            return api_order.order_id
+        return sim.order_id
 
     def get_order_book(self, symbol: str) -> Optional[OrderBook]:
         """Get current order book for symbol."""
+        # Depth snapshots are rebuilt lazily, only when someone reads them
+        if self.order_book_sim:
+            self.order_book_sim.refresh_snapshot(symbol)
         return self.order_books.get(symbol)
 
     def get_market_state(self, symbol: str) -> Optional[MarketState]:
@@ -182,6 +197,11 @@ class PRISMEngine:
         if self.persistence_enabled and self.questdb_client:
             await self.questdb_client.store_fill(fill)
 
+    async def store_fills(self, indices: Iterable[int]):
+        """Store fills from the fill buffer to persistence layer (batch)."""
+        if self.persistence_enabled and self.questdb_client:
+            await self.questdb_client.store_fills(self.fills.to_models(indices))
+
     async def store_analytics(self, symbol: str):
         """Store analytics metrics for a symbol."""
         if not self.persistence_enabled:
@@ -215,7 +235,7 @@ class PRISMEngine:
 
             # Store order book snapshot to ClickHouse (every N seconds)
             if self.clickhouse_client and symbol in self.order_books:
-                order_book = self.order_books[symbol]
+                order_book = self.get_order_book(symbol)
                 order_book_dict = {
                     'bids': [{'price': level.price, 'quantity': level.quantity, 'num_orders': level.num_orders}
                              for level in order_book.bids],
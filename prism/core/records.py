@@ -0,0 +1,187 @@
+"""
+Compact internal PRISM records.
+
+Agents and the matching engine work with SimOrder (a slotted record with an
+integer id) and append fills to a columnar FillBuffer. Pydantic Order/Fill
+models are only built at the API and persistence boundary.
+"""
+import itertools
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID, uuid4
+
+import numpy as np
+
+from .models import Order, Fill, OrderSide, OrderType, OrderStatus
+
+_order_ids = itertools.count(1)
+
+
+class SimOrder:
+    """Slotted order record used inside the simulation (no validation)."""
+
+    __slots__ = (
+        "order_id", "symbol", "side", "order_type", "quantity", "price",
+        "filled_quantity", "average_fill_price", "status", "timestamp",
+        "trader_id", "uuid"
+    )
+
+    def __init__(self, symbol: str, side: OrderSide, order_type: OrderType,
+                 quantity: float, price: Optional[float] = None,
+                 trader_id: Optional[str] = None, uuid: Optional[UUID] = None):
+        self.order_id = next(_order_ids)
+        self.symbol = symbol
+        self.side = side
+        self.order_type = order_type
+        self.quantity = quantity
+        self.price = price
+        self.filled_quantity = 0.0
+        self.average_fill_price = 0.0
+        self.status = OrderStatus.PENDING
+        self.timestamp = time.time()
+        self.trader_id = trader_id
+        self.uuid = uuid  # External id for orders that came through the API
+
+    @classmethod
+    def from_model(cls, order: Order) -> "SimOrder":
+        """Convert an API order into an internal record."""
+        sim = cls(
+            symbol=order.symbol,
+            side=order.side,
+            order_type=order.order_type,
+            quantity=order.quantity,
+            price=order.price,
+            trader_id=order.trader_id,
+            uuid=order.order_id
+        )
+        sim.filled_quantity = order.filled_quantity
+        sim.average_fill_price = order.average_fill_price
+        sim.status = order.status
+        return sim
+
+    @property
+    def external_id(self) -> UUID:
+        """UUID exposed outside PRISM (derived from the integer id if none)."""
+        return self.uuid if self.uuid is not None else UUID(int=self.order_id)
+
+    def update_model(self, order: Order):
+        """Copy execution state back onto the API order."""
+        order.filled_quantity = self.filled_quantity
+        order.average_fill_price = self.average_fill_price
+        order.status = self.status
+
+    def to_model(self) -> Order:
+        """Build the pydantic Order for this record."""
+        return Order(
+            order_id=self.external_id,
+            symbol=self.symbol,
+            side=self.side,
+            order_type=self.order_type,
+            quantity=self.quantity,
+            price=self.price,
+            filled_quantity=self.filled_quantity,
+            average_fill_price=self.average_fill_price,
+            status=self.status,
+            timestamp=datetime.utcfromtimestamp(self.timestamp),
+            trader_id=self.trader_id
+        )
+
+
+class FillBuffer:
+    """
+    Append-only columnar fill store.
+
+    Each column is a typed ``array.array`` (8 bytes or less per value instead
+    of a pydantic object per fill). Columns are read into NumPy for analytics.
+    Symbols are interned to integer codes.
+    """
+
+    _SIDES = (OrderSide.BUY, OrderSide.SELL)
+    _LIQUIDITY = ("taker", "maker")
+
+    def __init__(self):
+        self.order_id = array("q")
+        self.symbol_code = array("i")
+        self.side = array("b")
+        self.liquidity = array("b")
+        self.quantity = array("d")
+        self.price = array("d")
+        self.timestamp = array("d")
+
+        self.symbols: List[str] = []
+        self._symbol_codes: Dict[str, int] = {}
+        self._order_uuids: Dict[int, UUID] = {}
+
+        # Fill ids are <run prefix | index>, stable for the life of the buffer
+        self._id_prefix = uuid4().int & ~((1 << 64) - 1)
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def _code(self, symbol: str) -> int:
+        code = self._symbol_codes.get(symbol)
+        if code is None:
+            code = len(self.symbols)
+            self._symbol_codes[symbol] = code
+            self.symbols.append(symbol)
+        return code
+
+    def append(self, order: SimOrder, quantity: float, price: float,
+               liquidity: str = "taker") -> int:
+        """Record a fill for ``order`` and return its index."""
+        self.order_id.append(order.order_id)
+        self.symbol_code.append(self._code(order.symbol))
+        self.side.append(0 if order.side == OrderSide.BUY else 1)
+        self.liquidity.append(0 if liquidity == "taker" else 1)
+        self.quantity.append(quantity)
+        self.price.append(price)
+        self.timestamp.append(time.time())
+
+        if order.uuid is not None:
+            self._order_uuids[order.order_id] = order.uuid
+
+        return len(self.price) - 1
+
+    def column(self, name: str, indices: np.ndarray = None) -> np.ndarray:
+        """
+        NumPy copy of a column, optionally restricted to ``indices``.
+
+        The temporary buffer view is released before returning, since an
+        ``array.array`` cannot grow while a view of it is alive.
+        """
+        values = getattr(self, name)
+        view = np.frombuffer(values, dtype=values.typecode)
+        result = view.copy() if indices is None else view[indices]
+        del view
+        return result
+
+    def symbol_indices(self, symbol: str) -> np.ndarray:
+        """Indices of all fills for ``symbol``."""
+        code = self._symbol_codes.get(symbol)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        view = np.frombuffer(self.symbol_code, dtype=self.symbol_code.typecode)
+        indices = np.flatnonzero(view == code)
+        del view
+        return indices
+
+    def to_model(self, i: int) -> Fill:
+        """Build the pydantic Fill for fill ``i``."""
+        i = int(i)
+        order_id = self.order_id[i]
+        return Fill(
+            fill_id=UUID(int=self._id_prefix | i),
+            order_id=self._order_uuids.get(order_id) or UUID(int=order_id),
+            symbol=self.symbols[self.symbol_code[i]],
+            side=self._SIDES[self.side[i]],
+            quantity=self.quantity[i],
+            price=self.price[i],
+            timestamp=datetime.utcfromtimestamp(self.timestamp[i]),
+            liquidity=self._LIQUIDITY[self.liquidity[i]]
+        )
+
+    def to_models(self, indices: Iterable[int]) -> List[Fill]:
+        """Build pydantic Fills for a set of fill indices."""
+        return [self.to_model(i) for i in indices]
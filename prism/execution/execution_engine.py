@@ -4,7 +4,8 @@ Execution Engine - processes and executes orders realistically.
 import logging
 import asyncio
 from typing import List
-from ..core.models import Order, Fill, OrderType, OrderStatus, OrderSide
+from ..core.models import OrderType, OrderStatus, OrderSide
+from ..core.records import SimOrder
 from ..config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -19,7 +20,7 @@ class ExecutionEngine:
         self.engine = engine
         logger.info("ExecutionEngine initialized")
 
-    async def process_order(self, order: Order):
+    async def process_order(self, order: SimOrder):
         """Process an incoming order."""
         # Simulate execution latency
         await asyncio.sleep(settings.LATENCY_MS / 1000.0)
@@ -32,7 +33,7 @@ class ExecutionEngine:
             logger.warning(f"Order type {order.order_type} not yet implemented")
             order.status = OrderStatus.REJECTED
 
-    async def _execute_market_order(self, order: Order):
+    async def _execute_market_order(self, order: SimOrder):
         """Execute a market order immediately."""
         if not self.engine.order_book_sim:
             logger.error("Order book simulator not available")
@@ -54,27 +55,24 @@ class ExecutionEngine:
         if self.engine.liquidity_model and order.filled_quantity > 0:
             self.engine.liquidity_model.apply_liquidity_depletion(order, order.filled_quantity)
 
-        # Record fills
-        self.engine.fills.extend(fills)
-
-        # Store fills to persistence layer
-        for fill in fills:
-            asyncio.create_task(self.engine.store_fill(fill))
+        # Store fills to persistence layer (already recorded in engine.fills)
+        if fills:
+            asyncio.create_task(self.engine.store_fills(fills))
 
         # Update market state
         if fills and order.symbol in self.engine.symbols:
             # Update last trade price
-            last_fill = fills[-1]
-            self.engine.symbols[order.symbol].last_price = last_fill.price
+            last_price = self.engine.fills.price[fills[-1]]
+            self.engine.symbols[order.symbol].last_price = last_price
             self.engine.symbols[order.symbol].volume += order.filled_quantity
 
             # Update order book last trade price
             if order.symbol in self.engine.order_books:
-                self.engine.order_books[order.symbol].last_trade_price = last_fill.price
+                self.engine.order_books[order.symbol].last_trade_price = last_price
 
         logger.info(f"Market order executed: {order.symbol} {order.side.value} {order.filled_quantity} @ avg ${order.average_fill_price:.2f}")
 
-    async def _execute_limit_order(self, order: Order):
+    async def _execute_limit_order(self, order: SimOrder):
         """Execute a limit order (add to book or match)."""
         if not self.engine.order_book_sim:
             logger.error("Order book simulator not available")
@@ -89,21 +87,17 @@ class ExecutionEngine:
             if self.engine.liquidity_model:
                 self.engine.liquidity_model.apply_liquidity_depletion(order, order.filled_quantity)
 
-            # Record fills
-            self.engine.fills.extend(fills)
-
-            # Store fills to persistence layer
-            for fill in fills:
-                asyncio.create_task(self.engine.store_fill(fill))
+            # Store fills to persistence layer (already recorded in engine.fills)
+            asyncio.create_task(self.engine.store_fills(fills))
 
             # Update market state
             if order.symbol in self.engine.symbols:
-                last_fill = fills[-1]
-                self.engine.symbols[order.symbol].last_price = last_fill.price
+                last_price = self.engine.fills.price[fills[-1]]
+                self.engine.symbols[order.symbol].last_price = last_price
                 self.engine.symbols[order.symbol].volume += order.filled_quantity
 
                 if order.symbol in self.engine.order_books:
-                    self.engine.order_books[order.symbol].last_trade_price = last_fill.price
+                    self.engine.order_books[order.symbol].last_trade_price = last_price
 
         # If not fully filled, add to book
         if order.filled_quantity < order.quantity:
@@ -111,7 +105,7 @@ class ExecutionEngine:
 
         logger.info(f"Limit order processed: {order.symbol} {order.side.value} {order.quantity} @ ${order.price} (filled: {order.filled_quantity})")
 
-    def calculate_slippage(self, order: Order) -> float:
+    def calculate_slippage(self, order: SimOrder) -> float:
         """Calculate slippage for an order."""
         if not self.engine.liquidity_model:
             return 0.0
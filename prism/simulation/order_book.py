@@ -1,17 +1,104 @@
 """
 Order Book Simulator - realistic limit order book dynamics.
+
+Each book side keeps its price levels in a dict of integer tick -> PriceLevel
+plus a heap of ticks (best price on top, lazy deletion).
+A level is a FIFO queue of resting orders keyed by order id, so cancels are
+O(1) through the order-id index. Depth snapshots are only rebuilt when the
+engine's OrderBook is read.
+
+Resting and incoming orders are SimOrder records; fills are appended to the
+engine's columnar FillBuffer and referenced by index.
 """
 import logging
-from typing import List, Optional, Tuple
-from collections import defaultdict
+from heapq import heapify, heappop, heappush, nlargest, nsmallest
+from collections import OrderedDict
+from typing import Dict, List, Optional
 from datetime import datetime
 
-from ..core.models import Order, OrderSide, OrderType, OrderStatus, OrderBookLevel, Fill
+from ..core.models import OrderSide, OrderType, OrderStatus, OrderBookLevel
+from ..core.records import SimOrder
 from ..config.settings import settings
 
 logger = logging.getLogger(__name__)
 
 
+class PriceLevel:
+    """FIFO queue of resting orders at one tick price."""
+
+    __slots__ = ("tick", "orders", "quantity")
+
+    def __init__(self, tick: int):
+        self.tick = tick
+        self.orders: "OrderedDict[int, SimOrder]" = OrderedDict()
+        self.quantity = 0.0  # Total remaining quantity at this level
+
+    def append(self, order: SimOrder):
+        self.orders[order.order_id] = order
+        self.quantity += order.quantity - order.filled_quantity
+
+    def discard(self, order: SimOrder) -> bool:
+        if self.orders.pop(order.order_id, None) is None:
+            return False
+        self.quantity -= order.quantity - order.filled_quantity
+        return True
+
+
+class BookSide:
+    """
+    One side of a limit order book.
+
+    Price levels live in ``levels`` (tick -> PriceLevel); ``heap`` orders the
+    ticks best-first (bids stored negated) with lazy deletion: dropping a
+    level only removes it from ``levels``, and stale heap entries are
+    discarded when they reach the top. Adding or dropping a level is
+    O(log n) and the best price is O(1) amortized.
+    """
+
+    __slots__ = ("is_bid", "heap", "levels")
+
+    def __init__(self, is_bid: bool):
+        self.is_bid = is_bid
+        self.heap: List[int] = []
+        self.levels: Dict[int, PriceLevel] = {}
+
+    def __bool__(self):
+        return bool(self.levels)
+
+    def best_tick(self) -> Optional[int]:
+        heap = self.heap
+        while heap:
+            tick = -heap[0] if self.is_bid else heap[0]
+            if tick in self.levels:
+                return tick
+            heappop(heap)
+        return None
+
+    def level(self, tick: int) -> PriceLevel:
+        level = self.levels.get(tick)
+        if level is None:
+            level = PriceLevel(tick)
+            self.levels[tick] = level
+            heappush(self.heap, -tick if self.is_bid else tick)
+            if len(self.heap) > 2 * len(self.levels) + 64:
+                self._compact()
+        return level
+
+    def drop_level(self, tick: int):
+        del self.levels[tick]
+
+    def best_ticks(self, depth: int) -> List[int]:
+        """Up to ``depth`` ticks, best price first."""
+        if self.is_bid:
+            return nlargest(depth, self.levels)
+        return nsmallest(depth, self.levels)
+
+    def _compact(self):
+        """Rebuild the heap from live levels (bounds stale entries from re-added ticks)."""
+        self.heap = [-tick if self.is_bid else tick for tick in self.levels]
+        heapify(self.heap)
+
+
 class OrderBookSimulator:
     """
     Simulates a realistic limit order book with proper matching logic.
@@ -19,16 +106,35 @@ class OrderBookSimulator:
 
     def __init__(self, engine):
         self.engine = engine
+        self.tick_size = settings.TICK_SIZE
+
+        # Order book: symbol -> {side -> BookSide}
+        self.books: Dict[str, Dict[str, BookSide]] = {}
 
-        # Order book: symbol -> {side -> price -> [orders]}
-        self.orders = defaultdict(lambda: {
-            "buy": defaultdict(list),
-            "sell": defaultdict(list)
-        })
+        # Resting order handles: order_id -> (symbol, side, tick)
+        self._index: Dict[int, tuple] = {}
+
+        # Symbols whose depth snapshot is out of date
+        self._dirty = set()
 
         logger.info("OrderBookSimulator initialized")
 
-    def add_order(self, order: Order):
+    def to_tick(self, price: float) -> int:
+        """Convert a price to integer ticks."""
+        return int(round(price / self.tick_size))
+
+    def to_price(self, tick: int) -> float:
+        """Convert integer ticks back to a price."""
+        return round(tick * self.tick_size, 10)
+
+    def _book(self, symbol: str) -> Dict[str, BookSide]:
+        book = self.books.get(symbol)
+        if book is None:
+            book = {"buy": BookSide(is_bid=True), "sell": BookSide(is_bid=False)}
+            self.books[symbol] = book
+        return book
+
+    def add_order(self, order: SimOrder):
         """Add an order to the order book."""
         symbol = order.symbol
         side = "buy" if order.side == OrderSide.BUY else "sell"
@@ -38,90 +144,79 @@ class OrderBookSimulator:
             # Market orders don't go in book
             return
 
-        self.orders[symbol][side][price].append(order)
+        tick = self.to_tick(price)
+        self._book(symbol)[side].level(tick).append(order)
+        self._index[order.order_id] = (symbol, side, tick)
         order.status = OrderStatus.OPEN
 
-        # Update order book snapshot
-        self._update_order_book_snapshot(symbol)
+        self._dirty.add(symbol)
 
         logger.debug(f"Added {side} order for {symbol} at ${price}")
 
-    def remove_order(self, order: Order):
-        """Remove an order from the order book."""
-        symbol = order.symbol
-        side = "buy" if order.side == OrderSide.BUY else "sell"
-        price = order.price
+    def cancel_order(self, order_id: int) -> Optional[SimOrder]:
+        """Remove a resting order by id in O(1). Returns the order, if found."""
+        handle = self._index.pop(order_id, None)
+        if handle is None:
+            return None
 
-        if price and symbol in self.orders:
-            orders_at_price = self.orders[symbol][side].get(price, [])
-            if order in orders_at_price:
-                orders_at_price.remove(order)
+        symbol, side, tick = handle
+        book_side = self.books[symbol][side]
+        level = book_side.levels[tick]
+        order = level.orders[order_id]
+        level.discard(order)
 
-                # Clean up empty price level
-                if not orders_at_price:
-                    del self.orders[symbol][side][price]
+        # Clean up empty price level
+        if not level.orders:
+            book_side.drop_level(tick)
 
-        # Update snapshot
-        self._update_order_book_snapshot(symbol)
+        self._dirty.add(symbol)
+        return order
+
+    def remove_order(self, order: SimOrder):
+        """Remove an order from the order book."""
+        self.cancel_order(order.order_id)
 
-    def match_order(self, order: Order) -> List[Fill]:
+    def match_order(self, order: SimOrder) -> range:
         """
         Match an incoming order against the order book.
-        Returns list of fills.
+        Returns the indices of the new fills in ``engine.fills``.
         """
         symbol = order.symbol
-        fills = []
+        fills = self.engine.fills
+        first_fill = len(fills)
 
-        # Get opposite side of book
-        if order.side == OrderSide.BUY:
-            # Buy order matches against asks (sell orders)
-            opposite_side = "sell"
-            compare = lambda order_price, book_price: order.order_type == OrderType.MARKET or order_price >= book_price
-        else:
-            # Sell order matches against bids (buy orders)
-            opposite_side = "buy"
-            compare = lambda order_price, book_price: order.order_type == OrderType.MARKET or order_price <= book_price
+        if symbol not in self.books:
+            return range(first_fill, first_fill)
 
-        if symbol not in self.orders:
-            return fills
+        # Buy orders match against asks (sell orders) and vice versa
+        is_buy = order.side == OrderSide.BUY
+        book_side = self.books[symbol]["sell" if is_buy else "buy"]
 
-        # Get sorted price levels
-        price_levels = sorted(
-            self.orders[symbol][opposite_side].keys(),
-            reverse=(opposite_side == "buy")  # Best prices first
-        )
+        is_market = order.order_type == OrderType.MARKET
+        limit_tick = None if is_market or order.price is None else self.to_tick(order.price)
 
         remaining_qty = order.quantity - order.filled_quantity
 
-        for price in price_levels:
-            if remaining_qty <= 0:
-                break
+        while remaining_qty > 0 and book_side:
+            tick = book_side.best_tick()
 
             # Check if price acceptable
-            if not compare(order.price, price):
+            if limit_tick is not None and (tick > limit_tick if is_buy else tick < limit_tick):
                 break
 
-            # Match against orders at this price level
-            orders_at_level = self.orders[symbol][opposite_side][price]
+            level = book_side.levels[tick]
+            price = self.to_price(tick)
 
-            for book_order in orders_at_level[:]:  # Copy list to modify during iteration
-                if remaining_qty <= 0:
-                    break
+            # Match against orders at this price level, oldest first
+            while remaining_qty > 0 and level.orders:
+                book_order = next(iter(level.orders.values()))
 
                 # Calculate fill quantity
                 available = book_order.quantity - book_order.filled_quantity
                 fill_qty = min(remaining_qty, available)
 
-                # Create fill
-                fill = Fill(
-                    order_id=order.order_id,
-                    symbol=symbol,
-                    side=order.side,
-                    quantity=fill_qty,
-                    price=price,
-                    liquidity="taker"  # Incoming order is taker
-                )
-                fills.append(fill)
+                # Record fill (incoming order is taker)
+                fills.append(order, fill_qty, price, "taker")
 
                 # Update order
                 order.filled_quantity += fill_qty
@@ -136,11 +231,13 @@ class OrderBookSimulator:
                     (book_order.average_fill_price * (book_order.filled_quantity - fill_qty) + price * fill_qty)
                     / book_order.filled_quantity
                 )
+                level.quantity -= fill_qty
 
-                # Update statuses
-                if book_order.filled_quantity >= book_order.quantity:
+                # Update statuses (comparing against available avoids float dust)
+                if fill_qty >= available:
                     book_order.status = OrderStatus.FILLED
-                    self.remove_order(book_order)
+                    level.orders.popitem(last=False)
+                    self._index.pop(book_order.order_id, None)
                 else:
                     book_order.status = OrderStatus.PARTIALLY_FILLED
 
@@ -148,47 +245,49 @@ class OrderBookSimulator:
 
                 logger.debug(f"Matched {fill_qty} @ ${price} for {symbol}")
 
+            # Clean up exhausted price level
+            if not level.orders:
+                book_side.drop_level(tick)
+
         # Update incoming order status
         if order.filled_quantity >= order.quantity:
             order.status = OrderStatus.FILLED
         elif order.filled_quantity > 0:
             order.status = OrderStatus.PARTIALLY_FILLED
 
-        # Update order book snapshot
+        new_fills = range(first_fill, len(fills))
+        if new_fills:
+            self._dirty.add(symbol)
+
+        return new_fills
+
+    def refresh_snapshot(self, symbol: str):
+        """Rebuild the engine's depth snapshot for symbol if the book changed."""
+        if symbol not in self._dirty:
+            return
+        self._dirty.discard(symbol)
         self._update_order_book_snapshot(symbol)
 
-        return fills
+    def _depth(self, book_side: BookSide) -> List[OrderBookLevel]:
+        levels = []
+        for tick in book_side.best_ticks(settings.MAX_ORDER_BOOK_DEPTH):
+            level = book_side.levels[tick]
+            if level.quantity > 0:
+                levels.append(OrderBookLevel(
+                    price=self.to_price(tick),
+                    quantity=level.quantity,
+                    num_orders=len(level.orders)
+                ))
+        return levels
 
     def _update_order_book_snapshot(self, symbol: str):
         """Update the order book snapshot in engine."""
-        if symbol not in self.orders:
+        if symbol not in self.books:
             return
 
-        # Aggregate bids (buy orders) - sorted high to low
-        bids = []
-        buy_prices = sorted(self.orders[symbol]["buy"].keys(), reverse=True)
-        for price in buy_prices[:settings.MAX_ORDER_BOOK_DEPTH]:
-            orders = self.orders[symbol]["buy"][price]
-            total_qty = sum(o.quantity - o.filled_quantity for o in orders)
-            if total_qty > 0:
-                bids.append(OrderBookLevel(
-                    price=price,
-                    quantity=total_qty,
-                    num_orders=len(orders)
-                ))
-
-        # Aggregate asks (sell orders) - sorted low to high
-        asks = []
-        sell_prices = sorted(self.orders[symbol]["sell"].keys())
-        for price in sell_prices[:settings.MAX_ORDER_BOOK_DEPTH]:
-            orders = self.orders[symbol]["sell"][price]
-            total_qty = sum(o.quantity - o.filled_quantity for o in orders)
-            if total_qty > 0:
-                asks.append(OrderBookLevel(
-                    price=price,
-                    quantity=total_qty,
-                    num_orders=len(orders)
-                ))
+        # Bids sorted high to low, asks low to high
+        bids = self._depth(self.books[symbol]["buy"])
+        asks = self._depth(self.books[symbol]["sell"])
 
         # Update engine's order book
         if symbol in self.engine.order_books:
@@ -198,15 +297,15 @@ class OrderBookSimulator:
 
     def get_best_bid(self, symbol: str) -> Optional[float]:
         """Get best bid price."""
-        if symbol not in self.orders or not self.orders[symbol]["buy"]:
+        if symbol not in self.books or not self.books[symbol]["buy"]:
             return None
-        return max(self.orders[symbol]["buy"].keys())
+        return self.to_price(self.books[symbol]["buy"].best_tick())
 
     def get_best_ask(self, symbol: str) -> Optional[float]:
         """Get best ask price."""
-        if symbol not in self.orders or not self.orders[symbol]["sell"]:
+        if symbol not in self.books or not self.books[symbol]["sell"]:
             return None
-        return min(self.orders[symbol]["sell"].keys())
+        return self.to_price(self.books[symbol]["sell"].best_tick())
 
     def get_mid_price(self, symbol: str) -> Optional[float]:
         """Get mid price."""
@@ -0,0 +1,160 @@
+"""
+PRISM Order Book Microbenchmark
+Measures in-process matching engine throughput (no HTTP, no engine loop).
+
+Run from the repository root:
+    python -m prism.tests.benchmark_order_book
+"""
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from prism.core.models import OrderBook, OrderSide, OrderType
+from prism.core.records import SimOrder, FillBuffer
+from prism.simulation.order_book import OrderBookSimulator
+
+SYMBOL = "BTCUSDT"
+MID_PRICE = 60000.0
+
+
+class _StubEngine:
+    """Minimal engine exposing the order book snapshot dict and fill buffer."""
+
+    def __init__(self):
+        self.order_books = {SYMBOL: OrderBook(symbol=SYMBOL)}
+        self.fills = FillBuffer()
+
+
+def _limit_order(rng, spread_ticks=500):
+    side = rng.choice([OrderSide.BUY, OrderSide.SELL])
+    offset = rng.randint(1, spread_ticks) * 0.01
+    price = MID_PRICE - offset if side == OrderSide.BUY else MID_PRICE + offset
+    return SimOrder(
+        symbol=SYMBOL,
+        side=side,
+        order_type=OrderType.LIMIT,
+        quantity=rng.uniform(1, 100),
+        price=round(price, 2)
+    )
+
+
+def _market_order(rng):
+    return SimOrder(
+        symbol=SYMBOL,
+        side=rng.choice([OrderSide.BUY, OrderSide.SELL]),
+        order_type=OrderType.MARKET,
+        quantity=rng.uniform(1, 50)
+    )
+
+
+def _report(name, count, duration, latencies=None):
+    print(f"\n{name}:")
+    print(f"  Operations: {count}")
+    print(f"  Duration: {duration:.3f}s")
+    print(f"  Throughput: {count / duration:,.0f} ops/sec")
+    if latencies:
+        print(f"  Mean: {statistics.mean(latencies):.2f} us")
+        print(f"  P99: {statistics.quantiles(latencies, n=100)[98]:.2f} us")
+    return count / duration
+
+
+def benchmark_add(num_orders=50000, seed=0):
+    """Resting limit order inserts."""
+    rng = random.Random(seed)
+    orders = [_limit_order(rng) for _ in range(num_orders)]
+    book = OrderBookSimulator(_StubEngine())
+
+    start = time.perf_counter()
+    for order in orders:
+        book.add_order(order)
+    duration = time.perf_counter() - start
+
+    return _report("Add (resting limit orders)", num_orders, duration), book, orders
+
+
+def benchmark_cancel(book, orders, seed=1):
+    """Cancels by order id, in random order."""
+    rng = random.Random(seed)
+    order_ids = [o.order_id for o in orders]
+    rng.shuffle(order_ids)
+
+    start = time.perf_counter()
+    for order_id in order_ids:
+        book.cancel_order(order_id)
+    duration = time.perf_counter() - start
+
+    return _report("Cancel (by order id)", len(order_ids), duration)
+
+
+def benchmark_mixed(num_events=50000, depth_orders=5000, seed=2):
+    """Agent-like flow: 60% limit, 30% market, 10% cancel."""
+    rng = random.Random(seed)
+    engine = _StubEngine()
+    book = OrderBookSimulator(engine)
+
+    resting = []
+    for _ in range(depth_orders):
+        order = _limit_order(rng)
+        book.add_order(order)
+        resting.append(order.order_id)
+
+    events = []
+    for _ in range(num_events):
+        r = rng.random()
+        if r < 0.6:
+            events.append(("limit", _limit_order(rng, spread_ticks=50)))
+        elif r < 0.9:
+            events.append(("market", _market_order(rng)))
+        else:
+            events.append(("cancel", None))
+
+    latencies = []
+    start = time.perf_counter()
+    for kind, order in events:
+        t0 = time.perf_counter()
+        if kind == "cancel":
+            if resting:
+                book.cancel_order(resting.pop(rng.randrange(len(resting))))
+        else:
+            book.match_order(order)
+            if kind == "limit" and order.filled_quantity < order.quantity:
+                book.add_order(order)
+                resting.append(order.order_id)
+        latencies.append((time.perf_counter() - t0) * 1e6)
+    duration = time.perf_counter() - start
+
+    throughput = _report("Mixed flow (limit/market/cancel)", num_events, duration, latencies)
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        book._dirty.add(SYMBOL)
+        book.refresh_snapshot(SYMBOL)
+    _report("Depth snapshot rebuild", 1000, time.perf_counter() - start)
+
+    return throughput
+
+
+def run_all_benchmarks():
+    print(f"{'='*60}")
+    print("PRISM ORDER BOOK MICROBENCHMARK")
+    print(f"{'='*60}")
+
+    results = {}
+    results["add"], book, orders = benchmark_add()
+    results["cancel"] = benchmark_cancel(book, orders)
+    results["mixed"] = benchmark_mixed()
+
+    print(f"\n{'='*60}")
+    print(f"Benchmarks completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*60}\n")
+
+    return results
+
+
+if __name__ == "__main__":
+    results = run_all_benchmarks()